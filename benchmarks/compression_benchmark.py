@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compare results-file compression codecs: compression ratio, the time the
+master's hot loop spends in RunResults.process_raw_results() (which must stay
+negligible), writer throughput until finalize() returns, and streaming read
+throughput.
+
+  $ python benchmarks/compression_benchmark.py --results 1000000
+"""
+
+import os
+import sys
+import time
+import msgpack
+import argparse
+import tempfile
+
+from ssbench.scenario import Scenario
+from ssbench.run_results import RunResults, available_codecs
+
+from report_benchmark import SCENARIO_PATH, synthetic_batches
+
+
+def main(argv):
+    arg_parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument(
+        '--results', type=int, default=1000000, metavar='COUNT',
+        help='Number of synthetic results to write')
+    arg_parser.add_argument(
+        '--batch-size', type=int, default=10, metavar='COUNT',
+        help='Results per batch, as sent by workers with --batch-size')
+    arg_parser.add_argument(
+        '--codecs', nargs='+', default=['none'] + available_codecs(),
+        help='Codecs to compare')
+    args = arg_parser.parse_args(argv)
+
+    scenario = Scenario(SCENARIO_PATH)
+    packed_batches = [msgpack.packb(batch) for batch in synthetic_batches(
+        args.results, args.batch_size, 10, scenario.sizes_by_name.keys())]
+    raw_bytes = len(scenario.packb()) + sum(map(len, packed_batches))
+    print '%d results, %.1f MB uncompressed' % (args.results,
+                                                raw_bytes / 1e6)
+    print '%-6s  %6s  %12s  %12s  %12s' % (
+        'codec', 'ratio', 'hot loop us', 'write MB/s', 'read MB/s')
+
+    fd, path = tempfile.mkstemp(suffix='.stat')
+    os.close(fd)
+    try:
+        for codec in args.codecs:
+            run_results = RunResults(
+                path, compression=None if codec == 'none' else codec)
+            start = time.time()
+            run_results.start_run(scenario)
+            hot_loop_seconds = 0.0
+            for packed in packed_batches:
+                call_start = time.time()
+                run_results.process_raw_results(packed)
+                hot_loop_seconds += time.time() - call_start
+            run_results.finalize()
+            write_seconds = time.time() - start
+
+            start = time.time()
+            _, unpacker = RunResults(path).read_results()
+            for _ in unpacker:
+                pass
+            read_seconds = time.time() - start
+
+            print '%-6s  %6.2f  %12.2f  %12.1f  %12.1f' % (
+                codec, float(raw_bytes) / os.path.getsize(path),
+                hot_loop_seconds * 1e6 / len(packed_batches),
+                raw_bytes / 1e6 / write_seconds,
+                raw_bytes / 1e6 / read_seconds)
+            sys.stdout.flush()
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compare the gevent and threaded (ssbench-worker --engine threads) worker
+engines running PUT and GET jobs against a local HTTP stand-in for Swift
+(a gevent WSGI server in its own process, which stores nothing).
+
+Each engine runs in its own process, so only the gevent one is
+monkey-patched.  Jobs are handed straight to its job runners and results
+taken off its result queue, so no master is needed.  This reports the jobs/s
+each engine managed and, since the stand-in may well be the bottleneck, the
+jobs per CPU-second the worker process used.
+
+  $ python benchmarks/engine_benchmark.py --jobs 20000 --concurrency 16 64
+"""
+
+import os
+import sys
+import time
+import resource
+import argparse
+import multiprocessing
+
+import ssbench
+
+
+def stand_in(port, size, conn):
+    from gevent.pywsgi import WSGIServer
+    body = 'A' * size
+
+    def app(environ, start_response):
+        method = environ['REQUEST_METHOD']
+        headers = [('X-Trans-Id', 'tx-stand-in')]
+        if method == 'PUT':
+            wsgi_input = environ['wsgi.input']
+            while wsgi_input.read(65536):
+                pass
+            start_response('201 Created', headers + [('Content-Length',
+                                                      '0')])
+            return ['']
+        if method in ('GET', 'HEAD'):
+            start_response('200 OK', headers + [('Content-Length',
+                                                 str(size))])
+            return [body] if method == 'GET' else ['']
+        start_response('204 No Content', headers + [('Content-Length', '0')])
+        return ['']
+    server = WSGIServer(('127.0.0.1', port), app, log=None)
+    server.start()
+    conn.send(server.server_port)
+    server.serve_forever()
+
+
+def make_jobs(count, url, size):
+    auth_kwargs = {'token': 'stand-in', 'storage_urls': [url]}
+    return [{'type': (ssbench.CREATE_OBJECT, ssbench.READ_OBJECT)[i % 2],
+             'container': 'stand_in', 'name': 'obj_%06d' % (i // 2),
+             'size_str': 'bench', 'size': size, 'block_size': 65536,
+             'auth_kwargs': auth_kwargs}
+            for i in xrange(count)]
+
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def feed(worker, jobs):
+    for job in jobs:
+        worker._spawn_job(job)
+
+
+def run_engine(engine, concurrency, jobs, conn):
+    if engine == 'gevent':
+        from ssbench.worker import Worker as worker_class, monkey_patch
+        monkey_patch()
+    else:
+        from ssbench.threaded_worker import ThreadedWorker as worker_class
+    # The sockets are never used; connecting them is harmless
+    worker = worker_class('127.0.0.1', 1, 2, 0, 0, concurrency=concurrency)
+    worker._start_job_runners()
+    errors = 0
+    start, cpu_start = time.time(), cpu_seconds()
+    worker._spawn(feed, worker, jobs)
+    for _ in xrange(len(jobs)):
+        if 'exception' in worker.result_queue.get():
+            errors += 1
+    conn.send((time.time() - start, cpu_seconds() - cpu_start, errors))
+    os._exit(0)
+
+
+def in_process(target, *args):
+    parent_conn, child_conn = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=target,
+                                      args=args + (child_conn,))
+    process.daemon = True
+    process.start()
+    return process, parent_conn
+
+
+def main(argv):
+    arg_parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument(
+        '--jobs', type=int, default=20000, metavar='COUNT',
+        help='Number of jobs (half PUTs, half GETs) per engine')
+    arg_parser.add_argument(
+        '--concurrency', type=int, nargs='+', default=[16, 64],
+        metavar='COUNT', help='Jobs in flight at once')
+    arg_parser.add_argument(
+        '--size', type=int, default=4096, metavar='BYTES',
+        help='Object size')
+    arg_parser.add_argument(
+        '--engines', nargs='+', default=['gevent', 'threads'],
+        choices=['gevent', 'threads'], help='Engines to compare')
+    args = arg_parser.parse_args(argv)
+
+    server, server_conn = in_process(stand_in, 0, args.size)
+    url = 'http://127.0.0.1:%d/v1/AUTH_bench' % server_conn.recv()
+    jobs = make_jobs(args.jobs, url, args.size)
+    print '%8s  %11s  %10s  %14s  %7s' % (
+        'engine', 'concurrency', 'jobs/s', 'jobs/CPU-sec', 'errors')
+    try:
+        for concurrency in args.concurrency:
+            for engine in args.engines:
+                process, conn = in_process(run_engine, engine, concurrency,
+                                           jobs)
+                elapsed, cpu, errors = conn.recv()
+                process.join()
+                print '%8s  %11d  %10.0f  %14.0f  %7d' % (
+                    engine, concurrency, len(jobs) / elapsed,
+                    len(jobs) / cpu, errors)
+                sys.stdout.flush()
+    finally:
+        server.terminate()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compare the cost of sending noop-mode jobs from ssbench-master to
+ssbench-worker as self-contained dicts (each carrying auth_kwargs and
+timeouts) and in compact form against a RunContext.
+
+For each encoding, this reports the bytes per job on the wire and the jobs/s
+the master can pack and a worker can unpack (and expand back into job
+dicts), each on one CPU.
+
+  $ python benchmarks/job_encoding_benchmark.py --jobs 200000
+"""
+
+import os
+import sys
+import time
+import msgpack
+import argparse
+
+from ssbench.scenario import ScenarioNoop
+from ssbench.run_context import RunContext, is_compact_message
+from ssbench.run_state import RunState
+
+
+SCENARIO_PATH = os.path.join(os.path.dirname(__file__), os.pardir,
+                             'scenarios', 'very_small.scenario')
+# Roughly what v2.0 auth looks like coming from the command-line
+AUTH_KWARGS = {
+    'auth_url': 'https://identity.example.com:5000/v2.0',
+    'user': 'benchmark-user', 'key': 'a-fairly-long-api-key-0123456789',
+    'auth_version': '2.0', 'cacert': None, 'insecure': False,
+    'os_options': {'tenant_name': 'benchmarking', 'tenant_id': None,
+                   'region_name': 'region-one', 'service_type': None,
+                   'endpoint_type': None},
+    'storage_urls': None,
+}
+CONNECT_TIMEOUT = 10
+NETWORK_TIMEOUT = 20
+
+
+def bench_jobs(scenario, count):
+    """A list of filled-in jobs, like do_a_run() sends during a noop run."""
+    run_state = RunState()
+    for job in scenario.initial_jobs():
+        run_state.handle_initialization_result(job)
+    scenario.run_seconds, scenario.operation_count = None, count
+    jobs = []
+    for job in scenario.bench_jobs():
+        jobs.append(run_state.fill_in_job(job) or
+                    dict(job, container='who_cares', name='who_cares'))
+    return jobs
+
+
+def legacy_pack(jobs):
+    for job in jobs:
+        job['auth_kwargs'] = AUTH_KWARGS
+        job['connect_timeout'] = CONNECT_TIMEOUT
+        job['network_timeout'] = NETWORK_TIMEOUT
+    return msgpack.dumps(jobs)
+
+
+def legacy_unpack(message):
+    return msgpack.loads(message, use_list=False)
+
+
+def time_encoding(jobs, batch_size, pack, unpack):
+    batches = [jobs[i:i + batch_size]
+               for i in xrange(0, len(jobs), batch_size)]
+    start = time.time()
+    messages = [pack(batch) for batch in batches]
+    pack_seconds = time.time() - start
+    start = time.time()
+    for message in messages:
+        unpack(message)
+    unpack_seconds = time.time() - start
+    wire_bytes = sum(len(message) for message in messages)
+    return (float(wire_bytes) / len(jobs), len(jobs) / pack_seconds,
+            len(jobs) / unpack_seconds)
+
+
+def main(argv):
+    arg_parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument(
+        '--jobs', type=int, default=200000, metavar='COUNT',
+        help='Number of jobs to encode')
+    arg_parser.add_argument(
+        '--batch-size', type=int, nargs='+', default=[1, 10, 100],
+        metavar='COUNT', help='Jobs per work message')
+    args = arg_parser.parse_args(argv)
+
+    scenario = ScenarioNoop(SCENARIO_PATH)
+    jobs = bench_jobs(scenario, args.jobs)
+    run_context = RunContext(
+        dict(auth_kwargs=AUTH_KWARGS, connect_timeout=CONNECT_TIMEOUT,
+             network_timeout=NETWORK_TIMEOUT, block_size=scenario.block_size,
+             noop=True),
+        containers=scenario.containers,
+        size_strs=scenario.sizes_by_name.keys())
+    # A worker fetches the context once per run; this is what it costs
+    context_bytes = len(run_context.packb())
+
+    def compact_unpack(message):
+        job_data = msgpack.loads(message, use_list=False)
+        assert is_compact_message(job_data)
+        return run_context.decode_jobs(job_data)
+
+    print 'Run context: %d bytes, sent once per worker per run' % (
+        context_bytes,)
+    print '%8s  %10s  %10s  %12s  %12s' % (
+        'encoding', 'batch size', 'bytes/job', 'pack jobs/s',
+        'unpack jobs/s')
+    for batch_size in args.batch_size:
+        for name, pack, unpack in (
+                ('dicts', legacy_pack, legacy_unpack),
+                ('compact', run_context.packb_jobs, compact_unpack)):
+            # Each encoding gets its own copies; legacy_pack mutates them
+            bytes_per_job, pack_rate, unpack_rate = time_encoding(
+                [dict(job) for job in jobs], batch_size, pack, unpack)
+            print '%8s  %10d  %10.1f  %12.0f  %12.0f' % (
+                name, batch_size, bytes_per_job, pack_rate, unpack_rate)
+            sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
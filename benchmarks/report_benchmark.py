@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Time report generation (Reporter.read_results() plus the default report) on
+synthetic results files, serially and with increasing numbers of processes.
+
+  $ python benchmarks/report_benchmark.py --results 1000000 10000000 50000000
+
+Synthetic results files are cached in --work-dir, so repeated invocations only
+pay for generating them once.  A 50M-result file needs a few GB of disk.
+"""
+
+import os
+import sys
+import time
+import random
+import msgpack
+import argparse
+import multiprocessing
+
+import ssbench
+from ssbench.scenario import Scenario
+from ssbench.reporter import Reporter
+from ssbench.run_results import RunResults
+
+
+SCENARIO_PATH = os.path.join(os.path.dirname(__file__), os.pardir,
+                             'scenarios', 'small_test.scenario')
+CRUD_TYPES = [ssbench.CREATE_OBJECT, ssbench.READ_OBJECT,
+              ssbench.UPDATE_OBJECT, ssbench.DELETE_OBJECT]
+
+
+def synthetic_batches(count, batch_size, worker_count, size_strs):
+    """Yield batches (lists) of plausible-looking result dicts."""
+    rng = random.Random(count)
+    completed_at = 1370000000.0
+    for batch_start in xrange(0, count, batch_size):
+        batch = []
+        for i in xrange(batch_start, min(count, batch_start + batch_size)):
+            completed_at += rng.expovariate(1000)
+            first_byte = rng.lognormvariate(-4, 0.7)
+            batch.append(dict(
+                worker_id=i % worker_count + 1,
+                type=CRUD_TYPES[i % 4],
+                size_str=size_strs[i % len(size_strs)],
+                size=4096, retries=int(rng.random() < 0.01),
+                first_byte_latency=first_byte,
+                last_byte_latency=first_byte + rng.lognormvariate(-3, 1),
+                trans_id='tx%032x' % i,
+                completed_at=completed_at))
+        yield batch
+
+
+def write_results(path, scenario, count, batch_size, worker_count,
+                  compression=None):
+    run_results = RunResults(path, compression=compression)
+    run_results.start_run(scenario)
+    for batch in synthetic_batches(count, batch_size, worker_count,
+                                   scenario.sizes_by_name.keys()):
+        run_results.process_raw_results(msgpack.packb(batch))
+    run_results.finalize()
+
+
+def time_report(path, processes):
+    start = time.time()
+    reporter = Reporter(RunResults(path))
+    reporter.read_results(processes=processes)
+    reporter.generate_default_report()
+    return time.time() - start
+
+
+def main(argv):
+    arg_parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument(
+        '--results', type=int, nargs='+', metavar='COUNT',
+        default=[1000000, 10000000, 50000000],
+        help='Sizes of the synthetic results files to report on')
+    arg_parser.add_argument(
+        '--processes', type=int, nargs='+', metavar='COUNT',
+        default=sorted(set([1, 2, 4, multiprocessing.cpu_count()])),
+        help='Process counts to time report generation with')
+    arg_parser.add_argument(
+        '--batch-size', type=int, default=10, metavar='COUNT',
+        help='Results per batch, as sent by workers with --batch-size')
+    arg_parser.add_argument(
+        '--workers', type=int, default=10, metavar='COUNT',
+        help='Number of distinct worker IDs in the synthetic results')
+    arg_parser.add_argument(
+        '--compression', default=None,
+        help='Compress the synthetic results files with this codec')
+    arg_parser.add_argument(
+        '--work-dir', default='/tmp/ssbench-report-benchmark',
+        help='Directory for the synthetic results files')
+    args = arg_parser.parse_args(argv)
+
+    if not os.path.isdir(args.work_dir):
+        os.makedirs(args.work_dir)
+    scenario = Scenario(SCENARIO_PATH)
+    print '%12s  %9s  %9s  %7s' % ('results', 'processes', 'seconds',
+                                   'speedup')
+    for count in args.results:
+        path = os.path.join(args.work_dir, 'results-%d-%d-%s.stat' % (
+            count, args.batch_size, args.compression or 'none'))
+        if not os.path.exists(path):
+            write_results(path + '.tmp', scenario, count, args.batch_size,
+                          args.workers, args.compression)
+            os.rename(path + '.tmp', path)
+        serial_seconds = None
+        for processes in args.processes:
+            seconds = time_report(path, processes)
+            if serial_seconds is None:
+                serial_seconds = seconds
+            print '%12d  %9d  %9.2f  %6.2fx' % (count, processes, seconds,
+                                                serial_seconds / seconds)
+            sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compare ways for ssbench-worker to batch up the results it sends back to
+ssbench-master: one result per message, the old fixed batches (up to 100,
+waiting up to a second for each one), and the adaptive batching
+gather_results() does (count, byte budget and a short linger).
+
+Results are produced at each of several steady rates.  For each policy and
+rate, this reports the messages sent, the results per message and packed
+bytes per result, the results/s the batches kept up with, and how long
+results were held back waiting for the rest of their batch (which is added
+to the latency the master sees).
+
+  $ python benchmarks/result_batching_benchmark.py --rates 100 1000 10000
+"""
+
+import sys
+import time
+import argparse
+
+import gevent
+import gevent.queue
+
+import ssbench
+from ssbench.worker import (gather_results, DEFAULT_RESULT_BATCH_SIZE,
+                            DEFAULT_RESULT_BATCH_BYTES,
+                            DEFAULT_RESULT_BATCH_LINGER)
+
+
+# (name, max_count, max_bytes, linger)
+POLICIES = (
+    ('one', 1, DEFAULT_RESULT_BATCH_BYTES, 0),
+    ('fixed', 100, sys.maxint, 1.0),
+    ('adaptive', DEFAULT_RESULT_BATCH_SIZE, DEFAULT_RESULT_BATCH_BYTES,
+     DEFAULT_RESULT_BATCH_LINGER),
+)
+TICK = 0.001
+
+
+def make_result(i):
+    """Roughly what a successful CREATE_OBJECT result looks like."""
+    now = time.time()
+    return {
+        'type': ssbench.CREATE_OBJECT, 'size_str': 'small',
+        'container': 'ssbench_000042_small', 'name': 'small_%06d' % i,
+        'size': 4096, 'block_size': 65536, 'job_id': i, 'worker_id': 3,
+        'first_byte_latency': 0.0123, 'last_byte_latency': 0.0456,
+        'trans_id': 'tx%021x-0051f8e1ab' % i, 'retries': 0,
+        'start': now - 0.0456, 'completed_at': now,
+    }
+
+
+def produce(result_queue, rate, seconds):
+    count = int(rate * seconds)
+    start = time.time()
+    produced = 0
+    while produced < count:
+        gevent.sleep(TICK)
+        due = min(count, int((time.time() - start) * rate) + 1)
+        while produced < due:
+            result_queue.put(make_result(produced))
+            produced += 1
+    return count
+
+
+def time_policy(rate, seconds, max_count, max_bytes, linger):
+    result_queue = gevent.queue.Queue()
+    producer = gevent.spawn(produce, result_queue, rate, seconds)
+    expected = int(rate * seconds)
+    received = messages = wire_bytes = 0
+    hold_total = hold_max = 0.0
+    start = time.time()
+    while received < expected:
+        results, packed = gather_results(
+            result_queue, max_count, max_bytes, linger,
+            lambda: expected - received)
+        sent_at = time.time()
+        messages += 1
+        received += len(results)
+        wire_bytes += len(packed)
+        for result in results:
+            hold = sent_at - result['completed_at']
+            hold_total += hold
+            hold_max = max(hold_max, hold)
+    elapsed = time.time() - start
+    producer.join()
+    return (messages, float(received) / messages,
+            float(wire_bytes) / received, received / elapsed,
+            hold_total / received * 1000, hold_max * 1000)
+
+
+def main(argv):
+    arg_parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument(
+        '--rates', type=int, nargs='+', default=[100, 1000, 10000],
+        metavar='RESULTS_PER_SEC', help='Rates at which results finish')
+    arg_parser.add_argument(
+        '--seconds', type=float, default=3, metavar='SECONDS',
+        help='How long to produce results at each rate')
+    args = arg_parser.parse_args(argv)
+
+    print '%8s  %8s  %8s  %11s  %10s  %10s  %12s  %11s' % (
+        'policy', 'rate', 'messages', 'results/msg', 'bytes/res',
+        'results/s', 'mean hold ms', 'max hold ms')
+    for rate in args.rates:
+        for name, max_count, max_bytes, linger in POLICIES:
+            stats = time_policy(rate, args.seconds, max_count, max_bytes,
+                                linger)
+            print '%8s  %8d  %8d  %11.1f  %10.1f  %10.0f  %12.2f  %11.2f' % (
+                (name, rate) + stats)
+            sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
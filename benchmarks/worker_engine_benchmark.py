@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compare how many noop jobs/s one ssbench-worker process can run on one CPU
+with the old execution engine (a greenlet spawned from a pool for every job,
+and a new result dict made for every result) and the current one (a fixed
+set of long-lived job runner greenlets, each turning its job's dict into the
+result in place).
+
+Only the job handling is timed: jobs are already decoded, and results are
+taken off the result queue without being sent anywhere.
+
+  $ python benchmarks/worker_engine_benchmark.py --jobs 200000
+"""
+
+import sys
+import time
+import logging
+import argparse
+
+import gevent
+import gevent.pool
+import gevent.queue
+
+import ssbench
+from ssbench.util import add_dicts
+from ssbench.worker import Worker
+
+
+JOB = {'type': ssbench.CREATE_OBJECT, 'size_str': 'small',
+       'container': 'ssbench_000042_small', 'name': 'small_000123',
+       'size': 4096, 'block_size': 65536, 'noop': True}
+
+
+def legacy_handle_noop(worker, object_info):
+    """What handle_noop() and put_results() used to do."""
+    worker.result_queue.put(add_dicts(object_info,
+                                      completed_at=time.time(),
+                                      worker_id=worker.worker_id,
+                                      first_byte_latency=0.0,
+                                      last_byte_latency=0.0,
+                                      trans_id=None, retries=0))
+
+
+def drain(worker, count):
+    for _ in xrange(count):
+        worker.result_queue.get()
+
+
+def run_spawn_per_job(worker, jobs):
+    pool = gevent.pool.Pool(worker.concurrency)
+    drainer = gevent.spawn(drain, worker, len(jobs))
+    start = time.time()
+    for job in jobs:
+        pool.spawn(legacy_handle_noop, worker, job)
+    drainer.join()
+    return time.time() - start
+
+
+def run_job_runners(worker, jobs):
+    worker.job_queue = gevent.queue.Queue(worker.concurrency)
+    runners = [gevent.spawn(worker._job_runner)
+               for _ in xrange(worker.concurrency)]
+    drainer = gevent.spawn(drain, worker, len(jobs))
+    start = time.time()
+    for job in jobs:
+        worker._spawn_job(job)
+    drainer.join()
+    elapsed = time.time() - start
+    gevent.killall(runners)
+    worker.spawned = 0
+    return elapsed
+
+
+def main(argv):
+    arg_parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument(
+        '--jobs', type=int, default=200000, metavar='COUNT',
+        help='Number of noop jobs to run')
+    arg_parser.add_argument(
+        '--concurrency', type=int, nargs='+', default=[16, 256],
+        metavar='COUNT', help='Jobs in flight at once')
+    args = arg_parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    print '%13s  %11s  %10s' % ('engine', 'concurrency', 'jobs/s')
+    for concurrency in args.concurrency:
+        # The sockets are never used; connecting them is harmless
+        worker = Worker('127.0.0.1', 1, 2, 0, 0, concurrency=concurrency)
+        for name, run in (('spawn-per-job', run_spawn_per_job),
+                          ('job runners', run_job_runners)):
+            jobs = [dict(JOB) for _ in xrange(args.jobs)]
+            elapsed = run(worker, jobs)
+            print '%13s  %11d  %10.0f' % (
+                name, concurrency, len(jobs) / elapsed)
+            sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Measure how ssbench-worker throughput scales with its --processes option.
+
+A minimal stand-in for ssbench-master pushes jobs to one ssbench-worker and
+counts the results coming back.  With --sink, jobs are PUTs and GETs against
+a local (pre-forked) HTTP server which accepts anything; otherwise they are
+noop jobs, which measure the worker's own overhead.
+
+  $ python benchmarks/worker_scaling_benchmark.py --processes 1 2 4
+  $ python benchmarks/worker_scaling_benchmark.py --sink --jobs 20000
+"""
+
+import os
+import sys
+import time
+import signal
+import socket
+import msgpack
+import argparse
+import subprocess
+import multiprocessing
+import BaseHTTPServer
+import zmq
+
+import ssbench
+
+
+WORKER_PATH = os.path.join(os.path.dirname(__file__), os.pardir, 'bin',
+                           'ssbench-worker')
+
+
+class _SinkHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    body = 'A' * 4096
+
+    def _reply(self, status, body=''):
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('X-Trans-Id', 'txsink')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_PUT(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        while length > 0:
+            length -= len(self.rfile.read(min(length, 65536)))
+        self._reply(201)
+
+    def do_GET(self):
+        self._reply(200, self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_sink(processes):
+    """Start a pre-forked HTTP server on an ephemeral port.
+
+    :returns: A (port, child_pids) tuple
+    """
+    server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), _SinkHandler)
+    server.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    pids = []
+    for _ in xrange(processes):
+        pid = os.fork()
+        if not pid:
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        pids.append(pid)
+    port = server.server_address[1]
+    server.socket.close()
+    return port, pids
+
+
+def make_jobs(count, sink_port):
+    if not sink_port:
+        return [dict(type=ssbench.CREATE_OBJECT, noop=True,
+                     container='bench', name='%d' % i, size=0,
+                     size_str='tiny') for i in xrange(count)]
+    auth_kwargs = dict(token='AUTH_tkbench', storage_urls=[
+        'http://127.0.0.1:%d/v1/AUTH_bench' % sink_port])
+    return [dict(type=ssbench.READ_OBJECT if i % 2 else
+                 ssbench.CREATE_OBJECT,
+                 container='bench', name='%d' % (i / 2), size=4096,
+                 size_str='tiny', auth_kwargs=auth_kwargs)
+            for i in xrange(count)]
+
+
+def _check_worker(worker):
+    if worker.poll() is not None:
+        raise Exception('ssbench-worker exited with status %d' %
+                        worker.returncode)
+
+
+def time_worker(args, processes, sink_port, work_port, results_port):
+    context = zmq.Context()
+    work_push = context.socket(zmq.PUSH)
+    work_push.bind('tcp://127.0.0.1:%d' % work_port)
+    results_pull = context.socket(zmq.PULL)
+    results_pull.bind('tcp://127.0.0.1:%d' % results_port)
+    worker_cmd = [
+        sys.executable, WORKER_PATH, '--zmq-work-port', str(work_port),
+        '--zmq-results-port', str(results_port),
+        '--concurrency', str(args.concurrency),
+        '--batch-size', str(args.batch_size),
+        '--processes', str(processes)]
+    if args.pin_cpus:
+        worker_cmd.append('--pin-cpus')
+    worker = subprocess.Popen(worker_cmd + ['1'])
+    try:
+        jobs = make_jobs(args.jobs, sink_port)
+        # Keep a bounded number of jobs in flight, like ssbench-master does
+        max_in_flight = args.concurrency * 2
+        sent = received = errors = 0
+        start = None
+        while received < len(jobs):
+            while sent < len(jobs) and sent - received < max_in_flight:
+                # PUSH sockets block until a worker process has connected
+                if not work_push.poll(1000, zmq.POLLOUT):
+                    _check_worker(worker)
+                    continue
+                batch = jobs[sent:sent + args.batch_size]
+                work_push.send(msgpack.dumps(batch))
+                sent += len(batch)
+            if not results_pull.poll(1000):
+                _check_worker(worker)
+                continue
+            results = msgpack.loads(results_pull.recv())
+            if start is None:
+                # Don't count worker start-up time
+                start = time.time()
+            received += len(results)
+            errors += sum(1 for r in results if 'exception' in r)
+        return time.time() - start, errors
+    finally:
+        if worker.poll() is None:
+            worker.send_signal(signal.SIGTERM)
+            worker.wait()
+        work_push.close(linger=0)
+        results_pull.close(linger=0)
+        context.term()
+
+
+def main(argv):
+    arg_parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument(
+        '--processes', type=int, nargs='+', metavar='COUNT',
+        default=sorted(set([1, 2, multiprocessing.cpu_count()])),
+        help='Worker process counts to measure')
+    arg_parser.add_argument(
+        '--jobs', type=int, default=100000, metavar='COUNT',
+        help='Jobs to run for each measurement')
+    arg_parser.add_argument(
+        '-c', '--concurrency', type=int, default=256, metavar='COUNT',
+        help='Total worker concurrency')
+    arg_parser.add_argument(
+        '--batch-size', type=int, default=10, metavar='COUNT',
+        help='Jobs and results per message')
+    arg_parser.add_argument(
+        '--pin-cpus', action='store_true', default=False,
+        help='Pass --pin-cpus to ssbench-worker')
+    arg_parser.add_argument(
+        '--sink', action='store_true', default=False,
+        help='Run PUTs and GETs against a local HTTP sink instead of noops')
+    arg_parser.add_argument(
+        '--sink-processes', type=int, default=multiprocessing.cpu_count(),
+        metavar='COUNT', help='Number of HTTP sink processes')
+    arg_parser.add_argument('--zmq-work-port', type=int, default=23579)
+    arg_parser.add_argument('--zmq-results-port', type=int, default=23580)
+    args = arg_parser.parse_args(argv)
+
+    sink_port, sink_pids = None, []
+    if args.sink:
+        sink_port, sink_pids = start_sink(args.sink_processes)
+    try:
+        print '%9s  %10s  %9s  %7s  %6s' % (
+            'processes', 'results/s', 'seconds', 'speedup', 'errors')
+        baseline = None
+        for processes in args.processes:
+            seconds, errors = time_worker(
+                args, processes, sink_port, args.zmq_work_port,
+                args.zmq_results_port)
+            rate = args.jobs / seconds
+            if baseline is None:
+                baseline = rate
+            print '%9d  %10.0f  %9.2f  %6.2fx  %6d' % (
+                processes, rate, seconds, rate / baseline, errors)
+            sys.stdout.flush()
+    finally:
+        for pid in sink_pids:
+            os.kill(pid, signal.SIGTERM)
+            os.waitpid(pid, 0)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -22,3 +22,22 @@ CREATE_OBJECT = 'upload_object'
 READ_OBJECT = 'get_object'
 UPDATE_OBJECT = 'update_object'
 DELETE_OBJECT = 'delete_object'
+# Metadata operations, weighted by a scenario's metadata_profile: an
+# object's HEAD or metadata POST, or a container's listing (one page of it)
+# or HEAD
+HEAD_OBJECT = 'head_object'
+POST_OBJECT = 'post_object'
+LIST_CONTAINER = 'list_container'
+HEAD_CONTAINER = 'head_container'
+METADATA_OPS = (HEAD_OBJECT, POST_OBJECT, LIST_CONTAINER, HEAD_CONTAINER)
+# Those which aren't on an object of their size class
+CONTAINER_OPS = (LIST_CONTAINER, HEAD_CONTAINER)
+
+# How a READ_OBJECT job may read its object (see a scenario's read_profile):
+# all of it, one byte range, its first bytes (then hang up), or several
+# byte ranges
+FULL_READ = 'full'
+RANGE_READ = 'range'
+FIRST_BYTES_READ = 'first'
+MULTI_RANGE_READ = 'multirange'
+READ_PATTERNS = (FULL_READ, RANGE_READ, FIRST_BYTES_READ, MULTI_RANGE_READ)
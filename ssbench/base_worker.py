@@ -0,0 +1,1106 @@
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+# Copyright (c) 2010-2012 OpenStack, LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Portions of this file copied from swift/common/bench.py
+
+import os
+import json
+import time
+import Queue
+import random
+import socket
+import msgpack
+import logging
+import tempfile
+import traceback
+
+from ssbench.util import raise_file_descriptor_limit
+from ssbench.run_context import RunContext, is_compact_message
+from ssbench.control import (HEARTBEAT_INTERVAL, START_BARRIER_TIMEOUT,
+                             CONFIGURABLE_SETTINGS, SPOOL_CHUNK_SIZE,
+                             DEFAULT_STUCK_SECONDS, token_key)
+from ssbench.ordered_dict import OrderedDict
+from ssbench.retry import (RetryBudget, backoff_delay, SOCKET_ERROR,
+                           DEFAULT_RETRY_BACKOFF, DEFAULT_RETRY_BACKOFF_MAX,
+                           DEFAULT_RETRY_BUDGET)
+from ssbench.summary import ResultSummary, TIMING_TYPES
+from ssbench.run_results import RunResults
+import ssbench.swift_client as client
+
+
+DEFAULT_BLOCK_SIZE = 2 ** 16  # 65536
+SUICIDE_EXIT_STATUS = 88
+RUN_CONTEXT_TIMEOUT = 5  # seconds to wait for each run context request
+RUN_CONTEXT_TRIES = 3
+MAX_RUN_CONTEXTS = 16  # cached run contexts
+# After a 401, how long to wait for the master to push a new token before
+# authenticating for ourselves
+BROKERED_TOKEN_TIMEOUT = 10
+# On STOP, how long to keep trying to deliver the last results (ms)
+STOP_LINGER = 5000
+# Results are sent to the master in batches of up to this many (if the
+# batch size is 0)...
+DEFAULT_RESULT_BATCH_SIZE = 100
+# ...or of about this many packed bytes...
+DEFAULT_RESULT_BATCH_BYTES = 2 ** 16
+# ...as soon as this many seconds have passed since the first one finished,
+# or nothing else is in flight, whichever comes first.
+DEFAULT_RESULT_BATCH_LINGER = 0.002
+# Result keys for the request timing breakdown, and the response "headers"
+# ssbench.swift_client reports them in
+TIMING_HEADERS = [
+    (timing_type, 'x-swiftstack-' + timing_type.replace('_', '-'))
+    for timing_type in TIMING_TYPES]
+# A Static Large Object's segments are PUT this many at a time, unless its
+# size class says otherwise
+DEFAULT_SEGMENT_CONCURRENCY = 4
+# Query strings to PUT a Static Large Object's manifest, and to DELETE it
+# along with its segments
+SLO_MANIFEST_PUT = 'multipart-manifest=put'
+SLO_MANIFEST_DELETE = 'multipart-manifest=delete'
+# The object metadata a POST_OBJECT job sets (to the time it was sent)
+POSTED_METADATA_HEADER = 'X-Object-Meta-Ssbench-Posted'
+
+_packer = msgpack.Packer()
+
+
+class DeadlineExceeded(Exception):
+    """
+    A job took longer than the deadline for its type of operation (see
+    Worker.handle_job()); the request it was making is abandoned.
+    """
+    def __init__(self, seconds):
+        Exception.__init__(self, 'No response within the %gs deadline' % (
+            seconds,))
+        self.seconds = seconds
+
+
+def _get_container_headers(**kwargs):
+    """
+    client.get_container(), for ignoring_http_responses(), which needs just
+    the response headers.
+    """
+    return client.get_container(**kwargs)[0]
+
+
+def gather_results(result_queue, max_count, max_bytes, linger, in_flight):
+    """
+    Take a batch of results off a queue: wait for one, then keep taking
+    them until there are max_count, the ones to be sent as they are pack to
+    max_bytes, linger seconds have passed or in_flight() says no more are
+    coming, whichever comes first.  Results already queued are taken even
+    once the linger has passed.
+
+    :returns: A (results, packed) tuple, where packed is the msgpack'ed list
+              of the results which aren't summarized, spooled or for jobs
+              which couldn't be decoded, or None if they all are
+    """
+    result = result_queue.get()
+    deadline = time.time() + linger
+    results, pieces, packed_bytes = [], [], 0
+    while True:
+        results.append(result)
+        if not (result.get('summary') or result.get('spool') or
+                result.get('undecoded')):
+            pieces.append(_packer.pack(result))
+            packed_bytes += len(pieces[-1])
+        if len(results) >= max_count or packed_bytes >= max_bytes or \
+                in_flight() <= len(results):
+            break
+        remaining = deadline - time.time()
+        try:
+            if remaining > 0:
+                result = result_queue.get(timeout=remaining)
+            else:
+                result = result_queue.get_nowait()
+        except Queue.Empty:
+            break
+    packed = None
+    if pieces:
+        packed = _packer.pack_array_header(len(pieces)) + ''.join(pieces)
+    return results, packed
+
+
+class BaseWorker:
+    """
+    Pulls jobs from the master, runs up to ``concurrency`` of them at once,
+    and pushes back their results.
+
+    How jobs are run concurrently is up to an engine subclass: it sets the
+    class attributes (a ZMQ module, and Queue, Event and Lock classes which
+    suit it) and implements connection(), _create_connection_pool(),
+    _spawn(), _spawn_later(), _sleep(), _deadline() and
+    _wait_for_control().  See ssbench.worker.Worker (gevent) and
+    ssbench.threaded_worker.ThreadedWorker (threads).  Nothing here imports
+    gevent, so the threaded engine doesn't need it installed.
+    """
+    _zmq = None
+    _Queue = None
+    _Event = None
+    _Lock = None
+
+    def __init__(self, zmq_host, zmq_work_port, zmq_results_port, worker_id,
+                 max_retries, profile_count=0, concurrency=256, batch_size=0,
+                 zmq_control_port=None, spool_dir=None,
+                 batch_bytes=DEFAULT_RESULT_BATCH_BYTES,
+                 batch_linger=DEFAULT_RESULT_BATCH_LINGER,
+                 retry_backoff=DEFAULT_RETRY_BACKOFF,
+                 retry_backoff_max=DEFAULT_RETRY_BACKOFF_MAX,
+                 retry_budget=DEFAULT_RETRY_BUDGET, retry_rules=None,
+                 stuck_seconds=DEFAULT_STUCK_SECONDS):
+        work_endpoint = 'tcp://%s:%d' % (zmq_host, zmq_work_port)
+        results_endpoint = 'tcp://%s:%d' % (zmq_host, zmq_results_port)
+        self.worker_id = worker_id
+        self.max_retries = max_retries
+        # See ssbench.retry; retry_rules maps HTTP statuses (and
+        # SOCKET_ERROR) to lower maximum retries
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self.retry_budget = retry_budget
+        self.retry_rules = retry_rules or {}
+        self.retry_tokens = RetryBudget()
+        # Jobs in flight for longer than this are counted in heartbeats
+        self.stuck_seconds = stuck_seconds
+        self.profile_count = profile_count
+        # See gather_results(); a batch_size of 0 means the default
+        self.batch_size = batch_size
+        self.batch_bytes = batch_bytes
+        self.batch_linger = batch_linger
+
+        raise_file_descriptor_limit()
+
+        self.concurrency = concurrency
+        self.conn_pools_lock = self._Lock()
+        self.conn_pools = {}  # hashed by storage_url
+        self.token_data = {}
+        self.token_data_lock = self._Lock()
+
+        self.context = self._zmq.Context()
+        self.work_pull = self.context.socket(self._zmq.PULL)
+        self.work_pull.connect(work_endpoint)
+        self.results_push = self.context.socket(self._zmq.PUSH)
+        self.results_push.connect(results_endpoint)
+        self.control_dealer = None
+        if zmq_control_port is not None:
+            self.control_dealer = self.context.socket(self._zmq.DEALER)
+            self.control_dealer.connect('tcp://%s:%d' % (zmq_host,
+                                                         zmq_control_port))
+        self.run_contexts = OrderedDict()
+        # Set (and replaced) whenever a control message arrives
+        self.control_updated = self._Event()
+        self.rejected_tokens = set()
+        # Run contexts with a start barrier which the master has started,
+        # and jobs for ones which it hasn't yet
+        self.started_contexts = set()
+        self.held_jobs = {}
+        # (first_job_id, count) for numbered jobs pulled since the last
+        # heartbeat, so the master knows which jobs died if we do
+        self.pulled_jobs = []
+
+        self.result_queue = self._Queue()
+        # Results of jobs asking for "summary results" are aggregated here,
+        # and those of jobs asking to be spooled are written to a RunResults
+        # spool file in spool_dir until the master collects it.
+        self.summary = ResultSummary(worker_id)
+        self.spool_dir = spool_dir or tempfile.gettempdir()
+        self.spool = None
+        # Jobs are handed to ``concurrency`` long-lived greenlets through
+        # this (see _start_job_runners()); handing one off blocks while it's
+        # full.
+        self.job_queue = None
+        self.runners = []
+        self.spawned = 0
+        # id(job) => when handle_job() started it
+        self.job_starts = {}
+
+    def connection(self, storage_url):
+        """
+        :returns: A context manager giving a (parsed URL, connection) pair
+                  to ``storage_url`` to make a request on; the connection
+                  is replaced if the request breaks it.
+        """
+        raise NotImplementedError()
+
+    def go(self):
+        logging.debug('Worker %s starting...', self.worker_id)
+        self._spawn(self._result_writer)
+        self._start_job_runners()
+        if self.control_dealer:
+            self._spawn(self._control_reader)
+            self._spawn(self._heartbeat)
+        jobs = self.work_pull.recv()
+        if self.profile_count:
+            import cProfile
+            prof = cProfile.Profile()
+            prof.enable()
+        gotten = 1
+        self.spawned = 0
+        while jobs:
+            job_data = msgpack.loads(jobs, use_list=False)
+            if is_compact_message(job_data):
+                if len(job_data) > 2:
+                    self.pulled_jobs.append((job_data[2], len(job_data[1])))
+                try:
+                    run_context = self._get_run_context(job_data[0])
+                except Exception as e:
+                    self._fail_jobs(job_data, e)
+                    job_data = ()
+                else:
+                    job_data = run_context.decode_jobs(job_data)
+                    if run_context.start_barrier and \
+                            run_context.context_id not in \
+                            self.started_contexts:
+                        self._hold_jobs(run_context.context_id, job_data)
+                        job_data = ()
+            for job_datum in job_data:
+                if not self._spawn_job(job_datum):
+                    continue
+                if self.profile_count and gotten >= self.profile_count:
+                    prof.disable()
+                    prof_output_path = '/tmp/worker_go.%d.prof' % os.getpid()
+                    prof.dump_stats(prof_output_path)
+                    logging.info('PROFILED worker go() to %s',
+                                 prof_output_path)
+                    self.profile_count = None
+                gotten += 1
+            jobs = self.work_pull.recv()
+
+    def _spawn(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on a new greenlet (or thread)."""
+        raise NotImplementedError()
+
+    def _spawn_later(self, seconds, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on a new greenlet (or thread) later."""
+        raise NotImplementedError()
+
+    def _sleep(self, seconds):
+        raise NotImplementedError()
+
+    def _spawn_helper(self, fn):
+        """Spawn a greenlet (or thread) helping the current job."""
+        return self._spawn(fn)
+
+    def _join_helper(self, helper):
+        """Wait for a helper to finish (or the job's deadline to pass)."""
+        helper.join()
+
+    def _deadline(self, seconds):
+        """
+        :returns: A context manager which raises DeadlineExceeded in the
+                  job running in it if that takes more than ``seconds``
+        """
+        raise NotImplementedError()
+
+    def _add_spawned(self, count):
+        self.spawned += count
+
+    def _start_job_runners(self):
+        # Unlike handing each job straight to an idle runner, a queue lets
+        # a runner whose job didn't block take the next one without
+        # switching greenlets.
+        self.job_queue = self._Queue(self.concurrency)
+        self.runners = [self._spawn(self._job_runner)
+                        for _ in xrange(self.concurrency)]
+
+    def _spawn_job(self, job_datum):
+        """
+        Queue one job for the job runners, waiting for room.
+
+        :returns: False if the job was bad (its exception result has already
+                  been put)
+        """
+        try:
+            if 'container' in job_datum:
+                logging.debug('WORK: %13s %s/%-17s',
+                              job_datum['type'],
+                              job_datum['container'],
+                              job_datum['name'])
+            else:
+                logging.debug('CMD: %13s', job_datum['type'])
+        except Exception as e:
+            # Under heavy load with VMs on my laptop, I saw job_datum
+            # apparently somehow equal to None.
+            self.put_exception_results({'job_datum': job_datum}, e)
+            return False
+
+        if job_datum['type'] == 'SUICIDE':
+            logging.info('Got SUICIDE; closing sockets and exiting.')
+            self._exit(SUICIDE_EXIT_STATUS)
+        # Count it first: the runner may finish it before we run again
+        self._add_spawned(1)
+        self.job_queue.put(job_datum)
+        return True
+
+    def _job_runner(self):
+        job_queue = self.job_queue
+        while True:
+            job_datum = job_queue.get()
+            try:
+                self.handle_job(job_datum)
+            except Exception as e:
+                self.put_exception_results(job_datum, e)
+
+    def _hold_jobs(self, context_id, job_data):
+        if context_id not in self.held_jobs:
+            logging.debug('Holding jobs for run context %r until it starts',
+                          context_id)
+            self.held_jobs[context_id] = []
+            self._spawn_later(START_BARRIER_TIMEOUT, self._start_context,
+                              context_id, timed_out=True)
+        self.held_jobs[context_id].extend(job_data)
+
+    def _start_context(self, context_id, timed_out=False):
+        if context_id in self.started_contexts:
+            return
+        if timed_out:
+            logging.warning('No START for run context %r after %ds; '
+                            'starting anyway', context_id,
+                            START_BARRIER_TIMEOUT)
+        self.started_contexts.add(context_id)
+        held_jobs = self.held_jobs.pop(context_id, ())
+        if held_jobs:
+            # The runners may all be busy; don't block the caller
+            self._spawn(self._spawn_jobs, held_jobs)
+
+    def _spawn_jobs(self, job_data):
+        for job_datum in job_data:
+            self._spawn_job(job_datum)
+
+    def _heartbeat(self):
+        self._send_control(('REGISTER', self.worker_id, self.concurrency,
+                            socket.gethostname(), os.getpid()))
+        while True:
+            self._sleep(HEARTBEAT_INTERVAL)
+            pulled_jobs, self.pulled_jobs = self.pulled_jobs, []
+            self._send_control(('HEARTBEAT', self.worker_id, self.spawned,
+                                pulled_jobs, self._stuck_count()))
+
+    def _stuck_count(self):
+        """
+        :returns: How many jobs have been in flight for over stuck_seconds
+        """
+        started_before = time.time() - self.stuck_seconds
+        return sum(1 for start in self.job_starts.values()
+                   if start < started_before)
+
+    def _send_control(self, message):
+        self.control_dealer.send(msgpack.dumps(message))
+
+    def _configure(self, settings):
+        for key, value in settings.iteritems():
+            if key not in CONFIGURABLE_SETTINGS:
+                logging.warning('Ignoring unknown setting %r', key)
+                continue
+            logging.info('Setting %s to %r', key, value)
+            if key == 'log_level':
+                logging.getLogger().setLevel(value)
+            else:
+                setattr(self, key, value)
+
+    def _stop(self):
+        logging.info('Got STOP; finishing %d jobs and exiting.',
+                     self.spawned)
+        # Results are counted off as the result writer sends them
+        while self.spawned > 0:
+            self._sleep(0.1)
+        self._exit(0, linger=STOP_LINGER)
+
+    def _exit(self, status, linger=None):
+        """
+        Close our sockets and exit; with a linger (in ms), wait up to that
+        long for queued messages (i.e. results) to be sent first.
+        """
+        for sock in (self.work_pull, self.results_push, self.control_dealer):
+            if sock:
+                sock.close(linger=linger or 0)
+        if linger:
+            self.context.term()
+        os._exit(status)
+
+    def _control_reader(self):
+        while True:
+            message_raw = self.control_dealer.recv()
+            try:
+                self._handle_control_message(message_raw)
+            except Exception:
+                logging.exception('Bad control message %r', message_raw)
+
+    def _handle_control_message(self, message_raw):
+        message = msgpack.loads(message_raw)
+        if message[0] == 'CONTEXT':
+            _, context_id, packed = message
+            # None means the master doesn't know the context
+            self.run_contexts[context_id] = packed and \
+                RunContext.unpackb(packed)
+            while len(self.run_contexts) > MAX_RUN_CONTEXTS:
+                self.run_contexts.popitem(last=False)
+        elif message[0] == 'TOKEN':
+            _, key, storage_urls, token = message
+            logging.debug('Got token %s from the master', token)
+            self.token_data[key] = (list(storage_urls), token)
+        elif message[0] == 'START':
+            self._start_context(message[1])
+        elif message[0] == 'COLLECT':
+            self._spawn(self._send_spool)
+        elif message[0] == 'CONFIGURE':
+            self._configure(message[1])
+        elif message[0] == 'STOP':
+            self._spawn(self._stop)
+        elif message[0] == 'KILL':
+            logging.info('Got KILL; closing sockets and exiting.')
+            self._exit(SUICIDE_EXIT_STATUS)
+        else:
+            raise ValueError('unknown control message')
+        updated, self.control_updated = \
+            self.control_updated, self._Event()
+        updated.set()
+
+    def _wait_for_control(self, ready, timeout):
+        """
+        Wait for control messages until ready() returns True.
+
+        :returns: False if that didn't happen within timeout seconds
+        """
+        raise NotImplementedError()
+
+    def _get_run_context(self, context_id):
+        """
+        Return the RunContext with the given ID, fetching it from the master
+        the first time it's needed.
+        """
+        if context_id not in self.run_contexts:
+            if not self.control_dealer:
+                raise ValueError('Got jobs for run context %r, but there is '
+                                 'no control port to fetch it from!' %
+                                 context_id)
+            for _ in xrange(RUN_CONTEXT_TRIES):
+                logging.debug('Fetching run context %r', context_id)
+                self._send_control(('CONTEXT', context_id))
+                if self._wait_for_control(
+                        lambda: context_id in self.run_contexts,
+                        RUN_CONTEXT_TIMEOUT):
+                    break
+                logging.warning('Timed out fetching run context %r',
+                                context_id)
+            else:
+                raise Exception('Unable to fetch run context %r from the '
+                                'master' % context_id)
+        run_context = self.run_contexts[context_id]
+        if run_context is None:
+            del self.run_contexts[context_id]
+            raise ValueError('The master does not know run context %r!' %
+                             context_id)
+        return run_context
+
+    def _fail_jobs(self, job_data, e):
+        """
+        Report the jobs of a work message which can't be run (the master
+        doesn't know their run context, or didn't send it) as failed, so
+        the master needn't wait for them; the worker carries on.  Without
+        job IDs, there's no telling the master which jobs they were.
+        """
+        logging.error('Unable to run %d jobs of run context %r: %r',
+                      len(job_data[1]), job_data[0], e)
+        if len(job_data) < 3:
+            return
+        self._add_spawned(len(job_data[1]))
+        for job_id in xrange(job_data[2], job_data[2] + len(job_data[1])):
+            self.put_exception_results(dict(job_id=job_id, undecoded=True),
+                                       e)
+
+    def _result_writer(self):
+        while True:
+            result_q, packed = gather_results(
+                self.result_queue,
+                self.batch_size or DEFAULT_RESULT_BATCH_SIZE,
+                self.batch_bytes, self.batch_linger, lambda: self.spawned)
+
+            if self.results_push.closed:
+                logging.warning('_result_writer: exiting due to closed '
+                                'socket!')
+                break
+            self._add_spawned(-len(result_q))
+            if packed:
+                self.results_push.send(packed)
+            kept = [r for r in result_q if r.get('summary') or
+                    r.get('spool') or r.get('undecoded')]
+            if kept:
+                self.results_push.send(msgpack.dumps(self._keep_results(kept)))
+
+    def _keep_results(self, results):
+        """
+        Summarize (see ssbench.summary) or spool some results instead of
+        sending them to the master.
+
+        :returns: The message which tells the master how the jobs went,
+                  including our summary buckets if they are due to be sent.
+        """
+        done, failed, spooled = [], [], []
+        # The exceptions of jobs the master has to fill in (see _fail_jobs())
+        exceptions = {}
+        for result in results:
+            if result.get('undecoded'):
+                failed.append(result['job_id'])
+                exceptions[result['job_id']] = result['exception']
+                continue
+            if result.pop('spool', False):
+                spooled.append(result)
+            else:
+                self.summary.add(result)
+            if 'exception' in result:
+                failed.append(result.get('job_id'))
+            else:
+                done.append(result.get('job_id'))
+        if spooled:
+            if self.spool is None:
+                self.spool = RunResults(os.path.join(
+                    self.spool_dir, 'ssbench-worker-%d-%d.spool' % (
+                        self.worker_id, os.getpid())))
+                self.spool.start_spool()
+            self.spool.process_raw_results(msgpack.dumps(spooled))
+        message = dict(done=done, failed=failed)
+        if exceptions:
+            message['exceptions'] = exceptions
+        now = time.time()
+        # Nothing left in flight means this may be the end of the run, so
+        # the master must have everything now.
+        if self.summary.buckets and (not self.spawned or
+                                     self.summary.due(now)):
+            message['summary'] = self.summary.flush(now)
+        return message
+
+    def _send_spool(self):
+        """
+        Send the master our spool file (see Master.collect_spools()), and
+        start a new one for any later results.
+        """
+        spool, self.spool = self.spool, None
+        chunk_count = 0
+        if spool is not None:
+            spool.finalize()
+            with open(spool.results_file_path, 'rb') as spool_file:
+                chunk = spool_file.read(SPOOL_CHUNK_SIZE)
+                while chunk:
+                    self._send_control(('SPOOL', self.worker_id, chunk))
+                    chunk_count += 1
+                    chunk = spool_file.read(SPOOL_CHUNK_SIZE)
+            os.unlink(spool.results_file_path)
+        logging.info('Sent the master %d chunks of spooled results',
+                     chunk_count)
+        self._send_control(('SPOOL_END', self.worker_id, chunk_count))
+
+    def handle_job(self, job_data):
+        # Dispatch type to a handler, if possible
+        if job_data.get('noop', False):
+            handler = self.handle_noop
+        else:
+            handler = getattr(self, 'handle_%s' % job_data['type'], None)
+        if handler:
+            # {CRUD type: seconds} the whole job (retries and all) may take
+            deadlines = job_data.pop('deadlines', None)
+            deadline = deadlines and deadlines.get(job_data['type'])
+            job_id = id(job_data)
+            self.job_starts[job_id] = time.time()
+            try:
+                if deadline:
+                    with self._deadline(deadline):
+                        handler(job_data)
+                else:
+                    handler(job_data)
+            except DeadlineExceeded as e:
+                self.put_exception_results(job_data, e, timed_out=True)
+            except Exception as e:
+                # If the handler threw an exception, we need to put a "result"
+                # anyway so the master can finish by reading the requisite
+                # number of results without having to timeout.
+                self.put_exception_results(job_data, e)
+            finally:
+                del self.job_starts[job_id]
+        else:
+            raise NameError("Unknown job type %r" % job_data['type'])
+
+    def _create_connection_pool(
+            self, storage_url,
+            connect_timeout=client.DEFAULT_CONNECT_TIMEOUT,
+            network_timeout=client.DEFAULT_NETWORK_TIMEOUT):
+        """
+        Get ready to make connections to ``storage_url`` (see connection()),
+        if not already.
+        """
+        raise NotImplementedError()
+
+    def _token_key(self, auth_kwargs):
+        return token_key(auth_kwargs)
+
+    def ignoring_http_responses(self, statuses, fn, call_info, **extra_keys):
+        if 401 not in statuses:
+            statuses += (401,)
+        args = dict(container=call_info['container'])
+        if 'name' in call_info:
+            # (Container operations have none)
+            args['name'] = call_info['name']
+        args.update(extra_keys)
+
+        if 'auth_kwargs' not in call_info:
+            raise ValueError('Got benchmark job without "auth_kwargs" key!')
+
+        tries = 0
+        token_key = None
+        # Time spent getting tokens, reported separately from the request
+        auth_latency = 0.0
+        # How long each failed attempt took, and when the first one started
+        attempt_latencies = []
+        first_attempt_start = None
+        self.retry_tokens.deposit(self.retry_budget)
+        while True:
+            # Make sure we've got a current storage_url/token
+            if call_info['auth_kwargs'].get('token', None):
+                args['url'] = random.choice(
+                    call_info['auth_kwargs']['storage_urls'])
+                args['token'] = call_info['auth_kwargs']['token']
+            else:
+                token_key = self._token_key(call_info['auth_kwargs'])
+                if token_key not in self.token_data:
+                    auth_start = time.time()
+                    self.token_data_lock.acquire()
+                    collided = False
+                    try:
+                        if token_key not in self.token_data:
+                            logging.debug('Authenticating with %r',
+                                          call_info['auth_kwargs'])
+                            storage_url, token = client.get_auth(
+                                **call_info['auth_kwargs'])
+                            override_urls = call_info['auth_kwargs'].get(
+                                'storage_urls', None)
+                            if override_urls:
+                                logging.debug(
+                                    'Will override auth storage url %s with '
+                                    'one of %r', storage_url, override_urls)
+                                storage_urls = override_urls
+                            else:
+                                storage_urls = [storage_url]
+                            self.token_data[token_key] = (storage_urls, token)
+                        else:
+                            collided = True
+                    finally:
+                        self.token_data_lock.release()
+                    if collided:
+                        # Wait just a little bit if we just collided with
+                        # another greenthread's re-auth
+                        logging.debug('Collided on re-auth; sleeping 0.005')
+                        self._sleep(0.005)
+                    auth_latency += time.time() - auth_start
+                storage_urls, args['token'] = self.token_data[token_key]
+                args['url'] = random.choice(storage_urls)
+
+            # Check for connection pool initialization (protected by a
+            # semaphore)
+            if args['url'] not in self.conn_pools:
+                self._create_connection_pool(
+                    args['url'],
+                    call_info.get('connect_timeout',
+                                  client.DEFAULT_CONNECT_TIMEOUT),
+                    call_info.get('network_timeout',
+                                  client.DEFAULT_NETWORK_TIMEOUT))
+
+            attempt_start = time.time()
+            if first_attempt_start is None:
+                first_attempt_start = attempt_start
+            try:
+                fn_results = None
+                with self.connection(args['url']) as conn:
+                    fn_results = fn(http_conn=conn, **args)
+                if fn_results:
+                    if tries != 0:
+                        logging.info('%r succeeded after %d tries',
+                                     call_info, tries)
+                        now = time.time()
+                        attempt_latencies.append(now - attempt_start)
+                        fn_results['attempt_latencies'] = attempt_latencies
+                        fn_results['first_attempt_latency'] = \
+                            attempt_latencies[0]
+                        fn_results['end_to_end_latency'] = \
+                            now - first_attempt_start
+                    break
+                tries += 1
+                attempt_latencies.append(time.time() - attempt_start)
+                if not self._may_retry(tries, None):
+                    e = Exception('No fn_results for %r after %d retires' % (
+                        fn, tries - 1))
+                    e.retries = tries - 1
+                    raise e
+            # XXX The name of this method does not suggest that it
+            # will also retry on socket-level errors. Regardless,
+            # sometimes Swift refuses connections (probably when it's
+            # way overloaded and the listen socket's connection queue
+            # (in the kernel) is full, so the kernel just says RST).
+            #
+            # UPDATE: connections should be handled by the ConnectionPool
+            # (which will trap socket.error and retry after a slight delay), so
+            # socket.error should NOT get raised here for connection failures.
+            # So hopefully this socket.error trapping code path will not get
+            # hit.
+            except socket.error as error:
+                tries += 1
+                attempt_latencies.append(time.time() - attempt_start)
+                if not self._may_retry(tries, SOCKET_ERROR):
+                    error.retries = tries - 1
+                    raise error
+            except client.ClientException as error:
+                tries += 1
+                attempt_latencies.append(time.time() - attempt_start)
+                if error.http_status in statuses and \
+                        self._may_retry(tries, error.http_status):
+                    if error.http_status == 401 and token_key:
+                        if token_key in self.token_data and \
+                                self.token_data[token_key][1] == args['token']:
+                            self.token_data_lock.acquire()
+                            try:
+                                if token_key in self.token_data and \
+                                        self.token_data[token_key][1] == \
+                                        args['token']:
+                                    logging.debug(
+                                        'Deleting token %s',
+                                        self.token_data[token_key][1])
+                                    del self.token_data[token_key]
+                            finally:
+                                self.token_data_lock.release()
+                        if self.control_dealer:
+                            auth_latency += self._wait_for_brokered_token(
+                                token_key, args['token'])
+                    logging.debug("Retrying an error: %r", error)
+                else:
+                    error.retries = tries - 1
+                    raise error
+        fn_results['retries'] = tries
+        if auth_latency:
+            fn_results['auth_latency'] = auth_latency
+        return fn_results
+
+    def _may_retry(self, tries, failure):
+        """
+        Decide whether to retry a request which has failed ``tries`` times,
+        the last time with ``failure`` (an HTTP status, SOCKET_ERROR or
+        None); if so, wait a while first (except after a 401, which gets a
+        new token instead).  See ssbench.retry.
+        """
+        if tries > self.retry_rules.get(failure, self.max_retries):
+            return False
+        if not self.retry_tokens.withdraw():
+            logging.debug('Retry budget exhausted; not retrying')
+            return False
+        if failure != 401 and self.retry_backoff:
+            self._sleep(backoff_delay(tries, self.retry_backoff,
+                                      self.retry_backoff_max))
+        return True
+
+    def _wait_for_brokered_token(self, token_key, token):
+        """
+        Tell the master a token was rejected and wait (a little while) for it
+        to push out a new one; if it doesn't, the caller will authenticate on
+        its own.
+
+        :returns: The number of seconds spent waiting
+        """
+        start = time.time()
+        if token not in self.rejected_tokens:
+            # Only the first greenthread to see the 401 needs to say so
+            self.rejected_tokens.add(token)
+            self._send_control(('TOKEN_REJECTED', token_key, token))
+        if not self._wait_for_control(
+                lambda: token_key in self.token_data and
+                self.token_data[token_key][1] != token,
+                BROKERED_TOKEN_TIMEOUT):
+            logging.warning('No new token from the master after %ds; '
+                            'authenticating', BROKERED_TOKEN_TIMEOUT)
+        return time.time() - start
+
+    def put_results(self, result, **kwargs):
+        """
+        Put work result into stats queue.  The result is the job's own dict,
+        updated in place with the given **kwargs, this worker's "ID" and the
+        time of completion, so no new dict is made for it.
+
+        :result: The job dict (which the job must not use afterwards)
+        :**kwargs: An optional set of key/value pairs to add to it
+        :returns: (nothing)
+        """
+        result.update(kwargs)
+        result['completed_at'] = time.time()
+        result['worker_id'] = self.worker_id
+        self.result_queue.put(result)
+
+    def put_exception_results(self, job_data, e, **kwargs):
+        # last arg is assumed as the # of retries
+        self.put_results(job_data,
+                         exception=repr(e),
+                         retries=getattr(e, 'retries', 0),
+                         traceback=traceback.format_exc(), **kwargs)
+
+    def _put_results_from_response(self, object_info, resp_headers):
+        # Strip some keys the job had that results don't need:
+        object_info.pop('network_timeout', None)
+        object_info.pop('connect_timeout', None)
+        object_info.pop('auth_kwargs', None)
+        object_info.pop('head_first', None)
+        object_info.pop('block_size', None)
+        object_info.pop('expect_continue', None)
+        object_info.pop('segment_size', None)
+        object_info.pop('segment_concurrency', None)
+        object_info.pop('ranges', None)
+        object_info.pop('read_bytes', None)
+        object_info.pop('prefix', None)
+        object_info.pop('delimiter', None)
+        object_info.pop('limit', None)
+        object_info.pop('marker', None)
+        if resp_headers.get('auth_latency'):
+            object_info['auth_latency'] = resp_headers['auth_latency']
+        if 'attempt_latencies' in resp_headers:
+            # Retried (see ignoring_http_responses())
+            for key in ('attempt_latencies', 'first_attempt_latency',
+                        'end_to_end_latency'):
+                object_info[key] = resp_headers[key]
+        if 'segments' in resp_headers:
+            # Uploaded in segments (see _upload_segmented())
+            for key in ('segments', 'segment_latency', 'manifest_latency',
+                        'object_latency'):
+                object_info[key] = resp_headers[key]
+        if 'x-swiftstack-sent-bytes' in resp_headers:
+            object_info['sent_bytes'] = \
+                resp_headers['x-swiftstack-sent-bytes']
+        if 'x-swiftstack-received-bytes' in resp_headers:
+            object_info['received_bytes'] = \
+                resp_headers['x-swiftstack-received-bytes']
+        if resp_headers.get('x-swiftstack-continue-timed-out'):
+            # Sent the body without a 100 Continue, so there's no continue
+            # latency
+            object_info['continue_timed_out'] = True
+        if 'read_pattern' in object_info:
+            # Reported separately for each pattern, too
+            object_info['%s_read_latency' % object_info['read_pattern']] = \
+                resp_headers.get('x-swiftstack-last-byte-latency')
+        for timing_type, header in TIMING_HEADERS:
+            if header in resp_headers:
+                object_info[timing_type] = resp_headers[header]
+        self.put_results(
+            object_info,
+            first_byte_latency=resp_headers.get(
+                'x-swiftstack-first-byte-latency', None),
+            last_byte_latency=resp_headers.get(
+                'x-swiftstack-last-byte-latency', None),
+            trans_id=resp_headers.get('x-trans-id', None),
+            retries=resp_headers.get('retries', 0))
+
+    def handle_noop(self, object_info):
+        self.put_results(
+            object_info,
+            first_byte_latency=0.0,
+            last_byte_latency=0.0,
+            trans_id=None,
+            retries=0)
+    handle_PING = handle_noop
+
+    def handle_upload_object(self, object_info, letter='A', replacing=False):
+        if object_info.get('head_first'):
+            # Only upload if it's not already present
+            try:
+                headers = self.ignoring_http_responses(
+                    (503,), client.head_object, object_info)
+            except client.ClientException:
+                # Not present, so continue on to the upload
+                pass
+            else:
+                # Nothing was uploaded
+                headers['x-swiftstack-sent-bytes'] = 0
+                self._put_results_from_response(object_info, headers)
+                return
+        object_info['size'] = int(object_info['size'])
+        block_size = object_info.get('block_size') or DEFAULT_BLOCK_SIZE
+        contents = letter * block_size
+        put_kwargs = dict(chunk_size=block_size, contents=contents)
+        if object_info.get('expect_continue'):
+            put_kwargs['expect_continue'] = True
+        if object_info.get('segment_size'):
+            headers = self._upload_segmented(object_info, put_kwargs)
+            if replacing:
+                self._delete_stale_segments(object_info, headers['segments'])
+        else:
+            headers = self.ignoring_http_responses(
+                (503,), client.put_object, object_info,
+                content_length=object_info['size'], **put_kwargs)
+        self._put_results_from_response(object_info, headers)
+
+    def _upload_segmented(self, object_info, put_kwargs):
+        """
+        Upload an object as a Static Large Object: PUT its segments (named
+        "<name>/seg/<index>", in the same container) ``segment_concurrency``
+        at a time, each from its own greenlet (or thread) over a pooled
+        connection, then its manifest.
+
+        :returns: "Headers" for _put_results_from_response(), with the time
+                  the whole upload took as the last-byte latency
+        """
+        size = object_info['size']
+        segment_size = int(object_info['segment_size'])
+        segment_count = max(1, -(-size // segment_size))
+        concurrency = min(segment_count,
+                          object_info.get('segment_concurrency') or
+                          DEFAULT_SEGMENT_CONCURRENCY)
+        # (name, size, headers) of each uploaded segment
+        segments = [None] * segment_count
+        # Popped off the end, so the segments go up in order
+        to_upload = range(segment_count - 1, -1, -1)
+        errors = []
+        start = time.time()
+
+        def _upload_segments():
+            while True:
+                try:
+                    index = to_upload.pop()
+                except IndexError:
+                    return
+                name = '%s/seg/%08d' % (object_info['name'], index)
+                length = min(segment_size, size - index * segment_size)
+                try:
+                    headers = self.ignoring_http_responses(
+                        (503,), client.put_object,
+                        dict(object_info, name=name),
+                        content_length=length, **put_kwargs)
+                except Exception as e:
+                    # The object can't be finished, so don't bother with
+                    # the rest
+                    errors.append(e)
+                    del to_upload[:]
+                    return
+                segments[index] = (name, length, headers)
+
+        uploaders = [self._spawn_helper(_upload_segments)
+                     for _ in xrange(concurrency)]
+        try:
+            for uploader in uploaders:
+                self._join_helper(uploader)
+        finally:
+            # If the job was interrupted (past its deadline), the uploaders
+            # stop after their current segments
+            del to_upload[:]
+        if errors:
+            raise errors[0]
+
+        manifest = json.dumps([
+            {'path': '/%s/%s' % (object_info['container'], name),
+             'etag': headers.get('etag', '').strip('"') or None,
+             'size_bytes': length}
+            for name, length, headers in segments])
+        manifest_headers = self.ignoring_http_responses(
+            (503,), client.put_object, object_info, contents=manifest,
+            content_length=len(manifest), chunk_size=len(manifest),
+            query_string=SLO_MANIFEST_PUT)
+        object_latency = time.time() - start
+
+        all_headers = [headers for _, _, headers in segments]
+        all_headers.append(manifest_headers)
+        return {
+            'x-trans-id': manifest_headers.get('x-trans-id'),
+            'x-swiftstack-last-byte-latency': object_latency,
+            'retries': sum(headers['retries'] for headers in all_headers),
+            'auth_latency': sum(headers.get('auth_latency', 0.0)
+                                for headers in all_headers),
+            'x-swiftstack-sent-bytes': sum(
+                headers.get('x-swiftstack-sent-bytes', 0)
+                for headers in all_headers),
+            'segments': segment_count,
+            'segment_latency': [
+                headers.get('x-swiftstack-last-byte-latency')
+                for _, _, headers in segments],
+            'manifest_latency': manifest_headers.get(
+                'x-swiftstack-last-byte-latency'),
+            'object_latency': object_latency,
+        }
+
+    def _delete_stale_segments(self, object_info, segment_count):
+        """
+        Delete the segments an updated Static Large Object had beyond its
+        new last one (its old upload may have had more), up to the first one
+        that isn't there.  This happens after its new manifest is in place,
+        and isn't counted in the update's latencies.
+        """
+        index = segment_count
+        while True:
+            try:
+                self.ignoring_http_responses(
+                    (503,), client.delete_object, dict(
+                        object_info,
+                        name='%s/seg/%08d' % (object_info['name'], index)))
+            except client.ClientException as error:
+                if error.http_status == 404:
+                    return
+                raise
+            index += 1
+
+    # By the time a job gets to the worker, an object create and update look
+    # the same: it's just a PUT.  We use a different letter for the contents
+    # for testability.
+
+    def handle_update_object(self, object_info):
+        return self.handle_upload_object(object_info, letter='B',
+                                         replacing=True)
+
+    def handle_delete_object(self, object_info):
+        delete_kwargs = {}
+        if object_info.get('segment_size'):
+            # Its segments go with it
+            delete_kwargs['query_string'] = SLO_MANIFEST_DELETE
+        headers = self.ignoring_http_responses(
+            (404, 503), client.delete_object, object_info, **delete_kwargs)
+        self._put_results_from_response(object_info, headers)
+
+    def handle_get_object(self, object_info):
+        get_kwargs = {}
+        # See Scenario._read_pattern()
+        for key in ('ranges', 'read_bytes'):
+            if object_info.get(key):
+                get_kwargs[key] = object_info[key]
+        headers = self.ignoring_http_responses(
+            (404, 503), client.get_object, object_info,
+            resp_chunk_size=object_info.get('block_size', DEFAULT_BLOCK_SIZE),
+            **get_kwargs)
+        self._put_results_from_response(object_info, headers)
+
+    def handle_head_object(self, object_info):
+        headers = self.ignoring_http_responses(
+            (404, 503), client.head_object, object_info)
+        self._put_results_from_response(object_info, headers)
+
+    def handle_post_object(self, object_info):
+        headers = self.ignoring_http_responses(
+            (404, 503), client.post_object, object_info,
+            headers={POSTED_METADATA_HEADER: '%.6f' % time.time()})
+        self._put_results_from_response(object_info, headers)
+
+    def handle_list_container(self, object_info):
+        # One page of the listing (see Scenario._metadata_job())
+        list_kwargs = dict((key, object_info[key])
+                           for key in ('prefix', 'delimiter', 'limit',
+                                       'marker')
+                           if object_info.get(key))
+        headers = self.ignoring_http_responses(
+            (404, 503), _get_container_headers, object_info, **list_kwargs)
+        self._put_results_from_response(object_info, headers)
+
+    def handle_head_container(self, object_info):
+        headers = self.ignoring_http_responses(
+            (404, 503), client.head_container, object_info)
+        self._put_results_from_response(object_info, headers)
@@ -0,0 +1,363 @@
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import math
+import random
+import logging
+import multiprocessing
+from mako.template import Template
+
+from ssbench.reporter import Reporter
+from ssbench.run_results import RunResults
+from ssbench.ordered_dict import OrderedDict
+
+
+LATENCY_TYPES = ('first_byte_latency', 'last_byte_latency')
+
+
+class _SamplingReporter(Reporter):
+    """A Reporter which also keeps a bounded random sample of each latency
+    series, sorted, so two runs' latency distributions can be compared after
+    the (much larger) raw series have been summarized away.
+    """
+    def __init__(self, run_results, max_samples, rng):
+        Reporter.__init__(self, run_results)
+        self.max_samples = max_samples
+        self.rng = rng
+
+    def _compute_latency_stats(self, stat_dict, nth_pctile, format_numbers):
+        for latency_type in LATENCY_TYPES:
+            sequence = filter(None, stat_dict.get(latency_type, []))
+            count = len(sequence)
+            if count > self.max_samples:
+                sequence = self.rng.sample(sequence, self.max_samples)
+            sequence.sort()
+            stat_dict[latency_type + '_samples'] = (count, sequence)
+        Reporter._compute_latency_stats(self, stat_dict, nth_pctile,
+                                        format_numbers)
+
+    def _calculate_scenario_stats_in_processes(self, pctiles, format_numbers,
+                                               window, processes,
+                                               distributions=False):
+        # Summarized results (see ssbench.summary) never get here with their
+        # latency series, so sample the merged latency histograms instead.
+        stats = Reporter._calculate_scenario_stats_in_processes(
+            self, pctiles, format_numbers, window, processes, True)
+        if distributions:
+            latency_distributions = stats['latency_distributions']
+        else:
+            latency_distributions = stats.pop('latency_distributions')
+        for (crud_type, size_str), histograms in \
+                latency_distributions.iteritems():
+            if crud_type is None:
+                stat_dict = stats['agg_stats']
+                per_size_stats = stats['size_stats']
+            else:
+                stat_dict = stats['op_stats'][crud_type]
+                per_size_stats = stat_dict['size_stats']
+            if size_str is not None:
+                stat_dict = per_size_stats[size_str]
+            for latency_type in LATENCY_TYPES:
+                stat_dict[latency_type + '_samples'] = _histogram_samples(
+                    histograms[latency_type], self.max_samples)
+        return stats
+
+
+def _histogram_samples(histogram, max_samples):
+    """
+    :returns: A (series_length, sorted_sample) tuple, like those
+              _SamplingReporter keeps, of evenly-spaced quantiles of a
+              LogHistogram's values (each within its relative error)
+    """
+    if not histogram.count:
+        return (0, [])
+    sample_size = min(histogram.count, max_samples)
+    rank_indexes = [int((i + 0.5) * histogram.count / sample_size)
+                    for i in xrange(sample_size)]
+    values = histogram.values_at_indexes(rank_indexes)
+    return (histogram.count, [values[i] for i in rank_indexes])
+
+
+def _summarize_stats(stats):
+    if not stats or not stats.get('req_count'):
+        return None
+    summary = dict(
+        req_count=stats['req_count'],
+        errors=stats['errors'],
+        avg_req_per_sec=stats['avg_req_per_sec'],
+    )
+    for latency_type in LATENCY_TYPES:
+        pctile = stats[latency_type]['pctile']
+        # _series_stats() returns placeholder strings when there's no data
+        summary[latency_type] = pctile if isinstance(pctile, float) else None
+        summary[latency_type + '_samples'] = stats[latency_type + '_samples']
+    return summary
+
+
+def summarize_run(args):
+    """Calculate the comparable statistics for one stats file.
+
+    This is a module-level function taking a single tuple so it can be
+    handed to multiprocessing.Pool.map().
+
+    :param args: A (stats_file_path, nth_pctile, max_samples, seed) tuple
+    :returns: A picklable dict with the run's scenario name, duration and a
+              'stats' OrderedDict mapping (label, size_str) keys (e.g.
+              ('READ', 'small') or ('TOTAL', 'all')) to request counts,
+              request rates, percentile latencies and latency samples
+    """
+    stats_file_path, nth_pctile, max_samples, seed = args
+    logging.info('Summarizing %s...', stats_file_path)
+    reporter = _SamplingReporter(RunResults(stats_file_path), max_samples,
+                                 random.Random(seed))
+    reporter.read_results(nth_pctile=nth_pctile, format_numbers=False)
+    stats = reporter.stats
+    summaries = OrderedDict()
+    for label, label_stats, size_stats in reporter._stat_list(stats):
+        summary = _summarize_stats(label_stats)
+        if summary:
+            summaries[(label, 'all')] = summary
+            for size_str, per_size_stats in size_stats.iteritems():
+                summary = _summarize_stats(per_size_stats)
+                if summary:
+                    summaries[(label, size_str)] = summary
+    return dict(
+        path=stats_file_path,
+        scenario_name=reporter.scenario.name,
+        duration=stats['time_series']['stop'] -
+        stats['time_series']['start_time'],
+        stats=summaries,
+    )
+
+
+def _resampled_pctile(samples, nth_pctile, rng):
+    # The k-th smallest of n values drawn (with replacement) from a sorted
+    # sample is the sample's inverse CDF applied to the k-th smallest of n
+    # uniform variates, which is Beta(k, n - k + 1) distributed.  So one
+    # bootstrap replicate of a percentile costs one betavariate() call
+    # instead of drawing and sorting n values.  Using the original series
+    # length for n keeps the interval honest for downsampled series.
+    count, sample = samples
+    rank = max(1, int(math.ceil(count * nth_pctile / 100.0)))
+    quantile = rng.betavariate(rank, count - rank + 1)
+    return sample[min(len(sample) - 1, int(quantile * len(sample)))]
+
+
+def bootstrap_pctile_delta(baseline, candidate, nth_pctile, iterations=2000,
+                           confidence=95, rng=None):
+    """Bootstrap a confidence interval for the difference between two
+    latency distributions' N-th percentiles.
+
+    :param baseline: A (series_length, sorted_sample) tuple
+    :param candidate: A (series_length, sorted_sample) tuple
+    :param nth_pctile: The percentile to compare
+    :param iterations: Number of bootstrap replicates
+    :param confidence: Confidence level of the interval, in percent
+    :param rng: Optional random.Random instance
+    :returns: A (low, high) tuple bounding candidate minus baseline, or None
+              if either sample is empty
+    """
+    if not baseline[1] or not candidate[1]:
+        return None
+    rng = rng or random.Random()
+    deltas = sorted(_resampled_pctile(candidate, nth_pctile, rng) -
+                    _resampled_pctile(baseline, nth_pctile, rng)
+                    for _ in xrange(iterations))
+    tail = (1 - confidence / 100.0) / 2
+    return (deltas[int(tail * (iterations - 1))],
+            deltas[int(math.ceil((1 - tail) * (iterations - 1)))])
+
+
+class Comparison:
+    def __init__(self, stats_file_paths, nth_pctile=95, max_samples=10000,
+                 processes=None, seed=0):
+        self.stats_file_paths = stats_file_paths
+        self.nth_pctile = nth_pctile
+        self.max_samples = max_samples
+        self.processes = processes
+        self.seed = seed
+
+    def read_results(self):
+        """Summarize every stats file, using a pool of processes when there's
+        more than one file and more than one process allowed.
+        """
+        job_args = [(path, self.nth_pctile, self.max_samples, self.seed)
+                    for path in self.stats_file_paths]
+        processes = self.processes or min(len(job_args),
+                                          multiprocessing.cpu_count())
+        if processes > 1 and len(job_args) > 1:
+            pool = multiprocessing.Pool(processes)
+            try:
+                self.runs = pool.map(summarize_run, job_args)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            self.runs = map(summarize_run, job_args)
+
+    def keys(self):
+        keys = OrderedDict()
+        for run in self.runs:
+            for key in run['stats']:
+                keys[key] = True
+        return keys.keys()
+
+    def find_regressions(self, threshold=10.0, confidence=95,
+                         iterations=2000):
+        """Compare every run after the first against the first (baseline)
+        run.
+
+        A percentile latency is a regression when the bootstrap confidence
+        interval of the difference lies entirely more than ``threshold``
+        percent of the baseline's above it, i.e. even its lower bound is a
+        significant increase, not just the point estimate.  A request rate is
+        a regression when it is more than ``threshold`` percent lower than
+        the baseline's.
+
+        :returns: A list of regression dicts
+        """
+        rng = random.Random(self.seed)
+        regressions = []
+        baseline = self.runs[0]['stats']
+        for run_index, run in enumerate(self.runs[1:], 2):
+            for key, stats in run['stats'].iteritems():
+                base_stats = baseline.get(key)
+                if not base_stats:
+                    continue
+                delta_pct = _delta_pct(base_stats['avg_req_per_sec'],
+                                       stats['avg_req_per_sec'])
+                if delta_pct is not None and delta_pct < -threshold:
+                    regressions.append(dict(
+                        run=run_index, key=key, metric='avg_req_per_sec',
+                        baseline=base_stats['avg_req_per_sec'],
+                        value=stats['avg_req_per_sec'],
+                        delta_pct=delta_pct, interval=None))
+                for latency_type in LATENCY_TYPES:
+                    delta_pct = _delta_pct(base_stats[latency_type],
+                                           stats[latency_type])
+                    if delta_pct is None or delta_pct <= threshold:
+                        continue
+                    interval = bootstrap_pctile_delta(
+                        base_stats[latency_type + '_samples'],
+                        stats[latency_type + '_samples'], self.nth_pctile,
+                        iterations, confidence, rng)
+                    if interval and interval[0] > \
+                            threshold / 100.0 * base_stats[latency_type]:
+                        regressions.append(dict(
+                            run=run_index, key=key, metric=latency_type,
+                            baseline=base_stats[latency_type],
+                            value=stats[latency_type],
+                            delta_pct=delta_pct, interval=interval))
+        return regressions
+
+    def comparison_template(self):
+        return """
+Comparing ${len(runs)} runs (deltas are relative to run [1]):
+% for i, run in enumerate(runs, 1):
+  [${i}] ${run['path']}  (${run['scenario_name']}; ${'%.0f' % round(run['duration'])}s)
+% endfor
+% for heading, rows in sections:
+
+${heading}
+% for row in rows:
+  ${'%-20s' % row[0]}${''.join('%-24s' % cell for cell in row[1:]).rstrip()}
+% endfor
+% endfor
+
+% if regressions:
+Regressions (more than ${'%g' % threshold}% worse than run [1]; ${'%g' % confidence}% confidence):
+% for regression in regressions:
+  [${regression['run']}] ${regression['heading']} ${regression['description']}
+% endfor
+% else:
+No regressions (more than ${'%g' % threshold}% worse than run [1]).
+% endif
+"""
+
+    def generate_report(self, regressions, threshold=10.0, confidence=95):
+        """Format a side-by-side comparison of the summarized runs.
+
+        :param regressions: Regressions from find_regressions()
+        :returns: A report (string) suitable for printing, emailing, etc.
+        """
+        flagged = set((r['run'], r['key'], r['metric']) for r in regressions)
+        rows_spec = [
+            ('Count', 'req_count', '%d', False),
+            ('Avg req/s', 'avg_req_per_sec', '%.1f', True),
+            ('First-byte %d%%-ile' % self.nth_pctile, 'first_byte_latency',
+             '%.3f', True),
+            ('Last-byte  %d%%-ile' % self.nth_pctile, 'last_byte_latency',
+             '%.3f', True),
+        ]
+        sections = []
+        for key in self.keys():
+            rows = [[''] + ['[%d]' % i for i in xrange(1, len(self.runs) + 1)]]
+            for row_label, metric, fmt, show_delta in rows_spec:
+                row = [row_label]
+                base_stats = self.runs[0]['stats'].get(key)
+                for run_index, run in enumerate(self.runs, 1):
+                    stats = run['stats'].get(key)
+                    if not stats or stats[metric] is None:
+                        row.append('N/A')
+                        continue
+                    cell = fmt % stats[metric]
+                    if show_delta and run_index > 1 and base_stats:
+                        delta_pct = _delta_pct(base_stats[metric],
+                                               stats[metric])
+                        if delta_pct is not None:
+                            cell += ' (%+.1f%%)' % delta_pct
+                    if (run_index, key, metric) in flagged:
+                        cell += ' !'
+                    row.append(cell)
+                rows.append(row)
+            sections.append((_heading(key), rows))
+
+        metric_names = {
+            'avg_req_per_sec': 'average requests per second',
+            'first_byte_latency':
+            'first-byte %d%%-ile latency' % self.nth_pctile,
+            'last_byte_latency':
+            'last-byte %d%%-ile latency' % self.nth_pctile,
+        }
+        for regression in regressions:
+            regression['heading'] = _heading(regression['key'])
+            fmt = '%.1f' if regression['metric'] == 'avg_req_per_sec' \
+                else '%.3f'
+            description = '%s: %s -> %s (%+.1f%%' % (
+                metric_names[regression['metric']],
+                fmt % regression['baseline'], fmt % regression['value'],
+                regression['delta_pct'])
+            if regression['interval']:
+                description += '; difference %+.3f to %+.3f' % \
+                    regression['interval']
+            regression['description'] = description + ')'
+
+        template = Template(self.comparison_template())
+        return template.render(
+            runs=self.runs, sections=sections, regressions=regressions,
+            threshold=threshold, confidence=confidence)
+
+
+def _heading(key):
+    label, size_str = key
+    if size_str == 'all':
+        return '%s (all obj sizes)' % label
+    return '%s (%s objs)' % (label, size_str)
+
+
+def _delta_pct(baseline, value):
+    if baseline is None or value is None or not baseline:
+        return None
+    return (value - baseline) * 100.0 / baseline
@@ -0,0 +1,85 @@
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Constants (and token_key()) shared by both ends of the control channel (the
+master's ROUTER socket and each worker's DEALER socket).
+
+Every message is a msgpack'ed tuple whose first element says what it is.
+
+Worker to master:
+  ('REGISTER', worker_id, concurrency, hostname, pid)
+  ('HEARTBEAT', worker_id, in_flight_jobs, [(first_job_id, count), ...],
+   stuck_jobs)
+    (the job ID ranges are the numbered jobs pulled since the last one;
+    stuck_jobs is how many jobs have been in flight for over the worker's
+    stuck_seconds)
+  ('CONTEXT', context_id)
+  ('TOKEN_REJECTED', token_key, token)
+  ('SPOOL', worker_id, chunk)
+  ('SPOOL_END', worker_id, chunk_count)
+    (in answer to COLLECT: the worker's spool file, if any, in order)
+
+Master to worker:
+  ('CONTEXT', context_id, packed_run_context_or_None)
+  ('TOKEN', token_key, storage_urls, token)
+  ('START', context_id)
+  ('CONFIGURE', settings_dict)
+  ('COLLECT',)
+  ('STOP',)
+  ('KILL',)
+"""
+
+# Workers send a heartbeat this often (seconds)
+HEARTBEAT_INTERVAL = 1.0
+# A worker not heard from for this long is presumed dead
+DEAD_WORKER_SECONDS = HEARTBEAT_INTERVAL * 5
+
+# A worker which has been sent jobs held for a start barrier starts them
+# anyway if the master hasn't said to within this many seconds.
+START_BARRIER_TIMEOUT = 30
+
+# Workers count jobs in flight for longer than this (seconds) as stuck
+DEFAULT_STUCK_SECONDS = 10
+
+# Spool files are sent to the master in chunks of this many bytes
+SPOOL_CHUNK_SIZE = 2 ** 20
+# The master gives up on collecting spool files if no chunk arrives for this
+# long (seconds)
+SPOOL_COLLECT_TIMEOUT = 30
+
+# Worker settings which may be changed with a CONFIGURE message
+CONFIGURABLE_SETTINGS = ('batch_size', 'batch_bytes', 'batch_linger',
+                         'max_retries', 'retry_backoff', 'retry_backoff_max',
+                         'retry_budget', 'retry_rules', 'stuck_seconds',
+                         'log_level')
+
+
+def token_key(auth_kwargs):
+    """
+    :returns: A string identifying the credentials in some auth_kwargs, so
+              the master and workers agree on which token goes with which
+              jobs.
+    """
+    parts = []
+    for key in sorted(auth_kwargs.keys()):
+        value = auth_kwargs.get(key, '') or ''
+        if isinstance(value, dict):
+            parts.append(token_key(value))
+        elif isinstance(value, list):
+            parts.extend(value)
+        else:
+            parts.append(value)
+    return '\x01'.join(map(str, parts))
@@ -0,0 +1,194 @@
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import math
+
+
+class LogHistogram(object):
+    """A mergeable histogram of positive values with logarithmically-sized
+    buckets.
+
+    Any value is reported back (e.g. as a percentile) within
+    ``relative_error`` of its true value, regardless of magnitude, using
+    memory proportional to the logarithm of the range of recorded values
+    rather than to their count.  Histograms with the same relative_error can
+    be merged, so partial histograms computed in different processes (or on
+    different workers) combine into exactly the histogram of all the values.
+    """
+    def __init__(self, relative_error=0.01):
+        self.relative_error = relative_error
+        self._gamma = (1 + relative_error) / (1 - relative_error)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets = {}
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def __len__(self):
+        return self.count
+
+    def __eq__(self, other):
+        return isinstance(other, LogHistogram) and \
+            self.relative_error == other.relative_error and \
+            self.buckets == other.buckets
+
+    def __ne__(self, other):
+        return not self == other
+
+    def bucket_index(self, value):
+        return int(math.ceil(math.log(value) / self._log_gamma))
+
+    def bucket_bounds(self, index):
+        """:returns: The (lower, upper] bounds of a bucket"""
+        return self._gamma ** (index - 1), self._gamma ** index
+
+    def bucket_value(self, index):
+        # Every value in (gamma**(i-1), gamma**i] is within relative_error of
+        # this one.
+        return 2 * self._gamma ** index / (self._gamma + 1)
+
+    def record(self, value, count=1):
+        """Record a value.  Values which are not positive are ignored."""
+        if value <= 0:
+            return
+        index = self.bucket_index(value)
+        self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        if other.relative_error != self.relative_error:
+            raise ValueError('Cannot merge histograms with different '
+                             'relative errors (%r != %r)' % (
+                                 self.relative_error, other.relative_error))
+        for index, count in other.buckets.iteritems():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        if other.min is not None and (self.min is None or
+                                      other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or
+                                      other.max > self.max):
+            self.max = other.max
+        return self
+
+    def value_at_index(self, rank_index):
+        """:returns: The approximate value of the 0-based rank_index-th
+        smallest recorded value
+        """
+        if not 0 <= rank_index < self.count:
+            raise IndexError('rank %d out of range' % rank_index)
+        if rank_index == 0:
+            return self.min
+        if rank_index == self.count - 1:
+            return self.max
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank_index:
+                return min(max(self.bucket_value(index), self.min), self.max)
+
+    def values_at_indexes(self, rank_indexes):
+        """:returns: A dict of the approximate value of each of the 0-based
+        rank_indexes, found in a single walk over the buckets
+        """
+        values = {}
+        pending = sorted(set(rank_indexes))
+        if pending and not (0 <= pending[0] and pending[-1] < self.count):
+            raise IndexError('rank out of range')
+        while pending and pending[0] == 0:
+            values[pending.pop(0)] = self.min
+        while pending and pending[-1] == self.count - 1:
+            values[pending.pop()] = self.max
+        seen = 0
+        for index in sorted(self.buckets):
+            if not pending:
+                break
+            seen += self.buckets[index]
+            while pending and seen > pending[0]:
+                values[pending.pop(0)] = min(max(self.bucket_value(index),
+                                                 self.min), self.max)
+        return values
+
+    def percentiles(self, nth_pctiles):
+        """:returns: A list of the approximate N-th percentiles of recorded
+        values for each N in nth_pctiles, interpolated the same way as
+        Reporter.pctile() does for sorted sequences
+        """
+        last = self.count - 1
+        rank_indexes = []
+        for nth_pctile in nth_pctiles:
+            rank = self.count * nth_pctile / 100.0
+            if float(int(rank)) == rank:
+                rank = int(rank)
+                rank_indexes.append((min(max(rank - 1, 0), last),
+                                     min(rank, last)))
+            else:
+                rank_index = min(int(math.ceil(rank)) - 1, last)
+                rank_indexes.append((rank_index, rank_index))
+        values = self.values_at_indexes(
+            [i for pair in rank_indexes for i in pair])
+        return [(values[low] + values[high]) / 2.0 if low != high
+                else values[low] for low, high in rank_indexes]
+
+    def percentile(self, nth_pctile):
+        """:returns: The approximate N-th percentile of recorded values"""
+        return self.percentiles([nth_pctile])[0]
+
+    def median(self):
+        return self.percentile(50)
+
+    def packable(self):
+        """:returns: A dict of plain values (e.g. for msgpack) from which
+        from_packable() rebuilds this histogram
+        """
+        return dict(relative_error=self.relative_error, buckets=self.buckets,
+                    count=self.count, min=self.min, max=self.max)
+
+    @classmethod
+    def from_packable(cls, data):
+        histogram = cls(relative_error=data['relative_error'])
+        histogram.buckets = dict(data['buckets'])
+        histogram.count = data['count']
+        histogram.min = data['min']
+        histogram.max = data['max']
+        return histogram
+
+    def iter_buckets(self):
+        """Yield (upper_bound, count) tuples in increasing order."""
+        for index in sorted(self.buckets):
+            yield self.bucket_bounds(index)[1], self.buckets[index]
+
+    def iter_values(self):
+        """Yield (approximate value, count) tuples in increasing order."""
+        for index in sorted(self.buckets):
+            yield (min(max(self.bucket_value(index), self.min), self.max),
+                   self.buckets[index])
+
+    def iter_cdf(self):
+        """Yield (approximate value, cumulative fraction, cumulative count)
+        tuples in increasing order: the cumulative distribution function of
+        recorded values.
+        """
+        seen = 0
+        for value, count in self.iter_values():
+            seen += count
+            if seen == self.count:
+                # All of them, up to the largest
+                value = self.max
+            yield value, seen / float(self.count), seen
@@ -0,0 +1,107 @@
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+
+from ssbench.control import HEARTBEAT_INTERVAL
+
+
+# An unclaimed job is given up on after this long (seconds)
+DEFAULT_UNCLAIMED_SECONDS = 300
+# Workers claim the jobs they pulled in their next heartbeat, so any job
+# older than this which is still unclaimed when a worker dies may have died
+# with it.
+CLAIM_GRACE_SECONDS = HEARTBEAT_INTERVAL * 2
+
+
+class JobLeases(object):
+    """
+    The jobs in one do_a_run() which have been sent to workers but not yet
+    answered.
+
+    A job is claimed once the worker which pulled it says so, and is lost if
+    that worker dies.  Jobs which nobody claims are lost after
+    unclaimed_seconds, or sooner if a worker dies while they are more than
+    CLAIM_GRACE_SECONDS old (they may have been sitting in its socket).
+    A lost job is no longer waited for, but if its result does turn up, it
+    is recovered.
+    """
+    def __init__(self, unclaimed_seconds=DEFAULT_UNCLAIMED_SECONDS):
+        self.unclaimed_seconds = unclaimed_seconds
+        self.outstanding = {}  # job_id -> [job, sent_at, identity]
+        self.by_worker = {}  # identity -> set of claimed job_ids
+        self.lost = {}  # job_id -> (job, identity)
+        self.checked_at = 0  # when the master last looked for dead workers
+
+    def __len__(self):
+        return len(self.outstanding)
+
+    def add(self, job_id, job, now):
+        self.outstanding[job_id] = [job, now, None]
+
+    def claim(self, identity, job_ranges):
+        """
+        Note that a worker pulled some jobs.
+
+        :param job_ranges: (first_job_id, count) pairs
+        """
+        claimed = self.by_worker.setdefault(identity, set())
+        for first_job_id, count in job_ranges:
+            for job_id in xrange(first_job_id, first_job_id + count):
+                lease = self.outstanding.get(job_id)
+                if lease:
+                    lease[2] = identity
+                    claimed.add(job_id)
+
+    def job(self, job_id):
+        """:returns: The job with the given ID, if it's outstanding or lost"""
+        lease = self.outstanding.get(job_id) or self.lost.get(job_id)
+        return lease[0] if lease else None
+
+    def complete(self, job_id):
+        """
+        Note that a job's result arrived.
+
+        :returns: True if the job was outstanding (rather than lost or not
+                  one of ours)
+        """
+        lease = self.outstanding.pop(job_id, None)
+        if lease:
+            if lease[2] is not None:
+                self.by_worker[lease[2]].discard(job_id)
+            return True
+        if self.lost.pop(job_id, None):
+            logging.info('Recovered lost job %d', job_id)
+        return False
+
+    def expire(self, now, dead_identities=()):
+        """
+        Give up on the jobs held by some dead workers, and on any jobs
+        which have gone unclaimed for too long.
+
+        :returns: A list of the newly lost job IDs
+        """
+        lost_ids = []
+        for identity in dead_identities:
+            lost_ids.extend(self.by_worker.pop(identity, ()))
+        unclaimed_before = now - (CLAIM_GRACE_SECONDS if dead_identities
+                                  else self.unclaimed_seconds)
+        lost_ids.extend(job_id for job_id, (_, sent_at, identity)
+                        in self.outstanding.iteritems()
+                        if identity is None and sent_at < unclaimed_before)
+        for job_id in lost_ids:
+            job, _, identity = self.outstanding.pop(job_id)
+            self.lost[job_id] = (job, identity)
+        return lost_ids
@@ -23,19 +23,71 @@ gevent.monkey.patch_time()
 import os
 import re
 import sys
+import math
 import time
+import shutil
 import signal
 import random
 import logging
 import msgpack
+import argparse
+import tempfile
 from gevent_zeromq import zmq
 
 import ssbench
 import ssbench.swift_client as client
 from ssbench.run_state import RunState
+from ssbench.run_context import RunContext
+from ssbench.control import (HEARTBEAT_INTERVAL, DEAD_WORKER_SECONDS,
+                             SPOOL_COLLECT_TIMEOUT)
+from ssbench.leases import JobLeases, DEFAULT_UNCLAIMED_SECONDS
+from ssbench.token_broker import (TokenBroker, token_key,
+                                  DEFAULT_TOKEN_REFRESH_SECONDS)
 from ssbench.util import raise_file_descriptor_limit
 
 
+# With a batch size of 0, jobs are sent in batches small enough that each
+# worker gets about this many per round of the run's concurrency...
+BATCH_SPREAD = 4
+# ...but never more than this many
+MAX_ADAPTIVE_BATCH_SIZE = 100
+# Once a job slot frees up, wait up to this long (seconds) for more to free
+# up before sending a partial batch.
+DEFAULT_BATCH_LINGER = 0.002
+# The operation names a --deadline may be given for
+DEADLINE_OPS = {
+    'create': ssbench.CREATE_OBJECT,
+    'read': ssbench.READ_OBJECT,
+    'update': ssbench.UPDATE_OBJECT,
+    'delete': ssbench.DELETE_OBJECT,
+    'head_object': ssbench.HEAD_OBJECT,
+    'post_object': ssbench.POST_OBJECT,
+    'list_container': ssbench.LIST_CONTAINER,
+    'head_container': ssbench.HEAD_CONTAINER,
+}
+
+
+def parse_deadline(spec):
+    """
+    Parse a --deadline, like ``30`` (for every operation) or ``read=5``.
+
+    :returns: [(CRUD type, seconds), ...]
+    """
+    op, _, seconds = spec.rpartition('=')
+    try:
+        seconds = float(seconds)
+    except ValueError:
+        seconds = None
+    if not seconds or seconds < 0 or (op and op not in DEADLINE_OPS):
+        raise argparse.ArgumentTypeError(
+            'deadlines look like SECONDS or OPERATION=SECONDS (with an '
+            'OPERATION of %s), not %r' % (', '.join(sorted(DEADLINE_OPS)),
+                                          spec))
+    if op:
+        return [(DEADLINE_OPS[op], seconds)]
+    return [(crud_type, seconds) for crud_type in DEADLINE_OPS.values()]
+
+
 def _container_creator(storage_urls, token, container):
     storage_url = random.choice(storage_urls)
     http_conn = client.http_connection(storage_url)
@@ -68,18 +120,39 @@ def _container_deleter(concurrency, storage_urls, token, container_info):
         http_conn=http_conn)
 
 
-def _gen_cleanup_job(object_info):
-    return {
-        'type': ssbench.DELETE_OBJECT,
-        'container': object_info[0],
-        'name': object_info[1],
-    }
+def _gen_cleanup_job(scenario, cleanup_info):
+    # Made like the scenario's own jobs, so a size class's segmenting keys
+    # come along and a segmented object's segments are deleted with it
+    size_str, object_info = cleanup_info
+    return scenario.job(size_str, type=ssbench.DELETE_OBJECT,
+                        container=object_info[0], name=object_info[1])
 
 
 class Master:
     def __init__(self, zmq_bind_ip=None, zmq_work_port=None,
                  zmq_results_port=11300, quiet=False, connect_timeout=None,
-                 network_timeout=None):
+                 network_timeout=None, zmq_control_port=None,
+                 token_refresh_seconds=DEFAULT_TOKEN_REFRESH_SECONDS,
+                 unclaimed_job_seconds=DEFAULT_UNCLAIMED_SECONDS):
+        self.control_router = None
+        self.token_broker = None
+        self.run_contexts = {}
+        self.started_contexts = set()
+        # Workers we've heard from on the control port, keyed by their
+        # socket identity
+        self.workers = {}
+        # The current do_a_run()'s JobLeases, if jobs are being numbered
+        self.leases = None
+        self.next_job_id = 0
+        # Jobs given up on in earlier runs; their results are ignored
+        self.lost_job_ids = set()
+        self.unclaimed_job_seconds = unclaimed_job_seconds
+        # While collecting workers' spool files: where they go, and each
+        # one's {'path', 'file', 'chunks', 'done', 'worker_id'} keyed by
+        # socket identity
+        self.spool_dir = None
+        self.spools = {}
+        self.spools_progress_at = 0
         if zmq_bind_ip is not None and zmq_work_port is not None:
             work_endpoint = 'tcp://%s:%d' % (zmq_bind_ip, zmq_work_port)
             results_endpoint = 'tcp://%s:%d' % (zmq_bind_ip, zmq_results_port)
@@ -88,16 +161,300 @@ class Master:
             self.work_push.bind(work_endpoint)
             self.results_pull = self.context.socket(zmq.PULL)
             self.results_pull.bind(results_endpoint)
+            if zmq_control_port is not None:
+                # Workers register and heartbeat here, and fetch run
+                # contexts and auth tokens; without it, every job carries its
+                # own auth_kwargs and timeouts, every worker authenticates
+                # for itself, and there is no start barrier.
+                self.control_router = self.context.socket(zmq.ROUTER)
+                self.control_router.bind('tcp://%s:%d' % (zmq_bind_ip,
+                                                          zmq_control_port))
+                self.token_broker = TokenBroker(self._authenticate,
+                                                token_refresh_seconds)
+                self.token_broker.listeners.append(self._push_token)
+                gevent.spawn(self._serve_control)
         self.connect_timeout = connect_timeout
         self.network_timeout = network_timeout
         self.quiet = quiet
 
+    def _serve_control(self):
+        while True:
+            identity, request_raw = self.control_router.recv_multipart()
+            try:
+                request = msgpack.loads(request_raw)
+                verb = request[0]
+            except Exception:
+                logging.warning('Ignoring bad control request %r',
+                                request_raw)
+                continue
+            worker = self.workers.get(identity)
+            if worker is None:
+                worker = self.workers[identity] = dict(
+                    worker_id=None, concurrency=None, in_flight=0)
+            worker['last_heard'] = time.time()
+            if worker.pop('dead', False):
+                logging.warning('Worker %s is alive after all',
+                                worker['worker_id'])
+            if verb == 'REGISTER':
+                (worker['worker_id'], worker['concurrency'],
+                 worker['hostname'], worker['pid']) = request[1:5]
+                logging.info('Worker %d registered from %s (pid %d, '
+                             'concurrency %d)', worker['worker_id'],
+                             worker['hostname'], worker['pid'],
+                             worker['concurrency'])
+            elif verb == 'HEARTBEAT':
+                worker['worker_id'], worker['in_flight'] = request[1:3]
+                if self.leases is not None and len(request) > 3:
+                    self.leases.claim(identity, request[3])
+                if len(request) > 4:
+                    self._note_stuck_jobs(worker, request[4])
+            elif verb == 'CONTEXT':
+                self._send_run_context(identity, request[1])
+            elif verb in ('SPOOL', 'SPOOL_END'):
+                self._receive_spool(identity, verb, request)
+            elif verb == 'TOKEN_REJECTED':
+                # Re-authenticating can take a while; don't hold up other
+                # workers' requests.
+                gevent.spawn(self.token_broker.rejected, request[1],
+                             request[2])
+            else:
+                logging.warning('Ignoring unknown control request %r',
+                                request)
+
+    def _note_stuck_jobs(self, worker, stuck):
+        """
+        Keep a worker's count of stuck jobs (in flight for longer than its
+        stuck_seconds), and say whenever the total changes.
+        """
+        if stuck == worker.get('stuck', 0):
+            return
+        worker['stuck'] = stuck
+        stuck_workers = sorted(
+            (w['worker_id'], w['stuck']) for w in self.workers.itervalues()
+            if w.get('stuck') and not w.get('dead'))
+        if stuck_workers:
+            logging.warning(
+                '%d jobs stuck in flight (%s)',
+                sum(count for _, count in stuck_workers),
+                ', '.join('%d on worker %s' % (count, worker_id)
+                          for worker_id, count in stuck_workers))
+        else:
+            logging.info('No jobs are stuck in flight any more')
+
+    def _receive_spool(self, identity, verb, request):
+        if self.spool_dir is None:
+            logging.warning('Ignoring unexpected %s from worker %s', verb,
+                            request[1])
+            return
+        spool = self.spools.get(identity)
+        if spool is None:
+            path = os.path.join(self.spool_dir, 'worker-%d.spool' % (
+                len(self.spools),))
+            spool = self.spools[identity] = dict(
+                path=path, file=open(path, 'wb'), chunks=0, done=False,
+                worker_id=request[1])
+        if verb == 'SPOOL':
+            spool['file'].write(request[2])
+            spool['chunks'] += 1
+        else:
+            spool['file'].close()
+            if request[2] != spool['chunks']:
+                logging.warning('Got %d of %d spool chunks from worker %s',
+                                spool['chunks'], request[2], request[1])
+            else:
+                spool['done'] = True
+        self.spools_progress_at = time.time()
+
+    def _send_control(self, identity, message):
+        self.control_router.send_multipart([identity, msgpack.dumps(message)])
+
+    def _send_run_context(self, identity, context_id):
+        run_context = self.run_contexts.get(context_id)
+        if not run_context:
+            logging.warning('Worker asked for unknown run context %r',
+                            context_id)
+            self._send_control(identity, ('CONTEXT', context_id, None))
+            return
+        auth_kwargs = run_context.job_defaults.get('auth_kwargs')
+        if auth_kwargs and not auth_kwargs.get('token') and \
+                not run_context.job_defaults.get('noop'):
+            # Send the token first, so the worker never authenticates on
+            # its own unless we couldn't.
+            key = token_key(auth_kwargs)
+            tokens = self.token_broker.tokens.get(key)
+            if tokens:
+                self._send_control(identity, ('TOKEN', key) + tokens)
+        self._send_control(identity, ('CONTEXT', context_id,
+                                      run_context.packb()))
+        if context_id in self.started_contexts:
+            # This worker missed the START broadcast
+            self._send_control(identity, ('START', context_id))
+
+    def _broadcast(self, message):
+        for identity in self.workers.keys():
+            self._send_control(identity, message)
+
+    def _push_token(self, key, storage_urls, token):
+        logging.debug('Pushing a new token to %d workers', len(self.workers))
+        self._broadcast(('TOKEN', key, storage_urls, token))
+
+    def wait_for_workers(self, count, timeout=30):
+        """
+        Wait until at least ``count`` workers have registered.
+
+        :returns: The number of registered workers
+        """
+        deadline = time.time() + timeout
+        while True:
+            registered = sum(1 for worker in self.workers.itervalues()
+                             if worker['concurrency'] is not None and
+                             not worker.get('dead'))
+            if registered >= count or time.time() >= deadline:
+                return registered
+            gevent.sleep(0.01)
+
+    def start_run(self, run_context):
+        """
+        Tell every worker to start the jobs it's holding for a run context
+        with a start barrier.
+        """
+        logging.debug('Starting run context %r on %d workers',
+                      run_context.context_id, len(self.workers))
+        self.started_contexts.add(run_context.context_id)
+        self._broadcast(('START', run_context.context_id))
+
+    def _command_workers(self, message, listen_seconds):
+        """
+        Send a command to every worker we know of, and to any others we hear
+        from within listen_seconds.  Every live worker heartbeats at least
+        once every HEARTBEAT_INTERVAL, so a fresh master (e.g. for
+        kill-workers) finds them all quickly.
+
+        :returns: The number of workers sent the command
+        """
+        deadline = time.time() + listen_seconds
+        commanded = set()
+        while True:
+            for identity in self.workers.keys():
+                if identity not in commanded:
+                    self._send_control(identity, message)
+                    commanded.add(identity)
+            if time.time() >= deadline:
+                return len(commanded)
+            gevent.sleep(0.05)
+
+    def configure_workers(self, settings, listen_seconds=None):
+        """
+        Change some settings (see ssbench.control.CONFIGURABLE_SETTINGS) on
+        every worker.
+        """
+        if listen_seconds is None:
+            listen_seconds = HEARTBEAT_INTERVAL * 2.5
+        count = self._command_workers(('CONFIGURE', settings), listen_seconds)
+        logging.info('Reconfigured %d workers: %r', count, settings)
+        return count
+
+    def collect_spools(self, run_results, timeout=SPOOL_COLLECT_TIMEOUT):
+        """
+        Fetch every live worker's spool file, and merge their results into
+        run_results (see RunResults.merge_spools()).
+
+        :param timeout: Give up on workers which send nothing for this long
+        :returns: The number of results merged
+        """
+        identities = [identity
+                      for identity, worker in self.workers.iteritems()
+                      if not worker.get('dead')]
+        logging.info('Collecting result spools from %d workers...',
+                     len(identities))
+        self.spool_dir = tempfile.mkdtemp(prefix='ssbench-spools-')
+        self.spools = {}
+        self.spools_progress_at = time.time()
+        try:
+            for identity in identities:
+                self._send_control(identity, ('COLLECT',))
+            while not all(self.spools.get(identity, {}).get('done')
+                          for identity in identities):
+                if time.time() - self.spools_progress_at >= timeout:
+                    logging.warning(
+                        'Gave up on the spools of %d workers',
+                        sum(1 for identity in identities
+                            if not self.spools.get(identity, {}).get('done')))
+                    break
+                gevent.sleep(0.01)
+            spool_paths = []
+            for spool in self.spools.itervalues():
+                spool['file'].close()
+                if spool['done'] and spool['chunks']:
+                    spool_paths.append(spool['path'])
+            merged = run_results.merge_spools(spool_paths)
+            logging.info('Merged %d results from %d spools', merged,
+                         len(spool_paths))
+            return merged
+        finally:
+            self.spools = {}
+            shutil.rmtree(self.spool_dir, ignore_errors=True)
+            self.spool_dir = None
+
+    def _get_tokens(self, auth_kwargs):
+        """
+        Like _authenticate(), but reuses the token brokered for workers
+        when there is one.
+        """
+        if self.token_broker and not auth_kwargs.get('token'):
+            tokens = self.token_broker.get(auth_kwargs)
+            if tokens:
+                return tokens
+        return self._authenticate(auth_kwargs)
+
+    def run_context(self, auth_kwargs, scenario=None, job_defaults=None,
+                    start_barrier=False):
+        """
+        Create (and start serving) a RunContext for one do_a_run() call, or
+        return None if workers can't fetch one.
+        """
+        if not self.control_router:
+            return None
+        defaults = dict(job_defaults or {},
+                        auth_kwargs=auth_kwargs,
+                        connect_timeout=self.connect_timeout,
+                        network_timeout=self.network_timeout)
+        if self.token_broker and not auth_kwargs.get('token') and \
+                not defaults.get('noop'):
+            # Authenticate before any worker needs the token
+            self.token_broker.get(auth_kwargs)
+        run_context = RunContext(
+            defaults,
+            containers=scenario.containers if scenario else (),
+            size_strs=scenario.sizes_by_name.keys() if scenario else (),
+            start_barrier=start_barrier)
+        self.run_contexts[run_context.context_id] = run_context
+        return run_context
+
     def process_results_to(self, results_raw, processor, label='',
-                           run_results=None):
+                           run_results=None, leases=None):
+        """
+        :returns: The number of results which answered jobs still being
+                  waited for (with leases, a lost job's late result doesn't
+                  count)
+        """
         results = msgpack.loads(results_raw, use_list=False)
+        if isinstance(results, dict):
+            return self._process_summary_to(results, processor, label,
+                                            run_results, leases)
+        if self.lost_job_ids and any(result.get('job_id') in
+                                     self.lost_job_ids for result in results):
+            # A run already finished without these; leave them out
+            results = [result for result in results
+                       if result.get('job_id') not in self.lost_job_ids]
+            logging.info('Ignoring late results for jobs already reported '
+                         'as lost')
+            results_raw = msgpack.dumps(results)
         result_count = 0
         for result in results:
-            result_count += 1
+            if leases is None or 'job_id' not in result or \
+                    leases.complete(result['job_id']):
+                result_count += 1
             logging.debug(
                 'RESULT: %13s %s/%-17s %s/%s %s',
                 result['type'], result['container'], result['name'],
@@ -135,9 +492,55 @@ class Master:
 
         return result_count
 
+    def _process_summary_to(self, message, processor, label, run_results,
+                            leases):
+        """
+        Like process_results_to(), for a message from a worker which is
+        summarizing (see ssbench.summary) or spooling its results, or
+        couldn't run some jobs at all.  Only the outcome of each job is
+        known, so the processor is given the job itself (with an "exception"
+        if it failed), and the worker's summary, if any, goes to the results
+        file.
+        """
+        exceptions = message.get('exceptions') or {}
+        result_count = 0
+        for job_ids, failed in ((message['done'], False),
+                                (message['failed'], True)):
+            for job_id in job_ids:
+                if job_id in self.lost_job_ids:
+                    # A run already finished without it
+                    continue
+                job = leases.job(job_id) if leases else None
+                if leases is None or job_id is None or \
+                        leases.complete(job_id):
+                    result_count += 1
+                if label and not self.quiet:
+                    sys.stderr.write('X' if failed else '.')
+                if job is not None:
+                    processor(dict(job, exception=exceptions.get(
+                        job_id, '(summarized)')) if failed else job)
+        if label and not self.quiet:
+            sys.stderr.flush()
+        if run_results and message.get('summary'):
+            run_results.process_raw_results(
+                msgpack.dumps(message['summary']))
+        return result_count
+
     def do_a_run(self, concurrency, job_generator, result_processor,
                  auth_kwargs, mapper_fn=None, label='', noop=False,
-                 batch_size=1, run_results=None):
+                 batch_size=1, run_results=None, run_context=None,
+                 batch_linger=DEFAULT_BATCH_LINGER):
+        """
+        Send jobs to workers, keeping up to ``concurrency`` of them in
+        flight, and process their results.
+
+        :param batch_size: Send up to this many jobs per message; 0 picks a
+                           size from the concurrency and worker count (see
+                           adaptive_batch_size())
+        :param batch_linger: When fewer job slots than a batch are free,
+                             wait up to this many seconds for more to free
+                             up before sending a partial batch
+        """
 
         if label and not self.quiet:
             print >>sys.stderr, label + """
@@ -165,11 +568,28 @@ class Master:
                         return None
             else:
                 work_job = raw_job
-            work_job['auth_kwargs'] = auth_kwargs
-            work_job['connect_timeout'] = self.connect_timeout
-            work_job['network_timeout'] = self.network_timeout
+            if run_context is None:
+                work_job['auth_kwargs'] = auth_kwargs
+                work_job['connect_timeout'] = self.connect_timeout
+                work_job['network_timeout'] = self.network_timeout
             return work_job
 
+        leases = None
+        if run_context is not None:
+            pack_jobs = run_context.packb_jobs
+            # Number the jobs, so we can tell which ones were lost if a
+            # worker dies
+            leases = self.leases = JobLeases(self.unclaimed_job_seconds)
+        else:
+            pack_jobs = msgpack.dumps
+
+        # With a start barrier, workers hold their first jobs until everyone
+        # has some, i.e. until we first wait for results.
+        barrier_context = run_context \
+            if run_context is not None and run_context.start_barrier else None
+
+        if not batch_size:
+            batch_size = self.adaptive_batch_size(concurrency)
         active = 0
         for raw_job in job_generator:
             work_job = _job_decorator(raw_job)
@@ -181,39 +601,159 @@ class Master:
 
             logging.debug('active: %d\tconcurrency: %d', active, concurrency)
             if active >= concurrency:
-                result_jobs_raw = self.results_pull.recv()
-                result_count = self.process_results_to(
-                    result_jobs_raw, result_processor, label=label,
-                    run_results=run_results)
-                active -= result_count
+                if barrier_context:
+                    self.start_run(barrier_context)
+                    barrier_context = None
+                active -= self._await_results(result_processor, label,
+                                              run_results, leases)
+                # Results come back in batches too; if only a few came
+                # back, wait a little for more before sending a runt batch.
+                deadline = time.time() + batch_linger
+                while concurrency - active < min(batch_size, concurrency):
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    active -= self._await_results(result_processor, label,
+                                                  run_results, leases,
+                                                  timeout=remaining)
 
             while len(send_q) < min(batch_size, concurrency - active):
                 try:
                     work_job = _job_decorator(job_generator.next())
-                    send_q.append(work_job)
+                    if work_job:
+                        send_q.append(work_job)
                 except StopIteration:
                     break
 
-            self.work_push.send(msgpack.dumps(send_q))
+            if leases is not None:
+                first_job_id = self.next_job_id
+                self.next_job_id += len(send_q)
+                now = time.time()
+                for job_id, job in enumerate(send_q, first_job_id):
+                    leases.add(job_id, job, now)
+                self.work_push.send(pack_jobs(send_q, first_job_id))
+            else:
+                self.work_push.send(pack_jobs(send_q))
             active += len(send_q)
 
+        if barrier_context:
+            self.start_run(barrier_context)
+
         # Drain the results
         logging.debug('All jobs sent; awaiting results...')
         while active > 0:
             logging.debug('Draining results: active = %d', active)
-            result_jobs_raw = self.results_pull.recv()
-            result_count = self.process_results_to(
-                result_jobs_raw, result_processor, label=label,
-                run_results=run_results)
-            active -= result_count
+            active -= self._await_results(result_processor, label,
+                                          run_results, leases)
+        if leases is not None:
+            self.leases = None
+            if leases.lost:
+                self._record_lost_jobs(leases, result_processor, label,
+                                       run_results)
         if label and not self.quiet:
             sys.stderr.write('\n')
             sys.stderr.flush()
 
-    def kill_workers(self, timeout=5):
+    def adaptive_batch_size(self, concurrency):
+        """
+        :returns: A job batch size which gives each live worker about
+                  BATCH_SPREAD batches per round of ``concurrency`` jobs, so
+                  big runs send fewer, bigger messages without one worker
+                  being handed most of the jobs.
+        """
+        worker_count = len([worker for worker in self.workers.itervalues()
+                            if not worker.get('dead')]) or 1
+        return max(1, min(MAX_ADAPTIVE_BATCH_SIZE, int(math.ceil(
+            float(concurrency) / (worker_count * BATCH_SPREAD)))))
+
+    def _await_results(self, result_processor, label, run_results, leases,
+                       timeout=None):
+        """
+        Wait for and process the next batch of results.  With leases, also
+        give up on jobs held by dead workers (at least once per heartbeat
+        interval).
+
+        :param timeout: Give up waiting after this many seconds
+        :returns: The number of outstanding jobs which were answered or lost
+        """
+        if leases is None:
+            result_jobs_raw = None
+            with gevent.Timeout(timeout, False):
+                result_jobs_raw = self.results_pull.recv()
+            if result_jobs_raw is None:
+                return 0
+            return self.process_results_to(
+                result_jobs_raw, result_processor, label=label,
+                run_results=run_results)
+        if time.time() - leases.checked_at >= HEARTBEAT_INTERVAL:
+            finished = self._expire_leases(leases)
+            if finished:
+                return finished
+        result_jobs_raw = None
+        with gevent.Timeout(min(timeout or HEARTBEAT_INTERVAL,
+                                HEARTBEAT_INTERVAL), False):
+            result_jobs_raw = self.results_pull.recv()
+        if result_jobs_raw is None:
+            if timeout is not None and timeout < HEARTBEAT_INTERVAL:
+                return 0
+            return self._expire_leases(leases)
+        return self.process_results_to(
+            result_jobs_raw, result_processor, label=label,
+            run_results=run_results, leases=leases)
+
+    def _expire_leases(self, leases):
+        # Let _serve_control catch up on heartbeats before judging anyone
+        gevent.sleep(0)
+        now = leases.checked_at = time.time()
+        dead = []
+        for identity, worker in self.workers.iteritems():
+            if not worker.get('dead') and \
+                    now - worker['last_heard'] > DEAD_WORKER_SECONDS:
+                logging.warning('Worker %s has not been heard from for '
+                                '%.0fs; presuming it dead',
+                                worker['worker_id'],
+                                now - worker['last_heard'])
+                worker['dead'] = True
+                dead.append(identity)
+        lost_ids = leases.expire(now, dead)
+        if lost_ids:
+            logging.warning('Gave up on %d jobs', len(lost_ids))
+        return len(lost_ids)
+
+    def _record_lost_jobs(self, leases, result_processor, label,
+                          run_results):
+        """
+        Record a result for each job which was never answered, so the
+        report can count them.
         """
-        Send a suicide message to all workers, with some kind of timeout.
+        logging.warning('%d jobs were lost', len(leases.lost))
+        now = time.time()
+        lost_results = []
+        for job_id, (job, identity) in sorted(leases.lost.iteritems()):
+            worker = self.workers.get(identity) or {}
+            lost_results.append(dict(
+                job, job_id=job_id, lost=True,
+                worker_id=worker.get('worker_id'), completed_at=now,
+                exception='No result from worker', traceback=''))
+        self.process_results_to(msgpack.dumps(lost_results),
+                                result_processor, label=label,
+                                run_results=run_results)
+        self.lost_job_ids.update(leases.lost)
+
+    def kill_workers(self, timeout=5, graceful=False):
         """
+        Tell all workers to exit, with some kind of timeout.  With the
+        control port, every worker is told at once (or as soon as its next
+        heartbeat arrives), and graceful workers finish their current jobs
+        first.
+        """
+        if self.control_router:
+            message = ('STOP',) if graceful else ('KILL',)
+            count = self._command_workers(
+                message, min(timeout, HEARTBEAT_INTERVAL * 2.5))
+            logging.info('Sent %s to %d workers', message[0], count)
+            return count
+
         logging.info('Killing workers, taking up to %d seconds.', int(timeout))
         poller = zmq.Poller()
         poller.register(self.results_pull, zmq.POLLIN)
@@ -287,7 +827,10 @@ class Master:
         return [storage_url], token
 
     def run_scenario(self, scenario, auth_kwargs, run_results, noop=False,
-                     with_profiling=False, keep_objects=False, batch_size=1):
+                     with_profiling=False, keep_objects=False, batch_size=0,
+                     summary_results=False, spool_results=False,
+                     batch_linger=DEFAULT_BATCH_LINGER,
+                     expect_continue=False, deadlines=None):
         """
         Runs a CRUD scenario, given cluster parameters and a Scenario object.
 
@@ -299,6 +842,20 @@ class Master:
         :param with_profiing: Profile the run?
         :param keep_objects: Keep uploaded objects instead of deleting them?
         :param batch_size: Send this many bench jobs per packet to workers
+                           (0 to size batches to the run; see do_a_run())
+        :param batch_linger: Seconds to wait for a full batch's worth of job
+                             slots to free up
+        :param summary_results: Have workers send aggregated statistics for
+                                the benchmark jobs instead of every result
+                                (see ssbench.summary)
+        :param spool_results: Have workers write the benchmark results to
+                              local spool files, which are collected and
+                              merged into run_results after the run
+        :param expect_continue: Have PUTs wait for 100 Continue before
+                                sending their bodies
+        :param deadlines: {CRUD type: seconds} after which a job of that
+                          type is abandoned, and its result says it timed
+                          out (see parse_deadline())
         :param returns: Collected result records from workers
         """
 
@@ -315,9 +872,16 @@ class Master:
                 'token': auth_kwargs['token'],
             }
 
+        # Keys (nearly) every job has, which needn't be sent with each one
+        job_defaults = {'block_size': scenario.block_size}
+        if expect_continue:
+            job_defaults['expect_continue'] = True
+        if deadlines:
+            job_defaults['deadlines'] = deadlines
+
         # Ensure containers exist
         if not noop:
-            storage_urls, c_token = self._authenticate(auth_kwargs)
+            storage_urls, c_token = self._get_tokens(auth_kwargs)
 
             logging.info('Ensuring %d containers (%s_*) exist; '
                          'concurrency=%d...',
@@ -336,13 +900,21 @@ class Master:
 
             self.do_a_run(scenario.user_count, scenario.initial_jobs(),
                           run_state.handle_initialization_result, auth_kwargs,
-                          batch_size=batch_size)
+                          batch_size=batch_size, batch_linger=batch_linger,
+                          run_context=self.run_context(auth_kwargs, scenario,
+                                                       job_defaults))
 
         logging.info('Starting benchmark run (up to %d concurrent '
                      'workers)', scenario.user_count)
         if noop:
             logging.info('  (not actually talking to Swift cluster!)')
 
+        bench_defaults = dict(job_defaults, noop=True) if noop \
+            else dict(job_defaults)
+        if summary_results:
+            bench_defaults['summary'] = True
+        elif spool_results:
+            bench_defaults['spool'] = True
         if with_profiling:
             import cProfile
             prof = cProfile.Profile()
@@ -351,19 +923,38 @@ class Master:
                       run_state.handle_run_result, auth_kwargs,
                       mapper_fn=run_state.fill_in_job,
                       label='Benchmark Run:', noop=noop, batch_size=batch_size,
-                      run_results=run_results)
+                      batch_linger=batch_linger,
+                      run_results=run_results,
+                      run_context=self.run_context(
+                          auth_kwargs, scenario, bench_defaults,
+                          start_barrier=True))
         if with_profiling:
             prof.disable()
             prof_output_path = '/tmp/do_a_run.%d.prof' % os.getpid()
             prof.dump_stats(prof_output_path)
             logging.info('PROFILED main do_a_run to %s', prof_output_path)
+        if bench_defaults.get('spool') and run_results:
+            self.collect_spools(run_results)
 
         if not noop and not keep_objects:
             logging.info('Deleting population objects from cluster')
             self.do_a_run(scenario.user_count,
                           run_state.cleanup_object_infos(),
                           lambda *_: None,
-                          auth_kwargs, mapper_fn=_gen_cleanup_job,
-                          batch_size=batch_size)
+                          auth_kwargs,
+                          mapper_fn=lambda cleanup_info: _gen_cleanup_job(
+                              scenario, cleanup_info),
+                          batch_size=batch_size, batch_linger=batch_linger,
+                          run_context=self.run_context(auth_kwargs, scenario,
+                                                       job_defaults))
         elif keep_objects:
             logging.info('NOT deleting any objects due to -k/--keep-objects')
+
+        if self.token_broker:
+            self.token_broker.stop()
+            if self.token_broker.auth_latencies:
+                logging.info(
+                    'Authenticated %d times for workers (%.3fs total)',
+                    len(self.token_broker.auth_latencies),
+                    sum(seconds for _, seconds
+                        in self.token_broker.auth_latencies))
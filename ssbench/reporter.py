@@ -13,9 +13,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
 import csv
 import math
 import logging
+import multiprocessing
 import statlib.stats
 from pprint import pformat
 from datetime import datetime
@@ -23,29 +25,227 @@ from cStringIO import StringIO
 from mako.template import Template
 
 import ssbench
+from ssbench.histogram import LogHistogram
 from ssbench.ordered_dict import OrderedDict
+from ssbench.run_results import RunResults
+from ssbench.size_distribution import UNIFORM
+from ssbench.summary import (LATENCY_TYPES, TIMING_TYPES,
+                             RETRY_LATENCY_TYPES, SEGMENT_LATENCY_TYPES,
+                             READ_PATTERN_LATENCY_TYPES, iter_timings,
+                             sent_bytes, received_bytes)
 
 
 REPORT_TIME_FORMAT = '%F %T UTC'
 
+# When auto-detecting the steady-state part of a run, seconds whose
+# (smoothed) completion rate is within this fraction of the run's median rate
+# are considered steady.
+STEADY_STATE_TOLERANCE = 0.2
+
+# Report labels for each type of operation, in the order they're reported
+OPERATION_LABELS = [
+    ('CREATE', ssbench.CREATE_OBJECT),
+    ('READ', ssbench.READ_OBJECT),
+    ('UPDATE', ssbench.UPDATE_OBJECT),
+    ('DELETE', ssbench.DELETE_OBJECT),
+    ('HEAD', ssbench.HEAD_OBJECT),
+    ('POST', ssbench.POST_OBJECT),
+    ('LIST', ssbench.LIST_CONTAINER),
+    ('HEAD_CONTAINER', ssbench.HEAD_CONTAINER),
+]
+
+# Labels for the request timing breakdown's TIMING_TYPES, the retried
+# requests' RETRY_LATENCY_TYPES, the segmented uploads'
+# SEGMENT_LATENCY_TYPES and the READ_PATTERN_LATENCY_TYPES
+TIMING_LABELS = {
+    'connect_latency': 'Connect',
+    'tls_latency': 'TLS handshake',
+    'continue_latency': '100 Continue',
+    'send_latency': 'Send request',
+    'wait_latency': 'Wait for reply',
+    'receive_latency': 'Receive body',
+    'first_attempt_latency': 'First attempt',
+    'end_to_end_latency': 'End-to-end',
+    'segment_latency': 'Each segment',
+    'manifest_latency': 'Manifest PUT',
+    'object_latency': 'Whole object',
+    'full_read_latency': 'Full object',
+    'range_read_latency': 'Single range',
+    'first_read_latency': 'First bytes',
+    'multirange_read_latency': 'Multi-range',
+}
+
+
+def pctile_list(nth_pctile):
+    """:returns: A list of the percentiles nth_pctile stands for: one
+    percentile, or a list of them (where only one fits, the first is
+    reported)
+    """
+    if isinstance(nth_pctile, (list, tuple)):
+        return list(nth_pctile)
+    return [nth_pctile]
+
+
+def pctile_label(nth_pctile, int_format='%02d'):
+    """:returns: A percentile's label, e.g. 95 -> "95", 99.9 -> "99.9"
+    """
+    if nth_pctile == int(nth_pctile):
+        return int_format % nth_pctile
+    return '%g' % nth_pctile
+
+
+def parse_pctiles(value):
+    """Parse a comma-separated list of percentiles, e.g. "50,99,99.9"."""
+    pctiles = []
+    for text in value.split(','):
+        nth_pctile = float(text)
+        if not 0 < nth_pctile < 100:
+            raise ValueError('Percentile %r is not between 0 and 100' % text)
+        pctiles.append(int(nth_pctile) if nth_pctile == int(nth_pctile)
+                       else nth_pctile)
+    return pctiles
+
+
+def _with_pctiles(series_stats, pctiles, values):
+    """Add a series' value at each of several percentiles (the first of
+    which is also its 'pctile') as a dict of percentile => value.
+    """
+    if len(pctiles) > 1:
+        series_stats['pctiles'] = dict(zip(pctiles, values))
+    return series_stats
+
+
+def _pctile_values(series_stats, pctiles):
+    """:returns: [(percentile, value), ...] of a series' stats"""
+    return [(pctiles[0], series_stats['pctile'])] + [
+        (nth_pctile, series_stats['pctiles'][nth_pctile])
+        for nth_pctile in pctiles[1:]]
+
+
+def write_hgrm(histogram, target_file):
+    """Write a LogHistogram's values (e.g. latencies in seconds) as an
+    HdrHistogram percentile distribution, which HdrHistogram's plotter
+    (and other tools reading .hgrm files) can graph.
+    """
+    target_file.write('%12s %14s %10s %14s\n\n' % (
+        'Value', 'Percentile', 'TotalCount', '1/(1-Percentile)'))
+    for value, fraction, count in histogram.iter_cdf():
+        if fraction < 1.0:
+            target_file.write('%12.6f %2.12f %10d %14.2f\n' % (
+                value, fraction, count, 1 / (1 - fraction)))
+        else:
+            target_file.write('%12.6f %2.12f %10d\n' % (
+                value, fraction, count))
+    # The footer's mean and standard deviation are estimated from the
+    # buckets, too
+    total = 0.0
+    total_sq = 0.0
+    for value, count in histogram.iter_values():
+        total += value * count
+        total_sq += value * value * count
+    mean = total / histogram.count
+    std_dev = math.sqrt(max(total_sq / histogram.count - mean * mean, 0))
+    target_file.write('#[Mean    = %12.6f, StdDeviation   = %12.6f]\n' % (
+        mean, std_dev))
+    target_file.write('#[Max     = %12.6f, Total count    = %12d]\n' % (
+        histogram.max, histogram.count))
+    target_file.write('#[Buckets = %12d, SubBuckets     = %12d]\n' % (
+        len(histogram.buckets), 1))
+
+
+def write_cdf_csv(histogram, target_file):
+    """Write a LogHistogram's values as a CDF, for plotting."""
+    target_file.write('"Latency (s)","Cumulative Fraction",'
+                      '"Cumulative Count"\n')
+    for value, fraction, count in histogram.iter_cdf():
+        target_file.write('%.6f,%.6f,%d\n' % (value, fraction, count))
+
 
 class Reporter:
     def __init__(self, run_results):
         self.run_results = run_results
 
-    def read_results(self, nth_pctile=95, format_numbers=True):
+    def read_results(self, nth_pctile=95, format_numbers=True, skip_first=0,
+                     skip_last=0, steady_state=False, processes=1,
+                     distributions=False):
         self.scenario, self.unpacker = self.run_results.read_results()
-        self.stats = self.calculate_scenario_stats(nth_pctile, format_numbers)
+        self.stats = self.calculate_scenario_stats(
+            nth_pctile, format_numbers, processes=processes,
+            distributions=distributions)
+        self.stats['steady_state'] = None
+        if skip_first or skip_last or steady_state:
+            window = self.steady_state_window(self.stats, skip_first,
+                                              skip_last, steady_state)
+            if window:
+                # Statistics for the window need a second pass over the
+                # results, since results may be much larger than RAM.
+                _, self.unpacker = self.run_results.read_results()
+                ss_stats = self.calculate_scenario_stats(
+                    nth_pctile, format_numbers, window=window,
+                    processes=processes)
+                ss_stats['window'] = dict(start=window[0], stop=window[1],
+                                          auto_detected=steady_state)
+                self.stats['steady_state'] = ss_stats
+            else:
+                logging.warning('Unable to find a steady-state window; '
+                                'reporting whole-run statistics only.')
+
+    def steady_state_window(self, stats, skip_first=0, skip_last=0,
+                            auto_detect=False):
+        """Determine the portion of a run to report as "steady state".
+
+        :param stats: Whole-run stats from calculate_scenario_stats()
+        :param skip_first: Exclude this many seconds from the start of the run
+        :param skip_last: Exclude this many seconds from the end of the run
+        :param auto_detect: Also exclude the ramp-up and tail-drain seconds
+                            whose completion rate is outside
+                            STEADY_STATE_TOLERANCE of the run's median rate
+        :returns: A (start, stop) tuple of epoch times, or None if the window
+                  would be empty
+        """
+        time_series = stats['time_series']
+        data = time_series['data']
+        if not data:
+            return None
+        # The run is considered to end with the last second in which a
+        # request completed.
+        start = time_series['start_time'] + skip_first
+        stop = time_series['stop'] + 1 - skip_last
+        if auto_detect:
+            # Smooth out per-second jitter with a centered 3-second moving
+            # average before comparing against the median.
+            smoothed = []
+            for i in xrange(len(data)):
+                neighbors = data[max(0, i - 1):i + 2]
+                smoothed.append(float(sum(neighbors)) / len(neighbors))
+            median = sorted(data)[len(data) / 2]
+            threshold = (1 - STEADY_STATE_TOLERANCE) * median
+            steady = [i for i, rate in enumerate(smoothed)
+                      if rate >= threshold]
+            if not steady:
+                return None
+            series_start = time_series['start']
+            start = max(start, series_start + steady[0])
+            stop = min(stop, series_start + steady[-1] + 1)
+        if stop <= start:
+            return None
+        return start, stop
 
     def write_rps_histogram(self, target_file):
-        target_file.write('"Seconds Since Start","Requests Completed"\n')
-        for i, req_count in enumerate(self.stats['time_series']['data'], 1):
-            target_file.write('%d,%d\n' % (i, req_count))
+        target_file.write('"Seconds Since Start","Requests Completed",'
+                          '"Bytes Completed"\n')
+        time_series = self.stats['time_series']
+        for i, (req_count, byte_count) in enumerate(
+                zip(time_series['data'], time_series['bytes']), 1):
+            target_file.write('%d,%d,%d\n' % (i, req_count, byte_count))
 
     def scenario_template(self):
         return """
 ${scenario.name}  (generated with ssbench version ${scenario.version})
 Worker count: ${'%3d' % agg_stats['worker_count']}   Concurrency: ${'%3d' % scenario.user_count}  Ran ${start_time} to ${stop_time} (${'%.0f' % round(duration)}s)
+% if phase_counts:
+Excluded from statistics: ${', '.join('%d %s' % (count, phase) for phase, count in sorted(phase_counts.iteritems()))} results
+% endif
 
 %% Ops    C   R   U   D       Size Range       Size Name
 % for size_datum in size_data:
@@ -53,26 +253,108 @@ ${size_datum['pct_total_ops']}   % ${size_datum['crud_pcts']}      ${size_datum[
 % endfor
 ---------------------------------------------------------------------
         ${'%3.0f' % weighted_c} ${'%3.0f' % weighted_r} ${'%3.0f' % weighted_u} ${'%3.0f' % weighted_d}      CRUD weighted average
+% if weighted_metadata:
+Metadata operations weighted average: ${', '.join('%.0f%% %s' % (pct, label) for label, pct in weighted_metadata)}
+% endif
 
 % for label, stats, sstats in stat_list:
 % if stats['req_count']:
 ${label}
        Count: ${'%5d' % stats['req_count']} (${'%5d' % stats['errors']} error; ${'%5d' % stats['retries']} retries: ${'%5.2f' % stats['retry_rate']}%)  Average requests per second: ${'%5.1f' % stats['avg_req_per_sec']}
-                            min       max      avg      std_dev  ${'%02d' % nth_pctile}%-ile  ${'%15s' % ''}  Worst latency TX ID
-       First-byte latency: ${stats['first_byte_latency']['min']} - ${stats['first_byte_latency']['max']}  ${stats['first_byte_latency']['avg']}  (${stats['first_byte_latency']['std_dev']})  ${stats['first_byte_latency']['pctile']}  (all obj sizes)  ${stats['worst_first_byte_latency'][1] if 'worst_first_byte_latency' in stats else ''}
-       Last-byte  latency: ${stats['last_byte_latency']['min']} - ${stats['last_byte_latency']['max']}  ${stats['last_byte_latency']['avg']}  (${stats['last_byte_latency']['std_dev']})  ${stats['last_byte_latency']['pctile']}  (all obj sizes)  ${stats['worst_last_byte_latency'][1] if 'worst_last_byte_latency' in stats else ''}
+% if stats['sent_bytes'] or stats['received_bytes']:
+       Bytes: ${'%.1f' % (stats['sent_bytes'] / 1e6)} MB sent, ${'%.1f' % (stats['received_bytes'] / 1e6)} MB received  Average throughput: ${'%.1f' % stats['avg_mb_per_sec']} MB/s (${'%.3f' % (stats['avg_mb_per_sec'] * 8 / 1e3)} Gbit/s)
+% endif
+                            min       max      avg      std_dev  ${pctile_heading}  ${'%15s' % ''}  Worst latency TX ID
+       First-byte latency: ${stats['first_byte_latency']['min']} - ${stats['first_byte_latency']['max']}  ${stats['first_byte_latency']['avg']}  (${stats['first_byte_latency']['std_dev']})  ${pctile_columns(stats['first_byte_latency'])}  (all obj sizes)  ${stats['worst_first_byte_latency'][1] if 'worst_first_byte_latency' in stats else ''}
+       Last-byte  latency: ${stats['last_byte_latency']['min']} - ${stats['last_byte_latency']['max']}  ${stats['last_byte_latency']['avg']}  (${stats['last_byte_latency']['std_dev']})  ${pctile_columns(stats['last_byte_latency'])}  (all obj sizes)  ${stats['worst_last_byte_latency'][1] if 'worst_last_byte_latency' in stats else ''}
 % for size_str, per_size_stats in sstats.iteritems():
 % if per_size_stats:
-       First-byte latency: ${per_size_stats['first_byte_latency']['min']} - ${per_size_stats['first_byte_latency']['max']}  ${per_size_stats['first_byte_latency']['avg']}  (${per_size_stats['first_byte_latency']['std_dev']})  ${per_size_stats['first_byte_latency']['pctile']}  ${'(%8s objs)' % size_str}  ${per_size_stats['worst_first_byte_latency'][1] if 'worst_first_byte_latency' in per_size_stats else ''}
-       Last-byte  latency: ${per_size_stats['last_byte_latency']['min']} - ${per_size_stats['last_byte_latency']['max']}  ${per_size_stats['last_byte_latency']['avg']}  (${per_size_stats['last_byte_latency']['std_dev']})  ${per_size_stats['last_byte_latency']['pctile']}  ${'(%8s objs)' % size_str}  ${per_size_stats['worst_last_byte_latency'][1] if 'worst_last_byte_latency' in per_size_stats else ''}
+       First-byte latency: ${per_size_stats['first_byte_latency']['min']} - ${per_size_stats['first_byte_latency']['max']}  ${per_size_stats['first_byte_latency']['avg']}  (${per_size_stats['first_byte_latency']['std_dev']})  ${pctile_columns(per_size_stats['first_byte_latency'])}  ${'(%8s objs)' % size_str}  ${per_size_stats['worst_first_byte_latency'][1] if 'worst_first_byte_latency' in per_size_stats else ''}
+       Last-byte  latency: ${per_size_stats['last_byte_latency']['min']} - ${per_size_stats['last_byte_latency']['max']}  ${per_size_stats['last_byte_latency']['avg']}  (${per_size_stats['last_byte_latency']['std_dev']})  ${pctile_columns(per_size_stats['last_byte_latency'])}  ${'(%8s objs)' % size_str}  ${per_size_stats['worst_last_byte_latency'][1] if 'worst_last_byte_latency' in per_size_stats else ''}
+% endif
+% endfor
+
 % endif
 % endfor
+% for title, timing_list in timing_sections:
+% if timing_list:
+${'%-30s' % title}count       avg    median    ${pctile_headings[0]}       max
+% for label, timings in timing_list:
+${label}
+% for timing_type, timing_stats in timings:
+       ${'%-16s' % timing_labels[timing_type]}  ${'%8d' % timing_stats['count']}  ${timing_stats['avg']}  ${timing_stats['median']}  ${timing_stats['pctile']}  ${timing_stats['max']}
+% endfor
+% endfor
 
 % endif
 % endfor
 Distribution of requests per worker-ID: ${jobs_per_worker_stats['min']} - ${jobs_per_worker_stats['max']} (avg: ${jobs_per_worker_stats['avg']}; stddev: ${jobs_per_worker_stats['std_dev']})
+% if peak_throughput:
+Throughput per worker-ID: ${mb_per_sec_per_worker_stats['min']} - ${mb_per_sec_per_worker_stats['max']} MB/s (avg: ${mb_per_sec_per_worker_stats['avg']}; stddev: ${mb_per_sec_per_worker_stats['std_dev']})
+Peak throughput: ${'%.1f' % peak_throughput[1]} MB/s (${'%.3f' % (peak_throughput[1] * 8 / 1e3)} Gbit/s) in second ${peak_throughput[0]} of the run
+% endif
+% if lost_counts:
+Lost operations (never answered by a worker): ${sum(count for _, count in lost_counts)} (${', '.join('%d %s' % (count, label) for label, count in lost_counts)})
+% endif
+% if timeout_counts:
+Timed-out operations (abandoned at their deadline): ${sum(count for _, count in timeout_counts)} (${', '.join('%d %s' % (count, label) for label, count in timeout_counts)})
+% endif
+% for label, objects, segments, megabytes, mb_per_sec in segmented_uploads:
+${label} segmented uploads: ${objects} objects in ${segments} segments, ${'%.1f' % megabytes} MB (${'%.1f' % mb_per_sec} MB/s)
+% endfor
+% if size_bytes:
+Bytes transferred by size class: ${', '.join('%s %.1f MB (%.1f MB/s)' % (size_str, megabytes, mb_per_sec) for size_str, megabytes, mb_per_sec in size_bytes)}
+% endif
+% if read_pattern_bytes:
+Bytes read by read pattern: ${', '.join('%s %.1f MB (%.1f MB/s)' % (timing_labels[pattern + '_read_latency'], megabytes, mb_per_sec) for pattern, megabytes, mb_per_sec in read_pattern_bytes)}
+% endif
+% if auth_stats and auth_stats['count']:
+Waited for auth tokens: ${auth_stats['count']} requests, ${'%.3f' % auth_stats['total']}s total (max: ${'%.3f' % auth_stats['max']}s; not included in latencies)
+% endif
+% if steady_state:
+
+Steady state${' (auto-detected)' if steady_state['auto_detected'] else ''}: ${steady_state['start_time']} to ${steady_state['stop_time']} (${'%.0f' % round(steady_state['duration'])}s)
+% for label, stats, sstats in steady_state['stat_list']:
+% if stats['req_count']:
+
+${label}
+       Count: ${'%5d' % stats['req_count']} (${'%5d' % stats['errors']} error; ${'%5d' % stats['retries']} retries: ${'%5.2f' % stats['retry_rate']}%)  Average requests per second: ${'%5.1f' % stats['avg_req_per_sec']}
+% if stats['sent_bytes'] or stats['received_bytes']:
+       Bytes: ${'%.1f' % (stats['sent_bytes'] / 1e6)} MB sent, ${'%.1f' % (stats['received_bytes'] / 1e6)} MB received  Average throughput: ${'%.1f' % stats['avg_mb_per_sec']} MB/s (${'%.3f' % (stats['avg_mb_per_sec'] * 8 / 1e3)} Gbit/s)
+% endif
+                            min       max      avg      std_dev  ${pctile_heading}  ${'%15s' % ''}  Worst latency TX ID
+       First-byte latency: ${stats['first_byte_latency']['min']} - ${stats['first_byte_latency']['max']}  ${stats['first_byte_latency']['avg']}  (${stats['first_byte_latency']['std_dev']})  ${pctile_columns(stats['first_byte_latency'])}  (all obj sizes)  ${stats['worst_first_byte_latency'][1] if 'worst_first_byte_latency' in stats else ''}
+       Last-byte  latency: ${stats['last_byte_latency']['min']} - ${stats['last_byte_latency']['max']}  ${stats['last_byte_latency']['avg']}  (${stats['last_byte_latency']['std_dev']})  ${pctile_columns(stats['last_byte_latency'])}  (all obj sizes)  ${stats['worst_last_byte_latency'][1] if 'worst_last_byte_latency' in stats else ''}
+% endif
+% endfor
+% endif
 """
 
+    def _stat_list(self, stats):
+        return [('TOTAL', stats['agg_stats'], stats['size_stats'])] + [
+            (label, stats['op_stats'][crud_type],
+             stats['op_stats'][crud_type]['size_stats'])
+            for label, crud_type in OPERATION_LABELS]
+
+    def _timing_list(self, stats, timing_types):
+        timing_stats = stats.get('timing_stats', {})
+        timing_list = []
+        for label, crud_type in OPERATION_LABELS:
+            timings = [(timing_type, timing_stats[crud_type][timing_type])
+                       for timing_type in timing_types
+                       if timing_type in timing_stats.get(crud_type, {})]
+            if timings:
+                timing_list.append((label, timings))
+        return timing_list
+
+    def _mb_per_sec(self, byte_count, duration):
+        return byte_count / 1e6 / duration if duration > 0 else 0.0
+
+    def _op_counts(self, counts):
+        return [(label, counts[crud_type])
+                for label, crud_type in OPERATION_LABELS
+                if crud_type in counts]
+
     def generate_default_report(self, output_csv=False):
         """Format a default summary report based on calculated statistics for
         an executed scenario.
@@ -82,34 +364,97 @@ Distribution of requests per worker-ID: ${jobs_per_worker_stats['min']} - ${jobs
 
         stats = self.stats
         template = Template(self.scenario_template())
+        pctiles = stats.get('pctiles', [stats['nth_pctile']])
+        pctile_headings = ['%s%%-ile' % pctile_label(nth_pctile)
+                           for nth_pctile in pctiles]
+        duration = stats['time_series']['stop'] - \
+            stats['time_series']['start_time']
         tmpl_vars = {
             'size_data': [],
-            'stat_list': [
-                ('TOTAL', stats['agg_stats'], stats['size_stats']),
-                ('CREATE', stats['op_stats'][ssbench.CREATE_OBJECT],
-                 stats['op_stats'][ssbench.CREATE_OBJECT]['size_stats']),
-                ('READ', stats['op_stats'][ssbench.READ_OBJECT],
-                 stats['op_stats'][ssbench.READ_OBJECT]['size_stats']),
-                ('UPDATE', stats['op_stats'][ssbench.UPDATE_OBJECT],
-                 stats['op_stats'][ssbench.UPDATE_OBJECT]['size_stats']),
-                ('DELETE', stats['op_stats'][ssbench.DELETE_OBJECT],
-                 stats['op_stats'][ssbench.DELETE_OBJECT]['size_stats']),
-            ],
+            'stat_list': self._stat_list(stats),
+            'timing_sections': [
+                ('Request timing breakdown',
+                 self._timing_list(stats, TIMING_TYPES)),
+                ('Retried requests',
+                 self._timing_list(stats, RETRY_LATENCY_TYPES)),
+                ('Segmented uploads',
+                 self._timing_list(stats, SEGMENT_LATENCY_TYPES)),
+                ('Read patterns',
+                 self._timing_list(stats, READ_PATTERN_LATENCY_TYPES))],
+            'timing_labels': TIMING_LABELS,
             'agg_stats': stats['agg_stats'],
             'nth_pctile': stats['nth_pctile'],
+            'pctiles': pctiles,
+            'pctile_headings': pctile_headings,
+            # Latency tables' percentile columns
+            'pctile_heading': '  '.join(pctile_headings),
+            'pctile_columns': lambda series_stats: '  '.join(
+                str(value).rjust(len(heading)) for (_, value), heading in zip(
+                    _pctile_values(series_stats, pctiles), pctile_headings)),
             'start_time': datetime.utcfromtimestamp(
                 stats['time_series']['start_time']
             ).strftime(REPORT_TIME_FORMAT),
             'stop_time': datetime.utcfromtimestamp(
                 stats['time_series']['stop']).strftime(REPORT_TIME_FORMAT),
-            'duration': stats['time_series']['stop']
-            - stats['time_series']['start_time'],
+            'duration': duration,
             'jobs_per_worker_stats': stats['jobs_per_worker_stats'],
+            'phase_counts': stats['phase_counts'],
+            'auth_stats': stats.get('auth_stats'),
+            'lost_counts': self._op_counts(stats.get('lost_counts', {})),
+            'timeout_counts': self._op_counts(
+                stats.get('timeout_counts', {})),
+            # (label, objects, segments, MB, MB/s over the whole run)
+            'segmented_uploads': [
+                (label, objects, segments, size / 1e6,
+                 self._mb_per_sec(size, duration))
+                for label, (objects, segments, size) in self._op_counts(
+                    stats.get('segmented_counts', {}))],
+            # (size class, MB sent and received, MB/s over the whole run)
+            'size_bytes': [
+                (size_str, byte_count / 1e6,
+                 self._mb_per_sec(byte_count, duration))
+                for size_str, size_stats in stats['size_stats'].iteritems()
+                for byte_count in [size_stats['sent_bytes'] +
+                                   size_stats['received_bytes']]
+                if byte_count],
+            'mb_per_sec_per_worker_stats':
+                stats['mb_per_sec_per_worker_stats'],
+            # (seconds into the run, MB/s) of the busiest second, if any
+            # bytes were transferred
+            'peak_throughput': None,
+            # (read pattern, MB, MB/s over the whole run)
+            'read_pattern_bytes': [
+                (pattern, pattern_bytes[pattern] / 1e6,
+                 self._mb_per_sec(pattern_bytes[pattern], duration))
+                for pattern_bytes in [stats.get('read_pattern_bytes', {})]
+                for pattern in ssbench.READ_PATTERNS
+                if pattern in pattern_bytes],
+            'steady_state': None,
             'weighted_c': 0.0,
             'weighted_r': 0.0,
             'weighted_u': 0.0,
             'weighted_d': 0.0,
+            # (label, weighted average %) of the metadata operations run
+            'weighted_metadata': [],
         }
+        byte_series = stats['time_series']['bytes']
+        if byte_series and max(byte_series):
+            peak = max(byte_series)
+            tmpl_vars['peak_throughput'] = (byte_series.index(peak) + 1,
+                                            peak / 1e6)
+        ss_stats = stats.get('steady_state')
+        if ss_stats:
+            window = ss_stats['window']
+            tmpl_vars['steady_state'] = {
+                'auto_detected': window['auto_detected'],
+                'start_time': datetime.utcfromtimestamp(
+                    window['start']).strftime(REPORT_TIME_FORMAT),
+                'stop_time': datetime.utcfromtimestamp(
+                    window['stop']).strftime(REPORT_TIME_FORMAT),
+                'duration': window['stop'] - window['start'],
+                'stat_list': self._stat_list(ss_stats),
+            }
+        weighted_metadata = {}
         for size_data in self.scenario.sizes_by_name.values():
             if size_data['size_min'] == size_data['size_max']:
                 size_range = '%-15s' % (
@@ -126,7 +471,10 @@ Distribution of requests per worker-ID: ${jobs_per_worker_stats['min']} - ${jobs
                 'crud_pcts': '  '.join(map(lambda p: '%2.0f' % p,
                                            size_data['crud_pcts'])),
                 'size_range': size_range,
-                'size_name': size_data['name'],
+                'size_name': size_data['name'] + (
+                    ' (%s)' % size_data['size_distribution'].get(
+                        'type', UNIFORM)
+                    if 'size_distribution' in size_data else ''),
                 'pct_total_ops': '%3.0f%%' % pct_total,
             })
             tmpl_vars['weighted_c'] += \
@@ -137,6 +485,14 @@ Distribution of requests per worker-ID: ${jobs_per_worker_stats['min']} - ${jobs
                 pct_total * size_data['crud_pcts'][2] / 100.0
             tmpl_vars['weighted_d'] += \
                 pct_total * size_data['crud_pcts'][3] / 100.0
+            for op, pct in zip(ssbench.METADATA_OPS,
+                               size_data.get('metadata_pcts', ())):
+                weighted_metadata[op] = \
+                    weighted_metadata.get(op, 0.0) + pct_total * pct / 100.0
+        tmpl_vars['weighted_metadata'] = [
+            (label, weighted_metadata[crud_type])
+            for label, crud_type in OPERATION_LABELS
+            if weighted_metadata.get(crud_type)]
         if output_csv:
             csv_fields = [
                 'scenario_name', 'ssbench_version', 'worker_count',
@@ -150,21 +506,72 @@ Distribution of requests per worker-ID: ${jobs_per_worker_stats['min']} - ${jobs
                 'stop_time': tmpl_vars['stop_time'],
                 'duration': tmpl_vars['duration'],
             }
-            for label, stats, sstats in tmpl_vars['stat_list']:
-                label_lc = label.lower()
-                if stats.get('req_count', 0):
+            for phase, count in sorted(tmpl_vars['phase_counts'].iteritems()):
+                self._add_csv_kv(csv_fields, csv_data, '%s_count' % phase,
+                                 count)
+            for label, count in tmpl_vars['lost_counts']:
+                self._add_csv_kv(csv_fields, csv_data,
+                                 '%s_lost_count' % label.lower(), count)
+            for label, count in tmpl_vars['timeout_counts']:
+                self._add_csv_kv(csv_fields, csv_data,
+                                 '%s_timeout_count' % label.lower(), count)
+            for label, objects, _, megabytes, mb_per_sec in \
+                    tmpl_vars['segmented_uploads']:
+                for key, value in (('count', objects), ('mb', megabytes),
+                                   ('mb_per_sec', mb_per_sec)):
+                    self._add_csv_kv(csv_fields, csv_data, '%s_segmented_%s' %
+                                     (label.lower(), key), value)
+            for size_str, megabytes, mb_per_sec in tmpl_vars['size_bytes']:
+                self._add_csv_kv(csv_fields, csv_data,
+                                 '%s_transferred_mb' % size_str, megabytes)
+                self._add_csv_kv(csv_fields, csv_data,
+                                 '%s_transferred_mb_per_sec' % size_str,
+                                 mb_per_sec)
+            if tmpl_vars['peak_throughput']:
+                for key in ('min', 'max', 'avg', 'std_dev'):
+                    self._add_csv_kv(
+                        csv_fields, csv_data, 'worker_mb_per_sec_' + key,
+                        tmpl_vars['mb_per_sec_per_worker_stats'][key])
+                self._add_csv_kv(csv_fields, csv_data, 'peak_mb_per_sec',
+                                 tmpl_vars['peak_throughput'][1])
+            for pattern, megabytes, mb_per_sec in \
+                    tmpl_vars['read_pattern_bytes']:
+                self._add_csv_kv(csv_fields, csv_data,
+                                 '%s_read_mb' % pattern, megabytes)
+                self._add_csv_kv(csv_fields, csv_data,
+                                 '%s_read_mb_per_sec' % pattern, mb_per_sec)
+            auth_stats = tmpl_vars['auth_stats']
+            if auth_stats and auth_stats['count']:
+                for key in ('count', 'total', 'max'):
+                    self._add_csv_kv(csv_fields, csv_data, 'auth_wait_' + key,
+                                     auth_stats[key])
+            self._add_stat_list_csv(csv_fields, csv_data,
+                                    tmpl_vars['stat_list'], pctiles)
+            for label, timing_type, timing_stats in [
+                    (label, timing_type, timing_stats)
+                    for _, timing_list in tmpl_vars['timing_sections']
+                    for label, timings in timing_list
+                    for timing_type, timing_stats in timings]:
+                key_base = '%s_%s_' % (label.lower(),
+                                       timing_type[:-len('_latency')])
+                for key, value in [
+                        ('count', timing_stats['count']),
+                        ('avg', timing_stats['avg']),
+                        ('median', timing_stats['median'])] + [
+                        ('%s_pctile' % pctile_label(nth_pctile, '%d'), value)
+                        for nth_pctile, value in _pctile_values(
+                            timing_stats, pctiles)] + [
+                        ('max', timing_stats['max'])]:
                     self._add_csv_kv(csv_fields, csv_data,
-                                     '%s_count' % label_lc, stats['req_count'])
-                    self._add_csv_kv(csv_fields, csv_data,
-                                     '%s_avg_req_per_s' % label_lc,
-                                     stats['avg_req_per_sec'])
-                    self._add_stats_for(csv_fields, csv_data, label, 'all',
-                                        stats, tmpl_vars['nth_pctile'])
-                    for size_str, per_size_stats in sstats.iteritems():
-                        if per_size_stats:
-                            self._add_stats_for(csv_fields, csv_data, label,
-                                                size_str, per_size_stats,
-                                                tmpl_vars['nth_pctile'])
+                                     key_base + key, value)
+            if tmpl_vars['steady_state']:
+                steady_state = tmpl_vars['steady_state']
+                for key in ('start_time', 'stop_time', 'duration'):
+                    self._add_csv_kv(csv_fields, csv_data, 'steady_' + key,
+                                     steady_state[key])
+                self._add_stat_list_csv(csv_fields, csv_data,
+                                        steady_state['stat_list'], pctiles,
+                                        prefix='steady_')
             csv_file = StringIO()
             csv_writer = csv.DictWriter(csv_file, csv_fields,
                                         lineterminator='\n',
@@ -175,12 +582,44 @@ Distribution of requests per worker-ID: ${jobs_per_worker_stats['min']} - ${jobs
         else:
             return template.render(scenario=self.scenario, **tmpl_vars)
 
+    def _add_stat_list_csv(self, csv_fields, csv_data, stat_list, pctiles,
+                           prefix=''):
+        for label, stats, sstats in stat_list:
+            label_lc = prefix + label.lower()
+            if stats.get('req_count', 0):
+                self._add_csv_kv(csv_fields, csv_data,
+                                 '%s_count' % label_lc, stats['req_count'])
+                self._add_csv_kv(csv_fields, csv_data,
+                                 '%s_avg_req_per_s' % label_lc,
+                                 stats['avg_req_per_sec'])
+                if stats['sent_bytes'] or stats['received_bytes']:
+                    for key in ('sent_bytes', 'received_bytes'):
+                        self._add_csv_kv(csv_fields, csv_data,
+                                         '%s_%s' % (label_lc, key),
+                                         stats[key])
+                    self._add_csv_kv(csv_fields, csv_data,
+                                     '%s_avg_mb_per_s' % label_lc,
+                                     stats['avg_mb_per_sec'])
+                self._add_stats_for(csv_fields, csv_data, label_lc, 'all',
+                                    stats, pctiles)
+                for size_str, per_size_stats in sstats.iteritems():
+                    if per_size_stats:
+                        if per_size_stats['sent_bytes'] or \
+                                per_size_stats['received_bytes']:
+                            self._add_csv_kv(
+                                csv_fields, csv_data,
+                                '%s_%s_avg_mb_per_s' % (label_lc, size_str),
+                                per_size_stats['avg_mb_per_sec'])
+                        self._add_stats_for(csv_fields, csv_data, label_lc,
+                                            size_str, per_size_stats,
+                                            pctiles)
+
     def _add_csv_kv(self, csv_fields, csv_data, key, value):
         csv_fields.append(key)
         csv_data[key] = value
 
     def _add_stats_for(self, csv_fields, csv_data, label, size_str, stats,
-                       nth_pctile):
+                       pctiles):
         for latency_type in ('first', 'last'):
             latency_stats = stats['%s_byte_latency' % latency_type]
             key_base = '%s_%s_%s_' % (label.lower(), latency_type, size_str)
@@ -192,9 +631,9 @@ Distribution of requests per worker-ID: ${jobs_per_worker_stats['min']} - ${jobs
                              latency_stats['avg'])
             self._add_csv_kv(csv_fields, csv_data, key_base + 'std_dev',
                              latency_stats['std_dev'])
-            self._add_csv_kv(csv_fields, csv_data,
-                             key_base + '%d_pctile' % nth_pctile,
-                             latency_stats['pctile'])
+            for nth_pctile, value in _pctile_values(latency_stats, pctiles):
+                self._add_csv_kv(csv_fields, csv_data, key_base + '%s_pctile' %
+                                 pctile_label(nth_pctile, '%d'), value)
             worst_key = 'worst_%s_byte_latency' % latency_type
             self._add_csv_kv(
                 csv_fields, csv_data, key_base + 'worst_txid',
@@ -208,12 +647,30 @@ Distribution of requests per worker-ID: ${jobs_per_worker_stats['min']} - ${jobs
             i += 1
         return '%3.0f %s' % (round(byte_count), units[i])
 
-    def calculate_scenario_stats(self, nth_pctile=95, format_numbers=True):
+    def calculate_scenario_stats(self, nth_pctile=95, format_numbers=True,
+                                 window=None, processes=1,
+                                 distributions=False):
         """Compute various statistics from worker job result dicts.
 
-        :param nth_pctile: Use this percentile when calculating the stats
+        :param nth_pctile: Use this percentile when calculating the stats,
+        or a list of percentiles to calculate (in the same pass); the first
+        is each series' 'pctile', and with more than one, each series also
+        has a 'pctiles' dict of percentile => value
         :param format_numbers: Should various floating-point numbers be
         formatted as strings or left full-precision floats
+        :param window: Optional (start, stop) tuple of epoch times; only
+        results completing within the window are included, and request rates
+        are calculated as if no request started before the window opened
+        :param processes: Aggregate the results in this many processes (0
+        means one per CPU).  With more than one process, or if workers
+        summarized their results (see ssbench.summary), percentiles and
+        medians are estimated to within 1% from mergeable histograms instead
+        of being calculated exactly.
+        :param distributions: Also keep each operation type's (and all
+        operations') latency histograms, over all object sizes and per size
+        class, as 'latency_distributions' (see
+        write_latency_distributions()); this always aggregates the results
+        like processes > 1 does.
         :returns: A stats python dict which looks something like:
             SERIES_STATS = {
                 'min': 1.1,
@@ -221,8 +678,12 @@ Distribution of requests per worker-ID: ${jobs_per_worker_stats['min']} - ${jobs
                 'avg': 1.1,
                 'std_dev': 1.1,
                 'median': 1.1,
+                'pctile': 1.1,
+                'pctiles': {50: 1.1, 99.9: 1.1}, # given several percentiles
             }
             {
+                'nth_pctile': 95, # the first percentile
+                'pctiles': [95], # all of them
                 'agg_stats': {
                     'worker_count': 1,
                     'start': 1.1,
@@ -231,6 +692,9 @@ Distribution of requests per worker-ID: ${jobs_per_worker_stats['min']} - ${jobs
                     'retries': 0,
                     'errors' : 0,
                     'avg_req_per_sec': 1.1, # req_count / (stop - start)?
+                    'sent_bytes': 1, # bytes successful requests sent
+                    'received_bytes': 1, # ...and received
+                    'avg_mb_per_sec': 1.1, # both / 1e6 / (stop - start)
                     'retry_rate': 0.0,
                     'first_byte_latency': SERIES_STATS,
                     'last_byte_latency': SERIES_STATS,
@@ -244,15 +708,23 @@ Distribution of requests per worker-ID: ${jobs_per_worker_stats['min']} - ${jobs
                         'retry_rate': 0.0,
                         'errors': 0,
                         'avg_req_per_sec': 1.1, # req_count / (stop - start)?
+                        'sent_bytes': 1,
+                        'received_bytes': 1,
+                        'avg_mb_per_sec': 1.1,
                         'first_byte_latency': SERIES_STATS,
                         'last_byte_latency': SERIES_STATS,
                     },
                     # ...
                 },
+                'mb_per_sec_per_worker_stats': SERIES_STATS, # of workers'
+                                                             # avg_mb_per_sec
                 'op_stats': {
                     CREATE_OBJECT: { # keys are CRUD constants: CREATE_OBJECT, READ_OBJECT, etc.
                         'req_count': 1, # num requests of this CRUD type
                         'avg_req_per_sec': 1.1, # total_requests / sum(last_byte_latencies)
+                        'sent_bytes': 1,
+                        'received_bytes': 1,
+                        'avg_mb_per_sec': 1.1,
                         'first_byte_latency': SERIES_STATS,
                         'last_byte_latency': SERIES_STATS,
                         'size_stats': {
@@ -260,6 +732,9 @@ Distribution of requests per worker-ID: ${jobs_per_worker_stats['min']} - ${jobs
                                 'req_count': 1, # num requests of this type and size
                                 'retries': 0, # num of retries
                                 'avg_req_per_sec': 1.1, # total_requests / sum(last_byte_latencies)
+                                'sent_bytes': 1,
+                                'received_bytes': 1,
+                                'avg_mb_per_sec': 1.1,
                                 'errors': 0,
                                 'retry_rate': 0.0,
                                 'first_byte_latency': SERIES_STATS,
@@ -276,6 +751,9 @@ Distribution of requests per worker-ID: ${jobs_per_worker_stats['min']} - ${jobs
                         'retries': 0, # num of retries
                         'acutual_request_count': 1, # num requests includes retries
                         'avg_req_per_sec': 1.1, # total_requests / sum(last_byte_latencies)
+                        'sent_bytes': 1,
+                        'received_bytes': 1,
+                        'avg_mb_per_sec': 1.1,
                         'errors': 0,
                         'retry_rate': 0.0,
                         'first_byte_latency': SERIES_STATS,
@@ -283,12 +761,55 @@ Distribution of requests per worker-ID: ${jobs_per_worker_stats['min']} - ${jobs
                     },
                     # ...
                 },
+                'phase_counts': {
+                    'warmup': 1, # num results excluded from all stats
+                    # ...
+                },
+                'lost_counts': {
+                    CREATE_OBJECT: 1, # num jobs no worker ever answered,
+                    # ...               # in any phase (empty for a window)
+                },
+                'timeout_counts': {
+                    CREATE_OBJECT: 1, # num jobs abandoned at their deadline
+                    # ...
+                },
+                'segmented_counts': {
+                    CREATE_OBJECT: [1, 8, 1000], # objects uploaded in
+                    # ...                        # segments, segments, bytes
+                },
+                'read_pattern_bytes': {
+                    'range': 1000, # bytes read by reads with each pattern
+                    # ...
+                },
+                'auth_stats': {
+                    'count': 1, # num requests which waited for a token
+                    'total': 1.1, # seconds spent waiting, in all
+                    'max': 1.1,
+                },
+                'timing_stats': {
+                    CREATE_OBJECT: { # only CRUD types with timings
+                        'connect_latency': SERIES_STATS, # plus a 'count';
+                        # ... # only the ALL_TIMING_TYPES results had
+                    },
+                    # ...
+                },
+                'latency_distributions': { # only given distributions
+                    (CREATE_OBJECT, 'small'): { # (None for all CRUD types
+                        'first_byte_latency': LogHistogram, # or sizes)
+                        'last_byte_latency': LogHistogram,
+                    },
+                    # ...
+                },
                 'time_series': {
                     'start': 1, # epoch time of first data point
                     'data': [
                         1, # number of requests finishing during this second
                         # ...
                     ],
+                    'bytes': [
+                        1, # bytes they sent and received
+                        # ...
+                    ],
                 },
             }
         """
@@ -312,29 +833,79 @@ Distribution of requests per worker-ID: ${jobs_per_worker_stats['min']} - ${jobs
         #   'retries': 1
         #   'exception': '...',
         # }
+        pctiles = pctile_list(nth_pctile)
+        if processes != 1 or distributions:
+            return self._calculate_scenario_stats_in_processes(
+                pctiles, format_numbers, window,
+                processes or multiprocessing.cpu_count(), distributions)
+
         logging.info('Calculating statistics...')
-        agg_stats = dict(start=2 ** 32, stop=0, req_count=0)
+        agg_stats = dict(start=2 ** 32, stop=0, req_count=0, sent_bytes=0,
+                         received_bytes=0)
         op_stats = {}
-        for crud_type in [ssbench.CREATE_OBJECT, ssbench.READ_OBJECT,
-                          ssbench.UPDATE_OBJECT, ssbench.DELETE_OBJECT]:
+        for _, crud_type in OPERATION_LABELS:
             op_stats[crud_type] = dict(
-                req_count=0, avg_req_per_sec=0,
+                req_count=0, avg_req_per_sec=0, avg_mb_per_sec=0,
                 size_stats=OrderedDict.fromkeys(
                     self.scenario.sizes_by_name.keys()))
 
         req_completion_seconds = {}
+        byte_completion_seconds = {}
+        phase_counts = {}
+        lost_counts = {}
+        timeout_counts = {}
+        segmented_counts = {}
+        read_pattern_bytes = {}
+        auth_stats = dict(count=0, total=0.0, max=0.0)
+        timings = {}
         start_time = 0
         completion_time_max = 0
         completion_time_min = 2 ** 32
         stats = dict(
-            nth_pctile=nth_pctile,
+            nth_pctile=pctiles[0],
+            pctiles=pctiles,
             agg_stats=agg_stats,
             worker_stats={},
             op_stats=op_stats,
+            phase_counts=phase_counts,
+            lost_counts=lost_counts,
+            timeout_counts=timeout_counts,
+            segmented_counts=segmented_counts,
+            read_pattern_bytes=read_pattern_bytes,
+            auth_stats=auth_stats,
             size_stats=OrderedDict.fromkeys(
                 self.scenario.sizes_by_name.keys()))
         for results in self.unpacker:
+            if isinstance(results, dict):
+                # Workers summarized their results (see ssbench.summary),
+                # which only the mergeable accumulators can take in; start
+                # over with those.
+                return self._calculate_scenario_stats_in_processes(
+                    pctiles, format_numbers, window, 1)
             for result in results:
+                if result.get('lost'):
+                    # Never answered, so there's no timing to count.  Its
+                    # completed_at is just when the run gave up on it, so
+                    # it's only counted for the whole run (not a window),
+                    # and a lost warm-up or cool-down job counts as lost,
+                    # not as run in its phase.
+                    if not window:
+                        lost_counts[result['type']] = \
+                            1 + lost_counts.get(result['type'], 0)
+                    continue
+                if result.get('phase'):
+                    # Warm-up and cool-down results are recorded, but they
+                    # don't count toward any statistics.
+                    phase_counts[result['phase']] = \
+                        1 + phase_counts.get(result['phase'], 0)
+                    continue
+                if window and not (window[0] <= result['completed_at']
+                                   <= window[1]):
+                    continue
+                _add_auth_latency(auth_stats, result)
+                if result.get('timed_out'):
+                    timeout_counts[result['type']] = \
+                        1 + timeout_counts.get(result['type'], 0)
                 completion_time = int(result['completed_at'])
                 if 'exception' in result:
                     # report log exceptions
@@ -351,8 +922,24 @@ Distribution of requests per worker-ID: ${jobs_per_worker_stats['min']} - ${jobs
                         completion_time_max = completion_time
                     req_completion_seconds[completion_time] = \
                         1 + req_completion_seconds.get(completion_time, 0)
+                    byte_completion_seconds[completion_time] = \
+                        sent_bytes(result) + received_bytes(result) + \
+                        byte_completion_seconds.get(completion_time, 0)
                     result['start'] = (
                         result['completed_at'] - result['last_byte_latency'])
+                    if window and result['start'] < window[0]:
+                        result['start'] = window[0]
+                    if result.get('segments'):
+                        _add_segmented(segmented_counts, result['type'],
+                                       (1, result['segments'],
+                                        int(result['size'])))
+                    if 'read_pattern' in result:
+                        _add_read_pattern_bytes(read_pattern_bytes, {
+                            result['read_pattern']:
+                            result.get('received_bytes', 0)})
+                    for timing_type, timing in iter_timings(result):
+                        timings.setdefault(
+                            (result['type'], timing_type), []).append(timing)
 
                 # Stats per-worker
                 if result['worker_id'] not in stats['worker_stats']:
@@ -392,6 +979,10 @@ Distribution of requests per worker-ID: ${jobs_per_worker_stats['min']} - ${jobs
         stats['jobs_per_worker_stats'] = self._series_stats(jobs_per_worker,
                                                             nth_pctile,
                                                             format_numbers)
+        stats['mb_per_sec_per_worker_stats'] = self._series_stats(
+            [worker_stats['avg_mb_per_sec']
+             for worker_stats in stats['worker_stats'].values()],
+            nth_pctile, format_numbers)
         logging.debug('Jobs per worker stats:\n' +
                       pformat(stats['jobs_per_worker_stats']))
 
@@ -421,13 +1012,172 @@ Distribution of requests per worker-ID: ${jobs_per_worker_stats['min']} - ${jobs
         time_series_data = [req_completion_seconds.get(t, 0)
                             for t in range(completion_time_min,
                                            completion_time_max + 1)]
+        time_series_bytes = [byte_completion_seconds.get(t, 0)
+                             for t in range(completion_time_min,
+                                            completion_time_max + 1)]
         stats['time_series'] = dict(start=completion_time_min,
                                     start_time=start_time,
                                     stop=completion_time_max,
-                                    data=time_series_data)
+                                    data=time_series_data,
+                                    bytes=time_series_bytes)
+        stats['timing_stats'] = {}
+        for (crud_type, timing_type), sequence in timings.iteritems():
+            timing_stats = self._series_stats(sequence, nth_pctile,
+                                              format_numbers)
+            # Like the other stats, ignore zero latencies
+            timing_stats['count'] = len(filter(None, sequence))
+            stats['timing_stats'].setdefault(crud_type, {})[timing_type] = \
+                timing_stats
+
+        return stats
+
+    def _calculate_scenario_stats_in_processes(self, pctiles,
+                                               format_numbers, window,
+                                               processes,
+                                               distributions=False):
+        partition_args = [(self.run_results.results_file_path, partition,
+                           processes, window)
+                          for partition in xrange(processes)]
+        if processes == 1:
+            partials = map(_partial_scenario_stats, partition_args)
+        else:
+            logging.info('Calculating statistics in %d processes...',
+                         processes)
+            pool = multiprocessing.Pool(processes)
+            try:
+                partials = pool.map(_partial_scenario_stats, partition_args)
+            finally:
+                pool.close()
+                pool.join()
+        partial = reduce(lambda a, b: a.merge(b), partials)
+
+        def finished(accumulator):
+            stat_dict = accumulator.stat_dict(pctiles, format_numbers)
+            self._compute_req_per_sec(stat_dict)
+            self._compute_retry_rate(stat_dict)
+            return stat_dict
 
+        agg_stats = finished(partial.agg)
+        agg_stats['worker_count'] = len(partial.workers)
+        worker_stats = dict((worker_id, finished(accumulator))
+                            for worker_id, accumulator
+                            in partial.workers.iteritems())
+        op_stats = {}
+        for _, crud_type in OPERATION_LABELS:
+            if crud_type in partial.ops:
+                op_stats[crud_type] = finished(partial.ops[crud_type])
+                op_stats[crud_type]['size_stats'] = OrderedDict(
+                    (size_str, finished(partial.op_sizes[key]))
+                    for size_str in self.scenario.sizes_by_name.keys()
+                    for key in [(crud_type, size_str)]
+                    if key in partial.op_sizes)
+            else:
+                op_stats[crud_type] = dict(
+                    req_count=0, avg_req_per_sec=0, avg_mb_per_sec=0,
+                    size_stats=OrderedDict.fromkeys(
+                        self.scenario.sizes_by_name.keys()))
+        jobs_per_worker = [worker['req_count']
+                           for worker in worker_stats.values()]
+        mb_per_sec_per_worker = [worker['avg_mb_per_sec']
+                                 for worker in worker_stats.values()]
+        if partial.first_completion:
+            completion_time_min, _, start_time = partial.first_completion
+        else:
+            completion_time_min, start_time = 2 ** 32, 0
+        completion_time_max = partial.completion_time_max
+        timing_stats = {}
+        for (crud_type, timing_type), accumulator in \
+                partial.timings.iteritems():
+            timing_stats.setdefault(crud_type, {})[timing_type] = dict(
+                accumulator.series_stats(pctiles, format_numbers),
+                count=accumulator.count)
+        stats = dict(
+            nth_pctile=pctiles[0],
+            pctiles=pctiles,
+            agg_stats=agg_stats,
+            worker_stats=worker_stats,
+            op_stats=op_stats,
+            phase_counts=partial.phase_counts,
+            lost_counts=partial.lost_counts,
+            timeout_counts=partial.timeout_counts,
+            segmented_counts=partial.segmented_counts,
+            read_pattern_bytes=partial.read_pattern_bytes,
+            auth_stats=partial.auth_stats,
+            timing_stats=timing_stats,
+            size_stats=OrderedDict(
+                (size_str, finished(partial.sizes[size_str]))
+                for size_str in self.scenario.sizes_by_name.keys()
+                if size_str in partial.sizes),
+            jobs_per_worker_stats=self._series_stats(
+                jobs_per_worker, pctiles, format_numbers),
+            mb_per_sec_per_worker_stats=self._series_stats(
+                mb_per_sec_per_worker, pctiles, format_numbers),
+            time_series=dict(
+                start=completion_time_min,
+                start_time=start_time,
+                stop=completion_time_max,
+                data=[partial.req_completion_seconds.get(t, 0)
+                      for t in range(completion_time_min,
+                                     completion_time_max + 1)],
+                bytes=[partial.byte_completion_seconds.get(t, 0)
+                       for t in range(completion_time_min,
+                                      completion_time_max + 1)]),
+        )
+        if distributions:
+            stats['latency_distributions'] = self._latency_distributions(
+                partial)
         return stats
 
+    def _latency_distributions(self, partial):
+        size_strs = self.scenario.sizes_by_name.keys()
+        accumulators = [((None, None), partial.agg)] + [
+            ((None, size_str), partial.sizes[size_str])
+            for size_str in size_strs if size_str in partial.sizes]
+        for _, crud_type in OPERATION_LABELS:
+            if crud_type in partial.ops:
+                accumulators.append(((crud_type, None),
+                                     partial.ops[crud_type]))
+                accumulators.extend(
+                    ((crud_type, size_str), partial.op_sizes[key])
+                    for size_str in size_strs
+                    for key in [(crud_type, size_str)]
+                    if key in partial.op_sizes)
+        return OrderedDict(
+            (key, dict((latency_type,
+                        accumulator.latencies[latency_type].histogram)
+                       for latency_type in LATENCY_TYPES))
+            for key, accumulator in accumulators)
+
+    def write_latency_distributions(self, target_dir):
+        """Write each latency distribution read with distributions=True
+        (see calculate_scenario_stats()) to target_dir, both as an
+        HdrHistogram percentile distribution (see write_hgrm()) and as a CDF
+        CSV file, named like "read_small_last_byte_latency.hgrm" (or
+        "total_all_..." for all operations and object sizes).
+
+        :returns: The paths of the files written
+        """
+        if not os.path.isdir(target_dir):
+            os.makedirs(target_dir)
+        op_names = dict((crud_type, label.lower())
+                        for label, crud_type in OPERATION_LABELS)
+        paths = []
+        for (crud_type, size_str), histograms in \
+                self.stats['latency_distributions'].iteritems():
+            for latency_type in LATENCY_TYPES:
+                histogram = histograms[latency_type]
+                if not histogram.count:
+                    continue
+                path_base = os.path.join(target_dir, '%s_%s_%s' % (
+                    op_names.get(crud_type, 'total'), size_str or 'all',
+                    latency_type))
+                for extension, write in (('.hgrm', write_hgrm),
+                                         ('.csv', write_cdf_csv)):
+                    with open(path_base + extension, 'w') as target_file:
+                        write(histogram, target_file)
+                    paths.append(path_base + extension)
+        return paths
+
     def _compute_latency_stats(self, stat_dict, nth_pctile, format_numbers):
         try:
             for latency_type in ('first_byte_latency', 'last_byte_latency'):
@@ -439,13 +1189,18 @@ Distribution of requests per worker-ID: ${jobs_per_worker_stats['min']} - ${jobs
             raise
 
     def _compute_req_per_sec(self, stat_dict):
+        # ...and megabytes (sent and received) per second
         if 'start' in stat_dict:
             delta_t = stat_dict['stop'] - stat_dict['start']
             stat_dict['avg_req_per_sec'] = round(
                 stat_dict['req_count'] / delta_t,
                 6)
+            stat_dict['avg_mb_per_sec'] = round(
+                (stat_dict['sent_bytes'] + stat_dict['received_bytes']) /
+                1e6 / delta_t, 6)
         else:
             stat_dict['avg_req_per_sec'] = 0.0
+            stat_dict['avg_mb_per_sec'] = 0.0
 
     def _compute_retry_rate(self, stat_dict):
         stat_dict['retry_rate'] = round((float(stat_dict['retries']) /
@@ -454,6 +1209,7 @@ Distribution of requests per worker-ID: ${jobs_per_worker_stats['min']} - ${jobs
     def _add_result_to(self, stat_dict, result):
         if 'errors' not in stat_dict:
             stat_dict['errors'] = 0
+            stat_dict['sent_bytes'] = stat_dict['received_bytes'] = 0
         if 'start' in result and ('start' not in stat_dict or
                                   result['start'] < stat_dict['start']):
             stat_dict['start'] = result['start']
@@ -465,15 +1221,20 @@ Distribution of requests per worker-ID: ${jobs_per_worker_stats['min']} - ${jobs
             stat_dict.get('retries', 0) + int(result['retries'])
         if 'exception' not in result:
             self._rec_latency(stat_dict, result)
+            stat_dict['sent_bytes'] += sent_bytes(result)
+            stat_dict['received_bytes'] += received_bytes(result)
         else:
             stat_dict['errors'] += 1
 
     def _series_stats(self, sequence, nth_pctile, format_numbers):
+        pctiles = pctile_list(nth_pctile)
         sequence = filter(None, sequence)
         if not sequence:
             # No data available
-            return dict(min=' N/A  ', max='  N/A  ', avg='  N/A  ',
-                        pctile='  N/A  ', std_dev='  N/A  ', median='  N/A  ')
+            return _with_pctiles(
+                dict(min=' N/A  ', max='  N/A  ', avg='  N/A  ',
+                     pctile='  N/A  ', std_dev='  N/A  ', median='  N/A  '),
+                pctiles, ['  N/A  '] * len(pctiles))
         sequence.sort()
         try:
             n, (minval, maxval), mean, std_dev, skew, kurtosis = \
@@ -484,22 +1245,26 @@ Distribution of requests per worker-ID: ${jobs_per_worker_stats['min']} - ${jobs
             minval = sequence[0]
             maxval = sequence[0]
             mean = sequence[0]
+        # All the percentiles come from the one sorted sequence
+        pctile_values = [self.pctile(sequence, p) for p in pctiles]
         if format_numbers:
-            return dict(
+            return _with_pctiles(dict(
                 min='%6.3f' % minval,
                 max='%7.3f' % maxval,
                 avg='%7.3f' % mean,
-                pctile='%7.3f' % self.pctile(sequence, nth_pctile),
+                pctile='%7.3f' % pctile_values[0],
                 std_dev='%7.3f' % statlib.stats.lsamplestdev(sequence),
-                median='%7.3f' % statlib.stats.lmedianscore(sequence))
+                median='%7.3f' % statlib.stats.lmedianscore(sequence)),
+                pctiles, ['%7.3f' % value for value in pctile_values])
         else:
-            return dict(
+            return _with_pctiles(dict(
                 min=round(minval, 6),
                 max=round(maxval, 6),
                 avg=round(mean, 6),
-                pctile=round(self.pctile(sequence, nth_pctile), 6),
+                pctile=round(pctile_values[0], 6),
                 std_dev=round(statlib.stats.lsamplestdev(sequence), 6),
-                median=round(statlib.stats.lmedianscore(sequence), 6))
+                median=round(statlib.stats.lmedianscore(sequence), 6)),
+                pctiles, [round(value, 6) for value in pctile_values])
 
     def pctile(self, sequence, nth_pctile):
         seq_len = len(sequence)
@@ -523,3 +1288,414 @@ Distribution of requests per worker-ID: ${jobs_per_worker_stats['min']} - ${jobs
                         or result[latency_type] > stats_dict[worst_key][0]:
                     stats_dict[worst_key] = (round(result[latency_type], 6),
                                              result['trans_id'])
+
+
+class _LatencyAccumulator(object):
+    """Mergeable running statistics for one latency series."""
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.sum_sq_dev = 0.0
+        self.histogram = LogHistogram()
+        # (latency, rounded latency, trans_id, stream position)
+        self.worst = None
+
+    def add(self, latency, trans_id, position):
+        if latency is None:
+            return
+        if self.worst is None or latency > self.worst[1]:
+            self.worst = (latency, round(latency, 6), trans_id, position)
+        if not latency:
+            # Like _series_stats(), ignore zero latencies
+            return
+        # Welford's online algorithm keeps the variance numerically stable
+        self.count += 1
+        delta = latency - self.mean
+        self.mean += delta / self.count
+        self.sum_sq_dev += delta * (latency - self.mean)
+        self.histogram.record(latency)
+
+    @classmethod
+    def from_summary(cls, summary, position):
+        """
+        :param summary: A bucket's LATENCY (see ssbench.summary)
+        """
+        accumulator = cls()
+        accumulator.count = summary['count']
+        accumulator.mean = summary['mean']
+        accumulator.sum_sq_dev = summary['sum_sq_dev']
+        accumulator.histogram = LogHistogram.from_packable(
+            summary['histogram'])
+        if summary['worst']:
+            latency, trans_id = summary['worst']
+            accumulator.worst = (latency, round(latency, 6), trans_id,
+                                 position)
+        return accumulator
+
+    def merge(self, other):
+        if other.count:
+            # Chan et al.'s pairwise combination of Welford accumulators
+            count = self.count + other.count
+            delta = other.mean - self.mean
+            self.mean += delta * other.count / count
+            self.sum_sq_dev += other.sum_sq_dev + \
+                delta * delta * self.count * other.count / count
+            self.count = count
+            self.histogram.merge(other.histogram)
+        if other.worst is not None:
+            # Replay the serial "strictly greater" rule in stream order
+            first, second = sorted([self.worst, other.worst],
+                                   key=lambda w: w and w[3])
+            if first is None or second[0] > first[1]:
+                self.worst = second
+            else:
+                self.worst = first
+        return self
+
+    def series_stats(self, nth_pctile, format_numbers):
+        pctiles = pctile_list(nth_pctile)
+        if not self.count:
+            return _with_pctiles(
+                dict(min=' N/A  ', max='  N/A  ', avg='  N/A  ',
+                     pctile='  N/A  ', std_dev='  N/A  ', median='  N/A  '),
+                pctiles, ['  N/A  '] * len(pctiles))
+        histogram = self.histogram
+        # The median and all the percentiles in one walk over the buckets
+        pctile_values = histogram.percentiles(pctiles + [50])
+        median = pctile_values.pop()
+        values = dict(
+            min=histogram.min,
+            max=histogram.max,
+            avg=self.mean,
+            pctile=pctile_values[0],
+            # Population standard deviation, like statlib's lsamplestdev()
+            std_dev=math.sqrt(self.sum_sq_dev / self.count),
+            median=median)
+        if format_numbers:
+            formats = dict(min='%6.3f', max='%7.3f', avg='%7.3f',
+                           pctile='%7.3f', std_dev='%7.3f', median='%7.3f')
+            return _with_pctiles(
+                dict((k, formats[k] % v) for k, v in values.iteritems()),
+                pctiles, ['%7.3f' % value for value in pctile_values])
+        return _with_pctiles(
+            dict((k, round(v, 6)) for k, v in values.iteritems()),
+            pctiles, [round(value, 6) for value in pctile_values])
+
+
+class _StatsAccumulator(object):
+    """Mergeable counterpart of the stat dicts built by
+    Reporter._add_result_to().
+    """
+    def __init__(self, start=None, stop=None):
+        self.start = start
+        self.stop = stop
+        self.req_count = 0
+        self.retries = 0
+        self.errors = 0
+        self.sent_bytes = 0
+        self.received_bytes = 0
+        self.latencies = dict((latency_type, _LatencyAccumulator())
+                              for latency_type in ('first_byte_latency',
+                                                   'last_byte_latency'))
+
+    def add(self, result, position):
+        if 'start' in result and (self.start is None or
+                                  result['start'] < self.start):
+            self.start = result['start']
+        if self.stop is None or result['completed_at'] > self.stop:
+            self.stop = result['completed_at']
+        self.req_count += 1
+        self.retries += int(result['retries'])
+        if 'exception' in result:
+            self.errors += 1
+        else:
+            self.sent_bytes += sent_bytes(result)
+            self.received_bytes += received_bytes(result)
+            for latency_type, accumulator in self.latencies.iteritems():
+                accumulator.add(result[latency_type], result['trans_id'],
+                                position)
+
+    def add_bucket(self, bucket, position, start):
+        """
+        Add a worker's summary of some results (see ssbench.summary), as if
+        they had been add()ed one by one.
+
+        :param start: The bucket's start time, clipped to any window
+        """
+        if start is not None and (self.start is None or start < self.start):
+            self.start = start
+        if self.stop is None or bucket['stop'] > self.stop:
+            self.stop = bucket['stop']
+        self.req_count += bucket['count']
+        self.retries += bucket['retries']
+        self.errors += bucket['errors']
+        self.sent_bytes += bucket.get('sent_bytes', 0)
+        self.received_bytes += bucket.get('received_bytes', 0)
+        for latency_type, accumulator in self.latencies.iteritems():
+            accumulator.merge(_LatencyAccumulator.from_summary(
+                bucket[latency_type], position))
+
+    def merge(self, other):
+        if other.start is not None and (self.start is None or
+                                        other.start < self.start):
+            self.start = other.start
+        if other.stop is not None and (self.stop is None or
+                                       other.stop > self.stop):
+            self.stop = other.stop
+        self.req_count += other.req_count
+        self.retries += other.retries
+        self.errors += other.errors
+        self.sent_bytes += other.sent_bytes
+        self.received_bytes += other.received_bytes
+        for latency_type, accumulator in self.latencies.iteritems():
+            accumulator.merge(other.latencies[latency_type])
+        return self
+
+    def stat_dict(self, nth_pctile, format_numbers):
+        stat_dict = dict(stop=self.stop, req_count=self.req_count,
+                         retries=self.retries, errors=self.errors,
+                         sent_bytes=self.sent_bytes,
+                         received_bytes=self.received_bytes)
+        if self.start is not None:
+            stat_dict['start'] = self.start
+        for latency_type, accumulator in self.latencies.iteritems():
+            stat_dict[latency_type] = accumulator.series_stats(
+                nth_pctile, format_numbers)
+            if accumulator.worst is not None:
+                stat_dict['worst_%s' % latency_type] = \
+                    accumulator.worst[1:3]
+        return stat_dict
+
+
+def _add_auth_latency(auth_stats, result):
+    """Count the time a request spent waiting for an auth token."""
+    auth_latency = result.get('auth_latency')
+    if auth_latency:
+        auth_stats['count'] += 1
+        auth_stats['total'] += auth_latency
+        auth_stats['max'] = max(auth_stats['max'], auth_latency)
+
+
+def _add_segmented(segmented_counts, crud_type, counts):
+    """Count (objects, segments, bytes) uploaded in segments."""
+    totals = segmented_counts.setdefault(crud_type, [0, 0, 0])
+    for i, count in enumerate(counts):
+        totals[i] += count
+
+
+def _add_read_pattern_bytes(read_pattern_bytes, pattern_bytes):
+    """Count bytes read by reads with each read pattern."""
+    for pattern, byte_count in pattern_bytes.iteritems():
+        read_pattern_bytes[pattern] = \
+            byte_count + read_pattern_bytes.get(pattern, 0)
+
+
+class _PartialScenarioStats(object):
+    """Mergeable statistics for part of a run's results."""
+    def __init__(self):
+        self.agg = _StatsAccumulator(start=2 ** 32, stop=0)
+        self.workers = {}
+        self.sizes = {}
+        self.ops = {}
+        self.op_sizes = {}
+        self.phase_counts = {}
+        self.lost_counts = {}
+        self.timeout_counts = {}
+        # CRUD type => [objects, segments, bytes] uploaded in segments
+        self.segmented_counts = {}
+        # Read pattern => bytes read
+        self.read_pattern_bytes = {}
+        self.auth_stats = dict(count=0, total=0.0, max=0.0)
+        # (CRUD type, one of ALL_TIMING_TYPES) => _LatencyAccumulator
+        self.timings = {}
+        self.req_completion_seconds = {}
+        self.byte_completion_seconds = {}
+        # (completion second, stream position, start time) of the earliest
+        # completing successful request
+        self.first_completion = None
+        self.completion_time_max = 0
+
+    def add(self, result, position, window=None):
+        if result.get('lost'):
+            # As in Reporter._calculate_scenario_stats()
+            if not window:
+                self.lost_counts[result['type']] = \
+                    1 + self.lost_counts.get(result['type'], 0)
+            return
+        if result.get('phase'):
+            self.phase_counts[result['phase']] = \
+                1 + self.phase_counts.get(result['phase'], 0)
+            return
+        if window and not window[0] <= result['completed_at'] <= window[1]:
+            return
+        _add_auth_latency(self.auth_stats, result)
+        if result.get('timed_out'):
+            self.timeout_counts[result['type']] = \
+                1 + self.timeout_counts.get(result['type'], 0)
+        completion_time = int(result['completed_at'])
+        if 'exception' in result:
+            logging.warn('calculate_scenario_stats: exception from '
+                         'worker %d: %s',
+                         result['worker_id'], result['exception'])
+            logging.info(result['traceback'])
+        else:
+            if self.first_completion is None or \
+                    completion_time < self.first_completion[0]:
+                self.first_completion = (
+                    completion_time, position,
+                    completion_time - result['last_byte_latency'])
+            if completion_time > self.completion_time_max:
+                self.completion_time_max = completion_time
+            self.req_completion_seconds[completion_time] = \
+                1 + self.req_completion_seconds.get(completion_time, 0)
+            self.byte_completion_seconds[completion_time] = \
+                sent_bytes(result) + received_bytes(result) + \
+                self.byte_completion_seconds.get(completion_time, 0)
+            result['start'] = (
+                result['completed_at'] - result['last_byte_latency'])
+            if window and result['start'] < window[0]:
+                result['start'] = window[0]
+            if result.get('segments'):
+                _add_segmented(self.segmented_counts, result['type'],
+                               (1, result['segments'], int(result['size'])))
+            if 'read_pattern' in result:
+                _add_read_pattern_bytes(self.read_pattern_bytes, {
+                    result['read_pattern']: result.get('received_bytes', 0)})
+            for timing_type, timing in iter_timings(result):
+                self._timing(result['type'], timing_type).add(
+                    timing, result['trans_id'], position)
+
+        for accumulators, key in (
+                (self.workers, result['worker_id']),
+                (self.sizes, result['size_str']),
+                (self.ops, result['type']),
+                (self.op_sizes, (result['type'], result['size_str']))):
+            if key not in accumulators:
+                accumulators[key] = _StatsAccumulator()
+            accumulators[key].add(result, position)
+        self.agg.add(result, position)
+
+    def add_summary(self, summary, position, window=None):
+        """Add a worker's SUMMARY (see ssbench.summary)."""
+        for sample in summary['samples']:
+            logging.warn('calculate_scenario_stats: exception from '
+                         'worker %d: %s',
+                         summary['worker_id'], sample['exception'])
+            logging.info(sample['traceback'])
+        for bucket_index, bucket in enumerate(summary['buckets']):
+            bucket_position = position + (bucket_index,)
+            if bucket['phase']:
+                self.phase_counts[bucket['phase']] = \
+                    bucket['count'] + self.phase_counts.get(bucket['phase'], 0)
+                continue
+            if window and not window[0] <= bucket['stop'] <= window[1]:
+                continue
+            auth_count, auth_total, auth_max = bucket['auth']
+            self.auth_stats['count'] += auth_count
+            self.auth_stats['total'] += auth_total
+            self.auth_stats['max'] = max(self.auth_stats['max'], auth_max)
+            if bucket.get('timeouts'):
+                self.timeout_counts[bucket['type']] = bucket['timeouts'] + \
+                    self.timeout_counts.get(bucket['type'], 0)
+            if bucket.get('segmented'):
+                _add_segmented(self.segmented_counts, bucket['type'],
+                               bucket['segmented'])
+            if bucket.get('pattern_bytes'):
+                _add_read_pattern_bytes(self.read_pattern_bytes,
+                                        bucket['pattern_bytes'])
+            start = bucket['start']
+            successes = bucket['count'] - bucket['errors']
+            if successes:
+                completion_time = bucket['second']
+                if self.first_completion is None or \
+                        completion_time < self.first_completion[0]:
+                    self.first_completion = (completion_time,
+                                             bucket_position, start)
+                if completion_time > self.completion_time_max:
+                    self.completion_time_max = completion_time
+                self.req_completion_seconds[completion_time] = \
+                    successes + self.req_completion_seconds.get(
+                        completion_time, 0)
+                self.byte_completion_seconds[completion_time] = \
+                    bucket.get('sent_bytes', 0) + \
+                    bucket.get('received_bytes', 0) + \
+                    self.byte_completion_seconds.get(completion_time, 0)
+                if window and start < window[0]:
+                    start = window[0]
+            for timing_type, timing_summary in \
+                    bucket.get('timings', {}).iteritems():
+                self._timing(bucket['type'], timing_type).merge(
+                    _LatencyAccumulator.from_summary(timing_summary,
+                                                     bucket_position))
+
+            for accumulators, key in (
+                    (self.workers, summary['worker_id']),
+                    (self.sizes, bucket['size_str']),
+                    (self.ops, bucket['type']),
+                    (self.op_sizes, (bucket['type'], bucket['size_str']))):
+                if key not in accumulators:
+                    accumulators[key] = _StatsAccumulator()
+                accumulators[key].add_bucket(bucket, bucket_position, start)
+            self.agg.add_bucket(bucket, bucket_position, start)
+
+    def _timing(self, crud_type, timing_type):
+        key = (crud_type, timing_type)
+        if key not in self.timings:
+            self.timings[key] = _LatencyAccumulator()
+        return self.timings[key]
+
+    def merge(self, other):
+        self.agg.merge(other.agg)
+        for mine, theirs in ((self.workers, other.workers),
+                             (self.sizes, other.sizes),
+                             (self.ops, other.ops),
+                             (self.op_sizes, other.op_sizes),
+                             (self.timings, other.timings)):
+            for key, accumulator in theirs.iteritems():
+                if key in mine:
+                    mine[key].merge(accumulator)
+                else:
+                    mine[key] = accumulator
+        for mine, theirs in ((self.phase_counts, other.phase_counts),
+                             (self.lost_counts, other.lost_counts),
+                             (self.timeout_counts, other.timeout_counts),
+                             (self.req_completion_seconds,
+                              other.req_completion_seconds),
+                             (self.byte_completion_seconds,
+                              other.byte_completion_seconds)):
+            for key, count in theirs.iteritems():
+                mine[key] = mine.get(key, 0) + count
+        for crud_type, counts in other.segmented_counts.iteritems():
+            _add_segmented(self.segmented_counts, crud_type, counts)
+        _add_read_pattern_bytes(self.read_pattern_bytes,
+                                other.read_pattern_bytes)
+        self.auth_stats['count'] += other.auth_stats['count']
+        self.auth_stats['total'] += other.auth_stats['total']
+        self.auth_stats['max'] = max(self.auth_stats['max'],
+                                     other.auth_stats['max'])
+        if other.first_completion is not None and (
+                self.first_completion is None or
+                other.first_completion[:2] < self.first_completion[:2]):
+            self.first_completion = other.first_completion
+        self.completion_time_max = max(self.completion_time_max,
+                                       other.completion_time_max)
+        return self
+
+
+def _partial_scenario_stats(args):
+    """Calculate partial statistics for one of ``partitions`` interleaved
+    subsets of the results in a results file (see RunResults.read_batches()).
+
+    This is a module-level function taking a single tuple so it can be
+    handed to multiprocessing.Pool.map().
+    """
+    results_file_path, partition, partitions, window = args
+    partial = _PartialScenarioStats()
+    for position, results in RunResults(results_file_path).read_batches(
+            partition, partitions):
+        if isinstance(results, dict):
+            partial.add_summary(results, position, window)
+            continue
+        for result_index, result in enumerate(results):
+            partial.add(result, position + (result_index,), window)
+    return partial
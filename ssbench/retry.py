@@ -0,0 +1,93 @@
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+How ssbench-worker retries failed requests, so that an overloaded cluster
+isn't hit with a burst of back-to-back retries for every failing operation:
+
+  - each retry waits a random time (up to a limit doubling with each retry
+    of the request: "full jitter" exponential backoff);
+  - retries come out of a per-worker budget, refilled by a percentage of
+    the requests made;
+  - "retry rules" cap the retries of a request failing with a particular
+    HTTP status (or a socket error) below the overall maximum.
+"""
+
+import random
+import argparse
+
+
+DEFAULT_MAX_RETRIES = 10
+# The first retry waits up to this many seconds; each one after that up to
+# twice as long as the one before, but never more than the maximum
+DEFAULT_RETRY_BACKOFF = 0.01
+DEFAULT_RETRY_BACKOFF_MAX = 1.0
+# Retries may add up to this percentage of a worker's requests...
+DEFAULT_RETRY_BUDGET = 20.0
+# ...plus a burst of this many
+RETRY_BUDGET_RESERVE = 10.0
+# The retry rule key for socket errors (the others are HTTP statuses)
+SOCKET_ERROR = 'socket'
+
+
+def backoff_delay(tries, backoff, backoff_max):
+    """
+    :param tries: How many times the request has failed so far (>= 1)
+    :returns: Seconds to wait before retrying it
+    """
+    return random.uniform(0, min(backoff_max, backoff * 2 ** (tries - 1)))
+
+
+def parse_retry_rule(spec):
+    """
+    Parse a retry rule given on the command line, like ``404=2`` or
+    ``socket=3``.
+
+    :returns: (HTTP status or SOCKET_ERROR, maximum retries)
+    """
+    try:
+        key, count = spec.split('=')
+        if key != SOCKET_ERROR:
+            key = int(key)
+        return key, int(count)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            'retry rules look like STATUS=COUNT or %s=COUNT, not %r' % (
+                SOCKET_ERROR, spec))
+
+
+class RetryBudget(object):
+    """
+    A token bucket of retries: every request adds a fraction of a token,
+    every retry takes a whole one, and there are never more than
+    RETRY_BUDGET_RESERVE in it.
+
+    It isn't locked; with a threaded worker, a lost update now and then
+    just makes the budget slightly more or less generous.
+    """
+    def __init__(self):
+        self.tokens = RETRY_BUDGET_RESERVE
+
+    def deposit(self, percent):
+        """Count a request, which adds ``percent``% of a retry."""
+        self.tokens = min(RETRY_BUDGET_RESERVE,
+                          self.tokens + percent / 100.0)
+
+    def withdraw(self):
+        """:returns: True if a retry may be made (and counts it)"""
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
@@ -0,0 +1,162 @@
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+import msgpack
+
+import ssbench
+
+
+# Compact jobs refer to their type by index into this tuple
+JOB_TYPES = (ssbench.CREATE_OBJECT, ssbench.READ_OBJECT,
+             ssbench.UPDATE_OBJECT, ssbench.DELETE_OBJECT) + \
+    ssbench.METADATA_OPS
+
+# Job keys which have their own slot in a compact job
+_POSITIONAL_KEYS = frozenset(['type', 'size_str', 'container', 'name',
+                              'size'])
+
+
+def is_compact_message(job_data):
+    """
+    :returns: True if an unpacked work message is a (context_id, jobs[,
+              first_job_id]) tuple from RunContext.packb_jobs() rather than
+              a list of job dicts.
+    """
+    return len(job_data) in (2, 3) and isinstance(job_data[0], (int, long))
+
+
+class RunContext(object):
+    """
+    Everything that is the same for every job in a run (auth_kwargs,
+    timeouts, the scenario's containers and size names, etc.), so it can be
+    sent to each worker once instead of with every job.
+
+    Jobs are then encoded as (type, size, container, name, size_bytes[,
+    extra]) tuples, where the type, size name and container are indices into
+    the context's tables, an object name like "small_000123" is just its
+    index (123), and ``extra`` is a dict of any other keys which differ from
+    the context's ``job_defaults``.  Values which aren't in a table are sent
+    as-is, so any job dict survives encode_job() and decode_job() unchanged
+    apart from gaining the job_defaults keys.
+
+    If ``start_barrier`` is set, workers hold the context's jobs until the
+    master broadcasts a START for it, so they all begin at the same moment.
+    """
+
+    def __init__(self, job_defaults=None, containers=(), size_strs=(),
+                 context_id=None, start_barrier=False):
+        if context_id is None:
+            # Workers outlive runs (and masters), so IDs must not repeat
+            context_id = random.getrandbits(62)
+        self.context_id = context_id
+        self.job_defaults = job_defaults or {}
+        self.containers = list(containers)
+        self.size_strs = list(size_strs)
+        self.start_barrier = start_barrier
+        self._container_indices = dict(
+            (container, i) for i, container in enumerate(self.containers))
+        self._size_indices = dict(
+            (size_str, i) for i, size_str in enumerate(self.size_strs))
+        self._type_indices = dict(
+            (job_type, i) for i, job_type in enumerate(JOB_TYPES))
+
+    def packb(self):
+        return msgpack.packb({
+            'context_id': self.context_id,
+            'job_defaults': self.job_defaults,
+            'containers': self.containers,
+            'size_strs': self.size_strs,
+            'start_barrier': self.start_barrier,
+        })
+
+    @classmethod
+    def unpackb(cls, packed):
+        data = msgpack.unpackb(packed)
+        return cls(job_defaults=data['job_defaults'],
+                   containers=data['containers'],
+                   size_strs=data['size_strs'],
+                   context_id=data['context_id'],
+                   start_barrier=data.get('start_barrier', False))
+
+    def encode_job(self, job):
+        size_str = job.get('size_str')
+        name = job.get('name')
+        if name is not None and size_str is not None:
+            prefix, _, index = name.rpartition('_')
+            if prefix == size_str and len(index) == 6 and index.isdigit():
+                name = int(index)
+        container = job.get('container')
+        job_type = job.get('type')
+        compact = (self._type_indices.get(job_type, job_type),
+                   self._size_indices.get(size_str, size_str),
+                   self._container_indices.get(container, container),
+                   name,
+                   job.get('size'))
+        extra = None
+        job_defaults = self.job_defaults
+        for key, value in job.iteritems():
+            if key in _POSITIONAL_KEYS or (key in job_defaults and
+                                           job_defaults[key] == value):
+                continue
+            if extra is None:
+                extra = {}
+            extra[key] = value
+        if extra:
+            compact += (extra,)
+        return compact
+
+    def decode_job(self, compact):
+        job = self.job_defaults.copy()
+        job_type, size_str, container, name, size = compact[:5]
+        job['type'] = JOB_TYPES[job_type] \
+            if job_type.__class__ is int else job_type
+        if size_str.__class__ is int:
+            size_str = self.size_strs[size_str]
+        job['size_str'] = size_str
+        if container is not None:
+            job['container'] = self.containers[container] \
+                if container.__class__ is int else container
+        if name is not None:
+            job['name'] = '%s_%06d' % (size_str, name) \
+                if name.__class__ is int else name
+        if size is not None:
+            job['size'] = size
+        if len(compact) > 5:
+            job.update(compact[5])
+        return job
+
+    def packb_jobs(self, jobs, first_job_id=None):
+        """
+        :param first_job_id: If given, the jobs are numbered consecutively
+                             from this (see decode_jobs())
+        :returns: A work message carrying the given job dicts in compact form
+        """
+        message = (self.context_id, [self.encode_job(job) for job in jobs])
+        if first_job_id is not None:
+            message += (first_job_id,)
+        return msgpack.dumps(message)
+
+    def decode_jobs(self, job_data):
+        """
+        :param job_data: An unpacked work message from packb_jobs()
+        :returns: A list of job dicts; if the jobs were numbered, each has a
+                  "job_id" key.
+        """
+        jobs = [self.decode_job(compact) for compact in job_data[1]]
+        if len(job_data) > 2:
+            for job_id, job in enumerate(jobs, job_data[2]):
+                job['job_id'] = job_id
+        return jobs
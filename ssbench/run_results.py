@@ -14,6 +14,9 @@
 # limitations under the License.
 
 import os
+import zlib
+import heapq
+import struct
 import logging
 import msgpack
 import threading
@@ -23,41 +26,289 @@ from cStringIO import StringIO
 
 from ssbench.scenario import Scenario
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
 
-def _thread_writer(queue, target_file):
+
+# A compressed results file starts with FRAMED_MAGIC, a format version byte
+# and the length-prefixed name of its compression codec.  The rest of the
+# file is a series of frames, each a FRAME_HEADER (compressed and
+# uncompressed lengths) followed by that many bytes of compressed data.  The
+# first frame holds the packed scenario, and every other frame holds whole
+# msgpack'ed batches of results, so frames can be decompressed and decoded
+# independently of each other.
+FRAMED_MAGIC = 'SSBENCHF'
+FRAMED_VERSION = 1
+FRAME_HEADER = struct.Struct('>II')
+
+# A worker's spool file (see RunResults.start_spool()) is a compressed
+# results file whose first frame holds this instead of a scenario.
+SPOOL_HEADER = {'spool': 1}
+SPOOL_CODEC = 'zlib'
+# Merged spool results are written in batches of this many
+MERGE_BATCH_SIZE = 1000
+
+
+class _ZlibCodec(object):
+    name = 'zlib'
+    default_level = 5
+
+    def __init__(self, level=None):
+        self.level = self.default_level if level is None else level
+
+    def compress(self, data):
+        # Compression objects release the GIL while deflating, so the writer
+        # thread doesn't stall the thread feeding it.
+        compressor = zlib.compressobj(self.level)
+        return compressor.compress(data) + compressor.flush()
+
+    def decompress(self, data, size):
+        return zlib.decompress(data)
+
+
+class _ZstdCodec(object):
+    name = 'zstd'
+    default_level = 3
+
+    def __init__(self, level=None):
+        self.level = self.default_level if level is None else level
+
+    def compress(self, data):
+        return zstandard.ZstdCompressor(level=self.level).compress(data)
+
+    def decompress(self, data, size):
+        return zstandard.ZstdDecompressor().decompress(
+            data, max_output_size=size)
+
+
+class _Lz4Codec(object):
+    name = 'lz4'
+    default_level = 0
+
+    def __init__(self, level=None):
+        self.level = self.default_level if level is None else level
+
+    def compress(self, data):
+        return lz4.frame.compress(data, compression_level=self.level)
+
+    def decompress(self, data, size):
+        return lz4.frame.decompress(data)
+
+
+COMPRESSION_CODECS = {
+    'zlib': _ZlibCodec,
+    'zstd': _ZstdCodec if zstandard else None,
+    'lz4': _Lz4Codec if lz4 else None,
+}
+
+
+def available_codecs():
+    """Names of the compression codecs usable in this environment."""
+    return sorted(name for name, codec in COMPRESSION_CODECS.iteritems()
+                  if codec)
+
+
+def _get_codec(name, level=None):
+    if name not in COMPRESSION_CODECS:
+        raise ValueError('Unknown compression codec %r' % (name,))
+    if not COMPRESSION_CODECS[name]:
+        raise ValueError('The %r compression codec requires a Python module '
+                         'which is not installed' % (name,))
+    return COMPRESSION_CODECS[name](level)
+
+
+def _frame(codec, data):
+    compressed = codec.compress(data)
+    return FRAME_HEADER.pack(len(compressed), len(data)) + compressed
+
+
+def _thread_writer(queue, target_file, codec=None):
     """
-    Read blobs off the given queue, writing them to target_file.
+    Read blobs off the given queue, writing them to target_file.  If a codec
+    is given, each blob is compressed into its own frame first.
     If an empty blob is read, that indicates we're done, and we exit.
     """
     blob = queue.get()
     while blob:
+        if codec:
+            blob = _frame(codec, blob)
         target_file.write(blob)
         blob = queue.get()
 
 
+class _FramedReader(object):
+    """A read-only file-like object which decompresses the frames of a
+    compressed results file as they are read.
+    """
+    def __init__(self, file_like, codec):
+        self.file_like = file_like
+        self.codec = codec
+        self.buffer = ''
+        self.buffer_offset = 0
+
+    def _read_frame(self):
+        header = self.file_like.read(FRAME_HEADER.size)
+        if len(header) < FRAME_HEADER.size:
+            return False
+        compressed_size, size = FRAME_HEADER.unpack(header)
+        self.buffer = self.codec.decompress(
+            self.file_like.read(compressed_size), size)
+        self.buffer_offset = 0
+        return True
+
+    def read(self, size=-1):
+        chunks = []
+        while size:
+            if self.buffer_offset >= len(self.buffer):
+                if not self._read_frame():
+                    break
+            if size < 0:
+                chunk = self.buffer[self.buffer_offset:]
+            else:
+                chunk = self.buffer[self.buffer_offset:
+                                    self.buffer_offset + size]
+                size -= len(chunk)
+            self.buffer_offset += len(chunk)
+            chunks.append(chunk)
+        return ''.join(chunks)
+
+    def close(self):
+        self.file_like.close()
+
+
+def _read_framed_header(file_like):
+    """Consume and parse the header of a compressed results file.
+
+    :returns: The file's codec, or None (after rewinding the file) if it
+              isn't a compressed results file
+    """
+    magic = file_like.read(len(FRAMED_MAGIC) + 2)
+    if len(magic) < len(FRAMED_MAGIC) + 2 or \
+            not magic.startswith(FRAMED_MAGIC):
+        file_like.seek(0)
+        return None
+    version, name_length = struct.unpack('>BB', magic[len(FRAMED_MAGIC):])
+    if version != FRAMED_VERSION:
+        raise ValueError('Unsupported results file version %d' % version)
+    return _get_codec(file_like.read(name_length))
+
+
 class RunResults:
-    def __init__(self, results_file_path):
+    def __init__(self, results_file_path, compression=None,
+                 compression_level=None):
+        """
+        :param results_file_path: Path of the results file
+        :param compression: Name of a codec (see available_codecs()) with
+                            which start_run() will compress the results file
+                            as it is written, or None for no compression
+        :param compression_level: Codec-specific compression level, or None
+                                  for the codec's default
+        """
         self.results_file_path = results_file_path
         self.write_threshold = 1000000  # 1 MB
+        self.compression = compression
+        self.compression_level = compression_level
 
     def read_results(self):
-        if self.results_file_path.endswith('.gz'):
+        file_like = open(self.results_file_path, 'rb')
+        codec = _read_framed_header(file_like)
+        if codec:
+            file_like = _FramedReader(file_like, codec)
+        elif self.results_file_path.endswith('.gz'):
+            file_like.close()
             file_like = GzipFile(self.results_file_path, 'rb')
-        else:
-            file_like = open(self.results_file_path, 'rb')
         unpacker = msgpack.Unpacker(file_like=file_like)
         scenario = Scenario.unpackb(unpacker)
 
         return scenario, unpacker
 
+    def read_batches(self, partition=0, partitions=1):
+        """Yield (position, batch) tuples for a subset of the batches of
+        results in the results file.
+
+        The results file is divided into units (frames for a compressed
+        file, individual batches otherwise), and only every
+        ``partitions``-th unit, starting with the ``partition``-th, is
+        decoded; the others are skipped as cheaply as possible.  So
+        ``partitions`` callers (e.g. processes) with different ``partition``
+        values together read every batch exactly once.
+
+        :returns: A generator of (position, batch) tuples; positions are
+                  tuples which sort in the order batches were written
+        """
+        with open(self.results_file_path, 'rb') as file_like:
+            codec = _read_framed_header(file_like)
+            if codec:
+                for position, batch in self._read_framed_batches(
+                        file_like, codec, partition, partitions):
+                    yield position, batch
+                return
+        _, unpacker = self.read_results()
+        batch_index = 0
+        while True:
+            try:
+                if batch_index % partitions == partition:
+                    yield (batch_index,), unpacker.unpack()
+                else:
+                    unpacker.skip()
+            except msgpack.OutOfData:
+                break
+            batch_index += 1
+
+    def _read_framed_batches(self, file_like, codec, partition, partitions):
+        # The first frame is the scenario
+        frame_index = -1
+        while True:
+            header = file_like.read(FRAME_HEADER.size)
+            if len(header) < FRAME_HEADER.size:
+                break
+            compressed_size, size = FRAME_HEADER.unpack(header)
+            if frame_index >= 0 and frame_index % partitions == partition:
+                unpacker = msgpack.Unpacker()
+                unpacker.feed(codec.decompress(
+                    file_like.read(compressed_size), size))
+                for batch_index, batch in enumerate(unpacker):
+                    yield (frame_index, batch_index), batch
+            else:
+                file_like.seek(compressed_size, os.SEEK_CUR)
+            frame_index += 1
+
     def start_run(self, scenario):
+        self._start(scenario.packb())
+
+    def start_spool(self):
+        """
+        Start writing a worker's spool file: its share of a run's results,
+        which the master collects afterwards and merges into the real
+        results file with merge_spools().
+        """
+        if not self.compression:
+            self.compression = SPOOL_CODEC
+        self._start(msgpack.packb(SPOOL_HEADER))
+
+    def _start(self, header):
         self.output_file = open(self.results_file_path, 'wb')
-        self.output_file.write(scenario.packb())
+        codec = None
+        if self.compression:
+            codec = _get_codec(self.compression, self.compression_level)
+            self.output_file.write(FRAMED_MAGIC + struct.pack(
+                '>BB', FRAMED_VERSION, len(codec.name)) + codec.name)
+            self.output_file.write(_frame(codec, header))
+        else:
+            self.output_file.write(header)
         self.raw_results_buffer = StringIO()
+        # Compression happens in the writer thread, and this queue is
+        # unbounded, so process_raw_results() never blocks on it.
         self.raw_results_q = Queue()
         self.raw_results_write_thread = threading.Thread(
             target=_thread_writer, args=(self.raw_results_q,
-                                         self.output_file))
+                                         self.output_file, codec))
         self.raw_results_write_thread.daemon = True
         self.raw_results_write_thread.start()
 
@@ -68,6 +319,39 @@ class RunResults:
             self.raw_results_q.put(self.raw_results_buffer.getvalue(True))
             self.raw_results_buffer.seek(0)
 
+    def merge_spools(self, spool_paths):
+        """
+        Append the results in some workers' spool files, merged into
+        completed_at order.  Each spool is already (nearly) in that order,
+        so this streams through them without holding more than a frame of
+        each in memory.
+
+        :returns: The number of results merged
+        """
+        def spool_results(spool_index, spool_path):
+            result_index = 0
+            for _, batch in RunResults(spool_path).read_batches():
+                for result in batch:
+                    # The indices break ties without comparing dicts
+                    yield (result['completed_at'], spool_index,
+                           result_index, result)
+                    result_index += 1
+
+        batch = []
+        merged = 0
+        for _, _, _, result in heapq.merge(*[
+                spool_results(spool_index, spool_path)
+                for spool_index, spool_path in enumerate(spool_paths)]):
+            batch.append(result)
+            if len(batch) >= MERGE_BATCH_SIZE:
+                self.process_raw_results(msgpack.dumps(batch))
+                merged += len(batch)
+                batch = []
+        if batch:
+            self.process_raw_results(msgpack.dumps(batch))
+            merged += len(batch)
+        return merged
+
     def finalize(self):
         logging.debug('Waiting on results file flushing thread...')
         self.raw_results_q.put(self.raw_results_buffer.getvalue(True))
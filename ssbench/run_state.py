@@ -30,12 +30,15 @@ class RunState(object):
         #
         # A request for an object CREATE doesn't do anything with the deque.
         # A request for an object DELETE is serviced with popleft().
-        # A READ or UPDATE request is serviced with [0], then the deque is
-        # rotated to the left (the serviced item goes to the back).
+        # A READ, UPDATE, object HEAD or POST request is serviced with [0],
+        # then the deque is rotated to the left (the serviced item goes to
+        # the back).
+        # A container LIST or HEAD request doesn't do anything with the
+        # deque (its container was chosen with it).
         #
         # A result for a successful object CREATE is added (to the right of the
         # deque) with append().
-        # A result for READ, UPDATE, DELETE does nothing with the deque.
+        # A result for anything else does nothing with the deque.
         self.objs_by_size = defaultdict(deque)
 
     def _handle_result(self, result, initial=False):
@@ -59,7 +62,8 @@ class RunState(object):
             except IndexError:
                 # Nothing (of this size) to delete... bummer.
                 return None
-        elif job['type'] != ssbench.CREATE_OBJECT:
+        elif job['type'] != ssbench.CREATE_OBJECT and \
+                job['type'] not in ssbench.CONTAINER_OPS:
             try:
                 obj_info = self.objs_by_size[job['size_str']][0]
                 self.objs_by_size[job['size_str']].rotate(-1)
@@ -71,7 +75,12 @@ class RunState(object):
         return job
 
     def cleanup_object_infos(self):
-        for q in sorted(self.objs_by_size.values()):
+        """
+        Yield (and forget) each object created during the run, but not the
+        initial ones, as a (size_str, object info) tuple.
+        """
+        for size_str, q in sorted(self.objs_by_size.iteritems(),
+                                  key=lambda item: item[1]):
             first_initial = None
             try:
                 while not first_initial or q[0] != first_initial:
@@ -81,6 +90,6 @@ class RunState(object):
                             first_initial = obj_info
                         q.rotate(-1)
                     else:
-                        yield q.popleft()
+                        yield size_str, q.popleft()
             except IndexError:
                 pass
@@ -13,16 +13,37 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
 import copy
 import json
 import random
-import signal
 import logging
 import msgpack
 import itertools
 
 import ssbench
 from ssbench.ordered_dict import OrderedDict
+from ssbench.size_distribution import SizeDistribution
+from ssbench.util import monotonic_time
+
+
+# Values for the "phase" key of bench jobs (and therefore their results)
+# which fall outside the measured portion of a run.  Jobs in the measured
+# portion have no "phase" key at all.
+WARMUP_PHASE = 'warmup'
+COOLDOWN_PHASE = 'cooldown'
+
+# Defaults for the parameters of a read_profile's patterns (see
+# Scenario._read_pattern()), which a size class or the scenario may set
+READ_PATTERN_DEFAULTS = (
+    ('range_size', 2 ** 20),   # bytes in each range
+    ('range_count', 4),        # ranges in a multi-range read
+    ('first_bytes', 2 ** 20),  # bytes a first-bytes read reads
+)
+# Objects in each container listing (page) of a metadata_profile's
+# LIST_CONTAINER jobs, unless a size class or the scenario sets
+# listing_limit
+DEFAULT_LISTING_LIMIT = 100
 
 
 class Scenario(object):
@@ -33,19 +54,22 @@ class Scenario(object):
 
     def __init__(self, scenario_filename=None, container_count=None,
                  user_count=None, operation_count=None, run_seconds=None,
-                 block_size=None, _scenario_data=None,
-                 version=ssbench.version):
+                 block_size=None, warmup_seconds=None, cooldown_seconds=None,
+                 _scenario_data=None, version=ssbench.version):
         """Initializes the object from a scenario file on disk.
 
         :scenario_filename: path to a scenario file
         """
 
         self.version = version
+        # An empirical size distribution's file is relative to the scenario
+        base_dir = None
         if _scenario_data is not None:
             # This is a "private" way to construct a Scenario object from the
             # raw JSON without a file lying around.
             self._scenario_data = _scenario_data
         elif scenario_filename is not None:
+            base_dir = os.path.dirname(scenario_filename)
             try:
                 fp = open(scenario_filename)
                 self._scenario_data = json.load(fp)
@@ -85,6 +109,22 @@ class Scenario(object):
             raise ValueError('A scenario requires run_seconds or '
                              'operation_count')
 
+        # Warm-up and cool-down windows bracket the measured part of the run;
+        # their jobs are run (and their results recorded) like any other, but
+        # they are tagged so the reporter can leave them out.
+        if warmup_seconds is not None:
+            self.warmup_seconds = warmup_seconds
+        else:
+            self.warmup_seconds = self._scenario_data.get('warmup_seconds', 0)
+        if cooldown_seconds is not None:
+            self.cooldown_seconds = cooldown_seconds
+        else:
+            self.cooldown_seconds = self._scenario_data.get(
+                'cooldown_seconds', 0)
+        if self.warmup_seconds < 0 or self.cooldown_seconds < 0:
+            raise ValueError('warmup_seconds and cooldown_seconds must be '
+                             '>= 0')
+
         self.block_size = block_size
         self.name = self._scenario_data['name']
         self.container_base = self._scenario_data.get('container_base',
@@ -101,19 +141,62 @@ class Scenario(object):
 
         # Set up sizes
         self.sizes_by_name = OrderedDict()
+        # Objects of a size with a segment_size are uploaded as Static Large
+        # Objects (see Worker.handle_upload_object()); its jobs carry these
+        # keys.
+        self.segmenting = {}
+        # Size class => SizeDistribution of the sizes of its objects
+        self.size_distributions = {}
+        # Size class => ({read pattern: probability threshold}, parameters)
+        # for the size classes with a read_profile
+        self.read_patterns = {}
         for size_data in self._scenario_data['sizes']:
             size_data_copy = copy.deepcopy(size_data)
             self.sizes_by_name[size_data_copy['name']] = size_data_copy
+            distribution = self.size_distributions[size_data['name']] = \
+                SizeDistribution(size_data['size_min'],
+                                 size_data['size_max'],
+                                 size_data.get('size_distribution'),
+                                 base_dir)
+            if 'size_distribution' in size_data:
+                # With any file it read, for packb()
+                size_data['size_distribution'] = distribution.spec
             crud_profile = size_data_copy.get(
                 'crud_profile', self._scenario_data['crud_profile'])
-            crud_total = sum(crud_profile)
+            # Metadata operations are weighted on the same scale, after the
+            # CRUD ones (see bench_job())
+            op_profile = list(crud_profile) + self._metadata_weights(
+                size_data_copy.get(
+                    'metadata_profile',
+                    self._scenario_data.get('metadata_profile', {})))
+            op_total = sum(op_profile)
             size_data_copy['crud_pcts'] = [
-                float(c) / crud_total * 100 for c in crud_profile]
+                float(c) / op_total * 100 for c in crud_profile]
+            size_data_copy['metadata_pcts'] = [
+                float(c) / op_total * 100 for c in op_profile[4:]]
             # Calculate probability thresholds for each CRUD element for this
             # object size category (defaulting to global crud profile).
-            size_data_copy['crud_thresholds'] = [1, 1, 1, 1]
+            size_data_copy['crud_thresholds'] = [1] * len(op_profile)
             self._thresholds_for(size_data_copy['crud_thresholds'],
-                                 range(4), crud_profile)
+                                 range(len(op_profile)), op_profile)
+            size_data_copy['listing_limit'] = size_data_copy.get(
+                'listing_limit', self._scenario_data.get(
+                    'listing_limit', DEFAULT_LISTING_LIMIT))
+            if size_data_copy['listing_limit'] <= 0:
+                raise ValueError('listing_limit must be > 0')
+            if 'segment_size' in size_data_copy:
+                segmenting = self.segmenting[size_data_copy['name']] = dict(
+                    (key, size_data_copy[key])
+                    for key in ('segment_size', 'segment_concurrency')
+                    if key in size_data_copy)
+                if min(segmenting.values()) <= 0:
+                    raise ValueError('segment_size and segment_concurrency '
+                                     'must be > 0')
+            read_profile = size_data_copy.get(
+                'read_profile', self._scenario_data.get('read_profile'))
+            if read_profile:
+                self.read_patterns[size_data_copy['name']] = \
+                    self._read_patterns_for(size_data_copy, read_profile)
 
         # Calculate probability thresholds for each size (from the
         # initial_files)
@@ -132,6 +215,8 @@ class Scenario(object):
             'user_count': self.user_count,
             'operation_count': self.operation_count,
             'run_seconds': self.run_seconds,
+            'warmup_seconds': self.warmup_seconds,
+            'cooldown_seconds': self.cooldown_seconds,
             'container_base': self.container_base,
             'container_count': self.container_count,
             'container_concurrency': self.container_concurrency,
@@ -147,6 +232,8 @@ class Scenario(object):
                        user_count=data['user_count'],
                        operation_count=data['operation_count'],
                        run_seconds=data['run_seconds'],
+                       warmup_seconds=data.get('warmup_seconds'),
+                       cooldown_seconds=data.get('cooldown_seconds'),
                        version=data['version'],
                        _scenario_data=data['_scenario_data'])
         return scenario
@@ -164,8 +251,84 @@ class Scenario(object):
             last = last + float(data[idx]) / initial_sum
             target[idx] = last
 
+    def _metadata_weights(self, metadata_profile):
+        unknown = set(metadata_profile) - set(ssbench.METADATA_OPS)
+        if unknown:
+            raise ValueError(
+                'Unknown metadata operation(s) %s; valid ones are %s' % (
+                    ', '.join(sorted(unknown)),
+                    ', '.join(ssbench.METADATA_OPS)))
+        return [metadata_profile.get(op, 0) for op in ssbench.METADATA_OPS]
+
+    def _read_patterns_for(self, size_data, read_profile):
+        unknown = set(read_profile) - set(ssbench.READ_PATTERNS)
+        if unknown:
+            raise ValueError('Unknown read pattern(s) %s; valid ones are %s' %
+                             (', '.join(sorted(unknown)),
+                              ', '.join(ssbench.READ_PATTERNS)))
+        thresholds = OrderedDict()
+        self._thresholds_for(
+            thresholds, [pattern for pattern in ssbench.READ_PATTERNS
+                         if read_profile.get(pattern)], read_profile)
+        if not thresholds:
+            raise ValueError('read_profile for %r has no patterns' %
+                             size_data['name'])
+        params = dict(
+            (key, size_data.get(key, self._scenario_data.get(key, default)))
+            for key, default in READ_PATTERN_DEFAULTS)
+        if min(params.values()) <= 0:
+            raise ValueError('Bad read_profile parameters for %r: %r' %
+                             (size_data['name'], params))
+        # Each range needs a byte of the smallest object to itself
+        params['size_min'] = size_data['size_min']
+        if ssbench.MULTI_RANGE_READ in thresholds:
+            range_bytes_needed = params['range_count']
+        elif ssbench.RANGE_READ in thresholds:
+            range_bytes_needed = 1
+        else:
+            range_bytes_needed = 0
+        if params['size_min'] < range_bytes_needed:
+            raise ValueError('Objects of size %r are too small for their '
+                             'read_profile' % size_data['name'])
+        return thresholds, params
+
+    def _read_pattern(self, size_str):
+        """
+        :returns: Job keys for a READ_OBJECT of an object of the given size,
+                  in a pattern chosen at random from its read_profile (none
+                  if it hasn't one)
+        """
+        if size_str not in self.read_patterns:
+            return {}
+        thresholds, params = self.read_patterns[size_str]
+        r = random.random()  # uniform on [0, 1)
+        for pattern, prob in thresholds.iteritems():
+            if r < prob:
+                break
+        if pattern == ssbench.FULL_READ:
+            return {'read_pattern': pattern}
+        if pattern == ssbench.FIRST_BYTES_READ:
+            return {'read_pattern': pattern,
+                    'read_bytes': params['first_bytes']}
+        # Ranges lie within the smallest object of the size, so any object
+        # of it has them; a multi-range read has one in each of range_count
+        # equal parts of that, so none overlap.
+        if pattern == ssbench.MULTI_RANGE_READ:
+            count = params['range_count']
+        else:
+            count = 1
+        stride = params['size_min'] // count
+        length = min(params['range_size'], stride)
+        ranges = []
+        for i in xrange(count):
+            first = i * stride + random.randint(0, stride - length)
+            ranges.append((first, first + length - 1))
+        return {'read_pattern': pattern, 'ranges': ranges}
+
     def job(self, size_str, **kwargs):
         job = {'size_str': size_str}
+        if size_str in self.segmenting:
+            job.update(self.segmenting[size_str])
         job.update(kwargs)
         return job
 
@@ -181,15 +344,35 @@ class Scenario(object):
                         type=ssbench.CREATE_OBJECT,
                         container=container,
                         name='%s_%06d' % (size_str, i),
-                        size=random.randint(
-                            self.sizes_by_name[size_str]['size_min'],
-                            self.sizes_by_name[size_str]['size_max']),
+                        size=self.size_distributions[size_str].sample(),
                         block_size=self.block_size,
                         head_first=head_first)
 
+    def _metadata_job(self, size_str, op):
+        """
+        :returns: A job dict for one of the METADATA_OPS.  Object ones get
+                  their object from the RunState, like a READ_OBJECT; a
+                  container one is on a random container, and a listing is
+                  of (up to listing_limit) objects of the size, from a
+                  random one of its initial objects on.  It's delimited
+                  by "/", so a segmented object's "<name>/seg/<index>"
+                  segments show up (once) as just its "<name>/" subdir.
+        """
+        if op not in ssbench.CONTAINER_OPS:
+            return self.job(size_str, type=op)
+        container = random.choice(self.containers)
+        if op == ssbench.HEAD_CONTAINER:
+            return self.job(size_str, type=op, container=container)
+        initial_count = self._scenario_data['initial_files'].get(size_str, 0)
+        return self.job(
+            size_str, type=op, container=container, prefix=size_str + '_',
+            delimiter='/', limit=self.sizes_by_name[size_str]['listing_limit'],
+            marker='%s_%06d' % (size_str, random.randint(0, initial_count)))
+
     def bench_job(self, size_str, crud_index, i):
         """Creates a benchmark work job dict of a given size and crud "index"
-        (where 0 is Create, 1 is Read, etc.).
+        (where 0 is Create, 1 is Read, etc., and 4 and up are the
+        METADATA_OPS in order).
 
         :size_str: One of the size strings defined in the scenario file
         :crud_index: An index into the CRUD array (0 is Create, etc.)
@@ -201,16 +384,18 @@ class Scenario(object):
             return self.create_job(size_str, i)
         elif crud_index == 1:
             return self.job(size_str, type=ssbench.READ_OBJECT,
-                            block_size=self.block_size)
+                            block_size=self.block_size,
+                            **self._read_pattern(size_str))
         elif crud_index == 2:
             return self.job(
                 size_str, type=ssbench.UPDATE_OBJECT,
                 block_size=self.block_size,
-                size=random.randint(
-                    self.sizes_by_name[size_str]['size_min'],
-                    self.sizes_by_name[size_str]['size_max']))
+                size=self.size_distributions[size_str].sample())
         elif crud_index == 3:
             return self.job(size_str, type=ssbench.DELETE_OBJECT)
+        else:
+            return self._metadata_job(size_str,
+                                      ssbench.METADATA_OPS[crud_index - 4])
 
     def initial_jobs(self):
         """
@@ -238,56 +423,80 @@ class Scenario(object):
                     index_per_size[size_str] += 1
                     yielded = True
 
+    def random_bench_job(self, i):
+        """
+        Creates a benchmark work job dict with a size and CRUD type chosen
+        according to the scenario's probability thresholds.
+
+        :i: The job index
+        :returns: A dictionary representing benchmark work job
+        """
+        r = random.random()  # uniform on [0, 1)
+        for size_str, prob in self.bench_size_thresholds.iteritems():
+            if r < prob:
+                this_size_str = size_str
+                break
+        # Determine which C/R/U/D (or metadata) type this job will be
+        size_crud = self.sizes_by_name[this_size_str]['crud_thresholds']
+        r = random.random()  # uniform on [0, 1)
+        for crud_index, prob in enumerate(size_crud):
+            if r < prob:
+                this_crud_index = crud_index
+                break
+
+        return self.bench_job(this_size_str, this_crud_index, i)
+
     def bench_jobs(self):
         """
         Generator for the worker jobs necessary to actually run the scenario.
 
-        If self.run_seconds is set, jobs will be for about that many seconds,
-        regardless of any value for self.operation_count.
+        If self.warmup_seconds is set, jobs will first be yielded for about
+        that many seconds with a "phase" key of WARMUP_PHASE.
+
+        Then, if self.run_seconds is set, jobs will be for about that many
+        seconds, regardless of any value for self.operation_count.
 
         If self.run_seconds is not set, exactly self.operation_count jobs will
         be yielded.
 
+        Finally, if self.cooldown_seconds is set, jobs will be yielded for
+        about that many more seconds with a "phase" key of COOLDOWN_PHASE.
+
+        All durations are measured against a monotonic clock (no signals are
+        used), so they may be fractional and this generator may be used from
+        any thread, concurrently with other Scenario objects.
+
         :returns: A generator which yields job objects (dicts)
         """
 
         max_index_size = max(self._scenario_data['initial_files'].itervalues())
+        index = max_index_size + 1
 
-        keep_running = [True]
-        prev_alarm = None
-        if self.run_seconds:
-            def _stop_running(signal, frame):
-                keep_running[0] = False
-            prev_alarm = signal.signal(signal.SIGALRM, _stop_running)
-            signal.alarm(self.run_seconds)
+        if self.warmup_seconds:
+            warmup_end = monotonic_time() + self.warmup_seconds
+            while monotonic_time() < warmup_end:
+                job = self.random_bench_job(index)
+                job['phase'] = WARMUP_PHASE
+                yield job
+                index += 1
 
-        index = max_index_size + 1
-        yielded = 0
-        while (self.run_seconds and keep_running[0]) or \
-                yielded < self.operation_count:
-            r = random.random()  # uniform on [0, 1)
-            for size_str, prob in self.bench_size_thresholds.iteritems():
-                if r < prob:
-                    this_size_str = size_str
-                    break
-            # Determine which C/R/U/D type this job will be
-            size_crud = self.sizes_by_name[this_size_str]['crud_thresholds']
-            r = random.random()  # uniform on [0, 1)
-            for crud_index, prob in enumerate(size_crud):
-                if r < prob:
-                    this_crud_index = crud_index
-                    break
-
-            yield self.bench_job(this_size_str, this_crud_index, index)
-
-            index += 1
-            yielded += 1
-
-        if prev_alarm:
-            # Deliberately avoiding the complexity of tyring to handle a
-            # pre-existing alarm timer value, since that shouldn't be
-            # necessary for all known applications of Scenario.
-            signal.signal(signal.SIGALRM, prev_alarm)
+        if self.run_seconds:
+            run_end = monotonic_time() + self.run_seconds
+            while monotonic_time() < run_end:
+                yield self.random_bench_job(index)
+                index += 1
+        else:
+            for _ in xrange(self.operation_count):
+                yield self.random_bench_job(index)
+                index += 1
+
+        if self.cooldown_seconds:
+            cooldown_end = monotonic_time() + self.cooldown_seconds
+            while monotonic_time() < cooldown_end:
+                job = self.random_bench_job(index)
+                job['phase'] = COOLDOWN_PHASE
+                yield job
+                index += 1
 
 
 class ScenarioNoop(Scenario):
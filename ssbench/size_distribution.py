@@ -0,0 +1,190 @@
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+How a scenario's size class picks the sizes of the objects it creates and
+updates (its "size_distribution"):
+
+  - uniform (the default): any size from size_min to size_max, all equally
+    likely;
+  - lognormal: log-normally distributed around a "median" size, with
+    "sigma" the standard deviation of the sizes' logarithms;
+  - pareto: Pareto-distributed from size_min up, with shape "alpha" (the
+    smaller it is, the heavier the tail);
+  - fixed: one of a list of "sizes", with relative "weights" (by default,
+    all equally likely);
+  - empirical: following a CSV "file", e.g. of sizes measured in
+    production: one "size,count" row per size (its "format" is
+    "histogram", the default), or one "size,cumulative fraction" row per
+    point of a CDF (format "cdf"), between which sizes are interpolated.
+
+Sizes outside size_min..size_max are clamped to them.
+"""
+
+import os
+import csv
+import math
+import random
+from bisect import bisect_left, bisect_right
+
+
+UNIFORM = 'uniform'
+LOG_NORMAL = 'lognormal'
+PARETO = 'pareto'
+FIXED = 'fixed'
+EMPIRICAL = 'empirical'
+DISTRIBUTIONS = (UNIFORM, LOG_NORMAL, PARETO, FIXED, EMPIRICAL)
+
+HISTOGRAM_FORMAT = 'histogram'
+CDF_FORMAT = 'cdf'
+
+# Sizes are drawn this many at a time, so the master's job generation pays
+# for the distribution's set-up (and Python's per-call overhead) once per
+# batch rather than once per job
+SAMPLE_BATCH = 1024
+
+
+def read_points(path):
+    """
+    :returns: [[size, value], ...] from the rows of a CSV file (a row whose
+              first column isn't a number, like a header, is skipped)
+    """
+    points = []
+    with open(path, 'rb') as fp:
+        for row in csv.reader(fp):
+            try:
+                points.append([int(row[0]), float(row[1])])
+            except (ValueError, IndexError):
+                continue
+    return points
+
+
+class SizeDistribution(object):
+    """
+    One size class's distribution of object sizes.  Its ``spec`` is the
+    scenario's, with an empirical distribution's file read into its
+    "points", so the scenario saved with a run's results has everything
+    needed to draw the same sizes.
+    """
+    def __init__(self, size_min, size_max, spec=None, base_dir=None):
+        self.size_min = size_min
+        self.size_max = size_max
+        self.spec = dict(spec or {})
+        self.kind = self.spec.get('type', UNIFORM)
+        if self.kind not in DISTRIBUTIONS:
+            raise ValueError('Unknown size distribution %r; valid ones are '
+                             '%s' % (self.kind, ', '.join(DISTRIBUTIONS)))
+        if size_min > size_max:
+            raise ValueError('size_min must be <= size_max')
+        self._draw = getattr(self, '_%s_sampler' % self.kind)(base_dir)
+        self._batch = []
+
+    def _param(self, name):
+        value = self.spec.get(name)
+        if not isinstance(value, (int, long, float)) or value <= 0:
+            raise ValueError('A %s size distribution needs a %r > 0' % (
+                self.kind, name))
+        return value
+
+    def _clamped(self, size):
+        return min(self.size_max, max(self.size_min, int(size)))
+
+    def _uniform_sampler(self, base_dir):
+        size_min, span = self.size_min, self.size_max - self.size_min + 1
+        random_ = random.random
+        return lambda count: [size_min + int(random_() * span)
+                              for _ in xrange(count)]
+
+    def _lognormal_sampler(self, base_dir):
+        mu = math.log(self._param('median'))
+        sigma = self._param('sigma')
+        clamped, lognormvariate = self._clamped, random.lognormvariate
+        return lambda count: [clamped(lognormvariate(mu, sigma))
+                              for _ in xrange(count)]
+
+    def _pareto_sampler(self, base_dir):
+        alpha = self._param('alpha')
+        scale = self.size_min or 1
+        clamped, paretovariate = self._clamped, random.paretovariate
+        return lambda count: [clamped(scale * paretovariate(alpha))
+                              for _ in xrange(count)]
+
+    def _weighted_sampler(self, sizes, weights):
+        if not sizes or len(sizes) != len(weights) or \
+                min(weights) < 0 or not sum(weights):
+            raise ValueError('A %s size distribution needs sizes with '
+                             'weights >= 0 (and not all 0)' % self.kind)
+        sizes = map(self._clamped, sizes)
+        cumulative = []
+        total = 0.0
+        for weight in weights:
+            total += weight
+            cumulative.append(total)
+        random_ = random.random
+        return lambda count: [sizes[bisect_right(cumulative,
+                                                 random_() * total)]
+                              for _ in xrange(count)]
+
+    def _fixed_sampler(self, base_dir):
+        sizes = self.spec.get('sizes') or []
+        return self._weighted_sampler(
+            sizes, self.spec.get('weights') or [1] * len(sizes))
+
+    def _empirical_sampler(self, base_dir):
+        if 'points' not in self.spec:
+            if 'file' not in self.spec:
+                raise ValueError('An empirical size distribution needs a '
+                                 '"file"')
+            self.spec['points'] = read_points(
+                os.path.join(base_dir or '', self.spec.pop('file')))
+        points = sorted(self.spec['points'])
+        if self.spec.get('format', HISTOGRAM_FORMAT) == HISTOGRAM_FORMAT:
+            return self._weighted_sampler([size for size, _ in points],
+                                          [count for _, count in points])
+        if self.spec['format'] != CDF_FORMAT:
+            raise ValueError('An empirical size distribution\'s format is '
+                             '%s or %s' % (HISTOGRAM_FORMAT, CDF_FORMAT))
+        sizes = [size for size, _ in points]
+        fractions = [fraction for _, fraction in points]
+        if not points or fractions != sorted(fractions) or \
+                fractions[0] < 0 or not fractions[-1]:
+            raise ValueError('An empirical size distribution\'s CDF must '
+                             'rise from 0 (or more) with size')
+        clamped, random_ = self._clamped, random.random
+        top = fractions[-1]
+
+        def _draw(count):
+            drawn = []
+            for _ in xrange(count):
+                fraction = random_() * top
+                i = bisect_left(fractions, fraction)
+                if i == 0:
+                    drawn.append(clamped(sizes[0]))
+                    continue
+                # Interpolated between the points either side
+                low, high = fractions[i - 1], fractions[i]
+                drawn.append(clamped(sizes[i - 1] + (
+                    sizes[i] - sizes[i - 1]) * (fraction - low) /
+                    (high - low)))
+            return drawn
+        return _draw
+
+    def sample(self):
+        """:returns: An object size (in bytes)"""
+        try:
+            return self._batch.pop()
+        except IndexError:
+            self._batch = self._draw(SAMPLE_BATCH)
+            return self._batch.pop()
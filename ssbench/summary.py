@@ -0,0 +1,284 @@
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+"Summary results" let workers aggregate their results locally instead of
+sending every result dict to the master, for runs at very high operation
+rates.
+
+A summarizing worker sends the master a dict instead of a list of results::
+
+  {'done': [job_id, ...],     # jobs which succeeded
+   'failed': [job_id, ...],   # jobs which raised an exception
+   'summary': SUMMARY}        # at most once per SUMMARY_INTERVAL, and
+                              # whenever the worker runs out of jobs
+
+The master needs only the job IDs to keep the run going, and it writes each
+SUMMARY to the results file, where it takes the place of the results it
+summarizes::
+
+  {'worker_id': 1,
+   'buckets': [BUCKET, ...],
+   'samples': [result, ...]}  # raw results for some failures
+
+with one BUCKET per (second, operation, size, phase)::
+
+  {'second': 1324372892,      # int(completed_at)
+   'type': 'get_object', 'size_str': 'large', 'phase': None,
+   'count': 1, 'errors': 0, 'retries': 0,
+   'timeouts': 1,             # errors which ran past their deadline (if any)
+   'segmented': [1, 8, 4900000],  # objects uploaded in segments, their
+                                  # segments and bytes (if any)
+   'pattern_bytes': {'range': 1048576},  # bytes read by reads with each
+                                         # read pattern (if any)
+   'sent_bytes': 0,           # bytes successful requests sent and
+   'received_bytes': 4900000, # received (see sent_bytes() and
+                              # received_bytes())
+   'start': 1324372891.4,     # earliest completed_at - last_byte_latency
+   'stop': 1324372892.36,     # latest completed_at
+   'auth': [1, 0.2, 0.2],     # count, total and max auth_latency
+   'first_byte_latency': LATENCY,
+   'last_byte_latency': LATENCY,
+   'timings': {              # only those of ALL_TIMING_TYPES any results had
+       'connect_latency': LATENCY, ...}}
+
+and each LATENCY holding the count, mean and sum of squared deviations of
+the (non-zero) latencies, a LogHistogram.packable() of them and the worst
+latency with its transaction ID, all of which merge without loss across
+buckets, workers and reporting processes.
+"""
+
+import time
+
+import ssbench
+from ssbench.histogram import LogHistogram
+
+
+# A summarizing worker sends its buckets at least this often (seconds)
+SUMMARY_INTERVAL = 1.0
+# Send at most this many raw results for failed requests per summary
+MAX_ERROR_SAMPLES = 10
+
+LATENCY_TYPES = ('first_byte_latency', 'last_byte_latency')
+# The parts of a request's time its result may break down (see
+# ssbench.swift_client); a new connection's connect and TLS handshake times
+# are reported with the first request made on it, and a PUT's wait for 100
+# Continue only if it asked for one.
+TIMING_TYPES = ('connect_latency', 'tls_latency', 'continue_latency',
+                'send_latency', 'wait_latency', 'receive_latency')
+# Only the results of retried requests have these (see
+# Worker.ignoring_http_responses()): how long their first (failed) attempt
+# took, and how long from its start to the end of the one which succeeded.
+RETRY_LATENCY_TYPES = ('first_attempt_latency', 'end_to_end_latency')
+# Only the results of segmented uploads have these (see
+# Worker._upload_segmented()): each segment's PUT (a list of them), the
+# manifest's PUT, and the whole upload.
+SEGMENT_LATENCY_TYPES = ('segment_latency', 'manifest_latency',
+                         'object_latency')
+# Only reads with a read pattern (see ssbench.READ_PATTERNS) have one of
+# these: their last-byte latency again.
+READ_PATTERN_LATENCY_TYPES = tuple('%s_read_latency' % pattern
+                                   for pattern in ssbench.READ_PATTERNS)
+# Everything kept in a bucket's (or a report's) 'timings'
+ALL_TIMING_TYPES = TIMING_TYPES + RETRY_LATENCY_TYPES + \
+    SEGMENT_LATENCY_TYPES + READ_PATTERN_LATENCY_TYPES
+
+
+def sent_bytes(result):
+    """
+    :returns: The bytes a successful result's request sent (a PUT's body)
+    """
+    if 'sent_bytes' in result:
+        return result['sent_bytes']
+    # Results from before requests counted what they sent
+    if result['type'] in (ssbench.CREATE_OBJECT, ssbench.UPDATE_OBJECT):
+        return int(result.get('size') or 0)
+    return 0
+
+
+def received_bytes(result):
+    """
+    :returns: The bytes a successful result's request received (a GET's
+              body, or a container listing)
+    """
+    return result.get('received_bytes', 0)
+
+
+def iter_timings(result):
+    """
+    :returns: An iterator of (timing type, latency) for each of
+              ALL_TIMING_TYPES the result has, once for each latency in a
+              list of them
+    """
+    for timing_type in ALL_TIMING_TYPES:
+        timing = result.get(timing_type)
+        if timing is None:
+            continue
+        if isinstance(timing, (list, tuple)):
+            for latency in timing:
+                yield timing_type, latency
+        else:
+            yield timing_type, timing
+
+
+class _LatencySummary(object):
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.sum_sq_dev = 0.0
+        self.histogram = LogHistogram()
+        self.worst = None  # (latency, trans_id)
+
+    def add(self, latency, trans_id):
+        if latency is None:
+            return
+        if self.worst is None or latency > self.worst[0]:
+            self.worst = (latency, trans_id)
+        if not latency:
+            # The reporter ignores zero latencies
+            return
+        # Welford's online algorithm, like the reporter's accumulators
+        self.count += 1
+        delta = latency - self.mean
+        self.mean += delta / self.count
+        self.sum_sq_dev += delta * (latency - self.mean)
+        self.histogram.record(latency)
+
+    def packable(self):
+        return dict(count=self.count, mean=self.mean,
+                    sum_sq_dev=self.sum_sq_dev,
+                    histogram=self.histogram.packable(), worst=self.worst)
+
+
+class _Bucket(object):
+    def __init__(self, second, job_type, size_str, phase):
+        self.key = dict(second=second, type=job_type, size_str=size_str,
+                        phase=phase)
+        self.count = self.errors = self.retries = 0
+        self.sent_bytes = self.received_bytes = 0
+        self.timeouts = 0
+        self.segmented = [0, 0, 0]
+        self.pattern_bytes = {}
+        self.start = None
+        self.stop = None
+        self.auth = [0, 0.0, 0.0]
+        self.latencies = dict((latency_type, _LatencySummary())
+                              for latency_type in LATENCY_TYPES)
+        self.timings = {}
+
+    def add(self, result):
+        completed_at = result['completed_at']
+        if self.stop is None or completed_at > self.stop:
+            self.stop = completed_at
+        self.count += 1
+        self.retries += int(result.get('retries', 0))
+        auth_latency = result.get('auth_latency')
+        if auth_latency:
+            self.auth[0] += 1
+            self.auth[1] += auth_latency
+            self.auth[2] = max(self.auth[2], auth_latency)
+        if 'exception' in result:
+            self.errors += 1
+            if result.get('timed_out'):
+                self.timeouts += 1
+            return
+        self.sent_bytes += sent_bytes(result)
+        self.received_bytes += received_bytes(result)
+        if result.get('segments'):
+            self.segmented[0] += 1
+            self.segmented[1] += result['segments']
+            self.segmented[2] += int(result['size'])
+        if 'read_pattern' in result:
+            self.pattern_bytes[result['read_pattern']] = \
+                result.get('received_bytes', 0) + \
+                self.pattern_bytes.get(result['read_pattern'], 0)
+        start = completed_at - result['last_byte_latency']
+        if self.start is None or start < self.start:
+            self.start = start
+        for latency_type, latency_summary in self.latencies.iteritems():
+            latency_summary.add(result[latency_type], result.get('trans_id'))
+        for timing_type, timing in iter_timings(result):
+            timing_summary = self.timings.get(timing_type)
+            if timing_summary is None:
+                timing_summary = self.timings[timing_type] = \
+                    _LatencySummary()
+            timing_summary.add(timing, result.get('trans_id'))
+
+    def packable(self):
+        packable = dict(self.key, count=self.count, errors=self.errors,
+                        retries=self.retries, sent_bytes=self.sent_bytes,
+                        received_bytes=self.received_bytes,
+                        start=self.start, stop=self.stop, auth=self.auth)
+        for latency_type, latency_summary in self.latencies.iteritems():
+            packable[latency_type] = latency_summary.packable()
+        if self.timeouts:
+            packable['timeouts'] = self.timeouts
+        if self.segmented[0]:
+            packable['segmented'] = self.segmented
+        if self.pattern_bytes:
+            packable['pattern_bytes'] = self.pattern_bytes
+        if self.timings:
+            packable['timings'] = dict(
+                (timing_type, timing_summary.packable())
+                for timing_type, timing_summary in self.timings.iteritems())
+        return packable
+
+
+class ResultSummary(object):
+    """
+    One worker's results, aggregated into buckets since they were last
+    flushed.
+    """
+    def __init__(self, worker_id):
+        self.worker_id = worker_id
+        self.flushed_at = time.time()
+        self._reset()
+
+    def _reset(self):
+        self.buckets = {}
+        self.samples = []
+
+    def __len__(self):
+        return sum(bucket.count for bucket in self.buckets.itervalues())
+
+    def add(self, result):
+        key = (int(result['completed_at']), result['type'],
+               result['size_str'], result.get('phase'))
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = _Bucket(*key)
+        bucket.add(result)
+        if 'exception' in result and \
+                len(self.samples) < MAX_ERROR_SAMPLES:
+            self.samples.append(result)
+
+    def due(self, now):
+        return now - self.flushed_at >= SUMMARY_INTERVAL
+
+    def flush(self, now=None):
+        """
+        :returns: A SUMMARY dict of everything added since the last flush,
+                  or None if nothing was
+        """
+        self.flushed_at = now or time.time()
+        if not self.buckets:
+            return None
+        summary = dict(
+            worker_id=self.worker_id,
+            buckets=[self.buckets[key].packable()
+                     for key in sorted(self.buckets)],
+            samples=self.samples)
+        self._reset()
+        return summary
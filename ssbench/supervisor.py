@@ -0,0 +1,160 @@
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sys
+import time
+import errno
+import signal
+import logging
+import multiprocessing
+
+from ssbench.util import set_cpu_affinity
+from ssbench.base_worker import SUICIDE_EXIT_STATUS
+
+
+# Worker process i of worker N reports results as worker N * 1000 + i
+WORKER_ID_MULTIPLIER = 1000
+
+
+def derived_worker_id(worker_id, index, processes):
+    """
+    :returns: The worker ID a worker process should use; a single process
+              keeps the ID it was given.
+    """
+    if processes == 1:
+        return worker_id
+    return worker_id * WORKER_ID_MULTIPLIER + index
+
+
+def split_concurrency(concurrency, processes):
+    """
+    Split a total concurrency as evenly as possible between some number of
+    processes; the first ``concurrency % processes`` get one extra.
+    """
+    share, extra = divmod(concurrency, processes)
+    return [share + 1 if i < extra else share for i in xrange(processes)]
+
+
+class WorkerSupervisor:
+    """
+    Fork a group of worker processes sharing one worker ID (and so one set
+    of ZMQ endpoints), restarting any which die unexpectedly.
+
+    The worker_factory is called in each child process with its derived
+    worker ID and concurrency and must return an object with a go() method
+    (i.e. a Worker).  It is only called after the fork, so no ZMQ context or
+    gevent hub is ever shared between processes.
+    """
+    def __init__(self, worker_factory, worker_id, processes, concurrency,
+                 pin_cpus=False, restart_delay=1.0):
+        if processes > concurrency:
+            logging.warning('Only starting %d worker processes for a '
+                            'concurrency of %d', concurrency, concurrency)
+            processes = concurrency
+        self.worker_factory = worker_factory
+        self.worker_id = worker_id
+        self.processes = processes
+        self.concurrencies = split_concurrency(concurrency, processes)
+        self.pin_cpus = pin_cpus
+        self.restart_delay = restart_delay
+        self.children = {}  # pid -> process index
+        self.stopping = False
+
+    def run(self):
+        """
+        Start every worker process and supervise them until all have exited
+        cleanly (or on SUICIDE) or this process is asked to stop.
+        """
+        previous_handlers = dict(
+            (signum, signal.signal(signum, self._stop))
+            for signum in (signal.SIGTERM, signal.SIGINT))
+        try:
+            for index in xrange(self.processes):
+                self._spawn(index)
+            self._supervise()
+        finally:
+            for signum, handler in previous_handlers.iteritems():
+                signal.signal(signum, handler)
+
+    def _supervise(self):
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, 0)
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                if e.errno == errno.ECHILD:
+                    break
+                raise
+            index = self.children.pop(pid, None)
+            if index is None or self.stopping:
+                continue
+            worker_id = derived_worker_id(self.worker_id, index,
+                                          self.processes)
+            if os.WIFEXITED(status) and os.WEXITSTATUS(status) in (
+                    0, SUICIDE_EXIT_STATUS):
+                logging.info('Worker %d (pid %d) exited', worker_id, pid)
+                continue
+            if os.WIFSIGNALED(status):
+                how = 'was killed by signal %d' % os.WTERMSIG(status)
+            else:
+                how = 'exited with status %d' % os.WEXITSTATUS(status)
+            logging.warning('Worker %d (pid %d) %s; restarting in %gs',
+                            worker_id, pid, how, self.restart_delay)
+            time.sleep(self.restart_delay)
+            if not self.stopping:
+                self._spawn(index)
+
+    def _spawn(self, index):
+        worker_id = derived_worker_id(self.worker_id, index, self.processes)
+        pid = os.fork()
+        if pid:
+            logging.info('Started worker %d (pid %d, concurrency %d)',
+                         worker_id, pid, self.concurrencies[index])
+            self.children[pid] = index
+            return pid
+
+        status = 1
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            # Only a gevent Worker's process has a hub (the threaded engine
+            # doesn't need gevent installed)
+            gevent = sys.modules.get('gevent')
+            if gevent is not None:
+                gevent.reinit()
+            if self.pin_cpus:
+                cpu = index % multiprocessing.cpu_count()
+                if not set_cpu_affinity(cpu):
+                    logging.warning('Worker %d could not be pinned to CPU %d',
+                                    worker_id, cpu)
+            worker = self.worker_factory(worker_id,
+                                         self.concurrencies[index])
+            worker.go()
+            status = 0
+        except Exception:
+            logging.exception('Worker %d crashed', worker_id)
+        finally:
+            os._exit(status)
+
+    def _stop(self, signum, frame):
+        logging.info('Stopping %d worker processes...', len(self.children))
+        self.stopping = True
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
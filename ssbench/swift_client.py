@@ -29,9 +29,8 @@ from functools import wraps
 from urllib import quote as _quote
 from urlparse import urlparse, urlunparse
 
+import httplib
 from httplib import HTTPException
-from geventhttpclient.httplib import HTTPConnection, HTTPSConnection
-from gevent import sleep
 
 
 logger = logging.getLogger("swiftclient")
@@ -41,6 +40,10 @@ logger = logging.getLogger("swiftclient")
 # get_object or put_object or whatever).
 DEFAULT_CONNECT_TIMEOUT = 10.0
 DEFAULT_NETWORK_TIMEOUT = 20.0
+# How long a PUT with "Expect: 100-continue" waits for 100 Continue before
+# sending its body anyway, as RFC 7231 5.1.1 says to (a server, or a
+# middlebox, may ignore Expect); like curl's default
+DEFAULT_CONTINUE_TIMEOUT = 1.0
 
 
 def http_log(args, kwargs, resp, body):
@@ -152,25 +155,35 @@ class ClientException(Exception):
         return b and '%s: %s' % (a, b) or a
 
 
-def http_connection(url, proxy=None, connect_timeout=DEFAULT_CONNECT_TIMEOUT):
+def http_connection(url, proxy=None, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                    connection_classes=None):
     """
     Make an HTTPConnection or HTTPSConnection
 
     :param url: url to connect to
     :param proxy: proxy to connect through, if any; None by default; str of the
                   format 'http://127.0.0.1:8888' to set one
+    :param connection_classes: (HTTPConnection, HTTPSConnection) classes to
+                               use instead of geventhttpclient's, e.g.
+                               httplib's
     :returns: tuple of (parsed url, connection object)
     :raises ClientException: Unable to handle protocol scheme
     """
+    if connection_classes is None:
+        # Imported only as needed, so the threaded engine (which passes
+        # httplib's) doesn't need gevent
+        from geventhttpclient.httplib import HTTPConnection, HTTPSConnection
+        connection_classes = (HTTPConnection, HTTPSConnection)
+    http_class, https_class = connection_classes
     url = encode_utf8(url)
     parsed = urlparse(url)
     proxy_parsed = urlparse(proxy) if proxy else None
     if parsed.scheme == 'http':
-        conn = HTTPConnection(
+        conn = http_class(
             (proxy_parsed if proxy else parsed).netloc,
             timeout=connect_timeout)
     elif parsed.scheme == 'https':
-        conn = HTTPSConnection(
+        conn = https_class(
             (proxy_parsed if proxy else parsed).netloc,
             timeout=connect_timeout)
     else:
@@ -200,6 +213,56 @@ def http_connection(url, proxy=None, connect_timeout=DEFAULT_CONNECT_TIMEOUT):
     return parsed, conn
 
 
+def connect(conn):
+    """
+    Connect an HTTPConnection or HTTPSConnection (geventhttpclient's or
+    httplib's) like its connect() method would, timing the TCP connection and
+    the TLS handshake separately.
+
+    :param conn: connection object, not yet connected
+    :returns: tuple of (TCP connect seconds, TLS handshake seconds or None)
+    """
+    start = time()
+    # A geventhttpclient connection can only have come from its (already
+    # imported) module
+    green_httplib = sys.modules.get('geventhttpclient.httplib')
+    green = green_httplib is not None and \
+        isinstance(conn, green_httplib.HTTPConnection)
+    if not (isinstance(conn, httplib.HTTPSConnection) or
+            green and isinstance(conn, green_httplib.HTTPSConnection)):
+        conn.connect()
+        return time() - start, None
+    if green:
+        import gevent.socket
+        sock = gevent.socket.create_connection(
+            (conn.host, conn.port), conn.timeout, conn.source_address)
+    else:
+        sock = socket.create_connection(
+            (conn.host, conn.port), conn.timeout, conn.source_address)
+    connected = time()
+    if conn._tunnel_host:
+        conn.sock = sock
+        conn._tunnel()
+    if green:
+        import gevent.ssl
+        conn.sock = gevent.ssl.wrap_socket(sock, conn.key_file,
+                                           conn.cert_file)
+    else:
+        # httplib's also checks the server's certificate
+        conn.sock = conn._context.wrap_socket(
+            sock, server_hostname=conn._tunnel_host or conn.host)
+    return connected - start, time() - connected
+
+
+def _connect_if_closed(conn):
+    """
+    Connect (see connect()) a connection which isn't, as its next request
+    would have, so the time that takes is reported with the request.
+    """
+    if conn.sock is None:
+        conn.connect_latencies = connect(conn)
+
+
 def get_auth_1_0(url, user, key, snet):
     parsed, conn = http_connection(url)
     method = 'GET'
@@ -473,7 +536,8 @@ def get_container(url, token, container, marker=None, limit=None,
     :param full_listing: if True, return a full listing, else returns a max
                          of 10000 listings
     :returns: a tuple of (response headers, a list of objects) The response
-              headers will be a dict and all header names will be lowercase.
+              headers will be a dict and all header names will be lowercase;
+              they include the number of body bytes read.
     :raises ClientException: HTTP GET request failed
     """
     if not http_conn:
@@ -505,9 +569,14 @@ def get_container(url, token, container, marker=None, limit=None,
         qs += '&delimiter=%s' % quote(delimiter)
     headers = {'X-Auth-Token': token}
     method = 'GET'
+    _connect_if_closed(conn)
+    start_time = time()
     conn.request(method, '%s?%s' % (path, qs), '', headers)
+    sent = time()
     resp = conn.getresponse()
+    headers_at = time()
     body = resp.read()
+    done = time()
     http_log(('%s?%s' % (url, qs), method,), {'headers': headers}, resp, body)
 
     if resp.status < 200 or resp.status >= 300:
@@ -517,9 +586,10 @@ def get_container(url, token, container, marker=None, limit=None,
                               http_query=qs, http_status=resp.status,
                               http_reason=resp.reason,
                               http_response_content=body)
-    resp_headers = {}
-    for header, value in resp.getheaders():
-        resp_headers[header.lower()] = value
+    resp_headers = _decorated_response_headers(
+        resp, last_byte_latency=done - start_time, conn=conn,
+        timestamps=(start_time, sent, headers_at, done))
+    resp_headers['x-swiftstack-received-bytes'] = len(body)
     if resp.status == 204:
         return resp_headers, []
     return resp_headers, json_loads(body)
@@ -547,9 +617,14 @@ def head_container(url, token, container, http_conn=None, headers=None):
     req_headers = {'X-Auth-Token': token}
     if headers:
         req_headers.update(headers)
+    _connect_if_closed(conn)
+    start_time = time()
     conn.request(method, path, '', req_headers)
+    sent = time()
     resp = conn.getresponse()
+    headers_at = time()
     body = resp.read()
+    done = time()
     http_log(('%s%s' % (url.replace(parsed.path, ''), path), method,),
              {'headers': req_headers}, resp, body)
 
@@ -559,10 +634,9 @@ def head_container(url, token, container, http_conn=None, headers=None):
                               http_port=conn.port, http_path=path,
                               http_status=resp.status, http_reason=resp.reason,
                               http_response_content=body)
-    resp_headers = {}
-    for header, value in resp.getheaders():
-        resp_headers[header.lower()] = value
-    return resp_headers
+    return _decorated_response_headers(
+        resp, last_byte_latency=done - start_time, conn=conn,
+        timestamps=(start_time, sent, headers_at, done))
 
 
 def put_container(url, token, container, headers=None, http_conn=None):
@@ -667,7 +741,7 @@ def delete_container(url, token, container, http_conn=None):
 
 
 def get_object(url, token, container, name, http_conn=None,
-               resp_chunk_size=65536):
+               resp_chunk_size=65536, ranges=None, read_bytes=None):
     """
     Modified for benchmarking to GET an object in "chunk sizes" of
     resp_chunk_size, throwing away the actual contents.
@@ -679,7 +753,13 @@ def get_object(url, token, container, name, http_conn=None,
     :param http_conn: HTTP connection object (If None, it will create the
                       conn object)
     :param resp_chunk_size: chunk size of data to read; defaults to 65536.
-    :returns: benchmarking-decorated response headers.
+    :param ranges: list of (first, last) byte positions to ask for (in a
+                   Range header), instead of the whole object
+    :param read_bytes: stop after reading this many bytes of the body; if
+                       there was more, the connection is closed, as it can't
+                       be used again
+    :returns: benchmarking-decorated response headers, including the number
+              of body bytes read
     :raises ClientException: HTTP GET request failed
     """
     if http_conn:
@@ -689,10 +769,16 @@ def get_object(url, token, container, name, http_conn=None,
     path = '%s/%s/%s' % (parsed.path, quote(container), quote(name))
     method = 'GET'
     headers = {'X-Auth-Token': token}
+    if ranges:
+        headers['Range'] = 'bytes=' + ','.join(
+            '%d-%d' % (first, last) for first, last in ranges)
+    _connect_if_closed(conn)
     start = time()
     conn.request(method, path, '', headers)
+    sent = time()
     resp = conn.getresponse()
-    first_byte_latency = time() - start
+    headers_at = time()
+    first_byte_latency = headers_at - start
     if resp.status < 200 or resp.status >= 300:
         body = resp.read()
         http_log(('%s%s' % (url.replace(parsed.path, ''), path), method,),
@@ -703,25 +789,68 @@ def get_object(url, token, container, name, http_conn=None,
                               http_reason=resp.reason,
                               http_response_content=body)
     last_byte_latency = None
-    buf = True
-    while buf:
-        buf = resp.read(resp_chunk_size)
-    last_byte_latency = time() - start
+    received = 0
+    if read_bytes is None:
+        buf = True
+        while buf:
+            buf = resp.read(resp_chunk_size)
+            received += len(buf)
+    else:
+        while received < read_bytes:
+            buf = resp.read(min(resp_chunk_size or read_bytes,
+                                read_bytes - received))
+            if not buf:
+                break
+            received += len(buf)
+    done = time()
+    last_byte_latency = done - start
     resp_headers = _decorated_response_headers(
         resp, first_byte_latency=first_byte_latency,
-        last_byte_latency=last_byte_latency)
+        last_byte_latency=last_byte_latency, conn=conn,
+        timestamps=(start, sent, headers_at, done))
+    resp_headers['x-swiftstack-received-bytes'] = received
+    if read_bytes is not None and \
+            received < int(resp_headers.get('content-length', received + 1)):
+        # The rest of the body is still coming
+        resp.close()
+        conn.close()
     http_log(('%s%s' % (url.replace(parsed.path, ''), path), method,),
              {'headers': headers}, resp, None)
     return resp_headers
 
 
 def _decorated_response_headers(resp, first_byte_latency=None,
-                                last_byte_latency=None):
+                                last_byte_latency=None, conn=None,
+                                timestamps=None, continue_latency=None):
+    """
+    :param conn: the request's connection; if _connect_if_closed() or
+                 ConnectionPool.create() just made it, its connect (and TLS
+                 handshake) latencies are reported, once
+    :param timestamps: tuple of the times the request started, finished
+                       being sent, got its response headers and got the last
+                       byte of the response body, for the send, wait and
+                       receive latencies
+    :param continue_latency: seconds a PUT waited for 100 Continue; its
+                             send latency then starts when that came
+    """
     resp_headers = {}
     if first_byte_latency is not None:
         resp_headers['x-swiftstack-first-byte-latency'] = first_byte_latency
     if last_byte_latency is not None:
         resp_headers['x-swiftstack-last-byte-latency'] = last_byte_latency
+    connect_latencies = getattr(conn, 'connect_latencies', None)
+    if connect_latencies:
+        conn.connect_latencies = None
+        resp_headers['x-swiftstack-connect-latency'] = connect_latencies[0]
+        if connect_latencies[1] is not None:
+            resp_headers['x-swiftstack-tls-latency'] = connect_latencies[1]
+    if continue_latency is not None:
+        resp_headers['x-swiftstack-continue-latency'] = continue_latency
+    if timestamps:
+        start, sent, headers_at, done = timestamps
+        resp_headers['x-swiftstack-send-latency'] = sent - start
+        resp_headers['x-swiftstack-wait-latency'] = headers_at - sent
+        resp_headers['x-swiftstack-receive-latency'] = done - headers_at
     for header, value in resp.getheaders():
         resp_headers[header.lower()] = value
     return resp_headers
@@ -748,10 +877,14 @@ def head_object(url, token, container, name, http_conn=None):
     path = '%s/%s/%s' % (parsed.path, quote(container), quote(name))
     method = 'HEAD'
     headers = {'X-Auth-Token': token}
+    _connect_if_closed(conn)
     start_time = time()
     conn.request(method, path, '', headers)
+    sent = time()
     resp = conn.getresponse()
+    headers_at = time()
     body = resp.read()
+    done = time()
     http_log(('%s%s' % (url.replace(parsed.path, ''), path), method,),
              {'headers': headers}, resp, body)
     if resp.status < 200 or resp.status >= 300:
@@ -760,14 +893,75 @@ def head_object(url, token, container, name, http_conn=None):
                               http_path=path, http_status=resp.status,
                               http_reason=resp.reason,
                               http_response_content=body)
-    now = time()
     return _decorated_response_headers(
-        resp, last_byte_latency=now - start_time)
+        resp, last_byte_latency=done - start_time, conn=conn,
+        timestamps=(start_time, sent, headers_at, done))
+
+
+def _read_interim_response(conn, timeout=None):
+    """
+    Read the response a server sends to a request's "Expect: 100-continue"
+    headers: normally 100 Continue, but perhaps a final response rejecting the
+    request before its body was sent.  Nothing else is sent until the body
+    is, so this reads straight from the socket.
+
+    :param timeout: give up if the response hasn't started after this many
+                    seconds (once it has, the network timeout applies)
+    :returns: tuple of (status, reason), or None if the wait timed out
+    """
+    head = ''
+    network_timeout = conn.sock.gettimeout()
+    if timeout is not None:
+        conn.sock.settimeout(timeout)
+    try:
+        while '\r\n\r\n' not in head:
+            try:
+                data = conn.sock.recv(1024)
+            except socket.timeout:
+                if head or timeout is None:
+                    raise
+                return None
+            if not data:
+                raise httplib.BadStatusLine(head)
+            conn.sock.settimeout(network_timeout)
+            head += data
+    finally:
+        conn.sock.settimeout(network_timeout)
+    status_line = head.split('\r\n', 1)[0]
+    try:
+        version, status, reason = (status_line.split(None, 2) + [''])[:3]
+        return int(status), reason
+    except ValueError:
+        raise httplib.BadStatusLine(status_line)
+
+
+def _skip_late_continue(conn):
+    """
+    Read a 100 Continue which only came after a PUT gave up waiting for it
+    and sent its body, if one did, so it isn't taken for the final response
+    (geventhttpclient's responses, unlike httplib's, don't skip it).
+    """
+    try:
+        status_line = conn.sock.recv(12, socket.MSG_PEEK)
+    except ValueError:
+        # SSL sockets can't peek
+        return
+    if status_line.split()[1:] != ['100']:
+        return
+    # Byte by byte, so none of the final response is read
+    head = ''
+    while not head.endswith('\r\n\r\n'):
+        data = conn.sock.recv(1)
+        if not data:
+            raise httplib.BadStatusLine(head)
+        head += data
 
 
 def put_object(url, token=None, container=None, name=None, contents=None,
                content_length=None, chunk_size=65536,
-               content_type=None, headers=None, http_conn=None, proxy=None):
+               content_type=None, headers=None, http_conn=None, proxy=None,
+               expect_continue=False, query_string=None,
+               continue_timeout=DEFAULT_CONTINUE_TIMEOUT):
     """
     Modified for benchmarking to take a constant string in "contents" and write
     out the first "chunk_size" bytes of "contents" until "content_length" bytes
@@ -776,6 +970,14 @@ def put_object(url, token=None, container=None, name=None, contents=None,
     If the length of contents is less than chunk_size, the length of contents
     will be the de facto chunk size.
 
+    With expect_continue, the request is sent with "Expect: 100-continue" and
+    the body only once the server says to go on; how long that took is
+    reported as the continue latency.  If the server rejects the request
+    instead, no body is sent and the connection is closed.  If it says
+    nothing within continue_timeout seconds, the body is sent anyway, with
+    no continue latency reported ("x-swiftstack-continue-timed-out" is set
+    instead).
+
     :param url: storage URL
     :param token: auth token; if None, no token will be sent
     :param container: container name that the object is in; if None, the
@@ -795,7 +997,12 @@ def put_object(url, token=None, container=None, name=None, contents=None,
                       conn object)
     :param proxy: proxy to connect through, if any; None by default; str of the
                   format 'http://127.0.0.1:8888' to set one
-    :returns: dict with benchmarking headers
+    :param expect_continue: wait for 100 Continue before sending the body
+    :param query_string: if set will be appended with '?' to generated path
+    :param continue_timeout: with expect_continue, seconds to wait for 100
+                             Continue before sending the body anyway
+    :returns: dict with benchmarking headers, including the number of body
+              bytes sent
     :raises ClientException: HTTP PUT request failed
     """
     if http_conn:
@@ -807,6 +1014,8 @@ def put_object(url, token=None, container=None, name=None, contents=None,
         path = '%s/%s' % (path.rstrip('/'), quote(container))
     if name:
         path = '%s/%s' % (path.rstrip('/'), quote(name))
+    if query_string:
+        path += '?' + query_string
     if headers:
         headers = dict(headers)
     else:
@@ -821,11 +1030,33 @@ def put_object(url, token=None, container=None, name=None, contents=None,
         raise ValueError('For benchmarking, content_length cannot be None!')
     if content_type is not None:
         headers['Content-Type'] = content_type
+    if expect_continue:
+        headers['Expect'] = '100-continue'
+    _connect_if_closed(conn)
     request_start = time()
     conn.putrequest('PUT', path)
     for header, value in headers.iteritems():
         conn.putheader(header, value)
     conn.endheaders()
+    body_start = request_start
+    continue_latency = None
+    continue_timed_out = False
+    if expect_continue:
+        interim = _read_interim_response(conn, continue_timeout)
+        body_start = time()
+        continue_timed_out = interim is None
+        status, reason = interim or (100, '')
+        if status != 100:
+            # The body we promised isn't coming, so the connection can't be
+            # used again
+            conn.close()
+            raise ClientException(
+                'Object PUT failed', http_scheme=parsed.scheme,
+                http_host=conn.host, http_port=conn.port, http_path=path,
+                http_status=status, http_reason=reason,
+                http_response_content='')
+        if not continue_timed_out:
+            continue_latency = body_start - request_start
     left = content_length
     chunk_size = min(chunk_size, len(contents))
     while left > 0:
@@ -835,8 +1066,13 @@ def put_object(url, token=None, container=None, name=None, contents=None,
         else:
             conn.send(contents)
             left -= chunk_size
+    sent = time()
+    if continue_timed_out:
+        _skip_late_continue(conn)
     resp = conn.getresponse()
+    headers_at = time()
     body = resp.read()
+    done = time()
     headers = {'X-Auth-Token': token}
     http_log(('%s%s' % (url.replace(parsed.path, ''), path), 'PUT',),
              {'headers': headers}, resp, body)
@@ -846,8 +1082,14 @@ def put_object(url, token=None, container=None, name=None, contents=None,
                               http_path=path, http_status=resp.status,
                               http_reason=resp.reason,
                               http_response_content=body)
-    return _decorated_response_headers(
-        resp, last_byte_latency=time() - request_start)
+    resp_headers = _decorated_response_headers(
+        resp, last_byte_latency=done - request_start, conn=conn,
+        timestamps=(body_start, sent, headers_at, done),
+        continue_latency=continue_latency)
+    resp_headers['x-swiftstack-sent-bytes'] = content_length
+    if continue_timed_out:
+        resp_headers['x-swiftstack-continue-timed-out'] = True
+    return resp_headers
 
 
 def post_object(url, token, container, name, headers, http_conn=None):
@@ -861,6 +1103,8 @@ def post_object(url, token, container, name, headers, http_conn=None):
     :param headers: additional headers to include in the request
     :param http_conn: HTTP connection object (If None, it will create the
                       conn object)
+    :returns: a dict containing the response's headers (all header names will
+              be lowercase)
     :raises ClientException: HTTP POST request failed
     """
     if http_conn:
@@ -869,9 +1113,14 @@ def post_object(url, token, container, name, headers, http_conn=None):
         parsed, conn = http_connection(url)
     path = '%s/%s/%s' % (parsed.path, quote(container), quote(name))
     headers['X-Auth-Token'] = token
+    _connect_if_closed(conn)
+    start_time = time()
     conn.request('POST', path, '', headers)
+    sent = time()
     resp = conn.getresponse()
+    headers_at = time()
     body = resp.read()
+    done = time()
     http_log(('%s%s' % (url.replace(parsed.path, ''), path), 'POST',),
              {'headers': headers}, resp, body)
     if resp.status < 200 or resp.status >= 300:
@@ -880,10 +1129,13 @@ def post_object(url, token, container, name, headers, http_conn=None):
                               http_path=path, http_status=resp.status,
                               http_reason=resp.reason,
                               http_response_content=body)
+    return _decorated_response_headers(
+        resp, last_byte_latency=done - start_time, conn=conn,
+        timestamps=(start_time, sent, headers_at, done))
 
 
 def delete_object(url, token=None, container=None, name=None, http_conn=None,
-                  headers=None, proxy=None):
+                  headers=None, proxy=None, query_string=None):
     """
     Delete object
 
@@ -898,6 +1150,7 @@ def delete_object(url, token=None, container=None, name=None, http_conn=None,
     :param headers: additional headers to include in the request
     :param proxy: proxy to connect through, if any; None by default; str of the
                   format 'http://127.0.0.1:8888' to set one
+    :param query_string: if set will be appended with '?' to generated path
     :returns: A dict of response headers including observed latencies
     :raises ClientException: HTTP DELETE request failed
     """
@@ -910,16 +1163,22 @@ def delete_object(url, token=None, container=None, name=None, http_conn=None,
         path = '%s/%s' % (path.rstrip('/'), quote(container))
     if name:
         path = '%s/%s' % (path.rstrip('/'), quote(name))
+    if query_string:
+        path += '?' + query_string
     if headers:
         headers = dict(headers)
     else:
         headers = {}
     if token:
         headers['X-Auth-Token'] = token
+    _connect_if_closed(conn)
     start_time = time()
     conn.request('DELETE', path, '', headers)
+    sent = time()
     resp = conn.getresponse()
+    headers_at = time()
     body = resp.read()
+    done = time()
     http_log(('%s%s' % (url.replace(parsed.path, ''), path), 'DELETE',),
              {'headers': headers}, resp, body)
     if resp.status < 200 or resp.status >= 300:
@@ -929,7 +1188,8 @@ def delete_object(url, token=None, container=None, name=None, http_conn=None,
                               http_status=resp.status, http_reason=resp.reason,
                               http_response_content=body)
     return _decorated_response_headers(
-        resp, last_byte_latency=time() - start_time)
+        resp, last_byte_latency=done - start_time, conn=conn,
+        timestamps=(start_time, sent, headers_at, done))
 
 
 class Connection(object):
@@ -1019,6 +1279,7 @@ class Connection(object):
                     pass
                 else:
                     raise
+            from gevent import sleep
             sleep(backoff)
             backoff *= 2
             if reset_func:
@@ -0,0 +1,239 @@
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import random
+import shutil
+import msgpack
+import tempfile
+from nose.tools import (assert_equal, assert_true, assert_false, assert_in,
+                        assert_not_in, assert_is_none, assert_less,
+                        assert_greater, assert_almost_equal)
+
+import ssbench
+from ssbench.comparison import (Comparison, summarize_run,
+                                bootstrap_pctile_delta)
+from ssbench.run_results import RunResults
+from ssbench.summary import ResultSummary
+
+from ssbench.tests.test_scenario import ScenarioFixture
+
+
+class TestComparison(ScenarioFixture):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.stub_scenario_file = os.path.join(self.temp_dir,
+                                               'some_scenario.json')
+        super(TestComparison, self).setUp()
+        self.baseline_path = self._write_run('baseline.stat', 1.0, 0.1)
+        self.same_path = self._write_run('same.stat', 1.0, 0.1, seed=7)
+        self.slower_path = self._write_run('slower.stat', 1.5, 0.2)
+
+    def tearDown(self):
+        super(TestComparison, self).tearDown()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write_run(self, name, latency_scale, interval, seed=1,
+                   summarize=False):
+        # READs of tiny objects and CREATEs of small objects, one completing
+        # every `interval` seconds, with latencies scaled by `latency_scale`;
+        # summarized by worker (see ssbench.summary) if `summarize`.
+        rng = random.Random(seed)
+        path = os.path.join(self.temp_dir, name)
+        run_results = RunResults(path)
+        run_results.start_run(self.scenario)
+        results = []
+        for i in xrange(400):
+            op_type, size_str = (ssbench.READ_OBJECT, 'tiny') if i % 4 \
+                else (ssbench.CREATE_OBJECT, 'small')
+            first_byte = latency_scale * rng.uniform(0.01, 0.05)
+            results.append(dict(
+                worker_id=i % 2 + 1, type=op_type, size_str=size_str,
+                size=99, retries=0, first_byte_latency=first_byte,
+                last_byte_latency=first_byte + latency_scale * rng.uniform(
+                    0.05, 0.2),
+                trans_id='tx%d' % i, completed_at=1000 + i * interval))
+        if summarize:
+            for worker_id in (1, 2):
+                summary = ResultSummary(worker_id)
+                for result in results:
+                    if result['worker_id'] == worker_id:
+                        summary.add(result)
+                run_results.process_raw_results(
+                    msgpack.packb(summary.flush()))
+        else:
+            run_results.process_raw_results(msgpack.packb(results))
+        run_results.finalize()
+        return path
+
+    def test_summarize_run(self):
+        run = summarize_run((self.baseline_path, 95, 50, 0))
+
+        assert_equal(self.baseline_path, run['path'])
+        assert_equal(self.scenario.name, run['scenario_name'])
+        assert_equal([('TOTAL', 'all'), ('TOTAL', 'tiny'),
+                      ('TOTAL', 'small'), ('CREATE', 'all'),
+                      ('CREATE', 'small'), ('READ', 'all'),
+                      ('READ', 'tiny')], run['stats'].keys())
+        total = run['stats'][('TOTAL', 'all')]
+        assert_equal(400, total['req_count'])
+        assert_equal(0, total['errors'])
+        assert_almost_equal(10.0, total['avg_req_per_sec'], places=1)
+        count, sample = total['last_byte_latency_samples']
+        # Downsampled, but the original series length is kept
+        assert_equal(400, count)
+        assert_equal(50, len(sample))
+        assert_equal(sorted(sample), sample)
+        count, sample = run['stats'][('CREATE', 'small')][
+            'first_byte_latency_samples']
+        assert_equal(100, count)
+        assert_equal(50, len(sample))
+
+    def test_summarize_summarized_run(self):
+        path = self._write_run('summarized.stat', 1.0, 0.1, summarize=True)
+        run = summarize_run((path, 95, 50, 0))
+        raw_run = summarize_run((self.baseline_path, 95, 400, 0))
+
+        assert_equal(raw_run['stats'].keys(), run['stats'].keys())
+        count, sample = run['stats'][('TOTAL', 'all')][
+            'last_byte_latency_samples']
+        assert_equal(400, count)
+        assert_equal(50, len(sample))
+        assert_equal(sorted(sample), sample)
+        # Evenly-spaced quantiles of the histogram, each within its 1% of
+        # the raw series' (all of which are in raw_sample)
+        _, raw_sample = raw_run['stats'][('TOTAL', 'all')][
+            'last_byte_latency_samples']
+        for i, value in enumerate(sample):
+            raw_value = raw_sample[4 + 8 * i]
+            assert_almost_equal(raw_value, value, delta=raw_value * 0.01)
+        count, sample = run['stats'][('CREATE', 'small')][
+            'first_byte_latency_samples']
+        assert_equal((100, 50), (count, len(sample)))
+
+        # Comparable to raw runs and to other summarized ones
+        slower_path = self._write_run('slower_summarized.stat', 1.5, 0.2,
+                                      summarize=True)
+        comparison = Comparison([self.baseline_path, path, slower_path],
+                                processes=1)
+        comparison.read_results()
+        # Only the slower run regressed
+        assert_equal(set([3]), set(regression['run'] for regression
+                                   in comparison.find_regressions()))
+
+    def test_bootstrap_pctile_delta(self):
+        rng = random.Random(0)
+        baseline = (1000, [i / 1000.0 for i in xrange(1000)])
+        shifted = (1000, [0.2 + i / 1000.0 for i in xrange(1000)])
+
+        low, high = bootstrap_pctile_delta(baseline, shifted, 95,
+                                           iterations=500, rng=rng)
+        assert_less(low, 0.2)
+        assert_greater(low, 0.15)
+        assert_greater(high, 0.2)
+        assert_less(high, 0.25)
+
+        low, high = bootstrap_pctile_delta(baseline, baseline, 95,
+                                           iterations=500, rng=rng)
+        assert_less(low, 0)
+        assert_greater(high, 0)
+
+        assert_is_none(bootstrap_pctile_delta(baseline, (0, []), 95))
+
+    def test_no_regressions(self):
+        comparison = Comparison([self.baseline_path, self.same_path],
+                                processes=1)
+        comparison.read_results()
+
+        regressions = comparison.find_regressions(threshold=10)
+        assert_equal([], regressions)
+        report = comparison.generate_report(regressions, threshold=10)
+        assert_in('  [1] %s  (%s; 39s)\n' % (self.baseline_path,
+                                             self.scenario.name), report)
+        assert_in('\nREAD (tiny objs)\n', report)
+        assert_in('No regressions (more than 10% worse than run [1]).',
+                  report)
+
+    def test_regressions(self):
+        comparison = Comparison(
+            [self.baseline_path, self.same_path, self.slower_path],
+            processes=1)
+        comparison.read_results()
+
+        regressions = comparison.find_regressions(threshold=10,
+                                                  iterations=500)
+        assert_true(regressions)
+        assert_equal(set([3]), set(r['run'] for r in regressions))
+        flagged = set((r['key'], r['metric']) for r in regressions)
+        assert_in((('TOTAL', 'all'), 'avg_req_per_sec'), flagged)
+        assert_in((('TOTAL', 'all'), 'last_byte_latency'), flagged)
+        assert_in((('CREATE', 'small'), 'first_byte_latency'), flagged)
+        for regression in regressions:
+            if regression['metric'] == 'avg_req_per_sec':
+                assert_is_none(regression['interval'])
+                assert_almost_equal(-50.0, regression['delta_pct'], places=0)
+            else:
+                assert_greater(regression['interval'][0], 0)
+                assert_greater(regression['delta_pct'], 10)
+
+        # A lenient enough threshold lets it pass
+        assert_equal([], comparison.find_regressions(threshold=100))
+
+        report = comparison.generate_report(regressions, threshold=10)
+        total_section = report.split('\nTOTAL (all obj sizes)\n')[1]
+        req_per_sec_row = total_section.split('\n')[2]
+        assert_true(req_per_sec_row.startswith('  Avg req/s'))
+        assert_in('5.0 (-49.9%) !', req_per_sec_row)
+        assert_in('Regressions (more than 10% worse than run [1]; '
+                  '95% confidence):', report)
+        assert_in('  [3] TOTAL (all obj sizes) average requests per second: '
+                  '10.0 -> 5.0 (-49.9%)\n', report)
+        assert_not_in('  [2] ', report.split('Regressions')[1])
+
+    def test_regression_interval_clears_threshold(self):
+        def stats(pctile, sample):
+            samples = (len(sample), sorted(sample))
+            return {('TOTAL', 'all'): dict(
+                avg_req_per_sec=10.0, first_byte_latency=pctile,
+                first_byte_latency_samples=samples,
+                last_byte_latency=pctile, last_byte_latency_samples=samples)}
+
+        rng = random.Random(7)
+        comparison = Comparison([], processes=1)
+        comparison.runs = [
+            dict(stats=stats(1.95, [1.0 + i / 1000.0 for i in xrange(1000)])),
+            # 18% slower, but from so few latencies that the interval's lower
+            # bound is well under 10% (though above zero)
+            dict(stats=stats(2.3, [rng.uniform(1.2, 2.4)
+                                   for _ in xrange(40)])),
+            dict(stats=stats(2.9, [1.5 + i / 1000.0 for i in xrange(1000)])),
+        ]
+
+        regressions = comparison.find_regressions(threshold=10,
+                                                  iterations=500)
+        assert_equal([3, 3], [r['run'] for r in regressions])
+        for regression in regressions:
+            assert_greater(regression['interval'][0], 0.195)
+
+    def test_read_results_in_processes(self):
+        serial = Comparison([self.baseline_path, self.slower_path],
+                            processes=1)
+        serial.read_results()
+        parallel = Comparison([self.baseline_path, self.slower_path],
+                              processes=2)
+        parallel.read_results()
+
+        assert_equal(serial.runs, parallel.runs)
+        assert_false(parallel.find_regressions(threshold=200))
@@ -0,0 +1,145 @@
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+import pickle
+import msgpack
+from nose.tools import (assert_equal, assert_raises, assert_almost_equal,
+                        assert_is_none, assert_less_equal)
+
+from ssbench.histogram import LogHistogram
+from ssbench.reporter import Reporter
+
+
+def _assert_close(expected, actual, relative_error=0.01):
+    assert_less_equal(abs(actual - expected), expected * relative_error,
+                      '%r is not within %r of %r' % (actual, relative_error,
+                                                     expected))
+
+
+def test_empty():
+    histogram = LogHistogram()
+    assert_equal(0, len(histogram))
+    assert_is_none(histogram.min)
+    assert_equal([], list(histogram.iter_buckets()))
+    with assert_raises(IndexError):
+        histogram.percentile(50)
+
+
+def test_ignores_non_positive_values():
+    histogram = LogHistogram()
+    histogram.record(0)
+    histogram.record(-1.5)
+    assert_equal(0, len(histogram))
+
+
+def test_percentiles_match_reporter():
+    rng = random.Random(42)
+    values = [rng.lognormvariate(-3, 1.5) for _ in xrange(10001)]
+    histogram = LogHistogram()
+    for value in values:
+        histogram.record(value)
+    values.sort()
+    reporter = Reporter(None)
+
+    assert_equal(10001, len(histogram))
+    assert_equal(values[0], histogram.min)
+    assert_equal(values[-1], histogram.max)
+    assert_equal(values[0], histogram.percentile(0.001))
+    assert_equal(values[-1], histogram.percentile(100))
+    for nth_pctile in (1, 25, 50, 90, 95, 99, 99.9):
+        _assert_close(reporter.pctile(values, nth_pctile),
+                      histogram.percentile(nth_pctile))
+    _assert_close(values[5000], histogram.median())
+
+    # All at once, in one walk over the buckets
+    nth_pctiles = (99.99, 50, 1, 99.9, 0.001)
+    assert_equal([histogram.percentile(nth_pctile)
+                  for nth_pctile in nth_pctiles],
+                 histogram.percentiles(nth_pctiles))
+
+
+def test_interpolates_integer_ranks():
+    histogram = LogHistogram()
+    for value in (1.0, 2.0, 3.0, 4.0):
+        histogram.record(value)
+    # Like Reporter.pctile(), an integer rank averages two values
+    _assert_close(2.5, histogram.percentile(50))
+    assert_equal(4.0, histogram.percentile(100))
+
+
+def test_record_count():
+    histogram = LogHistogram()
+    histogram.record(0.5, count=3)
+    histogram.record(2.0)
+    assert_equal(4, len(histogram))
+    _assert_close(0.5, histogram.percentile(70))
+    assert_equal([(histogram.bucket_bounds(histogram.bucket_index(0.5))[1],
+                   3),
+                  (histogram.bucket_bounds(histogram.bucket_index(2.0))[1],
+                   1)],
+                 list(histogram.iter_buckets()))
+
+
+def test_merge():
+    rng = random.Random(7)
+    values = [rng.expovariate(10) for _ in xrange(1000)]
+    whole = LogHistogram()
+    parts = [LogHistogram() for _ in xrange(3)]
+    for i, value in enumerate(values):
+        whole.record(value)
+        parts[i % 3].record(value)
+
+    merged = reduce(lambda a, b: a.merge(b), parts)
+    assert_equal(whole, merged)
+    assert_equal(whole.min, merged.min)
+    assert_equal(whole.max, merged.max)
+    assert_equal(whole.percentile(95), merged.percentile(95))
+
+    merged.merge(LogHistogram())
+    assert_equal(whole, merged)
+    with assert_raises(ValueError):
+        merged.merge(LogHistogram(relative_error=0.05))
+
+
+def test_pickles():
+    histogram = LogHistogram(relative_error=0.02)
+    histogram.record(0.123)
+    unpickled = pickle.loads(pickle.dumps(histogram, 2))
+    assert_equal(histogram, unpickled)
+    assert_almost_equal(histogram.percentile(50), unpickled.percentile(50))
+
+
+def test_packable_survives_msgpack():
+    histogram = LogHistogram(relative_error=0.02)
+    for value in (0.001, 0.123, 7.5):
+        histogram.record(value)
+    unpacked = LogHistogram.from_packable(
+        msgpack.loads(msgpack.dumps(histogram.packable())))
+    assert_equal(histogram, unpacked)
+    assert_equal((3, 0.001, 7.5), (unpacked.count, unpacked.min,
+                                   unpacked.max))
+
+
+def test_iter_cdf():
+    histogram = LogHistogram()
+    for value in (0.5, 0.1, 0.1, 2.0):
+        histogram.record(value)
+    cdf = list(histogram.iter_cdf())
+    assert_equal([0.25 * i for i in (2, 3, 4)],
+                 [fraction for _, fraction, _ in cdf])
+    assert_equal([2, 3, 4], [count for _, _, count in cdf])
+    assert_equal((0.1, 2.0), (cdf[0][0], cdf[-1][0]))
+    assert_almost_equal(0.5, cdf[1][0], delta=0.005)
@@ -0,0 +1,61 @@
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+
+from ssbench.leases import JobLeases, CLAIM_GRACE_SECONDS
+
+
+class TestJobLeases(TestCase):
+    def setUp(self):
+        self.leases = JobLeases(unclaimed_seconds=100)
+        for job_id in xrange(5):
+            self.leases.add(job_id, {'type': 'PING', 'n': job_id}, 1000.0)
+
+    def test_complete(self):
+        self.assertTrue(self.leases.complete(3))
+        self.assertFalse(self.leases.complete(3))
+        self.assertFalse(self.leases.complete(99))
+        self.assertEqual(4, len(self.leases))
+
+    def test_dead_worker(self):
+        self.leases.claim('w1', [(0, 2), (4, 1)])
+        self.leases.claim('w2', [(2, 1)])
+        self.leases.complete(1)
+
+        # Job 3 was sent long enough ago that it should have been claimed
+        self.assertEqual([0, 3, 4], sorted(
+            self.leases.expire(1000.0 + CLAIM_GRACE_SECONDS + 1, ['w1'])))
+        self.assertEqual([2], self.leases.outstanding.keys())
+        self.assertEqual(({'type': 'PING', 'n': 0}, 'w1'),
+                         self.leases.lost[0])
+        self.assertEqual(None, self.leases.lost[3][1])
+
+    def test_recent_unclaimed_jobs_survive_a_death(self):
+        self.leases.claim('w1', [(0, 1)])
+        self.assertEqual([0], self.leases.expire(1000.5, ['w1']))
+        self.assertEqual(4, len(self.leases))
+
+    def test_unclaimed_timeout(self):
+        self.leases.claim('w1', [(0, 1)])
+        self.assertEqual([], self.leases.expire(1050.0))
+        self.assertEqual([1, 2, 3, 4], sorted(self.leases.expire(1101.0)))
+        self.assertEqual([0], self.leases.outstanding.keys())
+
+    def test_recovered(self):
+        self.leases.expire(1101.0)
+        self.assertFalse(self.leases.complete(2))
+        self.assertNotIn(2, self.leases.lost)
+        self.assertEqual(4, len(self.leases.lost))
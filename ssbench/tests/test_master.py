@@ -13,11 +13,24 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+import time
+import shutil
+import logging
+import msgpack
+import argparse
+import tempfile
 from unittest import TestCase
 from flexmock import flexmock
+import gevent
 from gevent_zeromq import zmq
 
-from ssbench.master import Master
+import ssbench
+from ssbench.leases import JobLeases
+from ssbench.master import Master, parse_deadline, _gen_cleanup_job
+from ssbench.scenario import Scenario
+from ssbench.run_results import RunResults
+from ssbench.token_broker import TokenBroker, token_key
 
 from ssbench.tests.test_scenario import ScenarioFixture
 
@@ -83,3 +96,393 @@ class TestMaster(ScenarioFixture, TestCase):
 
     def tearDown(self):
         super(TestMaster, self).tearDown()
+
+    def test_run_context_without_control_port(self):
+        self.assertIsNone(self.master.run_context({'token': 'x'},
+                                                  self.scenario))
+
+    def test_run_context(self):
+        self.master.control_router = flexmock()
+        auth_kwargs = {'token': 'AUTH_tk', 'storage_urls': ['http://s/v1']}
+        run_context = self.master.run_context(auth_kwargs, self.scenario,
+                                              {'block_size': 4096})
+
+        self.assertIs(run_context,
+                      self.master.run_contexts[run_context.context_id])
+        self.assertEqual(dict(auth_kwargs=auth_kwargs, block_size=4096,
+                              connect_timeout=3.14159,
+                              network_timeout=2.71828),
+                         run_context.job_defaults)
+        self.assertEqual(self.scenario.containers, run_context.containers)
+        self.assertEqual(self.scenario.sizes_by_name.keys(),
+                         run_context.size_strs)
+
+    def test_run_scenario_cleanup_job_defaults(self):
+        self.master.control_router = flexmock()
+        auth_kwargs = {'token': 'AUTH_tk', 'storage_urls': ['http://s/v1']}
+        flexmock(ssbench.master).should_receive('_container_creator')
+        run_contexts = []
+        flexmock(self.master).should_receive('do_a_run').replace_with(
+            lambda *args, **kwargs: run_contexts.append(
+                kwargs['run_context']))
+        deadlines = {ssbench.DELETE_OBJECT: 5.0}
+
+        self.master.run_scenario(self.scenario, auth_kwargs, None,
+                                 expect_continue=True, deadlines=deadlines)
+        # Cleanup DELETEs get the same defaults (their deadline included)
+        # as the other runs' jobs
+        initial, bench, cleanup = run_contexts
+        self.assertEqual(dict(initial.job_defaults),
+                         dict(cleanup.job_defaults))
+        self.assertEqual(deadlines, cleanup.job_defaults['deadlines'])
+        self.assertEqual(self.scenario.block_size,
+                         cleanup.job_defaults['block_size'])
+        self.assertTrue(cleanup.job_defaults['expect_continue'])
+
+    def test_send_run_context_with_brokered_token(self):
+        self.master.control_router = flexmock()
+        self.master.token_broker = TokenBroker(
+            lambda auth_kwargs: (['http://s/v1'], 'AUTH_tkb'))
+        auth_kwargs = {'auth_url': 'http://auth', 'user': 'u', 'key': 'k',
+                       'storage_urls': None}
+        run_context = self.master.run_context(auth_kwargs, self.scenario)
+        self.master.token_broker.stop()
+        sent = []
+        self.master.control_router.should_receive('send_multipart') \
+            .replace_with(sent.append).twice
+
+        self.master._send_run_context('w1', run_context.context_id)
+
+        self.assertEqual(['w1', 'w1'], [identity for identity, _ in sent])
+        self.assertEqual(['TOKEN', token_key(auth_kwargs), ['http://s/v1'],
+                          'AUTH_tkb'], msgpack.loads(sent[0][1]))
+        self.assertEqual(['CONTEXT', run_context.context_id,
+                          run_context.packb()], msgpack.loads(sent[1][1]))
+
+    def test_send_unknown_run_context(self):
+        self.master.control_router = flexmock()
+        self.master.control_router.should_receive('send_multipart') \
+            .with_args(['w1', msgpack.dumps(('CONTEXT', 5, None))]).once
+
+        self.master._send_run_context('w1', 5)
+
+    def test_serve_control_registration(self):
+        self.master.control_router = flexmock()
+        self.master.control_router.should_receive('recv_multipart') \
+            .and_return(['w1', msgpack.dumps(('REGISTER', 7, 64, 'h', 99))]) \
+            .and_return(['w1', msgpack.dumps(('HEARTBEAT', 7, 12))]) \
+            .and_raise(StopIteration)
+
+        self.assertRaises(StopIteration, self.master._serve_control)
+
+        worker = self.master.workers['w1']
+        self.assertEqual((7, 64, 'h', 99, 12), (
+            worker['worker_id'], worker['concurrency'], worker['hostname'],
+            worker['pid'], worker['in_flight']))
+        self.assertEqual(1, self.master.wait_for_workers(1, timeout=0))
+
+    def test_serve_control_claims(self):
+        self.master.leases = flexmock()
+        self.master.leases.should_receive('claim') \
+            .with_args('w1', [[0, 10], [30, 5]]).once
+        self.master.workers['w1'] = dict(worker_id=7, dead=True)
+        self.master.control_router = flexmock()
+        self.master.control_router.should_receive('recv_multipart') \
+            .and_return(['w1', msgpack.dumps(
+                ('HEARTBEAT', 7, 12, [(0, 10), (30, 5)]))]) \
+            .and_raise(StopIteration)
+
+        self.assertRaises(StopIteration, self.master._serve_control)
+
+        # Heard from again, so not dead after all
+        self.assertFalse(self.master.workers['w1'].get('dead'))
+
+    def test_serve_control_stuck_jobs(self):
+        self.master.workers['w1'] = dict(worker_id=7)
+        self.master.workers['w2'] = dict(worker_id=8, stuck=3)
+        self.master.control_router = flexmock()
+        self.master.control_router.should_receive('recv_multipart') \
+            .and_return(['w1', msgpack.dumps(('HEARTBEAT', 7, 12, [], 2))]) \
+            .and_return(['w1', msgpack.dumps(('HEARTBEAT', 7, 12, [], 2))]) \
+            .and_raise(StopIteration)
+        warnings = []
+        flexmock(logging).should_receive('warning').replace_with(
+            lambda msg, *args: warnings.append(msg % args))
+
+        self.assertRaises(StopIteration, self.master._serve_control)
+
+        self.assertEqual(2, self.master.workers['w1']['stuck'])
+        # Only said when the count changes
+        self.assertEqual(
+            ['5 jobs stuck in flight (2 on worker 7, 3 on worker 8)'],
+            warnings)
+
+    def test_parse_deadline(self):
+        self.assertEqual([(ssbench.READ_OBJECT, 2.5)],
+                         parse_deadline('read=2.5'))
+        self.assertEqual(
+            sorted([(ssbench.CREATE_OBJECT, 30.0), (ssbench.READ_OBJECT, 30.0),
+                    (ssbench.UPDATE_OBJECT, 30.0),
+                    (ssbench.DELETE_OBJECT, 30.0)] +
+                   [(op, 30.0) for op in ssbench.METADATA_OPS]),
+            sorted(parse_deadline('30')))
+        self.assertEqual([(ssbench.LIST_CONTAINER, 1.0)],
+                         parse_deadline('list_container=1'))
+        for spec in ('list=5', 'read=', 'read=soon', '0', '-1'):
+            self.assertRaises(argparse.ArgumentTypeError, parse_deadline,
+                              spec)
+
+    def test_gen_cleanup_job(self):
+        self.scenario_dict['sizes'][5].update(segment_size=10000000)
+        self.write_scenario_file()
+        scenario = Scenario(self.stub_scenario_file)
+
+        # A segmented object's segments are deleted with it
+        self.assertEqual(dict(
+            type=ssbench.DELETE_OBJECT, size_str='huge', container='c1',
+            name='huge_000001', segment_size=10000000),
+            _gen_cleanup_job(scenario, ('huge', ('c1', 'huge_000001',
+                                                 False))))
+        self.assertEqual(dict(
+            type=ssbench.DELETE_OBJECT, size_str='tiny', container='c2',
+            name='tiny_000002'),
+            _gen_cleanup_job(scenario, ('tiny', ('c2', 'tiny_000002',
+                                                 False))))
+
+    def test_wait_for_workers_timeout(self):
+        self.master.workers['w1'] = dict(worker_id=None, concurrency=None)
+        self.assertEqual(0, self.master.wait_for_workers(1, timeout=0.05))
+
+    def test_do_a_run_start_barrier(self):
+        self.master.control_router = flexmock()
+        self.master.workers = {'w1': {'last_heard': time.time()},
+                               'w2': {'last_heard': time.time()}}
+        run_context = self.master.run_context({'token': 'x'}, self.scenario,
+                                              start_barrier=True)
+        events = []
+        self.master.control_router.should_receive('send_multipart') \
+            .replace_with(lambda parts: events.append(
+                (parts[0], msgpack.loads(parts[1]))))
+        self.mock_work_push.should_receive('send').replace_with(
+            lambda _: events.append('jobs'))
+        results = [msgpack.dumps([{'type': 'PING', 'container': 'c',
+                                   'name': 'n'}])] * 3
+        self.mock_results_pull.should_receive('recv').replace_with(
+            lambda: events.append('recv') or results.pop())
+
+        self.master.do_a_run(2, iter([{'type': 'PING'}] * 3), lambda r: None,
+                             {'token': 'x'}, run_context=run_context)
+
+        start = ['START', run_context.context_id]
+        # Both workers are started after the first two jobs are sent, and
+        # before the master waits for any results
+        self.assertEqual(['jobs', 'jobs'], events[:2])
+        self.assertEqual(sorted([('w1', start), ('w2', start)]),
+                         sorted(events[2:4]))
+        self.assertEqual(['recv', 'jobs', 'recv', 'recv'], events[4:])
+        self.assertIn(run_context.context_id, self.master.started_contexts)
+
+    def test_adaptive_batch_size(self):
+        self.assertEqual(1, self.master.adaptive_batch_size(2))
+        self.assertEqual(64, self.master.adaptive_batch_size(256))
+        self.assertEqual(100, self.master.adaptive_batch_size(10000))
+        self.master.workers = {'w1': {}, 'w2': {}, 'w3': {'dead': True}}
+        self.assertEqual(32, self.master.adaptive_batch_size(256))
+        self.assertEqual(2, self.master.adaptive_batch_size(9))
+
+    def _batch_sizes_sent(self, **kwargs):
+        batch_sizes = []
+        self.mock_work_push.should_receive('send').replace_with(
+            lambda message: batch_sizes.append(len(msgpack.loads(message))))
+        result = msgpack.dumps([{'type': 'PING', 'container': 'c',
+                                 'name': 'n'}])
+        self.mock_results_pull.should_receive('recv').and_return(result)
+
+        self.master.do_a_run(4, iter([{'type': 'PING'}] * 6), lambda r: None,
+                             {'token': 'x'}, batch_size=2, **kwargs)
+        return batch_sizes
+
+    def test_do_a_run_batch_linger(self):
+        # Waits for a second result to free up a whole batch's worth of
+        # slots...
+        self.assertEqual([2, 2, 2], self._batch_sizes_sent())
+        # ...unless told not to
+        self.assertEqual([2, 2, 1, 1], self._batch_sizes_sent(batch_linger=0))
+
+    def test_send_started_run_context(self):
+        self.master.control_router = flexmock()
+        run_context = self.master.run_context({'token': 'x'}, self.scenario,
+                                              start_barrier=True)
+        self.master.started_contexts.add(run_context.context_id)
+        sent = []
+        self.master.control_router.should_receive('send_multipart') \
+            .replace_with(sent.append)
+
+        self.master._send_run_context('w1', run_context.context_id)
+
+        self.assertEqual(['CONTEXT', 'START'],
+                         [msgpack.loads(message)[0] for _, message in sent])
+
+    def test_kill_workers(self):
+        self.master.control_router = flexmock()
+        self.master.workers = {'w1': {}, 'w2': {}}
+        sent = []
+        self.master.control_router.should_receive('send_multipart') \
+            .replace_with(sent.append)
+
+        self.assertEqual(2, self.master.kill_workers(timeout=0))
+        self.assertEqual([['KILL'], ['KILL']],
+                         [msgpack.loads(message) for _, message in sent])
+
+        sent[:] = []
+        self.master.kill_workers(timeout=0, graceful=True)
+        self.assertEqual([['STOP'], ['STOP']],
+                         [msgpack.loads(message) for _, message in sent])
+
+    def test_do_a_run_dead_worker(self):
+        self.master.control_router = flexmock()
+        self.master.control_router.should_receive('send_multipart')
+        run_context = self.master.run_context({'token': 'x'}, self.scenario)
+        self.master.workers = {
+            'alive': {'worker_id': 1, 'last_heard': time.time()},
+            'dead': {'worker_id': 2, 'last_heard': time.time() - 60}}
+        sent = []
+
+        def _send(message):
+            # The dead worker pulled the second batch before it died
+            job_data = msgpack.loads(message)
+            sent.append(job_data[2])
+            if len(sent) == 2:
+                self.master.leases.claim('dead', [(job_data[2], 1)])
+        self.mock_work_push.should_receive('send').replace_with(_send)
+        results = [msgpack.dumps([{'type': 'PING', 'container': 'c',
+                                   'name': 'n', 'last_byte_latency': 0.1,
+                                   'job_id': 0}])]
+
+        def _recv():
+            if results:
+                return results.pop()
+            gevent.sleep(10)  # times out
+        self.mock_results_pull.should_receive('recv').replace_with(_recv)
+        processed = []
+        run_results = flexmock()
+        run_results.should_receive('process_raw_results').replace_with(
+            lambda raw: processed.extend(msgpack.loads(raw)))
+
+        self.master.do_a_run(
+            2, iter([{'type': 'PING', 'container': 'c', 'name': 'n'}] * 2),
+            lambda r: None, {'token': 'x'}, run_context=run_context,
+            run_results=run_results)
+
+        self.assertEqual([0, 1], sent)
+        self.assertEqual([0, 1], [r['job_id'] for r in processed])
+        lost = processed[1]
+        self.assertTrue(lost['lost'])
+        self.assertEqual(2, lost['worker_id'])
+        self.assertEqual('PING', lost['type'])
+        self.assertTrue(self.master.workers['dead']['dead'])
+        self.assertEqual(set([1]), self.master.lost_job_ids)
+        self.assertIsNone(self.master.leases)
+
+        # A late result for the lost job is left out of later runs
+        raw = msgpack.dumps([
+            {'type': 'PING', 'container': 'c', 'name': 'n', 'job_id': job_id}
+            for job_id in (1, 9)])
+        processed[:] = []
+        self.assertEqual(1, self.master.process_results_to(
+            raw, lambda r: None, run_results=run_results))
+        self.assertEqual([9], [r['job_id'] for r in processed])
+
+    def test_process_summary_results(self):
+        leases = JobLeases()
+        jobs = [dict(type=ssbench.CREATE_OBJECT, size_str='tiny',
+                     container='c', name='tiny_%06d' % i) for i in xrange(3)]
+        for job_id, job in enumerate(jobs):
+            leases.add(job_id, job, time.time())
+        summary = dict(worker_id=1, buckets=[], samples=[])
+        written = []
+        run_results = flexmock()
+        run_results.should_receive('process_raw_results').replace_with(
+            lambda raw: written.append(msgpack.loads(raw)))
+        processed = []
+
+        self.assertEqual(2, self.master.process_results_to(
+            msgpack.dumps(dict(done=[0], failed=[2], summary=summary)),
+            processed.append, run_results=run_results, leases=leases))
+
+        self.assertEqual(jobs[0], processed[0])
+        self.assertIn('exception', processed[1])
+        self.assertEqual('tiny_000002', processed[1]['name'])
+        self.assertEqual([summary], written)
+        self.assertEqual([1], leases.outstanding.keys())
+
+        # Without a summary, nothing is written
+        self.assertEqual(1, self.master.process_results_to(
+            msgpack.dumps(dict(done=[1], failed=[])), processed.append,
+            run_results=run_results, leases=leases))
+        self.assertEqual(1, len(written))
+
+    def test_process_failed_jobs(self):
+        # A worker which couldn't run the jobs says why
+        leases = JobLeases()
+        job = dict(type=ssbench.CREATE_OBJECT, size_str='tiny',
+                   container='c', name='tiny_000000')
+        leases.add(5, job, time.time())
+        processed = []
+
+        self.assertEqual(1, self.master.process_results_to(
+            msgpack.dumps(dict(done=[], failed=[5],
+                               exceptions={5: 'ValueError()'})),
+            processed.append, leases=leases))
+        self.assertEqual([dict(job, exception='ValueError()')], processed)
+        self.assertEqual({}, leases.outstanding)
+
+    def test_collect_spools(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        spool_data = {}
+        for identity, times in (('w1', [1.0, 3.0]), ('w2', [2.0])):
+            spool = RunResults(os.path.join(temp_dir, identity))
+            spool.start_spool()
+            spool.process_raw_results(msgpack.dumps(
+                [dict(completed_at=t, worker=identity) for t in times]))
+            spool.finalize()
+            with open(spool.results_file_path, 'rb') as spool_file:
+                spool_data[identity] = spool_file.read()
+        self.master.workers = {'w1': {}, 'w2': {}, 'w3': {'dead': True}}
+
+        def _send(parts):
+            # Each worker answers COLLECT with its spool in two chunks
+            identity, message = parts[0], msgpack.loads(parts[1])
+            self.assertEqual(['COLLECT'], message)
+            data = spool_data[identity]
+            for chunk in (data[:10], data[10:]):
+                self.master._receive_spool(
+                    identity, 'SPOOL', ('SPOOL', 1, chunk))
+            self.master._receive_spool(
+                identity, 'SPOOL_END', ('SPOOL_END', 1, 2))
+        self.master.control_router = flexmock()
+        self.master.control_router.should_receive('send_multipart') \
+            .replace_with(_send).twice
+        run_results = RunResults(os.path.join(temp_dir, 'stats'))
+        run_results.start_run(self.scenario)
+
+        self.assertEqual(3, self.master.collect_spools(run_results))
+
+        run_results.finalize()
+        _, unpacker = run_results.read_results()
+        self.assertEqual([(1.0, 'w1'), (2.0, 'w2'), (3.0, 'w1')],
+                         [(result['completed_at'], result['worker'])
+                          for batch in unpacker for result in batch])
+        self.assertIsNone(self.master.spool_dir)
+
+    def test_collect_spools_timeout(self):
+        self.master.workers = {'w1': {}}
+        self.master.control_router = flexmock()
+        self.master.control_router.should_receive('send_multipart').once
+        run_results = flexmock()
+        run_results.should_receive('merge_spools').with_args([]) \
+            .and_return(0).once
+
+        self.assertEqual(0, self.master.collect_spools(run_results,
+                                                       timeout=0.05))
@@ -13,14 +13,21 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
 import csv
+import shutil
+import msgpack
+import tempfile
 from mock import MagicMock
 from statlib import stats
 from unittest import TestCase
 from cStringIO import StringIO
 
 import ssbench
-from ssbench.reporter import Reporter
+from ssbench.reporter import Reporter, parse_pctiles
+from ssbench.scenario import Scenario
+from ssbench.run_results import RunResults
+from ssbench.summary import ResultSummary
 from ssbench.ordered_dict import OrderedDict
 
 from ssbench.tests.test_scenario import ScenarioFixture
@@ -203,6 +210,8 @@ class TestReporter(ScenarioFixture, TestCase):
             worker_count=3, start=100.0, stop=152.2, req_count=13,
             retries=7, retry_rate=53.846154, errors=1,
             avg_req_per_sec=round(13 / (152.2 - 100), 6),
+            sent_bytes=6 * 989, received_bytes=0,
+            avg_mb_per_sec=round(6 * 989 / 1e6 / (152.2 - 100), 6),
             first_byte_latency=dict(
                 min='%6.3f' % 0.1,
                 max='%7.3f' % 1.2,
@@ -236,6 +245,8 @@ class TestReporter(ScenarioFixture, TestCase):
             worker_count=3, start=100.0, stop=152.2, req_count=13,
             retries=7, retry_rate=53.846154, errors=1,
             avg_req_per_sec=round(13 / (152.2 - 100), 6),
+            sent_bytes=6 * 989, received_bytes=0,
+            avg_mb_per_sec=round(6 * 989 / 1e6 / (152.2 - 100), 6),
             first_byte_latency=dict(
                 min='%6.3f' % 0.1,
                 max='%7.3f' % 1.2,
@@ -264,6 +275,8 @@ class TestReporter(ScenarioFixture, TestCase):
             start=100.0, stop=106.4, req_count=4,
             retries=0, retry_rate=0.0, errors=0,
             avg_req_per_sec=round(4 / (106.4 - 100), 6),
+            sent_bytes=3 * 989, received_bytes=0,
+            avg_mb_per_sec=round(3 * 989 / 1e6 / (106.4 - 100), 6),
             first_byte_latency=dict(
                 min='%6.3f' % min(w1_first_byte_latency),
                 max='%7.3f' % max(w1_first_byte_latency),
@@ -293,6 +306,8 @@ class TestReporter(ScenarioFixture, TestCase):
             start=100.1, stop=152.2, req_count=5,
             retries=7, retry_rate=140.0, errors=1,
             avg_req_per_sec=round(5 / (152.2 - 100.1), 6),
+            sent_bytes=2 * 989, received_bytes=0,
+            avg_mb_per_sec=round(2 * 989 / 1e6 / (152.2 - 100.1), 6),
             first_byte_latency=dict(
                 min='%6.3f' % min(w2_first_byte_latency),
                 max='%7.3f' % max(w2_first_byte_latency),
@@ -322,6 +337,8 @@ class TestReporter(ScenarioFixture, TestCase):
             start=100.1, stop=104.999, req_count=4,
             retries=0, retry_rate=0.0, errors=0,
             avg_req_per_sec=round(4 / (104.999 - 100.1), 6),
+            sent_bytes=989, received_bytes=0,
+            avg_mb_per_sec=round(989 / 1e6 / (104.999 - 100.1), 6),
             first_byte_latency=dict(
                 min='%6.3f' % min(w3_first_byte_latency),
                 max='%7.3f' % max(w3_first_byte_latency),
@@ -352,6 +369,8 @@ class TestReporter(ScenarioFixture, TestCase):
             start=100.0, stop=106.0, req_count=3,
             retries=1, retry_rate=33.333333, errors=0,
             avg_req_per_sec=round(3 / (106 - 100.0), 6),
+            sent_bytes=3 * 989, received_bytes=0,
+            avg_mb_per_sec=round(3 * 989 / 1e6 / (106 - 100.0), 6),
             first_byte_latency=dict(
                 min='%6.3f' % min(c_first_byte_latency),
                 max='%7.3f' % max(c_first_byte_latency),
@@ -372,6 +391,9 @@ class TestReporter(ScenarioFixture, TestCase):
             worst_last_byte_latency=(max(c_last_byte_latency), 'txID002'),
             size_stats=OrderedDict([
                 ('tiny', {'avg_req_per_sec': 5.0,
+                          'sent_bytes': 989, 'received_bytes': 0,
+                          'avg_mb_per_sec': round(
+                              989 / 1e6 / (103.5 - 103.3), 6),
                           'first_byte_latency': {'avg': '%7.3f' % 0.1,
                                                  'max': '%7.3f' % 0.1,
                                                  'pctile': '%7.3f' % 0.1,
@@ -393,6 +415,9 @@ class TestReporter(ScenarioFixture, TestCase):
                           'start': 103.3,
                           'stop': 103.5}),
                 ('small', {'avg_req_per_sec': 0.333333,
+                           'sent_bytes': 989, 'received_bytes': 0,
+                           'avg_mb_per_sec': round(
+                               989 / 1e6 / (103.0 - 100.0), 6),
                            'first_byte_latency': {'avg': '%7.3f' % 1.0,
                                                   'max': '%7.3f' % 1.0,
                                                   'pctile': '%7.3f' % 1.0,
@@ -414,6 +439,9 @@ class TestReporter(ScenarioFixture, TestCase):
                            'start': 100.0,
                            'stop': 103.0}),
                 ('huge', {'avg_req_per_sec': 0.454545,
+                          'sent_bytes': 989, 'received_bytes': 0,
+                          'avg_mb_per_sec': round(
+                              989 / 1e6 / (106.0 - 103.8), 6),
                           'first_byte_latency': {'avg': '%7.3f' % 1.2,
                                                  'max': '%7.3f' % 1.2,
                                                  'pctile': '%7.3f' % 1.2,
@@ -444,6 +472,7 @@ class TestReporter(ScenarioFixture, TestCase):
             start=100.1, stop=104.3, req_count=4,
             retries=0, retry_rate=0.0, errors=0,
             avg_req_per_sec=round(4 / (104.3 - 100.1), 6),
+            sent_bytes=0, received_bytes=0, avg_mb_per_sec=0.0,
             first_byte_latency=dict(
                 min='%6.3f' % min(r_first_byte_latency),
                 max='%7.3f' % max(r_first_byte_latency),
@@ -464,6 +493,8 @@ class TestReporter(ScenarioFixture, TestCase):
             worst_last_byte_latency=(max(r_last_byte_latency), 'txID010'),
             size_stats=OrderedDict([
                 ('tiny', {'avg_req_per_sec': 0.540541,
+                          'sent_bytes': 0, 'received_bytes': 0,
+                          'avg_mb_per_sec': 0.0,
                           'first_byte_latency': {'avg': '%7.3f' % 0.55,
                                                  'max': '%7.3f' % 1.0,
                                                  'pctile': '%7.3f' % 1.0,
@@ -485,6 +516,8 @@ class TestReporter(ScenarioFixture, TestCase):
                           'start': 100.1,
                           'stop': 103.8}),
                 ('small', {'avg_req_per_sec': 2.0,
+                           'sent_bytes': 0, 'received_bytes': 0,
+                           'avg_mb_per_sec': 0.0,
                            'first_byte_latency': {'avg': '%7.3f' % 0.2,
                                                   'max': '%7.3f' % 0.2,
                                                   'pctile': '%7.3f' % 0.2,
@@ -506,6 +539,8 @@ class TestReporter(ScenarioFixture, TestCase):
                            'start': 103.5,
                            'stop': 104.0}),
                 ('medium', {'avg_req_per_sec': 2.5,
+                            'sent_bytes': 0, 'received_bytes': 0,
+                            'avg_mb_per_sec': 0.0,
                             'first_byte_latency': {'avg': '%7.3f' % 0.3,
                                                    'max': '%7.3f' % 0.3,
                                                    'pctile': '%7.3f' % 0.3,
@@ -535,6 +570,8 @@ class TestReporter(ScenarioFixture, TestCase):
             start=100.1, stop=152.2, req_count=4,
             retries=6, retry_rate=150.0, errors=1,
             avg_req_per_sec=round(4 / (152.2 - 100.1), 6),
+            sent_bytes=3 * 989, received_bytes=0,
+            avg_mb_per_sec=round(3 * 989 / 1e6 / (152.2 - 100.1), 6),
             first_byte_latency=dict(
                 min='%6.3f' % min(u_first_byte_latency),
                 max='%7.3f' % max(u_first_byte_latency),
@@ -555,6 +592,9 @@ class TestReporter(ScenarioFixture, TestCase):
             worst_last_byte_latency=(max(u_last_byte_latency), 'txID006'),
             size_stats=OrderedDict([
                 ('tiny', {'avg_req_per_sec': 1.430615,
+                          'sent_bytes': 989, 'received_bytes': 0,
+                          'avg_mb_per_sec': round(
+                              989 / 1e6 / (104.999 - 104.3), 6),
                           'first_byte_latency': {'avg': '%7.3f' % 0.6,
                                                  'pctile': '%7.3f' % 0.6,
                                                  'max': '%7.3f' % 0.6,
@@ -576,6 +616,9 @@ class TestReporter(ScenarioFixture, TestCase):
                           'start': 104.3,
                           'stop': 104.999}),
                 ('medium', {'avg_req_per_sec': 0.357143,
+                            'sent_bytes': 989, 'received_bytes': 0,
+                            'avg_mb_per_sec': round(
+                                989 / 1e6 / (102.9 - 100.1), 6),
                             'first_byte_latency': {'avg': '%7.3f' % 0.8,
                                                    'pctile': '%7.3f' % 0.8,
                                                    'max': '%7.3f' % 0.8,
@@ -597,6 +640,9 @@ class TestReporter(ScenarioFixture, TestCase):
                             'start': 100.1,
                             'stop': 102.9}),
                 ('large', {'avg_req_per_sec': 0.043384,
+                           'sent_bytes': 989, 'received_bytes': 0,
+                           'avg_mb_per_sec': round(
+                               989 / 1e6 / (152.2 - 106.1), 6),
                            'first_byte_latency': {'avg': '%7.3f' % 0.2,
                                                   'pctile': '%7.3f' % 0.2,
                                                   'max': '%7.3f' % 0.2,
@@ -626,6 +672,7 @@ class TestReporter(ScenarioFixture, TestCase):
             start=102.9, stop=103.9, req_count=2,
             retries=0, retry_rate=0.0, errors=0,
             avg_req_per_sec=round(2 / (103.9 - 102.9), 6),
+            sent_bytes=0, received_bytes=0, avg_mb_per_sec=0.0,
             first_byte_latency=dict(
                 min='%6.3f' % min(d_first_byte_latency),
                 max='%7.3f' % max(d_first_byte_latency),
@@ -646,6 +693,8 @@ class TestReporter(ScenarioFixture, TestCase):
             worst_last_byte_latency=(max(d_last_byte_latency), 'txID011'),
             size_stats=OrderedDict([
                 ('small', {'avg_req_per_sec': 1.25,
+                           'sent_bytes': 0, 'received_bytes': 0,
+                           'avg_mb_per_sec': 0.0,
                            'first_byte_latency': {'avg': '%7.3f' % 0.5,
                                                   'max': '%7.3f' % 0.5,
                                                   'pctile': '%7.3f' % 0.5,
@@ -667,6 +716,8 @@ class TestReporter(ScenarioFixture, TestCase):
                            'start': 103.1,
                            'stop': 103.9}),
                 ('large', {'avg_req_per_sec': 2.5,
+                           'sent_bytes': 0, 'received_bytes': 0,
+                           'avg_mb_per_sec': 0.0,
                            'first_byte_latency': {'avg': '%7.3f' % 0.1,
                                                   'max': '%7.3f' % 0.1,
                                                   'pctile': '%7.3f' % 0.1,
@@ -692,6 +743,9 @@ class TestReporter(ScenarioFixture, TestCase):
     def test_calculate_scenario_size_stats(self):
         self.assertDictEqual(OrderedDict([
             ('tiny', {'avg_req_per_sec': 0.816493,
+                      'sent_bytes': 2 * 989, 'received_bytes': 0,
+                      'avg_mb_per_sec': round(
+                          2 * 989 / 1e6 / (104.999 - 100.1), 6),
                       'first_byte_latency': {'avg': '%7.3f' % 0.45,
                                              'max': '%7.3f' % 1.0,
                                              'pctile': '%7.3f' % 1.0,
@@ -713,6 +767,9 @@ class TestReporter(ScenarioFixture, TestCase):
                       'start': 100.1,
                       'stop': 104.999}),
             ('small', {'avg_req_per_sec': 0.75,
+                       'sent_bytes': 989, 'received_bytes': 0,
+                       'avg_mb_per_sec': round(
+                           989 / 1e6 / (104.0 - 100.0), 6),
                        'first_byte_latency': {'avg': '%7.3f' % 0.566667,
                                               'max': '%7.3f' % 1.0,
                                               'pctile': '%7.3f' % 1.0,
@@ -734,6 +791,9 @@ class TestReporter(ScenarioFixture, TestCase):
                        'start': 100.0,
                        'stop': 104.0}),
             ('medium', {'avg_req_per_sec': 0.47619,
+                        'sent_bytes': 989, 'received_bytes': 0,
+                        'avg_mb_per_sec': round(
+                            989 / 1e6 / (104.3 - 100.1), 6),
                         'first_byte_latency': {'avg': '%7.3f' % 0.55,
                                                'max': '%7.3f' % 0.8,
                                                'pctile': '%7.3f' % 0.8,
@@ -755,6 +815,9 @@ class TestReporter(ScenarioFixture, TestCase):
                         'start': 100.1,
                         'stop': 104.3}),
             ('large', {'avg_req_per_sec': 0.060852,
+                       'sent_bytes': 989, 'received_bytes': 0,
+                       'avg_mb_per_sec': round(
+                           989 / 1e6 / (152.2 - 102.9), 6),
                        'first_byte_latency': {'avg': '%7.3f' % 0.15,
                                               'max': '%7.3f' % 0.2,
                                               'pctile': '%7.3f' % 0.2,
@@ -776,6 +839,9 @@ class TestReporter(ScenarioFixture, TestCase):
                        'start': 102.9,
                        'stop': 152.2}),
             ('huge', {'avg_req_per_sec': 0.454545,
+                      'sent_bytes': 989, 'received_bytes': 0,
+                      'avg_mb_per_sec': round(
+                          989 / 1e6 / (106.0 - 103.8), 6),
                       'first_byte_latency': {'avg': '%7.3f' % 1.2,
                                              'max': '%7.3f' % 1.2,
                                              'pctile': '%7.3f' % 1.2,
@@ -805,8 +871,698 @@ class TestReporter(ScenarioFixture, TestCase):
             start_time=99.19999999999999,
             stop=106,
             data=[1, 1, 5, 3, 0, 2],
+            # Bytes sent and received by the requests completed each second
+            bytes=[0, 989, 2 * 989, 989, 0, 2 * 989],
         ), self.reporter.stats['time_series'])
 
+    def test_calculate_scenario_stats_excludes_phases(self):
+        warmup = self.gen_result(
+            1, ssbench.READ_OBJECT, 'tiny', 90.0, 90.1, 90.2, 0)
+        warmup['phase'] = 'warmup'
+        cooldown = self.gen_result(
+            2, ssbench.CREATE_OBJECT, 'huge', 106.0, 109.0, 120.0, 3)
+        cooldown['phase'] = 'cooldown'
+        self.stub_results.insert(0, [warmup, warmup])
+        self.stub_results.append([cooldown])
+        self.reporter.read_results()
+
+        self.assertDictEqual({'warmup': 2, 'cooldown': 1},
+                             self.reporter.stats['phase_counts'])
+        self.assertEqual(13, self.reporter.stats['agg_stats']['req_count'])
+        self.assertEqual(7, self.reporter.stats['agg_stats']['retries'])
+        self.assertDictEqual(dict(
+            start=101,
+            start_time=99.19999999999999,
+            stop=106,
+            data=[1, 1, 5, 3, 0, 2],
+            bytes=[0, 989, 2 * 989, 989, 0, 2 * 989],
+        ), self.reporter.stats['time_series'])
+
+        report = self.reporter.generate_default_report()
+        self.assertIn('Excluded from statistics: 1 cooldown, 2 warmup '
+                      'results\n', report)
+        self.reporter.read_results(format_numbers=False)
+        csv_text = self.reporter.generate_default_report(output_csv=True)
+        csv_data = list(csv.DictReader(csv_text.splitlines()))
+        self.assertEqual('2', csv_data[0]['warmup_count'])
+        self.assertEqual('1', csv_data[0]['cooldown_count'])
+
+    def test_calculate_scenario_stats_auth_latency(self):
+        self.stub_results[0][0]['auth_latency'] = 0.5
+        self.stub_results[1][0]['auth_latency'] = 1.25
+        self.reporter.read_results()
+
+        self.assertDictEqual(dict(count=2, total=1.75, max=1.25),
+                             self.reporter.stats['auth_stats'])
+        report = self.reporter.generate_default_report()
+        self.assertIn('Waited for auth tokens: 2 requests, 1.750s total '
+                      '(max: 1.250s; not included in latencies)\n', report)
+
+        reporter = Reporter(self._write_stub_results())
+        reporter.read_results(processes=2)
+        self.assertDictEqual(dict(count=2, total=1.75, max=1.25),
+                             reporter.stats['auth_stats'])
+
+    def test_calculate_scenario_stats_timings(self):
+        self.stub_results[0][0].update(connect_latency=0.25, send_latency=1.5,
+                                       wait_latency=0.5, receive_latency=1.0)
+        self.stub_results[1][0].update(send_latency=0.5, wait_latency=0.75,
+                                       receive_latency=0.25)
+        self.stub_results[0][1].update(
+            connect_latency=0.125, tls_latency=0.375, send_latency=0.0625,
+            wait_latency=0.25, receive_latency=0.5)
+        self.reporter.read_results(format_numbers=False)
+
+        timing_stats = self.reporter.stats['timing_stats']
+        self.assertEqual([ssbench.READ_OBJECT, ssbench.CREATE_OBJECT],
+                         sorted(timing_stats))
+        self.assertEqual(['connect_latency', 'receive_latency',
+                          'send_latency', 'wait_latency'],
+                         sorted(timing_stats[ssbench.CREATE_OBJECT]))
+        self.assertDictEqual(dict(
+            count=2, min=0.5, max=1.5, avg=1.0, pctile=1.5, std_dev=0.5,
+            median=1.0), timing_stats[ssbench.CREATE_OBJECT]['send_latency'])
+        self.assertEqual(
+            1, timing_stats[ssbench.READ_OBJECT]['tls_latency']['count'])
+        csv_data = list(csv.DictReader(
+            self.reporter.generate_default_report(
+                output_csv=True).splitlines()))[0]
+        self.assertEqual('2', csv_data['create_send_count'])
+        self.assertEqual('0.375', csv_data['read_tls_95_pctile'])
+
+        serial_stats = self.reporter.stats
+        for processes in (1, 2):
+            reporter = Reporter(self._write_stub_results())
+            reporter.read_results(format_numbers=False, processes=processes)
+            self._assert_stats_match(serial_stats['timing_stats'],
+                                     reporter.stats['timing_stats'])
+        summary = ResultSummary(1)
+        for results in self.stub_results:
+            for result in results:
+                summary.add(result)
+        self.stub_results = [summary.flush()]
+        reporter = Reporter(self._write_stub_results())
+        reporter.read_results(format_numbers=False)
+        self._assert_stats_match(serial_stats['timing_stats'],
+                                 reporter.stats['timing_stats'])
+
+        self.reporter.read_results(nth_pctile=50)
+        report = self.reporter.generate_default_report()
+        self.assertIn("""
+Request timing breakdown      count       avg    median    50%-ile       max
+CREATE
+       Connect                  1    0.250    0.250    0.250    0.250
+       Send request             2    1.000    1.000    1.000    1.500
+       Wait for reply           2    0.625    0.625    0.625    0.750
+       Receive body             2    0.625    0.625    0.625    1.000
+READ
+       Connect                  1    0.125    0.125    0.125    0.125
+       TLS handshake            1    0.375    0.375    0.375    0.375
+       Send request             1    0.062    0.062    0.062    0.062
+       Wait for reply           1    0.250    0.250    0.250    0.250
+       Receive body             1    0.500    0.500    0.500    0.500
+
+Distribution of requests per worker-ID:""", report)
+
+    def test_calculate_scenario_stats_retried(self):
+        self.stub_results[0][0].update(
+            retries=2, attempt_latencies=[0.5, 0.25, 1.0],
+            first_attempt_latency=0.5, end_to_end_latency=2.0)
+        self.stub_results[1][0].update(
+            retries=1, attempt_latencies=[0.25, 0.5],
+            first_attempt_latency=0.25, end_to_end_latency=1.0)
+        self.reporter.read_results(format_numbers=False)
+
+        timing_stats = self.reporter.stats['timing_stats']
+        self.assertEqual([ssbench.CREATE_OBJECT], sorted(timing_stats))
+        self.assertDictEqual(dict(
+            count=2, min=1.0, max=2.0, avg=1.5, pctile=2.0, std_dev=0.5,
+            median=1.5),
+            timing_stats[ssbench.CREATE_OBJECT]['end_to_end_latency'])
+        csv_data = list(csv.DictReader(
+            self.reporter.generate_default_report(
+                output_csv=True).splitlines()))[0]
+        self.assertEqual('0.375', csv_data['create_first_attempt_avg'])
+        self.assertEqual('2.0', csv_data['create_end_to_end_max'])
+
+        serial_stats = self.reporter.stats
+        summary = ResultSummary(1)
+        for results in self.stub_results:
+            for result in results:
+                summary.add(result)
+        self.stub_results = [summary.flush()]
+        reporter = Reporter(self._write_stub_results())
+        reporter.read_results(format_numbers=False)
+        self._assert_stats_match(serial_stats['timing_stats'],
+                                 reporter.stats['timing_stats'])
+
+        self.reporter.read_results(nth_pctile=50)
+        report = self.reporter.generate_default_report()
+        self.assertNotIn('Request timing breakdown', report)
+        self.assertIn("""
+Retried requests              count       avg    median    50%-ile       max
+CREATE
+       First attempt            2    0.375    0.375    0.375    0.500
+       End-to-end               2    1.500    1.500    1.500    2.000
+
+Distribution of requests per worker-ID:""", report)
+
+    def test_calculate_scenario_stats_segmented(self):
+        for results, segment_latency in ((self.stub_results[0], [0.5, 1.0]),
+                                         (self.stub_results[1], [0.25])):
+            results[0].update(
+                size=2 * 10 ** 7, segments=len(segment_latency),
+                segment_latency=segment_latency, manifest_latency=0.125,
+                object_latency=results[0]['last_byte_latency'])
+        self.reporter.read_results(format_numbers=False)
+
+        stats = self.reporter.stats
+        self.assertDictEqual({ssbench.CREATE_OBJECT: [2, 3, 4 * 10 ** 7]},
+                             stats['segmented_counts'])
+        self.assertEqual(3, stats['timing_stats'][ssbench.CREATE_OBJECT][
+            'segment_latency']['count'])
+        self.assertEqual(1.0, stats['timing_stats'][ssbench.CREATE_OBJECT][
+            'segment_latency']['max'])
+        duration = stats['time_series']['stop'] - \
+            stats['time_series']['start_time']
+        report = self.reporter.generate_default_report()
+        self.assertIn('\nSegmented uploads             count', report)
+        self.assertIn('       Each segment             3', report)
+        self.assertIn('CREATE segmented uploads: 2 objects in 3 segments, '
+                      '40.0 MB (%.1f MB/s)\n' % (40 / duration), report)
+        csv_data = list(csv.DictReader(
+            self.reporter.generate_default_report(
+                output_csv=True).splitlines()))[0]
+        self.assertEqual('2', csv_data['create_segmented_count'])
+        self.assertEqual('40.0', csv_data['create_segmented_mb'])
+        self.assertEqual('3', csv_data['create_segment_count'])
+
+        summary = ResultSummary(1)
+        for results in self.stub_results:
+            for result in results:
+                summary.add(result)
+        self.stub_results = [summary.flush()]
+        reporter = Reporter(self._write_stub_results())
+        reporter.read_results(format_numbers=False)
+        self.assertDictEqual(stats['segmented_counts'],
+                             reporter.stats['segmented_counts'])
+        self._assert_stats_match(stats['timing_stats'],
+                                 reporter.stats['timing_stats'])
+
+    def test_calculate_scenario_stats_read_patterns(self):
+        reads = [result for results in self.stub_results
+                 for result in results
+                 if result['type'] == ssbench.READ_OBJECT and
+                 'exception' not in result]
+        for result, pattern in zip(reads, (
+                ssbench.RANGE_READ, ssbench.RANGE_READ,
+                ssbench.FIRST_BYTES_READ)):
+            result.update({'read_pattern': pattern,
+                           'received_bytes': 10 ** 6,
+                           pattern + '_read_latency':
+                           result['last_byte_latency']})
+        self.reporter.read_results(format_numbers=False)
+
+        stats = self.reporter.stats
+        self.assertDictEqual({ssbench.RANGE_READ: 2 * 10 ** 6,
+                              ssbench.FIRST_BYTES_READ: 10 ** 6},
+                             stats['read_pattern_bytes'])
+        read_timings = stats['timing_stats'][ssbench.READ_OBJECT]
+        self.assertEqual(2, read_timings['range_read_latency']['count'])
+        duration = stats['time_series']['stop'] - \
+            stats['time_series']['start_time']
+        report = self.reporter.generate_default_report()
+        self.assertIn('\nRead patterns                 count', report)
+        self.assertIn('       Single range             2', report)
+        self.assertIn('Bytes read by read pattern: Single range 2.0 MB '
+                      '(%.1f MB/s), First bytes 1.0 MB (%.1f MB/s)\n' % (
+                          2 / duration, 1 / duration), report)
+        csv_data = list(csv.DictReader(
+            self.reporter.generate_default_report(
+                output_csv=True).splitlines()))[0]
+        self.assertEqual('2.0', csv_data['range_read_mb'])
+        self.assertEqual('2', csv_data['read_range_read_count'])
+
+        summary = ResultSummary(1)
+        for results in self.stub_results:
+            for result in results:
+                summary.add(result)
+        self.stub_results = [summary.flush()]
+        reporter = Reporter(self._write_stub_results())
+        reporter.read_results(format_numbers=False)
+        self.assertDictEqual(stats['read_pattern_bytes'],
+                             reporter.stats['read_pattern_bytes'])
+        self._assert_stats_match(stats['timing_stats'],
+                                 reporter.stats['timing_stats'])
+
+    def test_calculate_scenario_stats_metadata_ops(self):
+        self.scenario_dict['metadata_profile'] = dict(head_object=10)
+        self.write_scenario_file()
+        self.scenario = Scenario(self.stub_scenario_file)
+        self.stub_results.append([
+            self.gen_result(
+                1, ssbench.HEAD_OBJECT, 'tiny', 104.0, 104.0, 104.2, 0),
+            self.gen_result(
+                2, ssbench.LIST_CONTAINER, 'small', 104.0, 104.0, 104.5, 0),
+            self.gen_result(
+                2, ssbench.LIST_CONTAINER, 'small', 104.5, 104.5, 104.6, 0)])
+        self.run_results.read_results.return_value = (self.scenario,
+                                                      self.stub_results)
+        self.reporter.read_results(format_numbers=False)
+
+        op_stats = self.reporter.stats['op_stats']
+        self.assertEqual(1, op_stats[ssbench.HEAD_OBJECT]['req_count'])
+        self.assertEqual(2, op_stats[ssbench.LIST_CONTAINER]['req_count'])
+        self.assertEqual(0, op_stats[ssbench.POST_OBJECT]['req_count'])
+        self.assertEqual(16, self.reporter.stats['agg_stats']['req_count'])
+        report = self.reporter.generate_default_report()
+        # Half the ops of three fifths of the objects' sizes, a tenth of
+        # the rest
+        self.assertIn('\nMetadata operations weighted average: 33% HEAD\n',
+                      report)
+        self.assertIn('\nHEAD\n       Count:     1 ', report)
+        self.assertIn('\nLIST\n       Count:     2 ', report)
+        self.assertNotIn('\nPOST\n', report)
+        csv_data = list(csv.DictReader(
+            self.reporter.generate_default_report(
+                output_csv=True).splitlines()))[0]
+        self.assertEqual('2', csv_data['list_count'])
+        self.assertNotIn('post_count', csv_data)
+
+        summary = ResultSummary(1)
+        for results in self.stub_results:
+            for result in results:
+                summary.add(result)
+        self.stub_results = [summary.flush()]
+        reporter = Reporter(self._write_stub_results())
+        reporter.read_results(format_numbers=False)
+        for op in (ssbench.HEAD_OBJECT, ssbench.LIST_CONTAINER):
+            for stat in ('req_count', 'avg_req_per_sec'):
+                self.assertEqual(op_stats[op][stat],
+                                 reporter.stats['op_stats'][op][stat])
+            self.assertAlmostEqual(
+                op_stats[op]['last_byte_latency']['avg'],
+                reporter.stats['op_stats'][op]['last_byte_latency']['avg'])
+
+    def test_calculate_scenario_stats_bytes(self):
+        self.scenario_dict['sizes'][0]['size_distribution'] = dict(
+            type='lognormal', median=99, sigma=1)
+        self.write_scenario_file()
+        self.scenario = Scenario(self.stub_scenario_file)
+        # A read counts the bytes it received and an upload those it sent
+        # (or, in results which don't say, its size)
+        read = self.gen_result(
+            1, ssbench.READ_OBJECT, 'huge', 105.0, 105.1, 105.5, 0)
+        read['received_bytes'] = 60 * 10 ** 6
+        upload = self.gen_result(
+            3, ssbench.CREATE_OBJECT, 'huge', 105.0, 105.0, 105.6, 0)
+        upload['sent_bytes'] = 20 * 10 ** 6
+        self.stub_results.append([read, upload])
+        self.run_results.read_results.return_value = (self.scenario,
+                                                      self.stub_results)
+        self.reporter.read_results(format_numbers=False)
+
+        stats = self.reporter.stats
+        self.assertEqual(
+            (6 * 989 + 20 * 10 ** 6, 60 * 10 ** 6),
+            (stats['agg_stats']['sent_bytes'],
+             stats['agg_stats']['received_bytes']))
+        read_stats = stats['op_stats'][ssbench.READ_OBJECT]
+        self.assertEqual((0, 60 * 10 ** 6), (read_stats['sent_bytes'],
+                                             read_stats['received_bytes']))
+        self.assertEqual(round(60 / (105.5 - 100.1), 6),
+                         read_stats['avg_mb_per_sec'])
+        self.assertEqual(round((989 + 80 * 10 ** 6) / 1e6 / (106.0 - 103.8),
+                               6),
+                         stats['size_stats']['huge']['avg_mb_per_sec'])
+        self.assertEqual(
+            round((3 * 989 + 60 * 10 ** 6) / 1e6 / (106.4 - 100), 6),
+            stats['worker_stats'][1]['avg_mb_per_sec'])
+        self.assertEqual([0, 989, 2 * 989, 989, 80 * 10 ** 6, 2 * 989],
+                         stats['time_series']['bytes'])
+
+        duration = stats['time_series']['stop'] - \
+            stats['time_series']['start_time']
+        report = self.reporter.generate_default_report()
+        self.assertIn('      99  B - 100  B  tiny (lognormal)\n', report)
+        self.assertIn(', huge 80.0 MB (%.1f MB/s)\n' % (80 / duration),
+                      report)
+        self.assertIn(
+            '\n       Bytes: 0.0 MB sent, 60.0 MB received  Average '
+            'throughput: 11.1 MB/s (0.089 Gbit/s)\n', report)
+        self.assertIn('\nThroughput per worker-ID: ', report)
+        self.assertIn('\nPeak throughput: 80.0 MB/s (0.640 Gbit/s) in '
+                      'second 5 of the run\n', report)
+        csv_data = list(csv.DictReader(
+            self.reporter.generate_default_report(
+                output_csv=True).splitlines()))[0]
+        self.assertEqual('60000000', csv_data['read_received_bytes'])
+        self.assertEqual('80.0', csv_data['peak_mb_per_sec'])
+
+        summary = ResultSummary(1)
+        for results in self.stub_results:
+            for result in results:
+                summary.add(result)
+        self.stub_results = [summary.flush()]
+        reporter = Reporter(self._write_stub_results())
+        reporter.read_results(format_numbers=False)
+        for key in ('sent_bytes', 'received_bytes'):
+            self.assertEqual(stats['agg_stats'][key],
+                             reporter.stats['agg_stats'][key])
+            self.assertEqual(read_stats[key], reporter.stats['op_stats'][
+                ssbench.READ_OBJECT][key])
+        self.assertEqual(stats['time_series']['bytes'],
+                         reporter.stats['time_series']['bytes'])
+
+    def test_calculate_scenario_stats_lost(self):
+        lost = self.gen_result(
+            2, ssbench.CREATE_OBJECT, 'huge', 103.0, 103.0, 103.0, 0)
+        lost['lost'] = True
+        lost_read = dict(lost, type=ssbench.READ_OBJECT)
+        self.stub_results.append([lost, lost_read, lost])
+        self.reporter.read_results()
+
+        self.assertDictEqual({ssbench.CREATE_OBJECT: 2,
+                              ssbench.READ_OBJECT: 1},
+                             self.reporter.stats['lost_counts'])
+        self.assertEqual(13, self.reporter.stats['agg_stats']['req_count'])
+        report = self.reporter.generate_default_report()
+        self.assertIn('Lost operations (never answered by a worker): 3 '
+                      '(2 CREATE, 1 READ)\n', report)
+        csv_text = self.reporter.generate_default_report(output_csv=True)
+        csv_data = list(csv.DictReader(csv_text.splitlines()))
+        self.assertEqual('2', csv_data[0]['create_lost_count'])
+
+        reporter = Reporter(self._write_stub_results())
+        reporter.read_results(processes=2)
+        self.assertDictEqual(self.reporter.stats['lost_counts'],
+                             reporter.stats['lost_counts'])
+
+    def test_lost_results_outside_windows_and_phases(self):
+        # Stamped with the end of the run, which may be within a window
+        lost = self.gen_result(
+            2, ssbench.CREATE_OBJECT, 'huge', 103.0, 103.0, 103.0, 0)
+        lost['lost'] = True
+        lost_warmup = dict(lost, phase='warmup')
+        self.stub_results.append([lost, lost_warmup])
+
+        for processes in (1, 2):
+            reporter = Reporter(self._write_stub_results())
+            reporter.read_results(steady_state=True, processes=processes)
+            # A lost warm-up job was never run in its phase
+            self.assertDictEqual({ssbench.CREATE_OBJECT: 2},
+                                 reporter.stats['lost_counts'])
+            self.assertEqual({}, reporter.stats['phase_counts'])
+            # Only the whole run counts them
+            steady_state = reporter.stats['steady_state']
+            self.assertEqual((102, 106), (steady_state['window']['start'],
+                                          steady_state['window']['stop']))
+            self.assertDictEqual({}, steady_state['lost_counts'])
+
+    def test_calculate_scenario_stats_timeouts(self):
+        timed_out = self.gen_result(
+            2, ssbench.READ_OBJECT, 'huge', 103.0, 103.0, 103.0, 0)
+        timed_out.update(exception='DeadlineExceeded()', traceback='',
+                         timed_out=True)
+        self.stub_results.append([timed_out, dict(timed_out)])
+        self.reporter.read_results()
+
+        self.assertDictEqual({ssbench.READ_OBJECT: 2},
+                             self.reporter.stats['timeout_counts'])
+        report = self.reporter.generate_default_report()
+        self.assertIn('Timed-out operations (abandoned at their deadline): '
+                      '2 (2 READ)\n', report)
+        csv_text = self.reporter.generate_default_report(output_csv=True)
+        csv_data = list(csv.DictReader(csv_text.splitlines()))
+        self.assertEqual('2', csv_data[0]['read_timeout_count'])
+
+        reporter = Reporter(self._write_stub_results())
+        reporter.read_results(processes=2)
+        self.assertDictEqual(self.reporter.stats['timeout_counts'],
+                             reporter.stats['timeout_counts'])
+        summary = ResultSummary(1)
+        for results in self.stub_results:
+            for result in results:
+                summary.add(result)
+        self.stub_results = [summary.flush()]
+        reporter = Reporter(self._write_stub_results())
+        reporter.read_results()
+        self.assertDictEqual(self.reporter.stats['timeout_counts'],
+                             reporter.stats['timeout_counts'])
+
+    def test_steady_state_window_skip(self):
+        start, stop = self.reporter.steady_state_window(
+            self.reporter.stats, skip_first=2, skip_last=1.5)
+        self.assertAlmostEqual(101.2, start)
+        self.assertEqual(105.5, stop)
+        self.assertIsNone(
+            self.reporter.steady_state_window(self.reporter.stats,
+                                              skip_first=4, skip_last=4))
+
+    def test_steady_state_window_auto_detect(self):
+        # Smoothed completions per second are 1, 2.33, 3, 2.67, 1.67, 1 and
+        # the median is 2, so seconds 102-105 are steady.
+        self.assertEqual(
+            (102, 106),
+            self.reporter.steady_state_window(self.reporter.stats,
+                                              auto_detect=True))
+        start, stop = self.reporter.steady_state_window(
+            self.reporter.stats, skip_first=4, auto_detect=True)
+        self.assertAlmostEqual(103.2, start)
+        self.assertEqual(106, stop)
+
+    def test_read_results_without_steady_state(self):
+        self.assertIsNone(self.reporter.stats['steady_state'])
+        self.assertNotIn('Steady state',
+                         self.reporter.generate_default_report())
+
+    def test_read_results_empty_steady_state(self):
+        self.reporter.read_results(skip_first=10)
+
+        self.assertIsNone(self.reporter.stats['steady_state'])
+
+    def test_read_results_steady_state(self):
+        self.reporter.read_results(steady_state=True)
+
+        # Whole-run stats are unchanged
+        self.assertEqual(13, self.reporter.stats['agg_stats']['req_count'])
+        ss_stats = self.reporter.stats['steady_state']
+        self.assertDictEqual(dict(start=102, stop=106, auto_detected=True),
+                             ss_stats['window'])
+        self.assertEqual(10, ss_stats['agg_stats']['req_count'])
+        self.assertEqual(2, ss_stats['agg_stats']['retries'])
+        # Requests in flight when the window opened count from its start
+        self.assertEqual(2.5, ss_stats['agg_stats']['avg_req_per_sec'])
+        self.assertEqual(3, ss_stats['op_stats'][ssbench.READ_OBJECT][
+            'req_count'])
+
+        report = self.reporter.generate_default_report()
+        self.assertIn("""
+Steady state (auto-detected): 1970-01-01 00:01:42 UTC to 1970-01-01 00:01:46 UTC (4s)
+
+TOTAL
+       Count:    10 (    0 error;     2 retries: 20.00%)  Average requests per second:   2.5
+""", report)
+
+    def test_read_results_skip_csv(self):
+        self.reporter.read_results(format_numbers=False, skip_first=2,
+                                   skip_last=1)
+
+        csv_text = self.reporter.generate_default_report(output_csv=True)
+        csv_data = list(csv.DictReader(csv_text.splitlines()))[0]
+        self.assertEqual('13', csv_data['total_count'])
+        self.assertEqual('1970-01-01 00:01:41 UTC',
+                         csv_data['steady_start_time'])
+        self.assertEqual('1970-01-01 00:01:46 UTC',
+                         csv_data['steady_stop_time'])
+        self.assertEqual('11', csv_data['steady_total_count'])
+        self.assertEqual('0.1', csv_data['steady_total_first_all_min'])
+        self.assertEqual('4', csv_data['steady_read_count'])
+
+    def _write_stub_results(self, compression=None):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        run_results = RunResults(os.path.join(temp_dir, 'results.stat'),
+                                 compression=compression)
+        # One compressed frame per batch
+        run_results.write_threshold = 1
+        run_results.start_run(self.scenario)
+        for results in self.stub_results:
+            run_results.process_raw_results(msgpack.packb(results))
+        run_results.finalize()
+        return run_results
+
+    def _assert_stats_match(self, expected, actual, path=''):
+        if isinstance(expected, dict):
+            self.assertEqual(sorted(expected.keys()), sorted(actual.keys()),
+                             path)
+            if isinstance(expected, OrderedDict):
+                self.assertEqual(expected.keys(), actual.keys(), path)
+            for key in expected:
+                self._assert_stats_match(expected[key], actual[key],
+                                         '%s/%s' % (path, key))
+        elif isinstance(expected, float) and (
+                path.endswith(('/pctile', '/median')) or
+                '/pctiles/' in path):
+            # Estimated from a histogram
+            self.assertAlmostEqual(expected, actual, delta=expected * 0.01,
+                                   msg=path)
+        elif isinstance(expected, float):
+            self.assertAlmostEqual(expected, actual, places=5, msg=path)
+        else:
+            self.assertEqual(expected, actual, path)
+
+    def test_calculate_scenario_stats_in_processes(self):
+        self.stub_results[0][0]['phase'] = 'warmup'
+        reporter = Reporter(self._write_stub_results())
+        reporter.read_results(format_numbers=False)
+        serial_stats = reporter.stats
+
+        for processes in (2, 3, 7):
+            reporter.read_results(format_numbers=False, processes=processes)
+            self._assert_stats_match(serial_stats, reporter.stats)
+
+        reporter.read_results(format_numbers=False, steady_state=True)
+        serial_stats = reporter.stats
+        reporter.read_results(format_numbers=False, steady_state=True,
+                              processes=2)
+        self.assertEqual((102, 106), (
+            reporter.stats['steady_state']['window']['start'],
+            reporter.stats['steady_state']['window']['stop']))
+        self._assert_stats_match(serial_stats, reporter.stats)
+
+        reporter.read_results(nth_pctile=50)
+        serial_report = reporter.generate_default_report()
+        reporter.read_results(nth_pctile=50, processes=3)
+        self.assertEqual(serial_report.split('\n')[:3],
+                         reporter.generate_default_report().split('\n')[:3])
+
+        reporter.read_results(format_numbers=False)
+        compressed_reporter = Reporter(self._write_stub_results('zlib'))
+        compressed_reporter.read_results(format_numbers=False, processes=4)
+        self._assert_stats_match(reporter.stats, compressed_reporter.stats)
+
+    def test_calculate_scenario_stats_pctiles(self):
+        self.stub_results[0][0]['phase'] = 'warmup'
+        first_byte_latency_all = sorted([0.1, 1.2, 0.2, 0.8, 0.1, 0.1,
+                                         0.2, 1, 0.5, 0.3, 0.6])
+        reporter = Reporter(self._write_stub_results())
+        reporter.read_results(nth_pctile=[75, 50, 99.9],
+                              format_numbers=False)
+        serial_stats = reporter.stats
+        self.assertEqual((75, [75, 50, 99.9]), (serial_stats['nth_pctile'],
+                                                serial_stats['pctiles']))
+        first_byte_latency = serial_stats['agg_stats']['first_byte_latency']
+        self.assertEqual(
+            dict((nth_pctile, round(reporter.pctile(first_byte_latency_all,
+                                                    nth_pctile), 6))
+                 for nth_pctile in (75, 50, 99.9)),
+            first_byte_latency['pctiles'])
+        self.assertEqual(first_byte_latency['pctiles'][75],
+                         first_byte_latency['pctile'])
+        self.assertEqual(
+            ['  N/A  '] * 3,
+            reporter._series_stats([], [75, 50, 99.9], True)[
+                'pctiles'].values())
+
+        reporter.read_results(nth_pctile=[75, 50, 99.9],
+                              format_numbers=False, processes=2)
+        self._assert_stats_match(serial_stats, reporter.stats)
+
+    def test_generate_default_report_pctiles(self):
+        self.reporter.read_results(nth_pctile=[50, 99.9])
+        report = self.reporter.generate_default_report().split('\n')
+        self.assertEqual([
+            '                            min       max      avg      '
+            'std_dev  50%-ile  99.9%-ile                   Worst latency '
+            'TX ID',
+            '       First-byte latency:  0.100 -   1.200    0.508  (  0.386)'
+            '    0.400      1.200  (all obj sizes)  txID004',
+        ], report[17:19])
+
+        self.reporter.read_results(nth_pctile=[50, 99.9],
+                                   format_numbers=False)
+        csv_text = self.reporter.generate_default_report(output_csv=True)
+        csv_data = list(csv.DictReader(csv_text.splitlines()))[0]
+        self.assertEqual(('0.4', '1.2'),
+                         (csv_data['total_first_all_50_pctile'],
+                          csv_data['total_first_all_99.9_pctile']))
+
+    def test_parse_pctiles(self):
+        self.assertEqual([50, 99, 99.9], parse_pctiles('50,99,99.9'))
+        self.assertEqual([95], parse_pctiles('95'))
+        for value in ('100', '0', '50,', 'p99'):
+            self.assertRaises(ValueError, parse_pctiles, value)
+
+    def test_write_latency_distributions(self):
+        reporter = Reporter(self._write_stub_results())
+        reporter.read_results(distributions=True)
+        distributions = reporter.stats['latency_distributions']
+        self.assertEqual((None, None), distributions.keys()[0])
+        self.assertEqual(12, distributions[(None, None)][
+            'first_byte_latency'].count)
+        self.assertEqual(2, distributions[
+            (ssbench.READ_OBJECT, 'tiny')]['last_byte_latency'].count)
+
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        target_dir = os.path.join(temp_dir, 'latencies')
+        paths = reporter.write_latency_distributions(target_dir)
+        self.assertEqual(sorted(paths), sorted(
+            os.path.join(target_dir, name) for name in os.listdir(target_dir)))
+        self.assertEqual(len(distributions) * 4, len(paths))
+
+        with open(os.path.join(target_dir,
+                               'total_all_first_byte_latency.hgrm')) as fp:
+            lines = fp.read().splitlines()
+        self.assertEqual(['Value', 'Percentile', 'TotalCount',
+                          '1/(1-Percentile)'], lines[0].split())
+        self.assertEqual(['0.100000', '0.250000000000', '3', '1.33'],
+                         lines[2].split())
+        self.assertEqual(['1.200000', '1.000000000000', '12'],
+                         lines[-4].split())
+        self.assertEqual('#[Max     =     1.200000, Total count    = '
+                         '          12]', lines[-2])
+        with open(os.path.join(target_dir,
+                               'read_tiny_last_byte_latency.csv')) as fp:
+            rows = list(csv.reader(fp))
+        self.assertEqual(['Latency (s)', 'Cumulative Fraction',
+                          'Cumulative Count'], rows[0])
+        self.assertEqual(['1.800000', '1.000000', '2'], rows[-1])
+
+    def test_calculate_scenario_stats_from_summaries(self):
+        self.stub_results[0][0]['phase'] = 'warmup'
+        self.stub_results[1][0]['auth_latency'] = 0.5
+        reporter = Reporter(self._write_stub_results())
+        reporter.read_results(format_numbers=False)
+        serial_stats = reporter.stats
+
+        # The same results, as workers would have summarized them
+        summaries = []
+        for results in self.stub_results:
+            by_worker = OrderedDict()
+            for result in results:
+                by_worker.setdefault(result['worker_id'], []).append(result)
+            for worker_id, worker_results in by_worker.iteritems():
+                summary = ResultSummary(worker_id)
+                for result in worker_results:
+                    summary.add(result)
+                summaries.append(summary.flush())
+        self.stub_results = summaries
+        reporter = Reporter(self._write_stub_results())
+        # Only a bucket's earliest start is known
+        start_time = serial_stats['time_series'].pop('start_time')
+        for processes in (1, 2):
+            reporter.read_results(format_numbers=False, processes=processes)
+            self.assertAlmostEqual(
+                start_time, reporter.stats['time_series'].pop('start_time'),
+                delta=1)
+            self._assert_stats_match(serial_stats, reporter.stats)
+
+        reporter.read_results()
+        self.assertEqual(self.reporter.generate_default_report().count('\n'),
+                         reporter.generate_default_report().count('\n'))
+
     def test_write_rps_histogram(self):
         # Write out time series data (requests-per-second histogram) to an
         # already open CSV file
@@ -816,13 +1572,13 @@ class TestReporter(ScenarioFixture, TestCase):
         test_csv_file.seek(0)
         reader = csv.reader(test_csv_file)
         self.assertListEqual([
-            ["Seconds Since Start", "Requests Completed"],
-            ['1', '1'],
-            ['2', '1'],
-            ['3', '5'],
-            ['4', '3'],
-            ['5', '0'],
-            ['6', '2'],
+            ["Seconds Since Start", "Requests Completed", "Bytes Completed"],
+            ['1', '1', '0'],
+            ['2', '1', '989'],
+            ['3', '5', '1978'],
+            ['4', '3', '989'],
+            ['5', '0', '0'],
+            ['6', '2', '1978'],
         ], list(reader))
 
     def test_generate_default_report(self):
@@ -846,6 +1602,7 @@ Worker count:   3   Concurrency:   2  Ran 1970-01-01 00:01:39 UTC to 1970-01-01
 
 TOTAL
        Count:    13 (    1 error;     7 retries: 53.85%)  Average requests per second:   0.2
+       Bytes: 0.0 MB sent, 0.0 MB received  Average throughput: 0.0 MB/s (0.000 Gbit/s)
                             min       max      avg      std_dev  50%-ile                   Worst latency TX ID
        First-byte latency:  0.100 -   1.200    0.508  (  0.386)    0.400  (all obj sizes)  txID004
        Last-byte  latency:  0.200 -   3.000    1.158  (  0.970)    0.749  (all obj sizes)  txID002
@@ -862,6 +1619,7 @@ TOTAL
 
 CREATE
        Count:     3 (    0 error;     1 retries: 33.33%)  Average requests per second:   0.5
+       Bytes: 0.0 MB sent, 0.0 MB received  Average throughput: 0.0 MB/s (0.000 Gbit/s)
                             min       max      avg      std_dev  50%-ile                   Worst latency TX ID
        First-byte latency:  0.100 -   1.200    0.767  (  0.478)    1.000  (all obj sizes)  txID004
        Last-byte  latency:  0.200 -   3.000    1.800  (  1.178)    2.200  (all obj sizes)  txID002
@@ -886,6 +1644,7 @@ READ
 
 UPDATE
        Count:     4 (    1 error;     6 retries: 150.00%)  Average requests per second:   0.1
+       Bytes: 0.0 MB sent, 0.0 MB received  Average throughput: 0.0 MB/s (0.000 Gbit/s)
                             min       max      avg      std_dev  50%-ile                   Worst latency TX ID
        First-byte latency:  0.200 -   0.800    0.533  (  0.249)    0.600  (all obj sizes)  txID006
        Last-byte  latency:  0.300 -   2.800    1.266  (  1.097)    0.699  (all obj sizes)  txID006
@@ -907,6 +1666,9 @@ DELETE
        Last-byte  latency:  0.400 -   0.400    0.400  (  0.000)    0.400  (   large objs)  txID007
 
 Distribution of requests per worker-ID:  4.000 -   5.000 (avg:   4.333; stddev:   0.471)
+Throughput per worker-ID:  0.000 -   0.000 MB/s (avg:   0.000; stddev:   0.000)
+Peak throughput: 0.0 MB/s (0.000 Gbit/s) in second 3 of the run
+Bytes transferred by size class: tiny 0.0 MB (0.0 MB/s), small 0.0 MB (0.0 MB/s), medium 0.0 MB (0.0 MB/s), large 0.0 MB (0.0 MB/s), huge 0.0 MB (0.0 MB/s)
 """.split('\n'), self.reporter.generate_default_report().split('\n'))
 
     def test_generate_default_report_csv(self):
@@ -927,8 +1689,32 @@ Distribution of requests per worker-ID:  4.000 -   5.000 (avg:   4.333; stddev:
             'start_time': '1970-01-01 00:01:39 UTC',
             'stop_time': '1970-01-01 00:01:46 UTC',
             'duration': '6.800000000000011',
+            # 989 bytes per upload
+            'tiny_transferred_mb': '0.001978',
+            'tiny_transferred_mb_per_sec': '0.000290882352941176',
+            'small_transferred_mb': '0.000989',
+            'small_transferred_mb_per_sec': '0.000145441176470588',
+            'medium_transferred_mb': '0.000989',
+            'medium_transferred_mb_per_sec': '0.000145441176470588',
+            'large_transferred_mb': '0.000989',
+            'large_transferred_mb_per_sec': '0.000145441176470588',
+            'huge_transferred_mb': '0.000989',
+            'huge_transferred_mb_per_sec': '0.000145441176470588',
+            'worker_mb_per_sec_min': '3.8e-05',
+            'worker_mb_per_sec_max': '0.000464',
+            'worker_mb_per_sec_avg': '0.000235',
+            'worker_mb_per_sec_std_dev': '0.000175',
+            'peak_mb_per_sec': '0.001978',
             'total_count': '13',
             'total_avg_req_per_s': '0.249042',
+            'total_sent_bytes': '5934',
+            'total_received_bytes': '0',
+            'total_avg_mb_per_s': '0.000114',
+            'total_tiny_avg_mb_per_s': '0.000404',
+            'total_small_avg_mb_per_s': '0.000247',
+            'total_medium_avg_mb_per_s': '0.000235',
+            'total_large_avg_mb_per_s': '2e-05',
+            'total_huge_avg_mb_per_s': '0.00045',
             'total_first_all_min': '0.1',
             'total_first_all_max': '1.2',
             'total_first_all_avg': '0.508333',
@@ -1003,6 +1789,12 @@ Distribution of requests per worker-ID:  4.000 -   5.000 (avg:   4.333; stddev:
             'total_last_huge_worst_txid': 'txID004',
             'create_count': '3',
             'create_avg_req_per_s': '0.5',
+            'create_sent_bytes': '2967',
+            'create_received_bytes': '0',
+            'create_avg_mb_per_s': '0.000495',
+            'create_tiny_avg_mb_per_s': '0.004945',
+            'create_small_avg_mb_per_s': '0.00033',
+            'create_huge_avg_mb_per_s': '0.00045',
             'create_first_all_min': '0.1',
             'create_first_all_max': '1.2',
             'create_first_all_avg': '0.766667',
@@ -1103,6 +1895,12 @@ Distribution of requests per worker-ID:  4.000 -   5.000 (avg:   4.333; stddev:
             'read_last_medium_worst_txid': 'txID012',
             'update_count': '4',
             'update_avg_req_per_s': '0.076775',
+            'update_sent_bytes': '2967',
+            'update_received_bytes': '0',
+            'update_avg_mb_per_s': '5.7e-05',
+            'update_tiny_avg_mb_per_s': '0.001415',
+            'update_medium_avg_mb_per_s': '0.000353',
+            'update_large_avg_mb_per_s': '2.1e-05',
             'update_first_all_min': '0.2',
             'update_first_all_max': '0.8',
             'update_first_all_avg': '0.533333',
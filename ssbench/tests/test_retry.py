@@ -0,0 +1,57 @@
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+import argparse
+from unittest import TestCase
+from flexmock import flexmock
+
+from ssbench import retry
+
+
+class TestRetry(TestCase):
+    def test_backoff_delay(self):
+        limits = []
+        flexmock(random).should_receive('uniform').replace_with(
+            lambda low, high: limits.append((low, high)) or high)
+
+        for tries in (1, 2, 3, 10):
+            retry.backoff_delay(tries, 0.25, 1.5)
+
+        self.assertEqual([(0, 0.25), (0, 0.5), (0, 1.0), (0, 1.5)], limits)
+
+    def test_parse_retry_rule(self):
+        self.assertEqual((404, 2), retry.parse_retry_rule('404=2'))
+        self.assertEqual((retry.SOCKET_ERROR, 3),
+                         retry.parse_retry_rule('socket=3'))
+        for spec in ('404', '404=two', 'timeout=1', '404=1=2'):
+            self.assertRaises(argparse.ArgumentTypeError,
+                              retry.parse_retry_rule, spec)
+
+    def test_retry_budget(self):
+        budget = retry.RetryBudget()
+        # Starts with the reserve...
+        for _ in xrange(int(retry.RETRY_BUDGET_RESERVE)):
+            self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+        # ...then earns retries a fraction at a time
+        for _ in xrange(4):
+            budget.deposit(25.0)
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+        # ...but never more than the reserve
+        for _ in xrange(1000):
+            budget.deposit(100.0)
+        self.assertEqual(retry.RETRY_BUDGET_RESERVE, budget.tokens)
@@ -0,0 +1,126 @@
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import msgpack
+from nose.tools import (assert_equal, assert_true, assert_false,
+                        assert_not_equal, assert_less)
+
+import ssbench
+from ssbench.run_context import RunContext, is_compact_message
+
+
+AUTH_KWARGS = {
+    'auth_url': 'http://keystone.example.com:5000/v2.0',
+    'user': 'benchmarker', 'key': 'sekrit', 'auth_version': '2.0',
+    'os_options': {'tenant_name': 'bench', 'region_name': 'RegionOne'},
+    'storage_urls': None,
+}
+
+
+def _run_context(**kwargs):
+    return RunContext(dict(auth_kwargs=AUTH_KWARGS, connect_timeout=10,
+                           network_timeout=20, block_size=None),
+                      containers=['ssbench_%06d' % i for i in xrange(10)],
+                      size_strs=['tiny', 'small'], **kwargs)
+
+
+def test_round_trip():
+    run_context = _run_context()
+    jobs = [
+        dict(type=ssbench.CREATE_OBJECT, size_str='small',
+             container='ssbench_000003', name='small_000042', size=1990,
+             block_size=None, head_first=True),
+        dict(type=ssbench.READ_OBJECT, size_str='tiny',
+             container='ssbench_000009', name='tiny_000001',
+             block_size=None, phase='warmup'),
+        dict(type=ssbench.DELETE_OBJECT, size_str='tiny',
+             container='ssbench_000000', name='tiny_000002'),
+        # Values which aren't in the context's tables
+        dict(type='PING', size_str='huge', container='who_cares',
+             name='who_cares', block_size=4096),
+    ]
+    message = msgpack.loads(run_context.packb_jobs(jobs), use_list=False)
+    assert_true(is_compact_message(message))
+
+    decoded = run_context.decode_jobs(message)
+    for job, decoded_job in zip(jobs, decoded):
+        expected = dict(run_context.job_defaults)
+        expected.update(job)
+        assert_equal(expected, decoded_job)
+
+
+def test_compact_encoding():
+    run_context = _run_context()
+    assert_equal((0, 1, 3, 42, 1990),
+                 run_context.encode_job(dict(
+                     type=ssbench.CREATE_OBJECT, size_str='small',
+                     container='ssbench_000003', name='small_000042',
+                     size=1990, block_size=None, connect_timeout=10)))
+    # Names which don't round-trip through the index stay strings
+    assert_equal((1, 0, 'other', 'tiny_42', None, {'noop': True}),
+                 run_context.encode_job(dict(
+                     type=ssbench.READ_OBJECT, size_str='tiny',
+                     container='other', name='tiny_42', noop=True)))
+
+    job = dict(type=ssbench.UPDATE_OBJECT, size_str='tiny',
+               container='ssbench_000001', name='tiny_000123', size=99,
+               auth_kwargs=AUTH_KWARGS, connect_timeout=10,
+               network_timeout=20, block_size=None)
+    assert_less(len(msgpack.dumps(run_context.encode_job(job))) * 10,
+                len(msgpack.dumps(job)))
+
+
+def test_pack_unpack():
+    run_context = _run_context()
+    unpacked = RunContext.unpackb(run_context.packb())
+
+    assert_equal(run_context.context_id, unpacked.context_id)
+    assert_equal(run_context.job_defaults, unpacked.job_defaults)
+    assert_equal(run_context.containers, unpacked.containers)
+    assert_equal(run_context.size_strs, unpacked.size_strs)
+    assert_equal(False, unpacked.start_barrier)
+    assert_equal(True, RunContext.unpackb(
+        _run_context(start_barrier=True).packb()).start_barrier)
+    job = run_context.encode_job(dict(
+        type=ssbench.CREATE_OBJECT, size_str='small',
+        container='ssbench_000003', name='small_000042', size=1990))
+    assert_equal(run_context.decode_job(job), unpacked.decode_job(job))
+
+
+def test_context_ids_are_unique():
+    assert_not_equal(_run_context().context_id, _run_context().context_id)
+    assert_equal(5, _run_context(context_id=5).context_id)
+
+
+def test_is_compact_message():
+    assert_false(is_compact_message(({'type': 'PING'},)))
+    assert_false(is_compact_message(({'type': 'PING'}, {'type': 'PING'})))
+    assert_true(is_compact_message((5, ((0, 0, 0, 1, 99),))))
+    assert_true(is_compact_message((5, ((0, 0, 0, 1, 99),), 1000)))
+
+
+def test_numbered_jobs():
+    run_context = _run_context()
+    jobs = [dict(type=ssbench.READ_OBJECT, size_str='tiny',
+                 container='ssbench_000001', name='tiny_%06d' % i, size=99)
+            for i in xrange(3)]
+    job_data = msgpack.loads(run_context.packb_jobs(jobs, 40),
+                             use_list=False)
+
+    assert_equal([40, 41, 42], [job['job_id'] for job
+                                in run_context.decode_jobs(job_data)])
+    job_data = msgpack.loads(run_context.packb_jobs(jobs), use_list=False)
+    assert_true(all('job_id' not in job
+                    for job in run_context.decode_jobs(job_data)))
@@ -20,10 +20,10 @@ import msgpack
 import tempfile
 import subprocess
 from nose.tools import (assert_equal, assert_false, assert_greater,
-                        assert_raises)
+                        assert_raises, assert_in, assert_less)
 
 from ssbench.scenario import Scenario
-from ssbench.run_results import RunResults
+from ssbench.run_results import RunResults, available_codecs
 
 from ssbench.tests.test_scenario import ScenarioFixture
 
@@ -175,3 +175,83 @@ class TestRunResults(ScenarioFixture):
             [{'two-1': 2.1}, {'two-2': 2.2}],
             [{'three': '3'}],
         ])
+
+    def _write_compressed_results(self, compression):
+        run_results = RunResults(self.result_file_path,
+                                 compression=compression)
+        run_results.write_threshold = 1024
+        run_results.start_run(self.scenario)
+        batches = [[{'i': i, 'pad': 'x' * (i % 300)}] * (i % 3 + 1)
+                   for i in xrange(100)]
+        for batch in batches:
+            run_results.process_raw_results(msgpack.packb(batch))
+        run_results.finalize()
+        return batches
+
+    def test_compressed_read_results(self):
+        assert_in('zlib', available_codecs())
+        for compression in available_codecs():
+            batches = self._write_compressed_results(compression)
+            with open(self.result_file_path, 'rb') as f:
+                assert_equal('SSBENCHF', f.read(8))
+
+            got_scenario, unpacker = RunResults(
+                self.result_file_path).read_results()
+            assert_equal(self.scenario._scenario_data,
+                         got_scenario._scenario_data)
+            assert_equal(batches, list(unpacker))
+
+    def test_compression_shrinks_file(self):
+        batches = self._write_compressed_results('zlib')
+        raw_size = len(self.scenario.packb()) + sum(
+            len(msgpack.packb(batch)) for batch in batches)
+        assert_less(os.path.getsize(self.result_file_path), raw_size / 5)
+
+    def test_unknown_compression(self):
+        with assert_raises(ValueError):
+            RunResults(self.result_file_path,
+                       compression='rot13').start_run(self.scenario)
+
+    def test_read_batches(self):
+        for compression in [None] + available_codecs():
+            batches = self._write_compressed_results(compression)
+            run_results = RunResults(self.result_file_path)
+
+            positions_batches = list(run_results.read_batches())
+            assert_equal(batches, [b for _, b in positions_batches])
+            positions = [p for p, _ in positions_batches]
+            assert_equal(sorted(positions), positions)
+
+            partitioned = []
+            for partition in xrange(3):
+                partitioned.extend(run_results.read_batches(partition, 3))
+            assert_equal(positions_batches, sorted(partitioned))
+            if compression:
+                # Partitions are made of whole frames
+                assert_greater(len(set(p[0] for p in positions)), 3)
+                assert_greater(len(batches), len(set(p[0]
+                                                     for p in positions)))
+
+    def test_merge_spools(self):
+        spool_paths = []
+        for worker_id, completion_times in enumerate(
+                [[1.0, 2.5, 4.0], [0.5, 3.0], [], [2.0, 2.5, 5.0, 6.0]]):
+            spool_path = os.path.join(self.temp_dir, '%d.spool' % worker_id)
+            spool = RunResults(spool_path)
+            spool.write_threshold = 1  # a frame per batch
+            spool.start_spool()
+            for completed_at in completion_times:
+                spool.process_raw_results(msgpack.dumps(
+                    [dict(worker_id=worker_id, completed_at=completed_at)]))
+            spool.finalize()
+            spool_paths.append(spool_path)
+
+        self.run_results.start_run(self.scenario)
+        assert_equal(9, self.run_results.merge_spools(spool_paths))
+        self.run_results.finalize()
+
+        _, unpacker = self.run_results.read_results()
+        merged = [(result['completed_at'], result['worker_id'])
+                  for batch in unpacker for result in batch]
+        assert_equal([(0.5, 1), (1.0, 0), (2.0, 3), (2.5, 0), (2.5, 3),
+                      (3.0, 1), (4.0, 0), (5.0, 3), (6.0, 3)], merged)
@@ -136,9 +136,9 @@ class TestRunState(object):
         self._fill_run_results()
         cleanups = list(self.run_state.cleanup_object_infos())
 
-        assert_equal(cleanups, [('bucket3', 'obj4', False),
-                                ('bucket0', 'obj3', False),
-                                ('bucket1', 'obj6', False)])
+        assert_equal(cleanups, [('obtuse', ('bucket3', 'obj4', False)),
+                                ('round', ('bucket0', 'obj3', False)),
+                                ('round', ('bucket1', 'obj6', False))])
         assert_equal(self.run_state.objs_by_size, {
             'obtuse': deque([
                 ('bucket0', 'obj1', True),
@@ -151,9 +151,10 @@ class TestRunState(object):
         self._fill_run_results()
         cleanups = set(self.run_state.cleanup_object_infos())
 
-        assert_set_equal(cleanups, set([('bucket3', 'obj4', False),
-                                        ('bucket0', 'obj3', False),
-                                        ('bucket1', 'obj6', False)]))
+        assert_set_equal(cleanups, set([
+            ('obtuse', ('bucket3', 'obj4', False)),
+            ('round', ('bucket0', 'obj3', False)),
+            ('round', ('bucket1', 'obj6', False))]))
         # There were no initials, so there's nothing left:
         assert_equal(self.run_state.objs_by_size, {
             'obtuse': deque(),
@@ -251,6 +252,27 @@ class TestRunState(object):
                 ('bucket1', 'obj6', False)]),
         })
 
+    def test_fill_in_job_for_container_ops(self):
+        self._fill_initial_results()
+        for job_type in ssbench.CONTAINER_OPS:
+            assert_equal(self.run_state.fill_in_job({
+                'type': job_type,
+                'size_str': 'obtuse',
+                'container': 'bucket7',
+            }), {
+                'type': job_type,
+                'size_str': 'obtuse',
+                'container': 'bucket7',
+            })
+        # No object was used
+        assert_equal(self.run_state.objs_by_size, {
+            'obtuse': deque([
+                ('bucket0', 'obj1', True),
+                ('bucket1', 'obj1', True)]),
+            'round': deque([
+                ('bucket0', 'obj2', True)]),
+        })
+
     def test_fill_in_job_when_empty(self):
         self._fill_initial_results()
         assert_equal(self.run_state.fill_in_job({
@@ -337,9 +337,91 @@ class TestScenario(ScenarioFixture):
         assert_greater(len(jobs), 1)
         # +/- 10ms seems good:
         assert_almost_equal(delta_t, scenario.run_seconds, delta=0.01)
+        for job in jobs:
+            assert_not_in('phase', job)
 
+        # The run timing doesn't involve signals at all
         restored_handler = signal.signal(signal.SIGALRM, signal.SIG_DFL)
         assert_equal(restored_handler, initial_handler)
+        assert_equal(0, signal.alarm(0))
+
+    def test_bench_jobs_with_fractional_run_seconds(self):
+        scenario = Scenario(self.stub_scenario_file, run_seconds=0.25)
+
+        start_time = time.time()
+        jobs = list(scenario.bench_jobs())
+        delta_t = time.time() - start_time
+
+        assert_greater(len(jobs), 1)
+        assert_almost_equal(delta_t, 0.25, delta=0.01)
+
+    def test_bench_jobs_concurrent_scenarios(self):
+        # Two interleaved generators don't stomp on each other's timing
+        short = Scenario(self.stub_scenario_file, run_seconds=0.1)
+        longer = Scenario(self.stub_scenario_file, run_seconds=0.3)
+        short_jobs, longer_jobs = short.bench_jobs(), longer.bench_jobs()
+
+        start_time = time.time()
+        short_count = longer_count = 0
+        short_stop = None
+        for longer_job in longer_jobs:
+            longer_count += 1
+            if short_jobs is not None:
+                try:
+                    short_jobs.next()
+                    short_count += 1
+                except StopIteration:
+                    short_stop = time.time() - start_time
+                    short_jobs = None
+        longer_stop = time.time() - start_time
+
+        assert_greater(short_count, 1)
+        assert_greater(longer_count, short_count)
+        assert_almost_equal(short_stop, 0.1, delta=0.01)
+        assert_almost_equal(longer_stop, 0.3, delta=0.01)
+
+    def test_bench_jobs_with_warmup_and_cooldown(self):
+        self.scenario_dict['warmup_seconds'] = 0.1
+        self.scenario_dict['cooldown_seconds'] = 0.05
+        self.write_scenario_file()
+        scenario = Scenario(self.stub_scenario_file, operation_count=500)
+        assert_equal(0.1, scenario.warmup_seconds)
+        assert_equal(0.05, scenario.cooldown_seconds)
+
+        start_time = time.time()
+        jobs = list(scenario.bench_jobs())
+        delta_t = time.time() - start_time
+
+        phases = [job.get('phase') for job in jobs]
+        phase_counter = Counter(phases)
+        assert_equal(500, phase_counter[None])
+        assert_greater(phase_counter['warmup'], 0)
+        assert_greater(phase_counter['cooldown'], 0)
+        # Phases come strictly in order
+        assert_equal(sorted(phases, key=[
+            'warmup', None, 'cooldown'].index), phases)
+        assert_greater(delta_t, 0.15)
+
+        # The job indices continue through all the phases
+        names = [job['name'] for job in jobs if 'name' in job]
+        assert_equal(len(names), len(set(names)))
+
+    def test_warmup_and_cooldown_overrides(self):
+        self.scenario_dict['warmup_seconds'] = 3
+        self.write_scenario_file()
+        scenario = Scenario(self.stub_scenario_file, warmup_seconds=1.5,
+                            cooldown_seconds=2.5)
+        assert_equal(1.5, scenario.warmup_seconds)
+        assert_equal(2.5, scenario.cooldown_seconds)
+        assert_equal(0, self.scenario.warmup_seconds)
+        assert_equal(0, self.scenario.cooldown_seconds)
+
+        unpacked = Scenario.unpackb(scenario.packb())
+        assert_equal(1.5, unpacked.warmup_seconds)
+        assert_equal(2.5, unpacked.cooldown_seconds)
+
+        with assert_raises(ValueError):
+            Scenario(self.stub_scenario_file, warmup_seconds=-1)
 
     def test_bench_job_0(self):
         bench_job = self.scenario.bench_job('small', 0, 31)
@@ -409,6 +491,143 @@ class TestScenario(ScenarioFixture):
             size_str='huge',
         ), bench_job)
 
+    def test_segmented_size(self):
+        self.scenario_dict['sizes'][4].update(segment_size=100,
+                                              segment_concurrency=3)
+        self.write_scenario_file()
+        scenario = Scenario(self.stub_scenario_file)
+
+        for crud_index in xrange(4):
+            bench_job = scenario.bench_job('large', crud_index, 1)
+            assert_equal(100, bench_job['segment_size'])
+            assert_equal(3, bench_job['segment_concurrency'])
+        assert_not_in('segment_size', scenario.bench_job('small', 0, 1))
+
+        self.scenario_dict['sizes'][4]['segment_size'] = 0
+        self.write_scenario_file()
+        with assert_raises(ValueError):
+            Scenario(self.stub_scenario_file)
+
+    def test_read_profile(self):
+        self.scenario_dict.update(read_profile=dict(full=1, range=1),
+                                  range_size=50)
+        # Overridden for this size
+        self.scenario_dict['sizes'][4].update(
+            read_profile=dict(multirange=1, first=1), range_count=3,
+            first_bytes=10)
+        self.write_scenario_file()
+        scenario = Scenario(self.stub_scenario_file)
+
+        patterns = Counter()
+        for _ in xrange(1000):
+            job = scenario.bench_job('tiny', 1, 1)
+            patterns[job['read_pattern']] += 1
+            if job['read_pattern'] == ssbench.RANGE_READ:
+                (first, last), = job['ranges']
+                assert_equal(49, last - first)
+                # Within the smallest object of the size
+                assert_true(0 <= first and last < 99)
+            else:
+                assert_not_in('ranges', job)
+        assert_equal([ssbench.FULL_READ, ssbench.RANGE_READ],
+                     sorted(patterns))
+        assert_almost_equal(500, patterns[ssbench.FULL_READ], delta=100)
+
+        for _ in xrange(100):
+            job = scenario.bench_job('large', 1, 1)
+            if job['read_pattern'] == ssbench.FIRST_BYTES_READ:
+                assert_equal(10, job['read_bytes'])
+            else:
+                assert_equal(ssbench.MULTI_RANGE_READ, job['read_pattern'])
+                # One range in each third of 399 bytes
+                assert_equal([(i * 133, i * 133 + 49) for i in xrange(3)],
+                             [(start - start % 133, end - start % 133)
+                              for start, end in job['ranges']])
+        # Only reads get a read pattern
+        assert_not_in('read_pattern', scenario.bench_job('tiny', 0, 1))
+
+        self.scenario_dict['read_profile'] = dict(all=1)
+        self.write_scenario_file()
+        with assert_raises(ValueError):
+            Scenario(self.stub_scenario_file)
+
+    def test_read_profile_objects_too_small(self):
+        self.scenario_dict['sizes'][0].update(
+            size_min=2, read_profile=dict(multirange=1))
+        self.write_scenario_file()
+        with assert_raises(ValueError):
+            Scenario(self.stub_scenario_file)
+
+    def test_metadata_profile(self):
+        self.scenario_dict.update(
+            crud_profile=[1, 1, 1, 1],
+            metadata_profile=dict(head_object=2, list_container=2),
+            listing_limit=50)
+        # Overridden for this size
+        self.scenario_dict['sizes'][1].update(
+            metadata_profile=dict(post_object=2, head_container=2),
+            listing_limit=10)
+        self.write_scenario_file()
+        scenario = Scenario(self.stub_scenario_file)
+
+        tiny = scenario.sizes_by_name['tiny']
+        assert_equal([12.5] * 4, tiny['crud_pcts'])
+        assert_equal([25.0, 0.0, 25.0, 0.0], tiny['metadata_pcts'])
+        types = Counter(scenario.random_bench_job(1)['type']
+                        for _ in xrange(2000))
+        assert_equal(set([ssbench.CREATE_OBJECT, ssbench.READ_OBJECT,
+                          ssbench.UPDATE_OBJECT, ssbench.DELETE_OBJECT,
+                          ssbench.HEAD_OBJECT, ssbench.POST_OBJECT,
+                          ssbench.LIST_CONTAINER, ssbench.HEAD_CONTAINER]),
+                     set(types))
+
+        # Object operations get their objects from the RunState
+        assert_equal(dict(type=ssbench.HEAD_OBJECT, size_str='tiny'),
+                     scenario.bench_job('tiny', 4, 1))
+        assert_equal(dict(type=ssbench.POST_OBJECT, size_str='tiny'),
+                     scenario.bench_job('tiny', 5, 1))
+        job = scenario.bench_job('tiny', 6, 1)
+        assert_in(job.pop('container'), scenario.containers)
+        marker = job.pop('marker')
+        assert_true('tiny_000000' <= marker <= 'tiny_000700', marker)
+        assert_equal(dict(type=ssbench.LIST_CONTAINER, size_str='tiny',
+                          prefix='tiny_', delimiter='/', limit=50), job)
+        assert_equal(10, scenario.bench_job('small', 6, 1)['limit'])
+        job = scenario.bench_job('tiny', 7, 1)
+        assert_in(job.pop('container'), scenario.containers)
+        assert_equal(dict(type=ssbench.HEAD_CONTAINER, size_str='tiny'), job)
+
+        self.scenario_dict['metadata_profile'] = dict(copy_object=1)
+        self.write_scenario_file()
+        with assert_raises(ValueError):
+            Scenario(self.stub_scenario_file)
+
+    def test_size_distribution(self):
+        sizes_file = os.path.join(os.path.dirname(self.stub_scenario_file),
+                                  '.430gjf.sizes.csv')
+        with open(sizes_file, 'w') as fp:
+            fp.write('5000,1\n')
+        self.scenario_dict['sizes'][0].update(
+            size_min=1, size_max=10000, size_distribution=dict(
+                type='empirical', file=os.path.basename(sizes_file)))
+        self.scenario_dict['sizes'][1]['size_distribution'] = dict(
+            type='fixed', sizes=[199])
+        self.write_scenario_file()
+        try:
+            scenario = Scenario(self.stub_scenario_file)
+        finally:
+            os.unlink(sizes_file)
+
+        assert_equal(5000, scenario.create_job('tiny', 1)['size'])
+        assert_equal(5000, scenario.bench_job('tiny', 2, 1)['size'])
+        assert_equal(199, scenario.bench_job('small', 0, 1)['size'])
+        # Others are still uniform
+        assert_in(scenario.bench_job('medium', 0, 1)['size'], [299, 300])
+
+        # The file's sizes go with the scenario
+        scenario = Scenario.unpackb(scenario.packb())
+        assert_equal(5000, scenario.create_job('tiny', 1)['size'])
+
     def test_initial_jobs(self):
         jobs = list(self.scenario.initial_jobs())
 
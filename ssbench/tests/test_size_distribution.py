@@ -0,0 +1,123 @@
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+from collections import Counter
+from nose.tools import (assert_equal, assert_raises, assert_almost_equal,
+                        assert_true)
+
+from ssbench import size_distribution
+from ssbench.size_distribution import SizeDistribution
+
+
+def _samples(distribution, count=5000):
+    return [distribution.sample() for _ in xrange(count)]
+
+
+def _median(sizes):
+    return sorted(sizes)[len(sizes) // 2]
+
+
+def test_uniform():
+    sizes = _samples(SizeDistribution(10, 20))
+    assert_equal(range(10, 21), sorted(set(sizes)))
+    # Also when not given
+    sizes = _samples(SizeDistribution(10, 20, {'type': 'uniform'}))
+    assert_equal(range(10, 21), sorted(set(sizes)))
+
+
+def test_lognormal():
+    sizes = _samples(SizeDistribution(
+        1, 10 ** 9, {'type': 'lognormal', 'median': 10000, 'sigma': 1.5}))
+    assert_almost_equal(10000, _median(sizes), delta=1500)
+    # Heavy-tailed: the mean is well above the median
+    assert_true(sum(sizes) / len(sizes) > 20000)
+
+    # Clamped
+    sizes = _samples(SizeDistribution(
+        5000, 20000, {'type': 'lognormal', 'median': 10000, 'sigma': 3}))
+    assert_equal((5000, 20000), (min(sizes), max(sizes)))
+
+
+def test_pareto():
+    sizes = _samples(SizeDistribution(
+        1000, 10 ** 9, {'type': 'pareto', 'alpha': 1.0}))
+    assert_true(min(sizes) >= 1000)
+    # Half of them under twice the minimum
+    assert_almost_equal(2000, _median(sizes), delta=200)
+
+
+def test_fixed():
+    sizes = Counter(_samples(SizeDistribution(
+        1, 10000, {'type': 'fixed', 'sizes': [10, 100, 1000],
+                   'weights': [3, 1, 0]})))
+    assert_equal([10, 100], sorted(sizes))
+    assert_almost_equal(3, float(sizes[10]) / sizes[100], delta=0.5)
+
+    sizes = Counter(_samples(SizeDistribution(
+        1, 10000, {'type': 'fixed', 'sizes': [10, 100]})))
+    assert_almost_equal(1, float(sizes[10]) / sizes[100], delta=0.2)
+
+
+def test_empirical():
+    temp_dir = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(temp_dir, 'sizes.csv'), 'w') as fp:
+            fp.write('size,count\n100,1\n200,3\n')
+        distribution = SizeDistribution(
+            1, 1000, {'type': 'empirical', 'file': 'sizes.csv'}, temp_dir)
+    finally:
+        shutil.rmtree(temp_dir)
+    # The file is read into the spec
+    assert_equal({'type': 'empirical', 'points': [[100, 1.0], [200, 3.0]]},
+                 distribution.spec)
+    sizes = Counter(_samples(distribution))
+    assert_almost_equal(3, float(sizes[200]) / sizes[100], delta=0.5)
+
+    # Interpolated along a CDF: a quarter of them from 0 to 100 bytes, the
+    # rest from 100 to 1100
+    sizes = _samples(SizeDistribution(0, 2000, {
+        'type': 'empirical', 'format': 'cdf',
+        'points': [[0, 0], [100, 0.25], [1100, 1.0]]}))
+    assert_equal(0, min(sizes))
+    assert_true(max(sizes) <= 1100)
+    assert_almost_equal(0.25, len([size for size in sizes if size < 100]) /
+                        float(len(sizes)), delta=0.03)
+    assert_almost_equal(433, _median(sizes), delta=50)
+
+
+def test_batches():
+    distribution = SizeDistribution(1, 2)
+    distribution.sample()
+    assert_equal(size_distribution.SAMPLE_BATCH - 1,
+                 len(distribution._batch))
+
+
+def test_bad_specs():
+    for spec in ({'type': 'gaussian'},
+                 {'type': 'lognormal', 'median': 100},
+                 {'type': 'lognormal', 'median': -1, 'sigma': 1},
+                 {'type': 'pareto'},
+                 {'type': 'fixed'},
+                 {'type': 'fixed', 'sizes': [1, 2], 'weights': [1]},
+                 {'type': 'fixed', 'sizes': [1], 'weights': [0]},
+                 {'type': 'empirical'},
+                 {'type': 'empirical', 'format': 'pdf', 'points': [[1, 1]]},
+                 {'type': 'empirical', 'format': 'cdf',
+                  'points': [[1, 0.5], [2, 0.25]]}):
+        assert_raises(ValueError, SizeDistribution, 1, 10, spec)
+    assert_raises(ValueError, SizeDistribution, 10, 1)
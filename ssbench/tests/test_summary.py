@@ -0,0 +1,153 @@
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import msgpack
+from unittest import TestCase
+
+import ssbench
+from ssbench.summary import ResultSummary, MAX_ERROR_SAMPLES
+
+
+class TestResultSummary(TestCase):
+    def setUp(self):
+        self.summary = ResultSummary(7)
+
+    def result(self, completed_at, latency, **kwargs):
+        return dict(dict(type=ssbench.CREATE_OBJECT, size_str='small',
+                         size=100, completed_at=completed_at, retries=0,
+                         first_byte_latency=None, last_byte_latency=latency,
+                         trans_id='tx%g' % latency), **kwargs)
+
+    def test_buckets(self):
+        self.summary.add(self.result(100.5, 0.25))
+        self.summary.add(self.result(100.75, 0.5, retries=2))
+        self.summary.add(self.result(101.0, 0.125))
+        self.summary.add(self.result(100.9, 0.5, phase='warmup'))
+        self.summary.add(self.result(100.2, 1.0, type=ssbench.READ_OBJECT,
+                                     auth_latency=0.3))
+        self.assertEqual(5, len(self.summary))
+
+        summary = msgpack.loads(msgpack.dumps(self.summary.flush(200.0)))
+        self.assertEqual(200.0, self.summary.flushed_at)
+        self.assertEqual(0, len(self.summary))
+        self.assertEqual(7, summary['worker_id'])
+        self.assertEqual(
+            [(100, ssbench.READ_OBJECT, None, 1),
+             (100, ssbench.CREATE_OBJECT, None, 2),
+             (100, ssbench.CREATE_OBJECT, 'warmup', 1),
+             (101, ssbench.CREATE_OBJECT, None, 1)],
+            [(b['second'], b['type'], b['phase'], b['count'])
+             for b in summary['buckets']])
+
+        bucket = summary['buckets'][1]
+        self.assertEqual((2, 200, 0, 100.25, 100.75), (
+            bucket['retries'], bucket['sent_bytes'], bucket['received_bytes'],
+            bucket['start'], bucket['stop']))
+        latency = bucket['last_byte_latency']
+        self.assertEqual((2, 0.375, 0.03125), (
+            latency['count'], latency['mean'], latency['sum_sq_dev']))
+        self.assertEqual([0.5, 'tx0.5'], latency['worst'])
+        self.assertEqual(2, latency['histogram']['count'])
+        # No first-byte latencies for PUTs
+        self.assertEqual(0, bucket['first_byte_latency']['count'])
+        self.assertEqual([1, 0.3, 0.3], summary['buckets'][0]['auth'])
+
+    def test_timings(self):
+        self.summary.add(self.result(100.5, 0.25, connect_latency=0.125,
+                                     send_latency=0.5, wait_latency=0.25))
+        self.summary.add(self.result(100.75, 0.5, send_latency=1.5))
+        self.summary.add(self.result(101.0, 0.125))
+
+        summary = msgpack.loads(msgpack.dumps(self.summary.flush()))
+        timings = summary['buckets'][0]['timings']
+        self.assertEqual(['connect_latency', 'send_latency', 'wait_latency'],
+                         sorted(timings))
+        self.assertEqual((2, 1.0), (timings['send_latency']['count'],
+                                    timings['send_latency']['mean']))
+        self.assertEqual([0.125, 'tx0.25'],
+                         timings['connect_latency']['worst'])
+        self.assertNotIn('timings', summary['buckets'][1])
+
+    def test_bytes(self):
+        self.summary.add(self.result(100.5, 0.25, sent_bytes=150))
+        # Nothing sent, rather than its size: the object was already there
+        self.summary.add(self.result(100.6, 0.25, sent_bytes=0))
+        self.summary.add(self.result(100.7, 0.25, type=ssbench.READ_OBJECT,
+                                     received_bytes=70))
+        summary = self.summary.flush()
+        self.assertEqual([(0, 70), (150, 0)], sorted([
+            (bucket['sent_bytes'], bucket['received_bytes'])
+            for bucket in summary['buckets']]))
+
+    def test_errors(self):
+        for _ in xrange(MAX_ERROR_SAMPLES + 1):
+            self.summary.add(dict(type=ssbench.READ_OBJECT,
+                                  size_str='small', completed_at=100.0,
+                                  retries=1, exception='oops',
+                                  traceback='...'))
+        summary = self.summary.flush()
+        bucket, = summary['buckets']
+        self.assertEqual((11, 11, 11, 0, 0), (
+            bucket['count'], bucket['errors'], bucket['retries'],
+            bucket['sent_bytes'], bucket['received_bytes']))
+        self.assertIsNone(bucket['start'])
+        self.assertEqual(MAX_ERROR_SAMPLES, len(summary['samples']))
+        self.assertNotIn('timeouts', bucket)
+
+    def test_timeouts(self):
+        self.summary.add(dict(type=ssbench.READ_OBJECT, size_str='small',
+                              completed_at=100.0, exception='late',
+                              traceback='...', timed_out=True))
+        self.summary.add(dict(type=ssbench.READ_OBJECT, size_str='small',
+                              completed_at=100.0, exception='oops',
+                              traceback='...'))
+        bucket, = self.summary.flush()['buckets']
+        self.assertEqual((2, 1), (bucket['errors'], bucket['timeouts']))
+
+    def test_segmented(self):
+        self.summary.add(self.result(
+            100.5, 2.0, size=250, segments=3, segment_latency=[0.5, 1.0, 0.25],
+            manifest_latency=0.125, object_latency=2.0))
+        self.summary.add(self.result(100.75, 0.5))
+
+        bucket, = msgpack.loads(msgpack.dumps(
+            self.summary.flush()))['buckets']
+        self.assertEqual([1, 3, 250], bucket['segmented'])
+        timings = bucket['timings']
+        # Each segment's latency counts
+        self.assertEqual(3, timings['segment_latency']['count'])
+        self.assertAlmostEqual(1.75 / 3, timings['segment_latency']['mean'])
+        self.assertEqual([1.0, 'tx2'], timings['segment_latency']['worst'])
+        self.assertEqual(1, timings['object_latency']['count'])
+
+    def test_read_patterns(self):
+        for latency, pattern, received in ((0.5, ssbench.RANGE_READ, 100),
+                                           (0.25, ssbench.RANGE_READ, 50),
+                                           (1.0, ssbench.FULL_READ, 900)):
+            self.summary.add(self.result(
+                100.5, latency, type=ssbench.READ_OBJECT,
+                read_pattern=pattern, received_bytes=received,
+                **{pattern + '_read_latency': latency}))
+
+        bucket, = self.summary.flush()['buckets']
+        self.assertEqual({ssbench.RANGE_READ: 150, ssbench.FULL_READ: 900},
+                         bucket['pattern_bytes'])
+        self.assertEqual(2, bucket['timings']['range_read_latency']['count'])
+        self.assertEqual(1, bucket['timings']['full_read_latency']['count'])
+
+    def test_flush_nothing(self):
+        self.assertFalse(self.summary.due(self.summary.flushed_at))
+        self.assertTrue(self.summary.due(self.summary.flushed_at + 1))
+        self.assertIsNone(self.summary.flush())
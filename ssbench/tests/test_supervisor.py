@@ -0,0 +1,107 @@
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from nose.tools import assert_equal
+
+from ssbench.base_worker import SUICIDE_EXIT_STATUS
+from ssbench.supervisor import (WorkerSupervisor, derived_worker_id,
+                                split_concurrency)
+
+
+def test_split_concurrency():
+    assert_equal([4, 3, 3], split_concurrency(10, 3))
+    assert_equal([2, 2], split_concurrency(4, 2))
+    assert_equal([64], split_concurrency(64, 1))
+
+
+def test_derived_worker_id():
+    assert_equal(7, derived_worker_id(7, 0, 1))
+    assert_equal(7000, derived_worker_id(7, 0, 4))
+    assert_equal(7003, derived_worker_id(7, 3, 4))
+
+
+class _StubWorker(object):
+    def __init__(self, log_path, worker_id, concurrency, behavior):
+        self.log_path = log_path
+        self.worker_id = worker_id
+        self.concurrency = concurrency
+        self.behavior = behavior
+
+    def go(self):
+        with open(self.log_path, 'a') as fp:
+            fp.write('%d %d\n' % (self.worker_id, self.concurrency))
+        if self.behavior == 'crash':
+            raise Exception('crashed')
+        elif self.behavior == 'suicide':
+            os._exit(SUICIDE_EXIT_STATUS)
+
+
+class TestWorkerSupervisor(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.temp_dir, 'started')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _factory(self, behaviors=None):
+        behaviors = behaviors or {}
+
+        def factory(worker_id, concurrency):
+            behavior = behaviors.get(worker_id)
+            if behavior == 'crash-once':
+                # Crash the first time only
+                marker = os.path.join(self.temp_dir, 'crashed-%d' % worker_id)
+                if os.path.exists(marker):
+                    behavior = None
+                else:
+                    open(marker, 'w').close()
+                    behavior = 'crash'
+            return _StubWorker(self.log_path, worker_id, concurrency,
+                               behavior)
+        return factory
+
+    def _started(self):
+        with open(self.log_path) as fp:
+            return sorted(tuple(map(int, line.split())) for line in fp)
+
+    def test_runs_worker_processes(self):
+        supervisor = WorkerSupervisor(self._factory(), 3, 3, 10,
+                                      restart_delay=0)
+        supervisor.run()
+
+        assert_equal([(3000, 4), (3001, 3), (3002, 3)], self._started())
+        assert_equal({}, supervisor.children)
+
+    def test_restarts_crashed_processes(self):
+        supervisor = WorkerSupervisor(
+            self._factory({2001: 'crash-once', 2000: 'suicide'}), 2, 2, 4,
+            restart_delay=0)
+        supervisor.run()
+
+        # The crashed process is restarted; the SUICIDE'd one is not
+        assert_equal([(2000, 2), (2001, 2), (2001, 2)], self._started())
+
+    def test_processes_capped_at_concurrency(self):
+        supervisor = WorkerSupervisor(self._factory(), 1, 4, 2,
+                                      restart_delay=0)
+        assert_equal(2, supervisor.processes)
+        supervisor.run()
+
+        assert_equal([(1000, 1), (1001, 1)], self._started())
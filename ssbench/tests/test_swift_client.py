@@ -0,0 +1,184 @@
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import socket
+import time
+import gevent
+import gevent.socket
+from unittest import TestCase
+
+from ssbench import swift_client as client
+
+
+class TestPutObjectExpectContinue(TestCase):
+    def setUp(self):
+        self.listener = gevent.socket.socket()
+        self.addCleanup(self.listener.close)
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(1)
+        self.url = 'http://127.0.0.1:%d/v1/AUTH_test' % (
+            self.listener.getsockname()[1],)
+        self.received = []
+
+    def serve(self, interim, final=None, body_length=0):
+        """
+        Answer one PUT's headers with ``interim``, then (if there is a
+        ``final`` response) read its body and answer with that.
+        """
+        def _serve():
+            sock, _ = self.listener.accept()
+            request = ''
+            while '\r\n\r\n' not in request:
+                request += sock.recv(4096)
+            self.received.append(request)
+            sock.sendall(interim)
+            if final:
+                body = request.split('\r\n\r\n', 1)[1]
+                while len(body) < body_length:
+                    body += sock.recv(4096)
+                self.received.append(body)
+                sock.sendall(final)
+            else:
+                self.received.append(sock.recv(4096))
+            sock.close()
+        return gevent.spawn(_serve)
+
+    def connection(self):
+        conn = client.http_connection(self.url)
+        self.addCleanup(conn[1].close)
+        return conn
+
+    def test_continue(self):
+        server = self.serve('HTTP/1.1 100 Continue\r\n\r\n',
+                            'HTTP/1.1 201 Created\r\nContent-Length: 0\r\n'
+                            'X-Trans-Id: tx1\r\n\r\n', body_length=25)
+
+        headers = client.put_object(
+            self.url, token='t', container='c', name='o', contents='A' * 10,
+            content_length=25, chunk_size=10, http_conn=self.connection(),
+            expect_continue=True)
+        server.join(5)
+
+        self.assertIn('Expect: 100-continue\r\n', self.received[0])
+        self.assertEqual('A' * 25, self.received[1])
+        self.assertEqual(25, headers['x-swiftstack-sent-bytes'])
+        self.assertEqual('tx1', headers['x-trans-id'])
+        self.assertGreater(headers['x-swiftstack-continue-latency'], 0)
+        self.assertGreaterEqual(headers['x-swiftstack-last-byte-latency'],
+                                headers['x-swiftstack-continue-latency'] +
+                                headers['x-swiftstack-send-latency'])
+
+    def test_rejected(self):
+        server = self.serve('HTTP/1.1 507 Insufficient Storage\r\n'
+                            'Content-Length: 0\r\n\r\n')
+        conn = self.connection()
+
+        with self.assertRaises(client.ClientException) as caught:
+            client.put_object(
+                self.url, token='t', container='c', name='o',
+                contents='A' * 10, content_length=25, chunk_size=10,
+                http_conn=conn, expect_continue=True)
+        server.join(5)
+
+        self.assertEqual(507, caught.exception.http_status)
+        # No body was sent, and the connection was closed
+        self.assertEqual('', self.received[1])
+        self.assertIsNone(conn[1].sock)
+
+    def test_no_continue(self):
+        # The server ignores Expect, waiting for the body without a word
+        server = self.serve('', 'HTTP/1.1 201 Created\r\n'
+                            'Content-Length: 0\r\nX-Trans-Id: tx1\r\n\r\n',
+                            body_length=25)
+
+        start = time.time()
+        headers = client.put_object(
+            self.url, token='t', container='c', name='o', contents='A' * 10,
+            content_length=25, chunk_size=10, http_conn=self.connection(),
+            expect_continue=True, continue_timeout=0.05)
+        server.join(5)
+
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual('A' * 25, self.received[1])
+        self.assertEqual('tx1', headers['x-trans-id'])
+        self.assertTrue(headers['x-swiftstack-continue-timed-out'])
+        self.assertNotIn('x-swiftstack-continue-latency', headers)
+
+    def test_late_continue(self):
+        # 100 Continue only comes after the body was sent without it
+        server = self.serve('', 'HTTP/1.1 100 Continue\r\n\r\n'
+                            'HTTP/1.1 201 Created\r\nContent-Length: 0\r\n'
+                            'X-Trans-Id: tx1\r\n\r\n', body_length=25)
+
+        headers = client.put_object(
+            self.url, token='t', container='c', name='o', contents='A' * 10,
+            content_length=25, chunk_size=10, http_conn=self.connection(),
+            expect_continue=True, continue_timeout=0.05)
+        server.join(5)
+
+        self.assertEqual('tx1', headers['x-trans-id'])
+        self.assertTrue(headers['x-swiftstack-continue-timed-out'])
+        self.assertNotIn('x-swiftstack-continue-latency', headers)
+
+    def test_query_string(self):
+        self.serve('HTTP/1.1 201 Created\r\nContent-Length: 0\r\n\r\n')
+
+        client.put_object(
+            self.url, token='t', container='c', name='o/seg/00000001',
+            contents='[]', content_length=2, chunk_size=2,
+            http_conn=self.connection(),
+            query_string='multipart-manifest=put')
+
+        self.assertTrue(self.received[0].startswith(
+            'PUT /v1/AUTH_test/c/o/seg/00000001?multipart-manifest=put '
+            'HTTP/1.1\r\n'))
+
+    def test_get_ranges(self):
+        self.serve('HTTP/1.1 206 Partial Content\r\nContent-Length: 20\r\n'
+                   '\r\n' + 'A' * 20)
+        conn = self.connection()
+
+        headers = client.get_object(self.url, 't', 'c', 'o', http_conn=conn,
+                                    ranges=[(0, 9), (100, 109)])
+
+        self.assertIn('Range: bytes=0-9,100-109\r\n', self.received[0])
+        self.assertEqual(20, headers['x-swiftstack-received-bytes'])
+        # Kept alive
+        self.assertIsNotNone(conn[1].sock)
+
+    def test_get_container_received_bytes(self):
+        self.serve('HTTP/1.1 200 OK\r\nContent-Length: 15\r\n'
+                   '\r\n[{"name": "o"}]')
+
+        headers, listing = client.get_container(
+            self.url, 't', 'c', limit=1, http_conn=self.connection())
+
+        self.assertEqual([{'name': 'o'}], listing)
+        self.assertEqual(15, headers['x-swiftstack-received-bytes'])
+
+    def test_get_first_bytes(self):
+        server = self.serve('HTTP/1.1 200 OK\r\nContent-Length: 100000\r\n'
+                            '\r\n' + 'A' * 100000)
+        conn = self.connection()
+
+        headers = client.get_object(self.url, 't', 'c', 'o', http_conn=conn,
+                                    resp_chunk_size=4, read_bytes=10)
+        server.join(5)
+
+        self.assertEqual(10, headers['x-swiftstack-received-bytes'])
+        # The rest of the body was still coming, so it can't be used again
+        self.assertIsNone(conn[1].sock)
+        # ...and the server saw it hang up
+        self.assertIsInstance(server.exception, socket.error)
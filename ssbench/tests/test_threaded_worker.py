@@ -0,0 +1,232 @@
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+import time
+import socket
+import subprocess
+import httplib
+import msgpack
+import threading
+from unittest import TestCase
+from flexmock import flexmock
+
+from ssbench import swift_client as client
+from ssbench.base_worker import DeadlineExceeded
+from ssbench.threaded_worker import ThreadedWorker
+
+
+class TestThreadedWorker(TestCase):
+    def setUp(self):
+        # The sockets are never used
+        self.worker = ThreadedWorker('127.0.0.1', 1, 2, 3, 4, concurrency=2,
+                                     zmq_control_port=5)
+
+    def tearDown(self):
+        for sock in (self.worker.work_pull, self.worker.results_push,
+                     self.worker.control_dealer):
+            sock.close(linger=0)
+        self.worker.context.term()
+
+    def test_imports_without_gevent(self):
+        # As if none of gevent's packages were installed
+        code = '''
+import sys
+
+
+class NoGevent(object):
+    def find_module(self, name, path=None):
+        if name.split('.')[0] in ('gevent', 'geventhttpclient',
+                                  'gevent_zeromq'):
+            return self
+
+    def load_module(self, name):
+        raise ImportError(name)
+sys.meta_path.insert(0, NoGevent())
+import ssbench.threaded_worker
+import ssbench.supervisor
+'''
+        subprocess.check_call([sys.executable, '-c', code])
+
+    def test_job_runners(self):
+        self.worker._start_job_runners()
+        for i in xrange(5):
+            self.worker._spawn_job({'type': 'PING', 'i': i})
+
+        results = [self.worker.result_queue.get(timeout=5)
+                   for _ in xrange(5)]
+        self.assertEqual(range(5), sorted(r['i'] for r in results))
+        self.assertEqual(3, results[0]['worker_id'])
+        self.assertEqual(5, self.worker.spawned)
+
+    def test_send_control(self):
+        self.worker._send_control(('TOKEN_REJECTED', 'key', 'token'))
+
+        self.assertEqual(('TOKEN_REJECTED', 'key', 'token'), tuple(
+            msgpack.loads(self.worker.control_outbox.get_nowait())))
+
+    def test_wait_for_control(self):
+        self.assertFalse(self.worker._wait_for_control(
+            lambda: 'key' in self.worker.token_data, 0.01))
+
+        threading.Timer(0.01, self.worker._handle_control_message, [
+            msgpack.dumps(('TOKEN', 'key', ['url'], 'token'))]).start()
+        self.assertTrue(self.worker._wait_for_control(
+            lambda: 'key' in self.worker.token_data, 5))
+
+    def test_connection(self):
+        self.worker._create_connection_pool('http://a', 1, 2)
+        self.assertEqual((1, 2), self.worker.conn_pools['http://a'])
+        conns = [(None, flexmock(close=lambda: None)) for _ in xrange(3)]
+        flexmock(self.worker).should_receive('_connect').with_args(
+            'http://a').and_return(conns[0]).and_return(conns[1]) \
+            .and_return(conns[2]).times(3)
+
+        with self.worker.connection('http://a') as conn:
+            self.assertIs(conns[0], conn)
+        # Kept alive, even after a failed request...
+        with self.assertRaises(client.ClientException):
+            with self.worker.connection('http://a') as conn:
+                self.assertIs(conns[0], conn)
+                raise client.ClientException('404')
+        # ...but not after the connection broke
+        with self.worker.connection('http://a') as conn:
+            self.assertIs(conns[0], conn)
+            raise httplib.BadStatusLine('')
+        with self.worker.connection('http://a') as conn:
+            self.assertIs(conns[1], conn)
+
+        # Each thread has its own
+        used = []
+
+        def _in_thread():
+            with self.worker.connection('http://a') as conn:
+                used.append(conn)
+        thread = threading.Thread(target=_in_thread)
+        thread.start()
+        thread.join()
+        self.assertEqual([conns[2]], used)
+
+    def test_deadline(self):
+        conn = (None, flexmock(sock=flexmock()))
+        conn[1].should_receive('close').once
+        conn[1].sock.should_receive('shutdown').with_args(
+            socket.SHUT_RDWR).once
+        flexmock(self.worker).should_receive('_connect').and_return(conn) \
+            .once
+        # The watchdog is run by hand
+        flexmock(self.worker).should_receive('_spawn').once
+        flexmock(time).should_receive('sleep').and_return(None) \
+            .and_raise(StopIteration)
+
+        with self.worker._deadline(0):
+            with self.assertRaises(DeadlineExceeded):
+                with self.worker.connection('http://a'):
+                    self.assertRaises(StopIteration, self.worker._watchdog)
+                    # What the request then hits
+                    raise httplib.BadStatusLine('')
+            # No more requests (e.g. retries) are made
+            with self.assertRaises(DeadlineExceeded):
+                with self.worker.connection('http://a'):
+                    pass
+        self.assertEqual(set(), self.worker.deadlines)
+
+    def test_deadline_segmented_upload(self):
+        # A server which never answers
+        listener = socket.socket()
+        self.addCleanup(listener.close)
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(5)
+        url = 'http://127.0.0.1:%d/v1/AUTH_test' % listener.getsockname()[1]
+        self.worker._create_connection_pool(url, 1, 5)
+        connect = self.worker._connect
+        conns = []
+
+        def _connect(storage_url):
+            conns.append(connect(storage_url))
+            return conns[-1]
+        self.worker._connect = _connect
+        spawn_helper = self.worker._spawn_helper
+        helpers = []
+
+        def _spawn_helper(fn):
+            helpers.append(spawn_helper(fn))
+            return helpers[-1]
+        self.worker._spawn_helper = _spawn_helper
+        # The watchdog is stopped once done
+        stop = threading.Event()
+        sleep = time.sleep
+
+        def _sleep(seconds):
+            if stop.is_set():
+                raise SystemExit()
+            sleep(seconds)
+        flexmock(time).should_receive('sleep').replace_with(_sleep)
+        object_info = {
+            'type': 'upload_object',
+            'auth_kwargs': {'token': 'token', 'storage_urls': [url]},
+            'container': 'container',
+            'name': 'obj',
+            'size': 250,
+            'segment_size': 100,
+            'segment_concurrency': 2,
+        }
+
+        start = time.time()
+        with self.assertRaises(DeadlineExceeded):
+            with self.worker._deadline(0.2):
+                self.worker.handle_upload_object(object_info)
+        # Well before the network timeout
+        self.assertLess(time.time() - start, 2)
+        self.assertEqual(2, len(helpers))
+        for helper in helpers:
+            helper.join(5)
+            self.assertFalse(helper.is_alive())
+        # The uploaders' connections were closed as they exited
+        self.assertEqual(2, len(conns))
+        for parsed, conn in conns:
+            self.assertIsNone(conn.sock)
+        self.assertEqual(set(), self.worker.deadlines)
+        stop.set()
+        self.worker.watchdog.join(5)
+        self.assertFalse(self.worker.watchdog.is_alive())
+
+    def test_connect_latencies(self):
+        listener = socket.socket()
+        self.addCleanup(listener.close)
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(1)
+        url = 'http://127.0.0.1:%d/v1/AUTH_test' % listener.getsockname()[1]
+        self.worker._create_connection_pool(url, 1, 2)
+
+        parsed, conn = self.worker._connect(url)
+        self.addCleanup(conn.close)
+        connect_latency, tls_latency = conn.connect_latencies
+        self.assertGreater(connect_latency, 0)
+        self.assertIsNone(tls_latency)
+
+        # Reported with the first request made on the connection only
+        resp = flexmock(getheaders=lambda: [('X-Trans-Id', 'tx1')])
+        headers = client._decorated_response_headers(
+            resp, last_byte_latency=0.5, conn=conn,
+            timestamps=(10.0, 10.125, 10.375, 10.5))
+        self.assertEqual(dict(
+            [('x-trans-id', 'tx1'), ('x-swiftstack-last-byte-latency', 0.5),
+             ('x-swiftstack-connect-latency', connect_latency),
+             ('x-swiftstack-send-latency', 0.125),
+             ('x-swiftstack-wait-latency', 0.25),
+             ('x-swiftstack-receive-latency', 0.125)]), headers)
+        self.assertNotIn('x-swiftstack-connect-latency',
+                         client._decorated_response_headers(resp, conn=conn))
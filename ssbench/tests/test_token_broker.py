@@ -0,0 +1,82 @@
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+
+from ssbench.token_broker import TokenBroker, token_key
+
+
+AUTH_KWARGS = {'auth_url': 'http://auth', 'user': 'u', 'key': 'k',
+               'storage_urls': None}
+
+
+def test_token_key():
+    assert token_key(AUTH_KWARGS) == token_key(dict(AUTH_KWARGS))
+    assert token_key(AUTH_KWARGS) != token_key(dict(AUTH_KWARGS, user='v'))
+    assert token_key({'os_options': {'tenant_name': 'a'}}) != \
+        token_key({'os_options': {'tenant_name': 'b'}})
+
+
+class TestTokenBroker(TestCase):
+    def setUp(self):
+        self.auth_calls = []
+        self.fail = False
+        self.pushed = []
+        self.broker = TokenBroker(self._authenticate, refresh_seconds=60)
+        self.broker.listeners.append(
+            lambda *args: self.pushed.append(args))
+
+    def tearDown(self):
+        self.broker.stop()
+
+    def _authenticate(self, auth_kwargs):
+        self.auth_calls.append(auth_kwargs)
+        if self.fail:
+            raise Exception('auth is down')
+        return ['http://storage'], 'AUTH_tk%d' % len(self.auth_calls)
+
+    def test_get_authenticates_once(self):
+        self.assertEqual((['http://storage'], 'AUTH_tk1'),
+                         self.broker.get(AUTH_KWARGS))
+        self.assertEqual((['http://storage'], 'AUTH_tk1'),
+                         self.broker.get(dict(AUTH_KWARGS)))
+        self.assertEqual(1, len(self.auth_calls))
+        self.assertEqual(1, len(self.broker.auth_latencies))
+        self.assertEqual([(token_key(AUTH_KWARGS), ['http://storage'],
+                           'AUTH_tk1')], self.pushed)
+
+    def test_get_failure(self):
+        self.fail = True
+        self.assertIsNone(self.broker.get(AUTH_KWARGS))
+        self.assertEqual([], self.pushed)
+        # Failures are timed too
+        self.assertEqual(1, len(self.broker.auth_latencies))
+
+    def test_rejected_current_token(self):
+        self.broker.get(AUTH_KWARGS)
+        self.broker.rejected(token_key(AUTH_KWARGS), 'AUTH_tk1')
+
+        self.assertEqual((['http://storage'], 'AUTH_tk2'),
+                         self.broker.get(AUTH_KWARGS))
+        self.assertEqual(2, len(self.pushed))
+
+    def test_rejected_stale_token(self):
+        self.broker.get(AUTH_KWARGS)
+        self.broker.rejected(token_key(AUTH_KWARGS), 'AUTH_tk1')
+        # Other workers reporting the same old token don't cause more auths
+        self.broker.rejected(token_key(AUTH_KWARGS), 'AUTH_tk1')
+        self.broker.rejected('unknown', 'AUTH_tk1')
+
+        self.assertEqual(2, len(self.auth_calls))
@@ -13,8 +13,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+import json
 import time
 import socket
+import tempfile
+import msgpack
 from flexmock import flexmock
 from nose.tools import assert_equal, assert_raises, assert_true
 import gevent.queue
@@ -22,8 +26,12 @@ from gevent_zeromq import zmq
 
 import ssbench
 from ssbench import worker
+from ssbench import base_worker
+from ssbench.base_worker import gather_results
 from ssbench import swift_client as client
 from ssbench.util import add_dicts
+from ssbench.run_context import RunContext
+from ssbench.run_results import RunResults
 
 
 class TestWorker(object):
@@ -150,6 +158,28 @@ class TestWorker(object):
             extra_key='extra value',
         ))], self.stub_fn_calls)
 
+    def test_ignoring_http_responses_container_operation(self):
+        call_info = {
+            'container': 'someContainer',
+            'auth_kwargs': {
+                'storage_urls': ['someUrl'],
+                'token': 'someToken',
+            },
+        }
+        mock_conn = flexmock()
+        self.worker.conn_pools['someUrl'] = flexmock(
+            get=lambda: mock_conn, put=lambda conn: None)
+
+        self.worker.ignoring_http_responses([], self.stub_fn, call_info)
+
+        # No object name
+        assert_equal([((), dict(
+            container='someContainer',
+            url='someUrl',
+            token='someToken',
+            http_conn=mock_conn,
+        ))], self.stub_fn_calls)
+
     def test_ignoring_http_responses_with_no_auth_info(self):
         call_info = {
             'container': 'someContainer',
@@ -255,17 +285,180 @@ class TestWorker(object):
             extra_key='extra value',
         ))], self.stub_fn_calls)
 
+    def test_ignoring_http_responses_records_auth_latency(self):
+        call_info = {
+            'container': 'someContainer',
+            'name': 'someName',
+            'auth_kwargs': {
+                'auth_url': 'http://someAuthUrl',
+                'user': 'someUser',
+                'key': 'someKey',
+            },
+        }
+        now = [100.0]
+        self.time_expectation.replace_with(lambda: now[0])
+
+        def _slow_auth(**kwargs):
+            now[0] += 0.25
+            return 'someStorageUrl', 'someStorageToken'
+        self.mock_client.should_receive('get_auth').replace_with(
+            _slow_auth).once
+        self.worker.conn_pools['someStorageUrl'] = mock_pool = flexmock()
+        mock_pool.should_receive('get').and_return(flexmock())
+        mock_pool.should_receive('put')
+
+        got = self.worker.ignoring_http_responses([], self.stub_fn, call_info)
+
+        assert_equal(0.25, got['auth_latency'])
+
+    def test_ignoring_http_responses_brokered_token_after_401(self):
+        call_info = {
+            'container': 'someContainer',
+            'name': 'someName',
+            'auth_kwargs': {
+                'auth_url': 'http://someAuthUrl',
+                'user': 'someUser',
+                'key': 'someKey',
+            },
+        }
+        token_key = self.worker._token_key(call_info['auth_kwargs'])
+        self.worker.token_data[token_key] = (['someUrl'], 'oldToken')
+        self.mock_client.should_receive('get_auth').never
+        for url in ('someUrl', 'newUrl'):
+            self.worker.conn_pools[url] = mock_pool = flexmock()
+            mock_pool.should_receive('get').and_return(flexmock())
+            mock_pool.should_receive('put')
+        self.worker.control_dealer = flexmock()
+
+        def _push_token(message):
+            assert_equal(['TOKEN_REJECTED', token_key, 'oldToken'],
+                         msgpack.loads(message))
+            self.worker._handle_control_message(msgpack.dumps(
+                ('TOKEN', token_key, ['newUrl'], 'newToken')))
+        self.worker.control_dealer.should_receive('send').replace_with(
+            _push_token).once
+
+        def _fn(**kwargs):
+            self.stub_fn_calls.append(kwargs)
+            if kwargs['token'] == 'oldToken':
+                raise client.ClientException('denied', http_status=401)
+            return self.stub_fn_return
+
+        got = self.worker.ignoring_http_responses([], _fn, call_info)
+
+        assert_equal(got, self.stub_fn_return)
+        assert_equal([('someUrl', 'oldToken'), ('newUrl', 'newToken')],
+                     [(c['url'], c['token']) for c in self.stub_fn_calls])
+        assert_equal(1, got['retries'])
+        assert_true('auth_latency' not in got)
+
     def test_ignoring_http_responses_cached_auth(self):
         pass
 
     def test_ignoring_http_responses_handles_401(self):
         pass
 
+    def _retry_call_info(self):
+        self.worker.conn_pools['someUrl'] = mock_pool = flexmock()
+        mock_pool.should_receive('get').and_return(flexmock())
+        mock_pool.should_receive('put')
+        return {
+            'container': 'someContainer',
+            'name': 'someName',
+            'auth_kwargs': {
+                'storage_urls': ['someUrl'],
+                'token': 'someToken',
+            },
+        }
+
     def test_ignoring_http_responses_after_some_retries(self):
-        pass
+        now = [100.0]
+        self.time_expectation.replace_with(lambda: now[0])
+        sleeps = []
+        self.mock_worker.should_receive('_sleep').replace_with(
+            sleeps.append).times(2)
+
+        def _fn(**kwargs):
+            self.stub_fn_calls.append(kwargs)
+            now[0] += 0.25
+            if len(self.stub_fn_calls) < 3:
+                raise client.ClientException('busy', http_status=503)
+            return self.stub_fn_return
+
+        got = self.worker.ignoring_http_responses([503], _fn,
+                                                  self._retry_call_info())
+
+        assert_equal(got, self.stub_fn_return)
+        assert_equal(2, got['retries'])
+        assert_equal([0.25, 0.25, 0.25], got['attempt_latencies'])
+        assert_equal(0.25, got['first_attempt_latency'])
+        assert_equal(0.75, got['end_to_end_latency'])
+        # Random, but within the (doubling) backoff limits
+        assert_true(0 <= sleeps[0] <= 0.01)
+        assert_true(0 <= sleeps[1] <= 0.02)
 
     def test_ignoring_http_responses_too_many_retries(self):
-        pass
+        self.mock_worker.should_receive('_sleep')
+
+        def _fn(**kwargs):
+            self.stub_fn_calls.append(kwargs)
+            raise client.ClientException('busy', http_status=503)
+
+        with assert_raises(client.ClientException) as caught:
+            self.worker.ignoring_http_responses([503], _fn,
+                                                self._retry_call_info())
+        assert_equal(self.max_retries, caught.exception.retries)
+        assert_equal(self.max_retries + 1, len(self.stub_fn_calls))
+
+        # A retry rule lowers the limit for that status only
+        self.stub_fn_calls = []
+        self.worker.retry_rules = {503: 1, 404: 5}
+        with assert_raises(client.ClientException) as caught:
+            self.worker.ignoring_http_responses([503], _fn,
+                                                self._retry_call_info())
+        assert_equal(1, caught.exception.retries)
+        assert_equal(2, len(self.stub_fn_calls))
+
+    def test_ignoring_http_responses_socket_error_rule(self):
+        self.mock_worker.should_receive('_sleep')
+        self.worker.retry_rules = {base_worker.SOCKET_ERROR: 0}
+
+        def _fn(**kwargs):
+            self.stub_fn_calls.append(kwargs)
+            raise socket.error('reset')
+
+        with assert_raises(socket.error) as caught:
+            self.worker.ignoring_http_responses([503], _fn,
+                                                self._retry_call_info())
+        assert_equal(0, caught.exception.retries)
+        assert_equal(1, len(self.stub_fn_calls))
+
+    def test_ignoring_http_responses_retry_budget(self):
+        self.mock_worker.should_receive('_sleep')
+        self.worker.retry_budget = 50.0
+        self.worker.retry_tokens.tokens = 0.0
+
+        def _fn(**kwargs):
+            self.stub_fn_calls.append(kwargs)
+            raise client.ClientException('busy', http_status=503)
+
+        # The first request only earns half a retry...
+        with assert_raises(client.ClientException) as caught:
+            self.worker.ignoring_http_responses([503], _fn,
+                                                self._retry_call_info())
+        assert_equal(0, caught.exception.retries)
+        # ...and the second the other half
+        with assert_raises(client.ClientException) as caught:
+            self.worker.ignoring_http_responses([503], _fn,
+                                                self._retry_call_info())
+        assert_equal(1, caught.exception.retries)
+        assert_equal(3, len(self.stub_fn_calls))
+
+    def test_may_retry_no_backoff_after_401(self):
+        self.mock_worker.should_receive('_sleep').never
+        assert_true(self.worker._may_retry(1, 401))
+        self.worker.retry_backoff = 0
+        assert_true(self.worker._may_retry(1, 503))
 
     def test_handle_upload_object(self):
         object_name = '/foo/bar/SP000001'
@@ -280,8 +473,8 @@ class TestWorker(object):
         ).with_args(
             (503,), client.put_object, object_info,
             content_length=99000,
-            chunk_size=worker.DEFAULT_BLOCK_SIZE,
-            contents='A' * worker.DEFAULT_BLOCK_SIZE,
+            chunk_size=base_worker.DEFAULT_BLOCK_SIZE,
+            contents='A' * base_worker.DEFAULT_BLOCK_SIZE,
         ).and_return({
             'x-swiftstack-first-byte-latency': 0.492393,
             'x-swiftstack-last-byte-latency': 8.23283,
@@ -297,6 +490,66 @@ class TestWorker(object):
         ).once
         self.mock_worker.handle_upload_object(object_info)
 
+    def test_handle_upload_object_timings(self):
+        object_info = {
+            'type': ssbench.CREATE_OBJECT,
+            'container': 'Picture',
+            'name': '/foo/bar/SP000001',
+            'size': 99000,
+        }
+        self.mock_worker.should_receive(
+            'ignoring_http_responses'
+        ).and_return({
+            'x-swiftstack-last-byte-latency': 8.23283,
+            'x-swiftstack-connect-latency': 0.125,
+            'x-swiftstack-send-latency': 7.5,
+            'x-swiftstack-wait-latency': 0.5,
+            'x-swiftstack-receive-latency': 0.25,
+            'x-trans-id': 'abcdef',
+            'retries': 0,
+        }).once
+        self.time_expectation.once
+        self.result_queue.should_receive('put').with_args(
+            add_dicts(
+                object_info, worker_id=self.worker_id,
+                first_byte_latency=None, last_byte_latency=8.23283,
+                connect_latency=0.125, send_latency=7.5, wait_latency=0.5,
+                receive_latency=0.25, trans_id='abcdef',
+                completed_at=self.stub_time, retries=0),
+        ).once
+        self.mock_worker.handle_upload_object(object_info)
+
+    def test_handle_upload_object_expect_continue(self):
+        object_info = {
+            'type': ssbench.CREATE_OBJECT,
+            'container': 'Picture',
+            'name': '/foo/bar/SP000001',
+            'size': 99000,
+            'expect_continue': True,
+        }
+        self.mock_worker.should_receive(
+            'ignoring_http_responses'
+        ).with_args(
+            (503,), client.put_object, object_info,
+            content_length=99000,
+            chunk_size=base_worker.DEFAULT_BLOCK_SIZE,
+            contents='A' * base_worker.DEFAULT_BLOCK_SIZE,
+            expect_continue=True,
+        ).and_return({
+            'x-swiftstack-last-byte-latency': 8.23283,
+            'x-swiftstack-continue-latency': 0.125,
+            'x-trans-id': 'abcdef',
+            'retries': 0,
+        }).once
+        self.time_expectation.once
+        exp_put = add_dicts(
+            object_info, worker_id=self.worker_id, first_byte_latency=None,
+            last_byte_latency=8.23283, continue_latency=0.125,
+            trans_id='abcdef', completed_at=self.stub_time, retries=0)
+        exp_put.pop('expect_continue')
+        self.result_queue.should_receive('put').with_args(exp_put).once
+        self.mock_worker.handle_upload_object(object_info)
+
     def test_handle_upload_object_head_first_present(self):
         object_name = '/foo/bar/SP000001'
         object_info = {
@@ -329,7 +582,7 @@ class TestWorker(object):
         exp_put = add_dicts(
             object_info, worker_id=self.worker_id, first_byte_latency=0.942,
             last_byte_latency=8.84328, trans_id='abcdef',
-            completed_at=self.stub_time, retries=0)
+            completed_at=self.stub_time, retries=0, sent_bytes=0)
         exp_put.pop('head_first')
         exp_put.pop('block_size')
         self.result_queue.should_receive('put').with_args(exp_put).once
@@ -355,11 +608,12 @@ class TestWorker(object):
         ).with_args(
             (503,), client.put_object, object_info,
             content_length=99000,
-            chunk_size=worker.DEFAULT_BLOCK_SIZE,
-            contents='A' * worker.DEFAULT_BLOCK_SIZE,
+            chunk_size=base_worker.DEFAULT_BLOCK_SIZE,
+            contents='A' * base_worker.DEFAULT_BLOCK_SIZE,
         ).and_return({
             'x-swiftstack-first-byte-latency': 0.3248,
             'x-swiftstack-last-byte-latency': 4.493,
+            'x-swiftstack-sent-bytes': 99000,
             'x-trans-id': 'evn',
             'retries': 0,
         }).once
@@ -367,12 +621,128 @@ class TestWorker(object):
         exp_put = add_dicts(
             object_info, worker_id=self.worker_id, first_byte_latency=0.3248,
             last_byte_latency=4.493, trans_id='evn',
-            completed_at=self.stub_time, retries=0)
+            completed_at=self.stub_time, retries=0, sent_bytes=99000)
         exp_put.pop('head_first')
         exp_put.pop('block_size')
         self.result_queue.should_receive('put').with_args(exp_put).once
         self.mock_worker.handle_upload_object(object_info)
 
+    def test_handle_upload_object_segmented(self):
+        object_info = {
+            'type': ssbench.CREATE_OBJECT,
+            'container': 'Picture',
+            'name': 'huge_000001',
+            'size': 250,
+            'segment_size': 100,
+            'segment_concurrency': 2,
+        }
+        puts = []
+
+        def _put(statuses, fn, call_info, **kwargs):
+            puts.append((call_info['name'], kwargs))
+            return {
+                'x-swiftstack-last-byte-latency': 0.5 + 0.25 * len(puts),
+                'x-swiftstack-sent-bytes': 100,
+                'x-trans-id': 'tx%d' % len(puts),
+                'etag': '"etag%d"' % len(puts),
+                'retries': len(puts) == 2 and 1 or 0,
+            }
+        self.mock_worker.should_receive('ignoring_http_responses') \
+            .replace_with(_put).times(4)
+        self.result_queue.should_receive('put').with_args(dict(
+            type=ssbench.CREATE_OBJECT, container='Picture',
+            name='huge_000001', size=250, worker_id=self.worker_id,
+            first_byte_latency=None, last_byte_latency=0.0, trans_id='tx4',
+            completed_at=self.stub_time, retries=1, segments=3,
+            segment_latency=[0.75, 1.0, 1.25], manifest_latency=1.5,
+            object_latency=0.0, sent_bytes=400)).once
+        self.mock_worker.handle_upload_object(object_info)
+
+        # Segments go up in order, the last one short
+        assert_equal([('huge_000001/seg/%08d' % i, length)
+                      for i, length in enumerate((100, 100, 50))],
+                     [(name, kwargs['content_length'])
+                      for name, kwargs in puts[:3]])
+        name, kwargs = puts[3]
+        assert_equal('huge_000001', name)
+        assert_equal('multipart-manifest=put', kwargs['query_string'])
+        assert_equal([
+            {'path': '/Picture/huge_000001/seg/%08d' % i,
+             'etag': 'etag%d' % (i + 1), 'size_bytes': length}
+            for i, length in enumerate((100, 100, 50))],
+            json.loads(kwargs['contents']))
+        assert_equal(len(kwargs['contents']), kwargs['content_length'])
+
+    def test_handle_update_object_segmented(self):
+        object_info = {
+            'type': ssbench.UPDATE_OBJECT,
+            'container': 'Picture',
+            'name': 'huge_000001',
+            'size': 150,
+            'segment_size': 100,
+        }
+        calls = []
+
+        def _request(statuses, fn, call_info, **kwargs):
+            calls.append((fn, call_info['name']))
+            if fn is client.delete_object and len(calls) == 5:
+                raise client.ClientException('Not found', http_status=404)
+            return {'x-swiftstack-last-byte-latency': 0.5, 'retries': 0}
+        self.mock_worker.should_receive('ignoring_http_responses') \
+            .replace_with(_request).times(5)
+        self.result_queue.should_receive('put').once
+        self.mock_worker.handle_update_object(object_info)
+
+        # The old upload's segments beyond the new last one are deleted
+        # after the new manifest is in place
+        assert_equal([
+            (client.put_object, 'huge_000001/seg/00000000'),
+            (client.put_object, 'huge_000001/seg/00000001'),
+            (client.put_object, 'huge_000001'),
+            (client.delete_object, 'huge_000001/seg/00000002'),
+            (client.delete_object, 'huge_000001/seg/00000003')], calls)
+
+    def test_handle_upload_object_segment_fails(self):
+        object_info = {
+            'type': ssbench.CREATE_OBJECT,
+            'container': 'Picture',
+            'name': 'huge_000001',
+            'size': 1000,
+            'segment_size': 100,
+            'segment_concurrency': 1,
+        }
+        error = client.ClientException('Object PUT failed', http_status=500)
+        self.mock_worker.should_receive('ignoring_http_responses') \
+            .and_return({'retries': 0}).and_raise(error).times(2)
+
+        # Neither the other segments nor the manifest are uploaded
+        with assert_raises(client.ClientException):
+            self.mock_worker.handle_upload_object(object_info)
+
+    def test_handle_delete_object_segmented(self):
+        object_info = {
+            'type': ssbench.DELETE_OBJECT,
+            'container': 'Document',
+            'name': 'huge_000001',
+            'segment_size': 100,
+        }
+        self.mock_worker.should_receive(
+            'ignoring_http_responses',
+        ).with_args(
+            (404, 503,), client.delete_object, object_info,
+            query_string='multipart-manifest=delete',
+        ).and_return({
+            'x-swiftstack-last-byte-latency': 8.3273,
+            'x-trans-id': '9bjkk',
+            'retries': 0,
+        }).once
+        self.result_queue.should_receive('put').with_args(dict(
+            type=ssbench.DELETE_OBJECT, container='Document',
+            name='huge_000001', worker_id=self.worker_id,
+            first_byte_latency=None, last_byte_latency=8.3273,
+            trans_id='9bjkk', completed_at=self.stub_time, retries=0)).once
+        self.mock_worker.handle_delete_object(object_info)
+
     def test_handle_delete_object(self):
         object_info = {
             'type': ssbench.DELETE_OBJECT,
@@ -409,8 +779,8 @@ class TestWorker(object):
         ).with_args(
             (503,), client.put_object, object_info,
             content_length=483213,
-            chunk_size=worker.DEFAULT_BLOCK_SIZE,
-            contents='B' * worker.DEFAULT_BLOCK_SIZE,
+            chunk_size=base_worker.DEFAULT_BLOCK_SIZE,
+            contents='B' * base_worker.DEFAULT_BLOCK_SIZE,
         ).and_return({
             'x-swiftstack-first-byte-latency': 4.45,
             'x-swiftstack-last-byte-latency': 23.283,
@@ -437,7 +807,7 @@ class TestWorker(object):
             'ignoring_http_responses',
         ).with_args(
             (404, 503), client.get_object, object_info,
-            resp_chunk_size=worker.DEFAULT_BLOCK_SIZE,
+            resp_chunk_size=base_worker.DEFAULT_BLOCK_SIZE,
         ).and_return({
             'x-swiftstack-first-byte-latency': 5.33,
             'x-swiftstack-last-byte-latency': 9.99,
@@ -453,6 +823,105 @@ class TestWorker(object):
 
         self.mock_worker.handle_get_object(object_info)
 
+    def test_handle_get_object_read_pattern(self):
+        object_info = {
+            'type': ssbench.READ_OBJECT,
+            'container': 'Document',
+            'name': 'SuperObject',
+            'read_pattern': ssbench.MULTI_RANGE_READ,
+            'ranges': [(0, 99), (1000, 1099)],
+        }
+        self.mock_worker.should_receive(
+            'ignoring_http_responses',
+        ).with_args(
+            (404, 503), client.get_object, object_info,
+            resp_chunk_size=base_worker.DEFAULT_BLOCK_SIZE,
+            ranges=[(0, 99), (1000, 1099)],
+        ).and_return({
+            'x-swiftstack-first-byte-latency': 5.33,
+            'x-swiftstack-last-byte-latency': 9.99,
+            'x-swiftstack-received-bytes': 200,
+            'x-trans-id': 'bies',
+            'retries': 0,
+        }).once
+        self.result_queue.should_receive('put').with_args(dict(
+            type=ssbench.READ_OBJECT, container='Document',
+            name='SuperObject', read_pattern=ssbench.MULTI_RANGE_READ,
+            received_bytes=200, multirange_read_latency=9.99,
+            worker_id=self.worker_id, completed_at=self.stub_time,
+            trans_id='bies', first_byte_latency=5.33, last_byte_latency=9.99,
+            retries=0)).once
+
+        self.mock_worker.handle_get_object(object_info)
+
+    def _metadata_op_results(self, handler, object_info, fn, **kwargs):
+        self.mock_worker.should_receive(
+            'ignoring_http_responses',
+        ).with_args(
+            (404, 503), fn, object_info, **kwargs
+        ).and_return({
+            'x-swiftstack-last-byte-latency': 0.25,
+            'x-swiftstack-wait-latency': 0.125,
+            'x-trans-id': 'meta',
+            'retries': 1,
+        }).once
+        results = []
+        self.result_queue.should_receive('put').replace_with(results.append)
+        getattr(self.mock_worker, handler)(object_info)
+        assert_equal(1, len(results))
+        return results[0]
+
+    def test_handle_head_object(self):
+        result = self._metadata_op_results(
+            'handle_head_object', {'type': ssbench.HEAD_OBJECT,
+                                   'container': 'Document', 'name': 'obj'},
+            client.head_object)
+        assert_equal(dict(
+            type=ssbench.HEAD_OBJECT, container='Document', name='obj',
+            worker_id=self.worker_id, completed_at=self.stub_time,
+            first_byte_latency=None, last_byte_latency=0.25,
+            wait_latency=0.125, trans_id='meta', retries=1), result)
+
+    def test_handle_post_object(self):
+        result = self._metadata_op_results(
+            'handle_post_object', {'type': ssbench.POST_OBJECT,
+                                   'container': 'Document', 'name': 'obj'},
+            client.post_object,
+            headers={base_worker.POSTED_METADATA_HEADER: '%.6f' % self.stub_time})
+        assert_equal(0.25, result['last_byte_latency'])
+
+    def test_handle_list_container(self):
+        result = self._metadata_op_results(
+            'handle_list_container', {
+                'type': ssbench.LIST_CONTAINER, 'size_str': 'small',
+                'container': 'Document', 'prefix': 'small_',
+                'delimiter': '/', 'limit': 10, 'marker': 'small_000003'},
+            base_worker._get_container_headers, prefix='small_', delimiter='/',
+            limit=10, marker='small_000003')
+        # The listing's parameters aren't kept
+        assert_equal(dict(
+            type=ssbench.LIST_CONTAINER, size_str='small',
+            container='Document', worker_id=self.worker_id,
+            completed_at=self.stub_time, first_byte_latency=None,
+            last_byte_latency=0.25, wait_latency=0.125, trans_id='meta',
+            retries=1), result)
+
+    def test_handle_head_container(self):
+        result = self._metadata_op_results(
+            'handle_head_container', {'type': ssbench.HEAD_CONTAINER,
+                                      'container': 'Document'},
+            client.head_container)
+        assert_equal(0.25, result['last_byte_latency'])
+
+    def test_get_container_headers(self):
+        self.mock_client.should_receive('get_container').with_args(
+            url='someUrl', token='someToken', container='c', limit=5,
+            http_conn='conn',
+        ).and_return(({'x-trans-id': 'list'}, [{'name': 'o'}])).once
+        assert_equal({'x-trans-id': 'list'}, base_worker._get_container_headers(
+            url='someUrl', token='someToken', container='c', limit=5,
+            http_conn='conn'))
+
     def test_dispatching_bad_job_type(self):
         info = {'type': 'zomg,what?', 'a': 1}
         assert_raises(NameError, self.mock_worker.handle_job, info)
@@ -478,6 +947,65 @@ class TestWorker(object):
                 exception=repr(socket.error('slap happy')), retries=5),
             got[0])
 
+    def test_dispatching_deadline(self):
+        info = {'type': ssbench.READ_OBJECT, 'a': 3,
+                'deadlines': {ssbench.READ_OBJECT: 0.01,
+                              ssbench.CREATE_OBJECT: 60}}
+        self.mock_worker.should_receive('handle_get_object').replace_with(
+            lambda job: gevent.sleep(5)).once
+        got = []
+        self.result_queue.should_receive('put').replace_with(got.append).once
+
+        self.worker.handle_job(info)
+
+        assert_equal(1, len(got))
+        assert_true(got[0]['timed_out'])
+        assert_equal(repr(base_worker.DeadlineExceeded(0.01)), got[0]['exception'])
+        assert_true('deadlines' not in got[0])
+        assert_equal({}, self.worker.job_starts)
+
+    def test_connection_deadline_exceeded(self):
+        self.worker.conn_pools['someUrl'] = mock_pool = flexmock()
+        old_conn, new_conn = (None, flexmock()), (None, flexmock())
+        old_conn[1].should_receive('close').once
+        mock_pool.should_receive('get').and_return(old_conn).once
+        mock_pool.should_receive('create').and_return(new_conn).once
+        # The abandoned one's replaced
+        mock_pool.should_receive('put').with_args(new_conn).once
+
+        with assert_raises(base_worker.DeadlineExceeded):
+            with self.worker.connection('someUrl'):
+                raise base_worker.DeadlineExceeded(1)
+
+    def test_deadline_exceeded_waiting_for_connection(self):
+        # The pool's exhausted, so the deadline expires inside get()
+        self.worker.conn_pools['someUrl'] = mock_pool = flexmock()
+        mock_pool.should_receive('get').replace_with(
+            lambda: gevent.sleep(5)).once
+        mock_pool.should_receive('put').never
+
+        def _get_object(job):
+            with self.worker.connection('someUrl'):
+                pass
+        self.mock_worker.should_receive('handle_get_object').replace_with(
+            _get_object).once
+        got = []
+        self.result_queue.should_receive('put').replace_with(got.append).once
+
+        self.worker.handle_job({'type': ssbench.READ_OBJECT,
+                                'deadlines': {ssbench.READ_OBJECT: 0.01}})
+
+        assert_equal(1, len(got))
+        assert_true(got[0]['timed_out'])
+        assert_equal(repr(base_worker.DeadlineExceeded(0.01)), got[0]['exception'])
+
+    def test_stuck_count(self):
+        self.worker.stuck_seconds = 10
+        self.worker.job_starts = {1: self.stub_time - 11,
+                                  2: self.stub_time - 9,
+                                  3: self.stub_time - 30}
+        assert_equal(2, self.worker._stuck_count())
+
     def test_dispatching_client_exception(self):
         info = {'type': ssbench.READ_OBJECT, 'container': 'fun', 'a': 2}
         wrappedException = client.ClientException('slam bam')
@@ -553,3 +1081,328 @@ class TestWorker(object):
         self.mock_worker.should_receive(
             'handle_delete_object').with_args(info).once
         self.mock_worker.handle_job(info)
+
+    def test_get_run_context(self):
+        run_context = RunContext({'network_timeout': 3.0},
+                                 containers=['c_0', 'c_1'],
+                                 size_strs=['tiny'], context_id=7)
+        self.worker.control_dealer = flexmock()
+        self.worker.control_dealer.should_receive('send').with_args(
+            msgpack.dumps(('CONTEXT', 7))).replace_with(
+                lambda _: self.worker._handle_control_message(msgpack.dumps(
+                    ('CONTEXT', 7, run_context.packb())))).once
+
+        fetched = self.worker._get_run_context(7)
+        assert_equal(run_context.containers, fetched.containers)
+        assert_equal(run_context.job_defaults, fetched.job_defaults)
+        # Cached from now on
+        assert_true(self.worker._get_run_context(7) is fetched)
+
+    def test_get_run_context_unknown(self):
+        self.worker.control_dealer = flexmock()
+        self.worker.control_dealer.should_receive('send').replace_with(
+            lambda _: self.worker._handle_control_message(msgpack.dumps(
+                ('CONTEXT', 8, None)))).once
+
+        assert_raises(ValueError, self.worker._get_run_context, 8)
+        assert_true(8 not in self.worker.run_contexts)
+
+    def test_handle_control_message_token(self):
+        self.worker._handle_control_message(msgpack.dumps(
+            ('TOKEN', 'someKey', ['someUrl'], 'someToken')))
+
+        assert_equal((['someUrl'], 'someToken'),
+                     self.worker.token_data['someKey'])
+
+    def test_handle_control_message_wakes_waiters(self):
+        updated = self.worker.control_updated
+        self.worker._handle_control_message(msgpack.dumps(
+            ('TOKEN', 'someKey', ['someUrl'], 'someToken')))
+
+        assert_true(updated.is_set())
+        assert_true(self.worker.control_updated is not updated)
+        assert_true(not self.worker.control_updated.is_set())
+
+    def _go(self, messages):
+        """
+        Run go() over the given work messages, returning the jobs it spawns
+        and the results it puts.
+        """
+        self.mock_worker.should_receive('_spawn')
+        self.mock_worker.should_receive('_start_job_runners')
+        recv = self.mock_work_pull.should_receive('recv')
+        for message in messages + ['']:
+            recv.and_return(message)
+        spawned, got = [], []
+        self.mock_worker.should_receive('_spawn_job').replace_with(
+            lambda job: spawned.append(job) or True)
+        self.result_queue.should_receive('put').replace_with(got.append)
+        self.worker.go()
+        return spawned, got
+
+    def test_go_unknown_run_context(self):
+        self.worker.control_dealer = flexmock()
+        self.worker.control_dealer.should_receive('send').replace_with(
+            lambda _: self.worker._handle_control_message(msgpack.dumps(
+                ('CONTEXT', 8, None)))).once
+
+        spawned, got = self._go([
+            msgpack.dumps((8, [[0, 0, 0, 1, 99], [0, 0, 0, 2, 99]], 40)),
+            msgpack.dumps([{'type': 'PING'}])])
+        # The worker carries on with the next message
+        assert_equal([{'type': 'PING'}], spawned)
+        assert_equal([40, 41], [r['job_id'] for r in got])
+        assert_true('does not know run context 8' in got[0]['exception'])
+        assert_equal(2, self.worker.spawned)
+
+        # The master is told which jobs failed, and why
+        message = self.worker._keep_results(got)
+        assert_equal([40, 41], message['failed'])
+        assert_equal(got[1]['exception'], message['exceptions'][41])
+        assert_equal(0, len(self.worker.summary))
+
+    def test_go_run_context_timeout(self):
+        self.worker.control_dealer = flexmock()
+        self.worker.control_dealer.should_receive('send').times(
+            base_worker.RUN_CONTEXT_TRIES)
+        self.mock_worker.should_receive('_wait_for_control').and_return(
+            False)
+
+        spawned, got = self._go([
+            msgpack.dumps((9, [[0, 0, 0, 1, 99]], 7)),
+            # Without job IDs, there's nothing to report
+            msgpack.dumps((9, [[0, 0, 0, 2, 99]])),
+            msgpack.dumps([{'type': 'PING'}])])
+        assert_equal([{'type': 'PING'}], spawned)
+        assert_equal([7], [r['job_id'] for r in got])
+        assert_true('Unable to fetch run context 9' in got[0]['exception'])
+
+    def test_get_run_context_without_control_port(self):
+        assert_raises(ValueError, self.worker._get_run_context, 9)
+
+    def test_start_barrier_holds_jobs(self):
+        self.worker.job_queue = flexmock()
+        self.worker.job_queue.should_receive('put').with_args(
+            {'type': 'PING'}).twice
+        flexmock(gevent).should_receive('spawn_later').once
+        flexmock(gevent).should_receive('spawn').replace_with(
+            lambda fn, *args: fn(*args))
+
+        self.worker._hold_jobs(11, [{'type': 'PING'}])
+        self.worker._hold_jobs(11, [{'type': 'PING'}])
+        assert_equal(0, self.worker.spawned)
+
+        self.worker._handle_control_message(msgpack.dumps(('START', 11)))
+        assert_equal(2, self.worker.spawned)
+        assert_true(11 in self.worker.started_contexts)
+        assert_true(11 not in self.worker.held_jobs)
+
+        # Timing out after a START does nothing
+        self.worker._start_context(11, timed_out=True)
+        assert_equal(2, self.worker.spawned)
+
+    def test_job_runners(self):
+        self.worker.job_queue = gevent.queue.Channel()
+        runners = [gevent.spawn(self.worker._job_runner) for _ in xrange(2)]
+        got = []
+        self.result_queue.should_receive('put').replace_with(got.append)
+
+        for i in xrange(3):
+            self.worker._spawn_job({'type': 'PING', 'i': i})
+        # A job which blows up gets an exception result, and its runner
+        # carries on
+        self.worker._spawn_job({'type': 'bogus'})
+        self.worker._spawn_job({'type': 'PING', 'i': 3})
+        gevent.sleep(0)
+
+        assert_equal(5, self.worker.spawned)
+        assert_equal([0, 1, 2, 3], [r['i'] for r in got if 'i' in r])
+        bogus, = [r for r in got if r['type'] == 'bogus']
+        assert_true('NameError' in bogus['exception'])
+        assert_equal(self.stub_time, got[0]['completed_at'])
+        assert_equal(self.worker_id, got[0]['worker_id'])
+        gevent.killall(runners)
+
+    def test_configure(self):
+        concurrency = self.worker.concurrency
+        self.worker._handle_control_message(msgpack.dumps(
+            ('CONFIGURE', {'batch_size': 20, 'max_retries': 2,
+                           'batch_linger': 0.01, 'concurrency': 5,
+                           'retry_backoff': 0.1, 'retry_rules': {404: 1}})))
+
+        assert_equal(20, self.worker.batch_size)
+        assert_equal(0.01, self.worker.batch_linger)
+        assert_equal(2, self.worker.max_retries)
+        assert_equal(0.1, self.worker.retry_backoff)
+        assert_equal({404: 1}, self.worker.retry_rules)
+        # Not configurable
+        assert_equal(concurrency, self.worker.concurrency)
+
+    def test_kill(self):
+        self.mock_worker.should_receive('_exit').with_args(
+            base_worker.SUICIDE_EXIT_STATUS).once
+
+        self.worker._handle_control_message(msgpack.dumps(('KILL',)))
+
+    def test_heartbeat_claims_pulled_jobs(self):
+        self.worker.pulled_jobs = [(10, 3), (20, 1)]
+        sent = []
+        self.mock_worker.should_receive('_send_control').replace_with(
+            sent.append)
+        flexmock(gevent).should_receive('sleep').and_return(None) \
+            .and_raise(StopIteration)
+
+        assert_raises(StopIteration, self.worker._heartbeat)
+
+        assert_equal('REGISTER', sent[0][0])
+        assert_equal(('HEARTBEAT', self.worker_id, 0, [(10, 3), (20, 1)], 0),
+                     sent[1])
+        assert_equal([], self.worker.pulled_jobs)
+
+    def test_summarize(self):
+        result = dict(type=ssbench.READ_OBJECT, size_str='tiny', size=99,
+                      received_bytes=99, completed_at=self.stub_time,
+                      retries=1,
+                      first_byte_latency=0.1, last_byte_latency=0.2,
+                      trans_id='tx1', job_id=4, summary=True)
+        failure = dict(type=ssbench.READ_OBJECT, size_str='tiny',
+                       completed_at=self.stub_time, retries=0,
+                       exception='oops', traceback='', job_id=5,
+                       summary=True)
+        self.worker.summary.flushed_at = self.stub_time
+        self.worker.spawned = 1
+
+        assert_equal({'done': [4], 'failed': [5]},
+                     self.worker._keep_results([result, failure]))
+
+        # Out of jobs, so the buckets go too
+        self.worker.spawned = 0
+        message = self.worker._keep_results([dict(result, job_id=6)])
+        assert_equal([6], message['done'])
+        summary = message['summary']
+        assert_equal(self.worker_id, summary['worker_id'])
+        assert_equal([failure], summary['samples'])
+        bucket, = summary['buckets']
+        assert_equal((int(self.stub_time), 3, 1, 2, 0, 198),
+                     (bucket['second'], bucket['count'], bucket['errors'],
+                      bucket['retries'], bucket['sent_bytes'],
+                      bucket['received_bytes']))
+        assert_equal((0.2, 'tx1'), bucket['last_byte_latency']['worst'])
+        assert_equal(0, len(self.worker.summary))
+
+    def test_spool_results(self):
+        temp_dir = tempfile.mkdtemp()
+        self.worker.spool_dir = temp_dir
+        self.worker.spawned = 1
+        result = dict(type=ssbench.READ_OBJECT, size_str='tiny',
+                      completed_at=self.stub_time, retries=0,
+                      first_byte_latency=0.1, last_byte_latency=0.2,
+                      trans_id='tx1', job_id=4, spool=True)
+
+        assert_equal({'done': [4], 'failed': []},
+                     self.worker._keep_results([result]))
+        spool_path = self.worker.spool.results_file_path
+        assert_true(spool_path.startswith(temp_dir))
+
+        sent = []
+        self.mock_worker.should_receive('_send_control').replace_with(
+            sent.append)
+        self.worker._send_spool()
+        assert_true(self.worker.spool is None)
+        assert_true(not os.path.exists(spool_path))
+        assert_equal(('SPOOL_END', self.worker_id, 1), sent[-1])
+
+        # What was sent is a spool file holding the result
+        with open(spool_path, 'wb') as spool_file:
+            spool_file.write(sent[0][2])
+        batches = [batch for _, batch in RunResults(spool_path).read_batches()]
+        assert_equal([[result]], batches)
+        os.unlink(spool_path)
+        os.rmdir(temp_dir)
+
+    def test_send_no_spool(self):
+        self.mock_worker.should_receive('_send_control').with_args(
+            ('SPOOL_END', self.worker_id, 0)).once
+        self.worker._send_spool()
+
+
+def _queue_of(results):
+    result_queue = gevent.queue.Queue()
+    for result in results:
+        result_queue.put(result)
+    return result_queue
+
+
+def test_gather_results_max_count():
+    results = [{'job_id': i} for i in xrange(5)]
+    result_queue = _queue_of(results)
+
+    gathered, packed = gather_results(result_queue, 3, 2 ** 16, 0,
+                                      lambda: 100)
+
+    assert_equal(results[:3], gathered)
+    assert_equal(results[:3], msgpack.loads(packed))
+    assert_equal(2, result_queue.qsize())
+
+
+def test_gather_results_max_bytes():
+    results = [{'job_id': i, 'traceback': 'x' * 100} for i in xrange(5)]
+
+    gathered, packed = gather_results(_queue_of(results), 100, 150,
+                                      0, lambda: 100)
+
+    assert_equal(results[:2], gathered)
+
+
+def test_gather_results_takes_queued_past_linger():
+    results = [{'job_id': i} for i in xrange(5)]
+
+    gathered, packed = gather_results(_queue_of(results), 100,
+                                      2 ** 16, 0, lambda: 100)
+
+    assert_equal(results, gathered)
+
+
+def test_gather_results_linger():
+    result_queue = _queue_of([{'job_id': 1}])
+    gevent.spawn_later(0.05, result_queue.put, {'job_id': 2})
+
+    start = time.time()
+    gathered, packed = gather_results(result_queue, 100, 2 ** 16,
+                                      0.01, lambda: 100)
+    assert_true(time.time() - start < 0.05)
+    assert_equal([{'job_id': 1}], gathered)
+
+    # A longer linger waits for the straggler
+    assert_equal({'job_id': 2}, result_queue.get())
+    result_queue.put({'job_id': 3})
+    gevent.spawn_later(0.05, result_queue.put, {'job_id': 4})
+    gathered, packed = gather_results(result_queue, 100, 2 ** 16,
+                                      1, lambda: 100)
+    assert_equal([{'job_id': 3}, {'job_id': 4}], gathered)
+
+
+def test_gather_results_nothing_in_flight():
+    result_queue = _queue_of([{'job_id': 1}])
+    gevent.spawn_later(0.05, result_queue.put, {'job_id': 2})
+
+    start = time.time()
+    gathered, packed = gather_results(result_queue, 100, 2 ** 16,
+                                      1, lambda: 1)
+
+    assert_true(time.time() - start < 0.05)
+    assert_equal([{'job_id': 1}], gathered)
+
+
+def test_gather_results_kept_results_not_packed():
+    results = [{'job_id': 1, 'summary': True}, {'job_id': 2},
+               {'job_id': 3, 'spool': True}]
+
+    gathered, packed = gather_results(_queue_of(results), 100,
+                                      2 ** 16, 0, lambda: 100)
+    assert_equal(results, gathered)
+    assert_equal([{'job_id': 2}], msgpack.loads(packed))
+
+    gathered, packed = gather_results(_queue_of(results[:1]), 100,
+                                      2 ** 16, 0, lambda: 100)
+    assert_equal(None, packed)
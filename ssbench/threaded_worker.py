@@ -0,0 +1,252 @@
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import time
+import Queue
+import socket
+import httplib
+import logging
+import msgpack
+import threading
+from contextlib import contextmanager
+
+import zmq
+
+import ssbench.swift_client as client
+from ssbench.base_worker import BaseWorker, DeadlineExceeded
+
+
+# How often the control thread checks for control messages to send (seconds)
+CONTROL_POLL_INTERVAL = 0.01
+# Other threads may be blocked on our sockets when we exit, so they can't be
+# closed cleanly; on STOP, results already handed to ZMQ get this long
+# (seconds) to go out instead.
+EXIT_FLUSH_SECONDS = 0.5
+# How often the watchdog thread looks for jobs past their deadlines (seconds)
+WATCHDOG_INTERVAL = 0.1
+
+
+class _Deadline(object):
+    """A job's deadline, and the connections its threads are using"""
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.time() + seconds
+        self.expired = False
+        self.conns = set()
+
+
+class ThreadedWorker(BaseWorker):
+    """
+    A BaseWorker which runs its jobs on ``concurrency`` OS threads, with
+    plain (blocking) pyzmq sockets and httplib connections, instead of on
+    greenlets (see ssbench.worker.Worker).  Nothing is monkey-patched, so
+    profiles and tracebacks show ordinary frames, and gevent needn't even be
+    installed.  It speaks the same protocol to the master and handles
+    jobs with the same code; only the plumbing differs:
+
+      - each job thread keeps its own keep-alive connection to each storage
+        URL, instead of sharing a pool of them;
+      - ZMQ sockets may only be used by one thread, so control messages are
+        queued for the control thread to send;
+      - the number of jobs in flight is updated under a lock;
+      - a thread can't be interrupted, so a watchdog thread enforces job
+        deadlines by shutting down the connections of a job past its
+        deadline (including those of its helper threads, like segment
+        uploaders), failing its requests.
+    """
+    _zmq = zmq
+    _Queue = Queue.Queue
+    _Event = threading.Event
+    _Lock = threading.Lock
+
+    def __init__(self, *args, **kwargs):
+        BaseWorker.__init__(self, *args, **kwargs)
+        self.local = threading.local()
+        self.control_outbox = Queue.Queue()
+        self.spawned_lock = threading.Lock()
+        # _Deadlines of jobs in flight, for the watchdog (started with the
+        # first one)
+        self.deadlines = set()
+        self.deadlines_lock = threading.Lock()
+        self.watchdog = None
+
+    def _spawn(self, fn, *args, **kwargs):
+        thread = threading.Thread(target=fn, args=args, kwargs=kwargs)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def _spawn_later(self, seconds, fn, *args, **kwargs):
+        timer = threading.Timer(seconds, fn, args, kwargs)
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    def _sleep(self, seconds):
+        time.sleep(seconds)
+
+    def _spawn_helper(self, fn):
+        # The helper works under the job's deadline, and its connections
+        # aren't reused once it's done, so they're closed
+        deadline = getattr(self.local, 'deadline', None)
+
+        def _helper():
+            self.local.deadline = deadline
+            try:
+                fn()
+            finally:
+                for conn in self.local.__dict__.pop('conns', {}).values():
+                    try:
+                        conn[1].close()
+                    except Exception:
+                        pass
+        return self._spawn(_helper)
+
+    def _join_helper(self, helper):
+        # Thread.join() can't be interrupted, so check the job's deadline
+        # every so often
+        deadline = getattr(self.local, 'deadline', None)
+        while helper.is_alive():
+            helper.join(WATCHDOG_INTERVAL)
+            if deadline is not None and deadline.expired:
+                raise DeadlineExceeded(deadline.seconds)
+
+    @contextmanager
+    def _deadline(self, seconds):
+        deadline = self.local.deadline = _Deadline(seconds)
+        with self.deadlines_lock:
+            self.deadlines.add(deadline)
+            if self.watchdog is None:
+                self.watchdog = self._spawn(self._watchdog)
+        try:
+            yield
+        finally:
+            self.local.deadline = None
+            with self.deadlines_lock:
+                self.deadlines.discard(deadline)
+
+    def _watchdog(self):
+        while True:
+            time.sleep(WATCHDOG_INTERVAL)
+            now = time.time()
+            with self.deadlines_lock:
+                for deadline in self.deadlines:
+                    if deadline.expired or now < deadline.expires_at:
+                        continue
+                    deadline.expired = True
+                    # Its requests fail, and connection() raises
+                    # DeadlineExceeded for them
+                    for conn in deadline.conns:
+                        try:
+                            conn[1].sock.shutdown(socket.SHUT_RDWR)
+                        except Exception:
+                            pass
+
+    def _add_spawned(self, count):
+        with self.spawned_lock:
+            self.spawned += count
+
+    def _send_control(self, message):
+        self.control_outbox.put(msgpack.dumps(message))
+
+    def _control_reader(self):
+        poller = zmq.Poller()
+        poller.register(self.control_dealer, zmq.POLLIN)
+        while True:
+            while True:
+                try:
+                    self.control_dealer.send(self.control_outbox.get_nowait())
+                except Queue.Empty:
+                    break
+            if not poller.poll(CONTROL_POLL_INTERVAL * 1000):
+                continue
+            message_raw = self.control_dealer.recv()
+            try:
+                self._handle_control_message(message_raw)
+            except Exception:
+                logging.exception('Bad control message %r', message_raw)
+
+    def _wait_for_control(self, ready, timeout):
+        deadline = time.time() + timeout
+        while True:
+            # Take the event before checking, so an update in between
+            # isn't missed
+            updated = self.control_updated
+            if ready():
+                return True
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            updated.wait(remaining)
+
+    def _exit(self, status, linger=None):
+        if linger:
+            time.sleep(min(linger / 1000.0, EXIT_FLUSH_SECONDS))
+        os._exit(status)
+
+    def _create_connection_pool(
+            self, storage_url,
+            connect_timeout=client.DEFAULT_CONNECT_TIMEOUT,
+            network_timeout=client.DEFAULT_NETWORK_TIMEOUT):
+        # Connections are made per thread, as needed; just note how
+        with self.conn_pools_lock:
+            self.conn_pools.setdefault(storage_url,
+                                       (connect_timeout, network_timeout))
+
+    def _connect(self, storage_url):
+        connect_timeout, network_timeout = self.conn_pools[storage_url]
+        conn = client.http_connection(
+            storage_url, connect_timeout=connect_timeout,
+            connection_classes=(httplib.HTTPConnection,
+                                httplib.HTTPSConnection))
+        # Made as a job needs it, so reported with that job's request
+        conn[1].connect_latencies = client.connect(conn[1])
+        conn[1].sock.settimeout(network_timeout)
+        # As in ConnectionPool.create()
+        conn[1].sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return conn
+
+    @contextmanager
+    def connection(self, storage_url):
+        deadline = getattr(self.local, 'deadline', None)
+        if deadline is not None and deadline.expired:
+            raise DeadlineExceeded(deadline.seconds)
+        conns = self.local.__dict__.setdefault('conns', {})
+        conn = in_use = conns.pop(storage_url, None) or \
+            self._connect(storage_url)
+        if deadline is not None:
+            with self.deadlines_lock:
+                deadline.conns.add(conn)
+        try:
+            yield conn
+        except (httplib.HTTPException, socket.error) as e:
+            # Most likely the server closed a kept-alive connection; the
+            # request is retried on a new one.
+            logging.debug("@connection hit %r...", e)
+            try:
+                conn[1].close()
+            except Exception:
+                pass
+            conn = None
+            if deadline is not None and deadline.expired:
+                # No; the watchdog shut it down
+                raise DeadlineExceeded(deadline.seconds)
+        finally:
+            if deadline is not None:
+                with self.deadlines_lock:
+                    deadline.conns.discard(in_use)
+            if conn is not None:
+                conns[storage_url] = conn
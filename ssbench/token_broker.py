@@ -0,0 +1,124 @@
+# Copyright (c) 2012-2013 SwiftStack, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+import logging
+
+import gevent
+import gevent.coros
+
+from ssbench.control import token_key
+
+
+# Neither auth v1.0 nor our v2.0 client tell us when a token expires, so
+# tokens are refreshed this often (tempauth tokens last a day by default,
+# and Keystone's an hour or more).
+DEFAULT_TOKEN_REFRESH_SECONDS = 20 * 60
+# How long to wait before retrying a failed refresh
+RETRY_SECONDS = 5
+
+
+class TokenBroker(object):
+    """
+    Authenticates once on behalf of every worker, and keeps the tokens fresh.
+
+    Whenever a token is fetched (the first time, on a schedule, or because a
+    worker got a 401 with it), every callable in ``listeners`` is called with
+    (token_key, storage_urls, token) so the new token can be pushed out.
+    """
+    def __init__(self, authenticate,
+                 refresh_seconds=DEFAULT_TOKEN_REFRESH_SECONDS):
+        """
+        :param authenticate: A callable taking auth_kwargs and returning a
+                             (storage_urls, token) tuple
+        :param refresh_seconds: Re-authenticate this often
+        """
+        self.authenticate = authenticate
+        self.refresh_seconds = refresh_seconds
+        self.listeners = []
+        self.tokens = {}  # token_key -> (storage_urls, token)
+        # (token_key, seconds) for every authentication, successful or not
+        self.auth_latencies = []
+        self._auth_kwargs = {}  # token_key -> auth_kwargs
+        self._refreshers = {}  # token_key -> greenlet
+        self._lock = gevent.coros.Semaphore(1)
+
+    def get(self, auth_kwargs):
+        """
+        :returns: A (storage_urls, token) tuple for the given auth_kwargs,
+                  authenticating first if necessary, or None if
+                  authentication failed
+        """
+        key = token_key(auth_kwargs)
+        if key not in self.tokens:
+            self._lock.acquire()
+            try:
+                if key not in self.tokens:
+                    self._auth_kwargs[key] = auth_kwargs
+                    self._refresh(key)
+            finally:
+                self._lock.release()
+        return self.tokens.get(key)
+
+    def rejected(self, key, token):
+        """
+        Note that a worker got a 401 using the given token; if it's still
+        the current one, get a new one (once, no matter how many workers
+        report it).
+        """
+        if key not in self._auth_kwargs:
+            return
+        self._lock.acquire()
+        try:
+            current = self.tokens.get(key)
+            if current and current[1] == token:
+                logging.info('Token rejected; re-authenticating')
+                del self.tokens[key]
+                self._refresh(key)
+        finally:
+            self._lock.release()
+
+    def stop(self):
+        for refresher in self._refreshers.values():
+            refresher.kill(block=False)
+        self._refreshers.clear()
+
+    def _refresh(self, key):
+        start = time.time()
+        try:
+            storage_urls, token = self.authenticate(self._auth_kwargs[key])
+        except Exception:
+            logging.exception('Unable to authenticate for workers; they '
+                              'will authenticate on their own')
+            delay = RETRY_SECONDS
+        else:
+            delay = self.refresh_seconds
+            self.tokens[key] = (storage_urls, token)
+            for listener in self.listeners:
+                listener(key, storage_urls, token)
+        self.auth_latencies.append((key, time.time() - start))
+        refresher = self._refreshers.pop(key, None)
+        if refresher and refresher is not gevent.getcurrent():
+            refresher.kill(block=False)
+        self._refreshers[key] = gevent.spawn_later(delay,
+                                                   self._scheduled_refresh,
+                                                   key)
+
+    def _scheduled_refresh(self, key):
+        self._lock.acquire()
+        try:
+            self._refresh(key)
+        finally:
+            self._lock.release()
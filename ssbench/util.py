@@ -1,6 +1,10 @@
 # Copyright (c) 2012-2013 SwiftStack, Inc.
 
 import os
+import sys
+import time
+import ctypes
+import ctypes.util
 import resource
 
 
@@ -31,3 +35,63 @@ def raise_file_descriptor_limit():
         except ValueError:
             nofile_target /= 1024
         break
+
+
+def set_cpu_affinity(cpu):
+    """
+    Pin the calling process to the given CPU number.  Only supported on
+    Linux.
+
+    :returns: True if the affinity was set, False if it couldn't be
+    """
+    if not sys.platform.startswith('linux'):
+        return False
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        sched_setaffinity = libc.sched_setaffinity
+    except (OSError, AttributeError):
+        return False
+    # A cpu_set_t is a bitmask of (at least) 1024 CPUs
+    bits_per_word = 8 * ctypes.sizeof(ctypes.c_ulong)
+    mask = (ctypes.c_ulong * (max(1024, cpu + 1) / bits_per_word + 1))()
+    mask[cpu / bits_per_word] = 1 << (cpu % bits_per_word)
+    return sched_setaffinity(0, ctypes.sizeof(mask), mask) == 0
+
+
+class _timespec(ctypes.Structure):
+    _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+
+def _monotonic_clock():
+    """
+    Find a monotonic clock (one which is not affected by system clock
+    adjustments) with sub-second resolution.  Falls back to time.time() if
+    the platform doesn't offer one we know how to call.
+    """
+    if hasattr(time, 'monotonic'):
+        return time.monotonic
+    if sys.platform.startswith('linux'):
+        clock_id = 1  # CLOCK_MONOTONIC
+    elif sys.platform == 'darwin':
+        clock_id = 6  # CLOCK_MONOTONIC (OS X 10.12+)
+    else:
+        return time.time
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        clock_gettime = libc.clock_gettime
+    except (OSError, AttributeError):
+        return time.time
+    clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(_timespec)]
+    if clock_gettime(clock_id, ctypes.pointer(_timespec())) != 0:
+        return time.time
+
+    def monotonic():
+        timespec = _timespec()
+        clock_gettime(clock_id, ctypes.pointer(timespec))
+        return timespec.tv_sec + timespec.tv_nsec * 1e-9
+    return monotonic
+
+
+# Seconds (as a float) from an arbitrary, fixed starting point; only useful
+# for measuring intervals.
+monotonic_time = _monotonic_clock()